@@ -0,0 +1,46 @@
+"""add option_chain_snapshots table
+
+Revision ID: c3e1f7a2b9d4
+Revises: 2bf429ac7e6e
+Create Date: 2026-01-12 10:00:00.000000
+
+每個標的每天一份選擇權鏈快照，因子、Greeks 與回補腳本共用
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e1f7a2b9d4'
+down_revision: Union[str, None] = '2bf429ac7e6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'option_chain_snapshots',
+        sa.Column('underlying_id', sa.String(10), nullable=False, comment='標的物代碼（如 TX）'),
+        sa.Column('date', sa.Date(), nullable=False, comment='資料日期'),
+        sa.Column('contract_id', sa.String(20), nullable=False, comment='合約代碼'),
+        sa.Column('underlying_type', sa.String(10), nullable=False, comment='標的物類型（STOCK/FUTURES）'),
+        sa.Column('option_type', sa.String(4), nullable=False, comment='選擇權類型（CALL/PUT）'),
+        sa.Column('strike_price', sa.Numeric(10, 2), nullable=False, comment='履約價格'),
+        sa.Column('expiry_date', sa.Date(), nullable=False, comment='到期日'),
+        sa.Column('close', sa.Numeric(10, 2), nullable=True, comment='收盤價'),
+        sa.Column('volume', sa.BigInteger(), nullable=True, comment='成交量'),
+        sa.Column('open_interest', sa.BigInteger(), nullable=True, comment='未平倉量'),
+        sa.Column('source', sa.String(20), nullable=False, comment='資料來源（snapshot/kbars）'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('underlying_id', 'date', 'contract_id', name='pk_option_chain_snapshots'),
+        sa.CheckConstraint("option_type IN ('CALL', 'PUT')", name='ck_option_chain_snapshot_type'),
+        comment='選擇權鏈每日快照（因子 / Greeks / 回補共用）'
+    )
+    op.create_index('idx_option_chain_snapshots_date', 'option_chain_snapshots', ['date'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_option_chain_snapshots_date', table_name='option_chain_snapshots')
+    op.drop_table('option_chain_snapshots')
@@ -804,6 +804,23 @@ async def query_logs(
         )
 
 
+# ============ Cache Monitoring ============
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    獲取快取統計（需 superuser 權限）
+
+    近端 / Redis 命中率、Redis 讀取平均延遲、重算與提早刷新次數；
+    計數為處理此請求的 API 行程自啟動以來的累計值
+    """
+    from app.utils.cache import cache
+
+    return cache.get_stats()
+
+
 # ============ Security Monitoring ============
 
 @router.get("/security/events", response_model=SecurityEventsResponse)
@@ -5,8 +5,9 @@ Handles strategy backtesting operations
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db
 from app.api.dependencies import get_current_user
 from app.models.user import User
 from app.models.backtest import BacktestStatus
@@ -18,6 +19,8 @@ from app.schemas.backtest import (
     BacktestListResponse,
     BacktestRunRequest,
     BacktestProgress,
+    BacktestSweepRequest,
+    BacktestSweepStatus,
 )
 from app.services.backtest_service import BacktestService
 from app.services.backtest_engine import BacktestEngine
@@ -25,9 +28,11 @@ from app.core.config import settings
 from app.core.rate_limit import limiter, RateLimits
 from app.utils.logging import api_log
 from app.utils.redis_lock import backtest_execution_lock
-from app.tasks.backtest import run_backtest_async
+from app.services.backtest_sweep import SweepResultStore
+from app.tasks.backtest import run_backtest_async, run_backtest_sweep as run_backtest_sweep_task
 from loguru import logger
 from datetime import datetime, timezone
+import uuid
 
 router = APIRouter()
 
@@ -152,11 +157,123 @@ async def create_backtest(
         )
 
 
+@router.post("/sweep", status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit(RateLimits.BACKTEST_RUN)
+async def run_backtest_sweep(
+    request: Request,
+    sweep_request: BacktestSweepRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    參數掃描（網格 / 隨機搜尋）
+
+    同一策略、同一標的執行多組參數：資料只載入一次、策略只編譯一次，
+    參數組合分批派送到 backtest 隊列平行執行。
+    使用 GET /api/v1/backtest/sweep/{sweep_id} 查詢進度與排名（完成一個組合即可查到）。
+
+    Returns:
+        掃描 ID、任務 ID 與組合數量
+    """
+    try:
+        service = BacktestService(db)
+        config = service.prepare_sweep(sweep_request, current_user.id)
+
+        sweep_id = uuid.uuid4().hex
+        SweepResultStore(sweep_id).init({
+            'user_id': current_user.id,
+            'strategy_id': config['strategy_id'],
+            'symbol': config['symbol'],
+            'rank_by': config['rank_by'],
+            'total': len(config['combos']),
+            'status': 'pending',
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        })
+
+        task = run_backtest_sweep_task.apply_async(
+            args=[sweep_id, current_user.id, config],
+            queue='backtest',
+        )
+
+        logger.info(
+            f"Sweep {sweep_id} submitted: strategy {config['strategy_id']}, "
+            f"{len(config['combos'])} combinations (task_id: {task.id})"
+        )
+
+        api_log.log_operation(
+            "sweep",
+            "backtest",
+            config['strategy_id'],
+            current_user.id,
+            success=True,
+            task_id=task.id
+        )
+
+        return {
+            "sweep_id": sweep_id,
+            "task_id": task.id,
+            "total": len(config['combos']),
+            "status": "submitted",
+            "status_url": f"/api/v1/backtest/sweep/{sweep_id}"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _handle_error(
+            "Submit backtest sweep",
+            e,
+            "Failed to submit parameter sweep"
+        )
+
+
+@router.get("/sweep/{sweep_id}", response_model=BacktestSweepStatus)
+async def get_backtest_sweep(
+    sweep_id: str,
+    top: int = Query(20, ge=1, le=500, description="回傳前 N 名"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    查詢參數掃描進度與目前排名
+
+    結果隨子任務完成逐步寫入，可於掃描進行中輪詢。
+    """
+    try:
+        store = SweepResultStore(sweep_id)
+        meta = store.get_meta()
+
+        if not meta or meta.get('user_id') != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Sweep {sweep_id} not found"
+            )
+
+        return BacktestSweepStatus(
+            sweep_id=sweep_id,
+            status=meta.get('status', 'pending'),
+            total=meta.get('total', 0),
+            completed=meta.get('completed', 0),
+            failed=meta.get('failed', 0),
+            rank_by=meta.get('rank_by', 'sharpe_ratio'),
+            error=meta.get('error'),
+            results=store.top_results(top),
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _handle_error(
+            "Get backtest sweep",
+            e,
+            "Failed to retrieve parameter sweep status"
+        )
+
+
 @router.get("/{backtest_id}", response_model=BacktestDetail)
 async def get_backtest(
     backtest_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     取得回測詳情
@@ -168,8 +285,9 @@ async def get_backtest(
         回測完整資訊
     """
     try:
+        # BacktestDetail 包含 strategy 與 result，於同一次非同步查詢預先載入
         service = BacktestService(db)
-        backtest = service.get_backtest(
+        backtest = await service.get_backtest_with_result_async(
             backtest_id=backtest_id,
             user_id=current_user.id
         )
@@ -608,7 +726,7 @@ async def cancel_backtest_task(
 async def get_backtest_result(
     backtest_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     取得回測結果
@@ -621,9 +739,10 @@ async def get_backtest_result(
     """
     try:
         service = BacktestService(db)
-        backtest = service.get_backtest_with_result(
+        backtest = await service.get_backtest_with_result_async(
             backtest_id=backtest_id,
-            user_id=current_user.id
+            user_id=current_user.id,
+            with_trades=True
         )
 
         # Check if backtest is completed
@@ -651,7 +770,7 @@ async def get_backtest_result(
             "backtest_id": backtest.id,
             "status": backtest.status,
             "result": backtest.result,
-            "trades": backtest.trades if hasattr(backtest, 'trades') else []
+            "trades": backtest.trades
         }
 
     except HTTPException:
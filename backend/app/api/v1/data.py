@@ -5,7 +5,9 @@ Handles stock data fetching from database and FinLab API
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import Optional, List
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, date as date_type
 from decimal import Decimal
 from app.schemas.stock import (
@@ -31,7 +33,7 @@ from app.schemas.stock_price import StockPriceCreate
 from app.services.finlab_client import FinLabClient
 from app.repositories.stock import StockRepository
 from app.repositories.stock_price import StockPriceRepository
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_async_db, get_db
 from app.utils.cache import cache
 from loguru import logger
 import pandas as pd
@@ -69,32 +71,28 @@ async def get_stock_list(
         所有台股的基本資訊列表
     """
     try:
-        # Try cache first
         cache_key = f"stock_list:db:{skip}:{limit}"
-        cached_data = cache.get(cache_key)
-
-        if cached_data is not None:
-            logger.info("Returning cached stock list from database")
-            return cached_data
-
-        # Fetch from database
-        stocks = StockRepository.get_all(db, skip=skip, limit=limit, is_active='active')
 
-        # Convert to response format
-        result = [
-            StockInfo(
-                stock_id=stock.stock_id,
-                name=stock.name,
-                industry=stock.category,
-                market=stock.market,
-            )
-            for stock in stocks
-        ]
+        def load_stock_list():
+            # Fetch from database
+            stocks = StockRepository.get_all(db, skip=skip, limit=limit, is_active='active')
+
+            # Convert to response format
+            return [
+                StockInfo(
+                    stock_id=stock.stock_id,
+                    name=stock.name,
+                    industry=stock.category,
+                    market=stock.market,
+                )
+                for stock in stocks
+            ]
 
-        # Cache for 1 hour
-        cache.set(cache_key, result, expiry=3600)
+        # Cache for 1 hour（熱門鍵過期時只有一個 worker 查詢資料庫）
+        # Redis 與同步 Session 皆為阻塞呼叫，整段交給執行緒池
+        result = await run_in_threadpool(cache.get_or_set, cache_key, load_stock_list, expiry=3600)
 
-        logger.info(f"Returned {len(result)} stocks from database")
+        logger.info(f"Returned {len(result)} stocks")
         return result
 
     except Exception as e:
@@ -121,7 +119,7 @@ async def search_stocks(
     """
     try:
         # Search in database
-        stocks = StockRepository.search(db, request.keyword, skip=0, limit=50)
+        stocks = await run_in_threadpool(StockRepository.search, db, request.keyword, skip=0, limit=50)
 
         stock_infos = [
             StockInfo(
@@ -169,7 +167,7 @@ async def get_stock_price(
     try:
         # Try cache first
         cache_key = f"price:{stock_id}:{start_date}:{end_date}"
-        cached_data = cache.get(cache_key)
+        cached_data = await run_in_threadpool(cache.get, cache_key)
 
         if cached_data is not None:
             logger.info(f"Returning cached price data for {stock_id}")
@@ -179,8 +177,9 @@ async def get_stock_price(
                 cached=True,
             )
 
-        # Fetch from FinLab
-        price_df = finlab_client.get_price(
+        # Fetch from FinLab（同步 HTTP 客戶端，交給執行緒池）
+        price_df = await run_in_threadpool(
+            finlab_client.get_price,
             stock_id=stock_id,
             start_date=start_date,
             end_date=end_date,
@@ -194,7 +193,7 @@ async def get_stock_price(
         }
 
         # Cache for 10 minutes
-        cache.set(cache_key, data, expiry=600)
+        await run_in_threadpool(cache.set, cache_key, data, expiry=600)
 
         return StockDataResponse(
             stock_id=stock_id,
@@ -220,7 +219,7 @@ async def get_stock_ohlcv(
     stock_id: str,
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     finlab_client: FinLabClient = Depends(get_finlab_client),
 ):
     """
@@ -237,7 +236,7 @@ async def get_stock_ohlcv(
     try:
         # Try cache first
         cache_key = f"ohlcv:{stock_id}:{start_date}:{end_date}"
-        cached_data = cache.get(cache_key)
+        cached_data = await run_in_threadpool(cache.get, cache_key)
 
         if cached_data is not None:
             logger.info(f"Returning cached OHLCV data for {stock_id}")
@@ -247,12 +246,12 @@ async def get_stock_ohlcv(
                 cached=True,
             )
 
-        # Try database
+        # Try database（asyncpg，不阻塞 event loop）
         try:
             start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
             end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
 
-            prices = StockPriceRepository.get_by_stock(
+            prices = await StockPriceRepository.get_by_stock_async(
                 db, stock_id, start_date=start, end_date=end, skip=0, limit=10000
             )
 
@@ -270,7 +269,7 @@ async def get_stock_ohlcv(
                 }
 
                 # Cache for 10 minutes
-                cache.set(cache_key, data, expiry=600)
+                await run_in_threadpool(cache.set, cache_key, data, expiry=600)
 
                 logger.info(f"Returned {len(data)} OHLCV records from database for {stock_id}")
                 return StockDataResponse(
@@ -281,45 +280,13 @@ async def get_stock_ohlcv(
         except Exception as db_error:
             logger.warning(f"Database query failed, falling back to FinLab: {str(db_error)}")
 
-        # Fallback to FinLab if database is empty
-        ohlcv_df = finlab_client.get_ohlcv(
-            stock_id=stock_id,
-            start_date=start_date,
-            end_date=end_date,
+        # Fallback to FinLab if database is empty（FinLab 與寫回資料庫皆為同步呼叫）
+        data = await run_in_threadpool(
+            _fetch_and_store_ohlcv, finlab_client, stock_id, start_date, end_date
         )
 
-        # Convert DataFrame to dict
-        data = {
-            str(date): {
-                'open': float(row['open']) if pd.notna(row['open']) else None,
-                'high': float(row['high']) if pd.notna(row['high']) else None,
-                'low': float(row['low']) if pd.notna(row['low']) else None,
-                'close': float(row['close']) if pd.notna(row['close']) else None,
-                'volume': int(row['volume']) if pd.notna(row['volume']) else None,
-            }
-            for date, row in ohlcv_df.iterrows()
-        }
-
-        # Save to database for future use
-        try:
-            for date, row_data in data.items():
-                price_create = StockPriceCreate(
-                    stock_id=stock_id,
-                    date=datetime.strptime(date, "%Y-%m-%d").date(),
-                    open=Decimal(str(row_data['open'])) if row_data['open'] else Decimal('0'),
-                    high=Decimal(str(row_data['high'])) if row_data['high'] else Decimal('0'),
-                    low=Decimal(str(row_data['low'])) if row_data['low'] else Decimal('0'),
-                    close=Decimal(str(row_data['close'])) if row_data['close'] else Decimal('0'),
-                    volume=row_data['volume'] if row_data['volume'] else 0,
-                    adj_close=None
-                )
-                StockPriceRepository.upsert(db, price_create)
-            logger.info(f"Saved {len(data)} OHLCV records to database for {stock_id}")
-        except Exception as save_error:
-            logger.warning(f"Failed to save to database: {str(save_error)}")
-
         # Cache for 10 minutes
-        cache.set(cache_key, data, expiry=600)
+        await run_in_threadpool(cache.set, cache_key, data, expiry=600)
 
         logger.info(f"Returned {len(data)} OHLCV records from FinLab for {stock_id}")
         return StockDataResponse(
@@ -341,6 +308,59 @@ async def get_stock_ohlcv(
         )
 
 
+def _fetch_and_store_ohlcv(
+    finlab_client: FinLabClient,
+    stock_id: str,
+    start_date: Optional[str],
+    end_date: Optional[str],
+) -> dict:
+    """
+    從 FinLab 取得 OHLCV 並寫回資料庫（同步，於執行緒池中執行）
+
+    寫入使用獨立的同步 Session，與請求的 AsyncSession 互不影響。
+    """
+    ohlcv_df = finlab_client.get_ohlcv(
+        stock_id=stock_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+    # Convert DataFrame to dict
+    data = {
+        str(date): {
+            'open': float(row['open']) if pd.notna(row['open']) else None,
+            'high': float(row['high']) if pd.notna(row['high']) else None,
+            'low': float(row['low']) if pd.notna(row['low']) else None,
+            'close': float(row['close']) if pd.notna(row['close']) else None,
+            'volume': int(row['volume']) if pd.notna(row['volume']) else None,
+        }
+        for date, row in ohlcv_df.iterrows()
+    }
+
+    # Save to database for future use
+    db = SessionLocal()
+    try:
+        for date, row_data in data.items():
+            price_create = StockPriceCreate(
+                stock_id=stock_id,
+                date=datetime.strptime(date, "%Y-%m-%d").date(),
+                open=Decimal(str(row_data['open'])) if row_data['open'] else Decimal('0'),
+                high=Decimal(str(row_data['high'])) if row_data['high'] else Decimal('0'),
+                low=Decimal(str(row_data['low'])) if row_data['low'] else Decimal('0'),
+                close=Decimal(str(row_data['close'])) if row_data['close'] else Decimal('0'),
+                volume=row_data['volume'] if row_data['volume'] else 0,
+                adj_close=None
+            )
+            StockPriceRepository.upsert(db, price_create)
+        logger.info(f"Saved {len(data)} OHLCV records to database for {stock_id}")
+    except Exception as save_error:
+        logger.warning(f"Failed to save to database: {str(save_error)}")
+    finally:
+        db.close()
+
+    return data
+
+
 @router.get("/latest-price/{stock_id}", response_model=LatestPriceResponse)
 async def get_latest_price(
     stock_id: str,
@@ -356,19 +376,12 @@ async def get_latest_price(
         最新收盤價
     """
     try:
-        # Try cache first (cache for 5 minutes)
+        # Cache for 5 minutes（過期時只有一個 worker 呼叫 FinLab，其餘等待結果）
         cache_key = f"latest_price:{stock_id}"
-        cached_price = cache.get(cache_key)
-
-        if cached_price is not None:
-            logger.info(f"Returning cached latest price for {stock_id}")
-            return LatestPriceResponse(
-                stock_id=stock_id,
-                price=cached_price,
-            )
-
-        # Fetch from FinLab
-        price = finlab_client.get_latest_price(stock_id)
+        price = await run_in_threadpool(
+            cache.get_or_set,
+            cache_key, lambda: finlab_client.get_latest_price(stock_id), expiry=300
+        )
 
         if price is None:
             raise HTTPException(
@@ -376,9 +389,6 @@ async def get_latest_price(
                 detail=f"Stock {stock_id} not found or no price data available",
             )
 
-        # Cache for 5 minutes
-        cache.set(cache_key, price, expiry=300)
-
         return LatestPriceResponse(
             stock_id=stock_id,
             price=price,
@@ -408,15 +418,14 @@ async def clear_cache(
         清除的快取數量
     """
     try:
+        # SCAN 迴圈可能需要多次往返 Redis，交給執行緒池
         if pattern:
-            count = cache.clear_pattern(pattern)
+            count = await run_in_threadpool(cache.clear_pattern, pattern)
         else:
             # Clear all stock data cache
-            count = cache.clear_pattern("stock:*")
-            count += cache.clear_pattern("price:*")
-            count += cache.clear_pattern("ohlcv:*")
-            count += cache.clear_pattern("latest_price:*")
-            count += cache.clear_pattern("fundamental:*")
+            count = 0
+            for default_pattern in ("stock:*", "price:*", "ohlcv:*", "latest_price:*", "fundamental:*"):
+                count += await run_in_threadpool(cache.clear_pattern, default_pattern)
 
         return {
             "message": f"Cleared {count} cache entries",
@@ -564,7 +573,7 @@ async def get_fundamental_indicator(
     try:
         # L1 Cache: Try Redis first
         cache_key = f"fundamental:{stock_id}:{indicator}:{start_date}:{end_date}"
-        cached_data = cache.get(cache_key)
+        cached_data = await run_in_threadpool(cache.get, cache_key)
 
         if cached_data is not None:
             logger.info(f"✅ L1 Cache HIT (Redis): {stock_id} - {indicator}")
@@ -574,7 +583,8 @@ async def get_fundamental_indicator(
         from app.services.fundamental_service import FundamentalService
         service = FundamentalService(db)
 
-        data_points = service.get_indicator_data(
+        data_points = await run_in_threadpool(
+            service.get_indicator_data,
             stock_id=stock_id,
             indicator=indicator,
             start_date=start_date,
@@ -592,7 +602,7 @@ async def get_fundamental_indicator(
         )
 
         # Cache in Redis for 24 hours (financial data changes quarterly)
-        cache.set(cache_key, response, expiry=86400)
+        await run_in_threadpool(cache.set, cache_key, response, expiry=86400)
         logger.info(f"💾 Cached in Redis: {stock_id} - {indicator} ({len(data_points)} points)")
 
         return response
@@ -635,7 +645,7 @@ async def get_fundamental_indicators_batch(
         # L1 Cache: Try Redis first
         indicators_str = ",".join(sorted(request.indicators)) if request.indicators else "default"
         cache_key = f"fundamental_batch:{stock_id}:{indicators_str}:{request.start_date}:{request.end_date}"
-        cached_data = cache.get(cache_key)
+        cached_data = await run_in_threadpool(cache.get, cache_key)
 
         if cached_data is not None:
             logger.info(f"✅ L1 Cache HIT (Redis) for batch: {stock_id}")
@@ -648,7 +658,8 @@ async def get_fundamental_indicators_batch(
         # Determine which indicators to fetch
         indicators_to_fetch = request.indicators if request.indicators else FinLabClient.get_common_fundamental_indicators()
 
-        indicators_dict = service.get_indicators_batch(
+        indicators_dict = await run_in_threadpool(
+            service.get_indicators_batch,
             stock_id=stock_id,
             indicators=indicators_to_fetch,
             start_date=request.start_date,
@@ -668,7 +679,7 @@ async def get_fundamental_indicators_batch(
         )
 
         # Cache in Redis for 24 hours
-        cache.set(cache_key, response, expiry=86400)
+        await run_in_threadpool(cache.set, cache_key, response, expiry=86400)
         logger.info(f"💾 Cached batch in Redis: {stock_id} ({len(indicators_dict)}/{requested_count} indicators)")
 
         return response
@@ -703,14 +714,15 @@ async def get_fundamental_summary(
     try:
         # Try cache first
         cache_key = f"fundamental_summary:{stock_id}"
-        cached_data = cache.get(cache_key)
+        cached_data = await run_in_threadpool(cache.get, cache_key)
 
         if cached_data is not None:
             logger.info(f"Returning cached fundamental summary for {stock_id}")
             return cached_data
 
         # Fetch common indicators
-        indicators_data = finlab_client.get_fundamental_indicators_batch(
+        indicators_data = await run_in_threadpool(
+            finlab_client.get_fundamental_indicators_batch,
             stock_id=stock_id,
             indicators=None,  # Use default common indicators
         )
@@ -759,7 +771,7 @@ async def get_fundamental_summary(
         response = FundamentalSummary(**summary_data)
 
         # Cache for 1 hour
-        cache.set(cache_key, response, expiry=3600)
+        await run_in_threadpool(cache.set, cache_key, response, expiry=3600)
 
         logger.info(f"Returned fundamental summary for {stock_id}")
         return response
@@ -790,7 +802,7 @@ async def compare_fundamental_indicators(
         # Try cache first
         stock_ids_str = ",".join(sorted(request.stock_ids))
         cache_key = f"fundamental_compare:{stock_ids_str}:{request.indicator}:{request.start_date}:{request.end_date}"
-        cached_data = cache.get(cache_key)
+        cached_data = await run_in_threadpool(cache.get, cache_key)
 
         if cached_data is not None:
             logger.info(f"Returning cached fundamental comparison")
@@ -800,7 +812,8 @@ async def compare_fundamental_indicators(
         stocks_data = {}
         for stock_id in request.stock_ids:
             try:
-                data_df = finlab_client.get_fundamental_indicator(
+                data_df = await run_in_threadpool(
+                    finlab_client.get_fundamental_indicator,
                     indicator=request.indicator,
                     stock_id=stock_id,
                     start_date=request.start_date,
@@ -830,7 +843,7 @@ async def compare_fundamental_indicators(
         )
 
         # Cache for 1 hour
-        cache.set(cache_key, response, expiry=3600)
+        await run_in_threadpool(cache.set, cache_key, response, expiry=3600)
 
         logger.info(f"Returned comparison for {len(stocks_data)}/{len(request.stock_ids)} stocks")
         return response
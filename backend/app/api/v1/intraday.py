@@ -4,8 +4,10 @@ Intraday Data API
 分鐘級股票數據的 API 端點
 """
 from fastapi import APIRouter, Depends, Query, HTTPException, status, Request
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db
 from app.api.dependencies import get_current_user
 from app.models.user import User
 from app.services.stock_minute_price_service import StockMinutePriceService
@@ -39,7 +41,7 @@ async def get_intraday_ohlcv(
     timeframe: str = Query('1min', description="時間粒度（1min/5min/15min/30min/60min/1day）"),
     limit: int = Query(10000, le=10000, description="最大筆數"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     獲取分鐘級 OHLCV 數據
@@ -100,7 +102,7 @@ async def get_intraday_ohlcv(
                 )
 
         # 查詢數據
-        result = service.get_intraday_ohlcv(
+        result = await service.get_intraday_ohlcv_async(
             stock_id, start_dt, end_dt, timeframe, limit
         )
 
@@ -131,7 +133,7 @@ async def get_latest_intraday_price(
     stock_id: str,
     timeframe: str = Query('1min', description="時間粒度"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     獲取最新分鐘價格
@@ -162,7 +164,7 @@ async def get_latest_intraday_price(
                 detail=f"Invalid timeframe. Must be one of: 1min, 5min, 15min, 30min, 60min, 1day"
             )
 
-        price = service.get_latest_price(stock_id, timeframe)
+        price = await service.get_latest_price_async(stock_id, timeframe)
 
         if not price:
             raise HTTPException(
@@ -211,7 +213,8 @@ async def get_data_coverage(
     try:
         service = StockMinutePriceService(db)
 
-        coverage = service.get_data_coverage(stock_id, timeframe)
+        # 尚無非同步版本的查詢交給執行緒池，避免阻塞 event loop
+        coverage = await run_in_threadpool(service.get_data_coverage, stock_id, timeframe)
 
         if not coverage:
             raise HTTPException(
@@ -280,7 +283,8 @@ async def sync_intraday_data(
         )
 
         # 執行同步
-        count = service.sync_stock_minute_data(
+        count = await run_in_threadpool(
+            service.sync_stock_minute_data,
             stock_id, start_datetime, end_datetime, timeframe
         )
 
@@ -341,7 +345,7 @@ async def get_statistics(
                 detail=f"Invalid timeframe. Must be one of: 1min, 5min, 15min, 30min, 60min, 1day"
             )
 
-        stats = service.get_statistics(stock_id, timeframe)
+        stats = await run_in_threadpool(service.get_statistics, stock_id, timeframe)
 
         api_log.log_operation(
             "read", "intraday_statistics", None, current_user.id,
@@ -10,12 +10,14 @@ Option API Endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 
 from app.api.dependencies import get_current_user, get_db
+from app.db.session import get_async_db
 from app.models.user import User
 from app.repositories.option import (
     OptionContractRepository,
@@ -45,6 +47,11 @@ def get_option_service(db: Session = Depends(get_db)) -> OptionService:
     return OptionService(db)
 
 
+def get_async_option_service(db: AsyncSession = Depends(get_async_db)) -> OptionService:
+    """Dependency to get OptionService instance bound to an AsyncSession"""
+    return OptionService(db)
+
+
 @router.get("/stage", response_model=OptionStageInfo)
 @limiter.limit(RateLimits.GENERAL_READ)
 async def get_stage_info(
@@ -156,7 +163,7 @@ async def get_option_chain(
     underlying_id: str,
     expiry_date: date = Query(..., description="到期日"),
     current_user: User = Depends(get_current_user),
-    option_service: OptionService = Depends(get_option_service)
+    option_service: OptionService = Depends(get_async_option_service)
 ):
     """
     獲取 Option Chain
@@ -170,7 +177,7 @@ async def get_option_chain(
     """
     try:
         # 使用 Service 層構建 Option Chain
-        result = option_service.get_option_chain(
+        result = await option_service.get_option_chain_async(
             underlying_id=underlying_id,
             expiry_date=expiry_date
         )
@@ -208,7 +215,7 @@ async def get_daily_factors(
     end_date: Optional[date] = Query(None, description="結束日期"),
     limit: int = Query(100, ge=1, le=365),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查詢選擇權每日因子
@@ -222,7 +229,7 @@ async def get_daily_factors(
     - **limit**: 最多返回筆數（預設 100，最多 365）
     """
     try:
-        factors = OptionDailyFactorRepository.get_by_underlying(
+        factors = await OptionDailyFactorRepository.get_by_underlying_async(
             db=db,
             underlying_id=underlying_id,
             start_date=start_date,
@@ -252,7 +259,7 @@ async def get_latest_factor(
     request: Request,
     underlying_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     獲取最新的選擇權因子
@@ -260,7 +267,7 @@ async def get_latest_factor(
     返回該標的物最新一筆因子數據
     """
     try:
-        factor = OptionDailyFactorRepository.get_latest(db, underlying_id)
+        factor = await OptionDailyFactorRepository.get_latest_async(db, underlying_id)
 
         if not factor:
             raise HTTPException(
@@ -40,6 +40,7 @@ celery_app.conf.update(
     # Task routing - 專用隊列配置
     task_routes={
         'app.tasks.run_backtest_async': {'queue': 'backtest'},
+        'app.tasks.run_backtest_sweep*': {'queue': 'backtest'},
         'app.tasks.sync_*': {'queue': 'data_sync'},
         'app.tasks.cleanup_*': {'queue': 'maintenance'},
         # 因子評估專用隊列（並發控制）
@@ -64,8 +65,8 @@ celery_app.conf.update(
             'soft_time_limit': 1740,  # 29 分鐘軟限制
         },
         'app.tasks.register_option_contracts': {
-            'time_limit': 7200,      # 2 小時硬限制（處理 952 個選擇權合約）
-            'soft_time_limit': 6900,  # 1 小時 55 分鐘軟限制
+            'time_limit': 1800,      # 30 分鐘硬限制（選擇權快照已分批抓取）
+            'soft_time_limit': 1740,  # 29 分鐘軟限制
         },
         'app.tasks.sync_option_daily_factors': {
             'time_limit': 3600,      # 1 小時硬限制（計算 Greeks）
@@ -255,6 +256,15 @@ celery_app.conf.beat_schedule = {
         "options": {"expires": 82800},  # 23 hours
     },
 
+    # Precompute industry fundamental metrics after the daily fundamental sync
+    # Runs at: Taiwan 23:30 (UTC 15:30)
+    # Duration: ~seconds (single grouped query for all industries)
+    "precompute-industry-metrics-daily": {
+        "task": "app.tasks.precompute_industry_metrics",
+        "schedule": crontab(hour=15, minute=30),  # UTC 15:30 = Taiwan 23:30
+        "options": {"expires": 82800},  # 23 hours
+    },
+
     # ==================== 法人買賣數據同步 ====================
 
     # Sync institutional investors data (all active stocks) once per day
@@ -35,6 +35,10 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
 
+    # Async Database - FastAPI 讀取端點使用的 asyncpg 連接池（每個 API worker 一組）
+    ASYNC_DB_POOL_SIZE: int = 10
+    ASYNC_DB_MAX_OVERFLOW: int = 20
+
     # Redis
     REDIS_URL: str
 
@@ -47,6 +51,11 @@ class Settings(BaseSettings):
     # Cache Security - For signing cached data (防止 pickle 反序列化攻擊)
     CACHE_SIGNING_KEY: str = ""
 
+    # Near Cache - Redis 前的行程內 LRU 層（透過 pub/sub 失效，TTL 為失效訊息遺失時的上限）
+    CACHE_NEAR_MAX_ITEMS: int = 1024
+    CACHE_NEAR_TTL: int = 30
+    CACHE_NEAR_MAX_VALUE_BYTES: int = 1024 * 1024
+
     # Encryption - For encrypting sensitive data in database
     ENCRYPTION_KEY: str = ""
 
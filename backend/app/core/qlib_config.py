@@ -16,6 +16,13 @@ class QlibConfig:
         # 使用 /tmp 路徑避免權限問題
         self.data_path = os.getenv("QLIB_DATA_PATH", "/tmp/qlib_data")
         self.cache_path = os.getenv("QLIB_CACHE_PATH", "/tmp/qlib_cache")
+        # 持久化因子儲存（memmap，見 app/services/factor_store.py）
+        self.factor_store_path = os.getenv("QLIB_FACTOR_STORE_PATH", "/tmp/qlib_factor_store")
+        self.factor_store_max_mb = int(os.getenv("QLIB_FACTOR_STORE_MAX_MB", "2048"))
+        self.factor_store_enabled = os.getenv("QLIB_FACTOR_STORE_ENABLED", "true").lower() == "true"
+        # 分鐘線資料目錄：期貨（含夜盤）與股票的交易日曆不同，各自獨立
+        self.minute_data_path = os.getenv("QLIB_MINUTE_DATA_PATH", "/data/qlib/tw_stock_minute")
+        self.futures_minute_data_path = os.getenv("QLIB_FUTURES_MINUTE_DATA_PATH", "/data/qlib/tw_futures_minute")
         self.region = "cn"  # 使用中國市場配置（與台股類似）
         self.exp_manager = {
             "class": "MLflowExpManager",
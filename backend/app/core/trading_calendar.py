@@ -0,0 +1,175 @@
+"""
+交易日曆模組
+
+以 NumPy 日期運算向量化生成股票 / 期貨的交易分鐘索引（Qlib calendars/1min.txt 使用），
+取代逐日逐分鐘 datetime.combine 的迴圈。
+
+交易時段（與 app.core.trading_hours 一致）：
+- 股票：日盤 09:00-13:30（取 DAY_TRADING_SESSIONS 的起訖，與既有 1min 日曆相同為連續分鐘）
+- 期貨：夜盤後段 00:00-05:00、日盤 08:45-13:45、夜盤前段 15:00-23:59
+
+相同 (時段類型, 日期區間, 假日設定) 的索引會被快取，多年回補時不必重複建立時間戳。
+"""
+
+from datetime import date, datetime, time
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app.core.trading_hours import TradingHoursConfig
+
+SESSION_STOCK = 'stock'
+SESSION_FUTURES = 'futures'
+
+# 期貨日盤（較現貨早開 15 分鐘、晚收 15 分鐘）
+FUTURES_DAY_SESSION = (time(8, 45), time(13, 45))
+
+DateLike = Union[date, datetime, str, pd.Timestamp]
+
+
+def session_windows(session: str = SESSION_STOCK) -> List[Tuple[time, time]]:
+    """
+    取得交易時段的 (開始, 結束) 時間列表（依一天內的先後排序，兩端皆含）
+
+    Args:
+        session: 'stock' 或 'futures'
+    """
+    day_sessions = TradingHoursConfig.DAY_TRADING_SESSIONS
+    stock_window = (day_sessions[0].start_time, day_sessions[-1].end_time)
+
+    if session == SESSION_STOCK:
+        return [stock_window]
+    if session == SESSION_FUTURES:
+        night = sorted(
+            TradingHoursConfig.NIGHT_TRADING_SESSIONS, key=lambda s: s.start_time
+        )
+        return [(night[0].start_time, night[0].end_time), FUTURES_DAY_SESSION] + [
+            (s.start_time, s.end_time) for s in night[1:]
+        ]
+    raise ValueError(f"Unknown session type: {session}")
+
+
+@lru_cache(maxsize=None)
+def session_minute_offsets(session: str = SESSION_STOCK) -> np.ndarray:
+    """一天中屬於交易時段的分鐘（距 00:00 的分鐘數，遞增、唯讀）"""
+    offsets = np.unique(np.concatenate([
+        np.arange(start.hour * 60 + start.minute, end.hour * 60 + end.minute + 1)
+        for start, end in session_windows(session)
+    ]))
+    offsets.setflags(write=False)
+    return offsets
+
+
+def _to_date(value: DateLike) -> date:
+    return pd.Timestamp(value).date()
+
+
+def trading_days(
+    start_date: DateLike,
+    end_date: DateLike,
+    weekdays_only: bool = False,
+    holidays: Optional[Iterable[DateLike]] = None
+) -> pd.DatetimeIndex:
+    """
+    生成區間內的交易日（含兩端）
+
+    Args:
+        start_date: 開始日期
+        end_date: 結束日期
+        weekdays_only: 是否排除週六、週日
+        holidays: 額外排除的休市日期
+    """
+    return _trading_days(
+        _to_date(start_date), _to_date(end_date), weekdays_only, _holiday_set(holidays)
+    )
+
+
+def trading_minutes(
+    start_date: DateLike,
+    end_date: DateLike,
+    session: str = SESSION_STOCK,
+    weekdays_only: bool = False,
+    holidays: Optional[Iterable[DateLike]] = None
+) -> pd.DatetimeIndex:
+    """
+    生成交易分鐘索引
+
+    預設逐日（含週末）生成，與既有 calendars/1min.txt 的內容一致；
+    期貨週五夜盤延續到週六 05:00，排除週末前須確認不會丟失這段資料。
+
+    Args:
+        start_date: 開始日期
+        end_date: 結束日期
+        session: 'stock' 或 'futures'
+        weekdays_only: 是否排除週六、週日
+        holidays: 額外排除的休市日期
+
+    Returns:
+        交易分鐘索引（快取共用，請勿原地修改）
+    """
+    return _trading_minutes(
+        session, _to_date(start_date), _to_date(end_date),
+        weekdays_only, _holiday_set(holidays)
+    )
+
+
+def qlib_minute_calendar(start_date: DateLike, end_date: DateLike, is_futures: bool = False) -> pd.DatetimeIndex:
+    """
+    Qlib 分鐘線資料目錄的交易分鐘（sync_shioaji_to_qlib.py 與 export_minute_to_qlib.py 共用）
+
+    日曆只允許附加，寫入同一目錄的腳本必須使用相同的日期與時段規則：
+    逐日生成（不排除週末與休市日），股票與期貨分屬不同的資料目錄，各自只用一種時段。
+
+    Args:
+        start_date: 開始日期
+        end_date: 結束日期
+        is_futures: 是否為期貨目錄
+
+    Returns:
+        交易分鐘索引（快取共用，請勿原地修改）
+    """
+    session = SESSION_FUTURES if is_futures else SESSION_STOCK
+    return trading_minutes(start_date, end_date, session=session)
+
+
+def _holiday_set(holidays: Optional[Iterable[DateLike]]) -> FrozenSet[date]:
+    return frozenset(_to_date(d) for d in holidays) if holidays else frozenset()
+
+
+@lru_cache(maxsize=64)
+def _trading_days(
+    start_date: date,
+    end_date: date,
+    weekdays_only: bool,
+    holidays: FrozenSet[date]
+) -> pd.DatetimeIndex:
+    days = pd.date_range(start_date, end_date, freq='D')
+    if weekdays_only:
+        days = days[days.dayofweek < 5]
+    if holidays:
+        days = days[~days.isin(pd.DatetimeIndex(sorted(holidays)))]
+    return days
+
+
+@lru_cache(maxsize=64)
+def _trading_minutes(
+    session: str,
+    start_date: date,
+    end_date: date,
+    weekdays_only: bool,
+    holidays: FrozenSet[date]
+) -> pd.DatetimeIndex:
+    days = _trading_days(start_date, end_date, weekdays_only, holidays)
+    offsets = session_minute_offsets(session).astype('timedelta64[m]')
+
+    # (天數, 1) + (1, 每日分鐘數) 廣播後攤平，即依時間排序的分鐘索引
+    stamps = days.values.astype('datetime64[m]')[:, None] + offsets[None, :]
+    return pd.DatetimeIndex(stamps.ravel().astype('datetime64[ns]'))
+
+
+def clear_cache():
+    """清除已快取的交易日 / 交易分鐘索引"""
+    _trading_days.cache_clear()
+    _trading_minutes.cache_clear()
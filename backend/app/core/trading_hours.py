@@ -73,6 +73,9 @@ class TradingHoursConfig:
         )
     ]
 
+    # filter_dataframe 使用的每分钟查表缓存 {include_night: ndarray}
+    _MINUTE_MASKS = {}
+
     @classmethod
     def is_day_trading_time(cls, hour: int, minute: int = 0) -> bool:
         """检查是否为日盘交易时间"""
@@ -216,13 +219,25 @@ class TradingHoursConfig:
         if not pd.api.types.is_datetime64_any_dtype(df[datetime_column]):
             df[datetime_column] = pd.to_datetime(df[datetime_column])
 
-        # 构建过滤条件
-        mask = df[datetime_column].apply(
-            lambda dt: cls.is_trading_time(dt.hour, dt.minute, include_night)
-        )
+        # 构建过滤条件：以一天 1440 分钟的查表结果按「时*60+分」向量化取值
+        dt = df[datetime_column].dt
+        minute_of_day = (dt.hour * 60 + dt.minute).to_numpy()
+        mask = cls._minute_mask(include_night)[minute_of_day]
 
         return df[mask]
 
+    @classmethod
+    def _minute_mask(cls, include_night: bool = False):
+        """一天中每分钟是否为交易时间（长度 1440 的布尔数组，按需建立并缓存）"""
+        import numpy as np
+
+        if include_night not in cls._MINUTE_MASKS:
+            cls._MINUTE_MASKS[include_night] = np.array([
+                cls.is_trading_time(minute // 60, minute % 60, include_night)
+                for minute in range(24 * 60)
+            ])
+        return cls._MINUTE_MASKS[include_night]
+
 
 # 导出常用函数
 is_day_trading_time = TradingHoursConfig.is_day_trading_time
@@ -22,7 +22,7 @@ def import_models():
     from app.models.rdagent import RDAgentTask, GeneratedFactor, FactorEvaluation  # noqa: F401
     from app.models.institutional_investor import InstitutionalInvestor  # noqa: F401
     from app.models.telegram_notification import TelegramNotification, TelegramNotificationPreference  # noqa: F401
-    from app.models.option import OptionContract, OptionDailyFactor, OptionMinutePrice, OptionGreeks, OptionSyncConfig  # noqa: F401
+    from app.models.option import OptionContract, OptionDailyFactor, OptionMinutePrice, OptionGreeks, OptionSyncConfig, OptionChainSnapshot  # noqa: F401
     from app.models.strategy_signal import StrategySignal  # noqa: F401
 
 # Note: import_models() is called in alembic/env.py for migrations
@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
+from typing import AsyncIterator, Optional
 from loguru import logger
 from app.core.config import settings
 import multiprocessing
@@ -40,10 +43,75 @@ engine = create_engine(
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine（asyncpg）：僅供 FastAPI 讀取端點使用，首次使用時才建立
+# （此時 uvicorn worker 已 fork 完成，Celery worker 不會建立）
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
 # Import models flag to prevent multiple imports
 _models_imported = False
 
 
+def async_database_url(url: str) -> str:
+    """
+    將同步 DATABASE_URL 轉為 asyncpg 驅動
+
+    postgresql:// 與 postgresql+psycopg2:// 改為 postgresql+asyncpg://，
+    psycopg2 的 sslmode 參數改為 asyncpg 的 ssl；其他資料庫保持不變。
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != 'postgresql':
+        return parsed.render_as_string(hide_password=False)
+
+    query = dict(parsed.query)
+    if 'sslmode' in query:
+        query['ssl'] = query.pop('sslmode')
+    parsed = parsed.set(drivername='postgresql+asyncpg', query=query)
+    return parsed.render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    """取得（必要時建立）asyncpg engine"""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            async_database_url(settings.DATABASE_URL),
+            pool_pre_ping=True,
+            pool_size=settings.ASYNC_DB_POOL_SIZE,
+            max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+            pool_timeout=30,
+            pool_recycle=3600,
+            echo=settings.DEBUG,
+        )
+        logger.info(
+            f"Async database connection pool: "
+            f"pool_size={settings.ASYNC_DB_POOL_SIZE}, "
+            f"max_overflow={settings.ASYNC_DB_MAX_OVERFLOW}"
+        )
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """取得 AsyncSession 工廠（expire_on_commit=False，commit 後仍可讀取屬性而不觸發 lazy load）"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(),
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_session_factory
+
+
+async def dispose_async_engine() -> None:
+    """關閉 asyncpg 連接池（應用關閉時呼叫）"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
 def ensure_models_imported():
     """Ensure all models are imported (call this before using SessionLocal)"""
     global _models_imported
@@ -63,6 +131,24 @@ def get_db():
         db.close()
 
 
+# Async dependency for FastAPI routes
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    非同步資料庫會話依賴（asyncpg）
+
+    查詢期間不會阻塞 event loop。AsyncSession 不支援 lazy load，
+    需要的關聯必須在查詢時以 selectinload / joinedload 預先載入。
+
+    用法：
+        @router.get("/")
+        async def read(db: AsyncSession = Depends(get_async_db)):
+            rows = (await db.execute(stmt)).scalars().all()
+    """
+    ensure_models_imported()
+    async with get_async_session_factory()() as db:
+        yield db
+
+
 @contextmanager
 def transaction_scope(db: Session):
     """
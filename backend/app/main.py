@@ -244,6 +244,13 @@ async def shutdown_event():
     except Exception as e:
         print(f"⚠️  關閉 Shioaji 客戶端時發生錯誤: {e}")
 
+    # 關閉 asyncpg 連接池
+    try:
+        from app.db.session import dispose_async_engine
+        await dispose_async_engine()
+    except Exception as e:
+        print(f"⚠️  關閉非同步資料庫連接池時發生錯誤: {e}")
+
 
 if __name__ == "__main__":
     import uvicorn
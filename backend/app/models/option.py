@@ -443,6 +443,100 @@ class OptionGreeks(Base):
         return f"<OptionGreeks(contract={self.contract_id}, datetime={self.datetime}, delta={self.delta})>"
 
 
+class OptionChainSnapshot(Base):
+    """
+    選擇權鏈每日快照
+
+    用途：每個標的每天保存一份選擇權鏈（get_option_chain 的結果），
+    因子、Greeks 與回補腳本共用，重算歷史因子時不需再呼叫券商 API
+
+    注意：不對 option_contracts / stocks 建外鍵，合約尚未註冊時也能先保存原始資料
+    """
+    __tablename__ = "option_chain_snapshots"
+
+    # 複合主鍵
+    underlying_id = Column(
+        String(10),
+        nullable=False,
+        comment="標的物代碼（如 TX）"
+    )
+    date = Column(
+        Date,
+        nullable=False,
+        comment="資料日期"
+    )
+    contract_id = Column(
+        String(20),
+        nullable=False,
+        comment="合約代碼"
+    )
+
+    # 合約資訊
+    underlying_type = Column(
+        String(10),
+        nullable=False,
+        comment="標的物類型（STOCK/FUTURES）"
+    )
+    option_type = Column(
+        String(4),
+        nullable=False,
+        comment="選擇權類型（CALL/PUT）"
+    )
+    strike_price = Column(
+        Numeric(10, 2),
+        nullable=False,
+        comment="履約價格"
+    )
+    expiry_date = Column(
+        Date,
+        nullable=False,
+        comment="到期日"
+    )
+
+    # 行情
+    close = Column(
+        Numeric(10, 2),
+        nullable=True,
+        comment="收盤價"
+    )
+    volume = Column(
+        BigInteger,
+        nullable=True,
+        comment="成交量"
+    )
+    open_interest = Column(
+        BigInteger,
+        nullable=True,
+        comment="未平倉量"
+    )
+
+    # 元數據
+    source = Column(
+        String(20),
+        nullable=False,
+        comment="資料來源（snapshot/kbars）"
+    )
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    # 表設定
+    __table_args__ = (
+        PrimaryKeyConstraint('underlying_id', 'date', 'contract_id', name='pk_option_chain_snapshots'),
+        CheckConstraint(
+            "option_type IN ('CALL', 'PUT')",
+            name='ck_option_chain_snapshot_type'
+        ),
+        Index('idx_option_chain_snapshots_date', 'date'),
+        {'comment': '選擇權鏈每日快照（因子 / Greeks / 回補共用）'}
+    )
+
+    def __repr__(self):
+        return f"<OptionChainSnapshot(underlying={self.underlying_id}, date={self.date}, contract={self.contract_id})>"
+
+
 class OptionSyncConfig(Base):
     """
     選擇權同步配置表
@@ -4,8 +4,9 @@ Backtest repository for database operations
 
 from typing import Optional, List
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, desc, select
 from app.models.backtest import Backtest, BacktestStatus
 from app.schemas.backtest import BacktestCreate, BacktestUpdate
 
@@ -34,6 +35,28 @@ class BacktestRepository:
             .first()
         )
 
+    @staticmethod
+    async def get_by_id_with_result_async(
+        db: AsyncSession,
+        backtest_id: int,
+        with_trades: bool = False
+    ) -> Optional[Backtest]:
+        """
+        Get backtest by ID with result and strategy preloaded (AsyncSession version)
+
+        AsyncSession 無法 lazy load，需要的關聯都在此預先載入；
+        with_trades=True 時以 selectinload 另外一次查詢載入交易記錄。
+        """
+        stmt = (
+            select(Backtest)
+            .options(joinedload(Backtest.result), joinedload(Backtest.strategy))
+            .where(Backtest.id == backtest_id)
+        )
+        if with_trades:
+            stmt = stmt.options(selectinload(Backtest.trades))
+
+        return (await db.execute(stmt)).unique().scalars().first()
+
     @staticmethod
     def get_by_user(
         db: Session,
@@ -164,6 +187,10 @@ class BacktestRepository:
             }
         }
 
+        # 多標的投組回測：股票池存放於回測配置
+        if backtest_create.universe:
+            structured_params['backtest_config']['universe'] = backtest_create.universe
+
         db_backtest = Backtest(
             strategy_id=backtest_create.strategy_id,
             user_id=user_id,
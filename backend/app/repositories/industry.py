@@ -3,7 +3,8 @@ Industry Repository
 
 Handles database operations for industry classification data.
 """
-from typing import List, Optional, Dict
+import hashlib
+from typing import Any, List, Optional, Dict, Tuple
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, and_
 from datetime import date
@@ -11,6 +12,8 @@ from datetime import date
 from app.models.industry import Industry
 from app.models.stock_industry import StockIndustry
 from app.models.industry_metrics_cache import IndustryMetricsCache
+from app.models.fundamental_data import FundamentalData
+from app.utils.query_helpers import bulk_upsert
 from loguru import logger
 
 
@@ -356,6 +359,113 @@ class IndustryRepository:
         db.refresh(metric)
         return metric
 
+    def bulk_upsert_industry_metrics(
+        self, db: Session, rows: List[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """
+        Insert or update many industry metric cache rows in batched statements.
+
+        Args:
+            db: Database session
+            rows: Dicts with industry_code, date, metric_name, value, stocks_count
+
+        Returns:
+            {"inserted": count, "updated": count}
+        """
+        counts = bulk_upsert(
+            db, IndustryMetricsCache, rows,
+            conflict_columns=['industry_code', 'date', 'metric_name']
+        )
+        db.commit()
+        return counts
+
+    # Fundamental Aggregation Methods
+
+    def aggregate_fundamentals(
+        self,
+        db: Session,
+        indicators: List[str],
+        quarters: List[str],
+        industry_codes: Optional[List[str]] = None,
+        primary_only: bool = True
+    ) -> List[Tuple[str, str, str, float, int]]:
+        """
+        Average fundamental indicators per industry and quarter in one grouped query.
+
+        Args:
+            db: Database session
+            indicators: Indicator names (e.g., "ROE稅後")
+            quarters: Quarter strings (e.g., "2025-Q3")
+            industry_codes: Industries to aggregate (None = all industries)
+            primary_only: Only count stocks whose primary industry matches
+
+        Returns:
+            List of (industry_code, indicator, quarter, average, sample_size)
+        """
+        if not indicators or not quarters:
+            return []
+
+        query = db.query(
+            StockIndustry.industry_code,
+            FundamentalData.indicator,
+            FundamentalData.date,
+            func.avg(FundamentalData.value),
+            func.count(FundamentalData.value)
+        ).join(
+            FundamentalData, FundamentalData.stock_id == StockIndustry.stock_id
+        ).filter(
+            FundamentalData.indicator.in_(indicators),
+            FundamentalData.date.in_(quarters),
+            FundamentalData.value.isnot(None)
+        )
+
+        if primary_only:
+            query = query.filter(StockIndustry.is_primary == True)
+
+        if industry_codes is not None:
+            if not industry_codes:
+                return []
+            query = query.filter(StockIndustry.industry_code.in_(industry_codes))
+
+        results = query.group_by(
+            StockIndustry.industry_code,
+            FundamentalData.indicator,
+            FundamentalData.date
+        ).all()
+
+        return [
+            (industry_code, indicator, quarter, float(average), count)
+            for industry_code, indicator, quarter, average, count in results
+        ]
+
+    def get_industry_tree_version(self, db: Session) -> str:
+        """
+        Get a version string that changes whenever industries or stock mappings change.
+
+        Built from row counts, max IDs and timestamps, so mapping inserts / deletes
+        and industry edits made anywhere (API, import scripts) produce a new version.
+
+        Args:
+            db: Database session
+
+        Returns:
+            Short hex digest of the table fingerprints
+        """
+        industries = db.query(
+            func.count(Industry.id),
+            func.max(Industry.id),
+            func.max(Industry.created_at),
+            func.max(Industry.updated_at)
+        ).one()
+        mappings = db.query(
+            func.count(StockIndustry.id),
+            func.max(StockIndustry.id),
+            func.max(StockIndustry.created_at)
+        ).one()
+
+        fingerprint = repr((tuple(industries), tuple(mappings)))
+        return hashlib.md5(fingerprint.encode()).hexdigest()[:16]
+
     def get_industry_count_by_level(self, db: Session) -> Dict[int, int]:
         """
         Get count of industries by level.
@@ -403,7 +513,7 @@ class IndustryRepository:
         ).count()
 
     def get_stock_counts_bulk(
-        self, db: Session, industry_codes: List[str]
+        self, db: Session, industry_codes: List[str], primary_only: bool = False
     ) -> Dict[str, int]:
         """
         Get stock counts for multiple industries in a single query (avoids N+1).
@@ -411,6 +521,7 @@ class IndustryRepository:
         Args:
             db: Database session
             industry_codes: List of industry codes
+            primary_only: Only count stocks where this is primary industry
 
         Returns:
             Dict mapping industry_code to stock count
@@ -425,7 +536,12 @@ class IndustryRepository:
             func.count(StockIndustry.stock_id).label('count')
         ).filter(
             StockIndustry.industry_code.in_(industry_codes)
-        ).group_by(
+        )
+
+        if primary_only:
+            counts = counts.filter(StockIndustry.is_primary == True)
+
+        counts = counts.group_by(
             StockIndustry.industry_code
         ).all()
 
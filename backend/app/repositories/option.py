@@ -6,22 +6,59 @@ Option repository for database operations
 
 from typing import Optional, List, Dict, Any
 from datetime import date, datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc, func
+from sqlalchemy import Select, and_, or_, desc, asc, func, select
 from app.models.option import (
     OptionContract,
     OptionDailyFactor,
     OptionMinutePrice,
     OptionGreeks,
-    OptionSyncConfig
+    OptionSyncConfig,
+    OptionChainSnapshot
 )
 from app.schemas.option import (
     OptionContractCreate,
     OptionContractUpdate,
     OptionDailyFactorCreate,
+    OptionGreeksCreate,
+    OptionMinutePriceCreate,
     OptionSyncConfigCreate,
     OptionSyncConfigUpdate
 )
+from app.utils.query_helpers import bulk_upsert
+
+
+def _bulk_upsert_schemas(
+    db: Session,
+    model,
+    items: List[Any],
+    conflict_columns: List[str]
+) -> Dict[str, int]:
+    """
+    批次 upsert Pydantic 資料並提交一次
+
+    與單筆 upsert 相同，只寫入有設定的欄位：依已設定欄位分組，每組一個（分批）語句。
+
+    Returns:
+        {"inserted": 新增筆數, "updated": 更新筆數}
+    """
+    groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+    for item in items:
+        row = item.model_dump(exclude_unset=True, by_alias=True)
+        groups.setdefault(frozenset(row), []).append(row)
+
+    counts = {"inserted": 0, "updated": 0}
+    try:
+        for rows in groups.values():
+            result = bulk_upsert(db, model, rows, conflict_columns)
+            counts["inserted"] += result["inserted"]
+            counts["updated"] += result["updated"]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return counts
 
 
 class OptionContractRepository:
@@ -85,7 +122,27 @@ class OptionContractRepository:
 
         用於建構 Option Chain
         """
-        query = db.query(OptionContract).filter(
+        stmt = OptionContractRepository._chain_stmt(underlying_id, expiry_date, is_active)
+        return list(db.execute(stmt).scalars().all())
+
+    @staticmethod
+    async def get_by_underlying_and_expiry_async(
+        db: AsyncSession,
+        underlying_id: str,
+        expiry_date: date,
+        is_active: Optional[str] = 'active'
+    ) -> List[OptionContract]:
+        """AsyncSession version of get_by_underlying_and_expiry"""
+        stmt = OptionContractRepository._chain_stmt(underlying_id, expiry_date, is_active)
+        return list((await db.execute(stmt)).scalars().all())
+
+    @staticmethod
+    def _chain_stmt(
+        underlying_id: str,
+        expiry_date: date,
+        is_active: Optional[str]
+    ) -> Select:
+        stmt = select(OptionContract).where(
             and_(
                 OptionContract.underlying_id == underlying_id,
                 OptionContract.expiry_date == expiry_date
@@ -93,12 +150,12 @@ class OptionContractRepository:
         )
 
         if is_active:
-            query = query.filter(OptionContract.is_active == is_active)
+            stmt = stmt.where(OptionContract.is_active == is_active)
 
-        return query.order_by(
+        return stmt.order_by(
             OptionContract.strike_price.asc(),
             OptionContract.option_type.asc()
-        ).all()
+        )
 
     @staticmethod
     def get_expiry_dates(
@@ -256,19 +313,43 @@ class OptionDailyFactorRepository:
             end_date: 結束日期
             limit: 最大記錄數
         """
-        query = db.query(OptionDailyFactor).filter(
+        stmt = OptionDailyFactorRepository._by_underlying_stmt(
+            underlying_id, start_date, end_date, limit
+        )
+        return list(db.execute(stmt).scalars().all())
+
+    @staticmethod
+    async def get_by_underlying_async(
+        db: AsyncSession,
+        underlying_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: int = 100
+    ) -> List[OptionDailyFactor]:
+        """AsyncSession version of get_by_underlying"""
+        stmt = OptionDailyFactorRepository._by_underlying_stmt(
+            underlying_id, start_date, end_date, limit
+        )
+        return list((await db.execute(stmt)).scalars().all())
+
+    @staticmethod
+    def _by_underlying_stmt(
+        underlying_id: str,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        limit: int
+    ) -> Select:
+        stmt = select(OptionDailyFactor).where(
             OptionDailyFactor.underlying_id == underlying_id
         )
 
         if start_date:
-            query = query.filter(OptionDailyFactor.date >= start_date)
+            stmt = stmt.where(OptionDailyFactor.date >= start_date)
 
         if end_date:
-            query = query.filter(OptionDailyFactor.date <= end_date)
+            stmt = stmt.where(OptionDailyFactor.date <= end_date)
 
-        return query.order_by(
-            OptionDailyFactor.date.desc()
-        ).limit(limit).all()
+        return stmt.order_by(OptionDailyFactor.date.desc()).limit(limit)
 
     @staticmethod
     def get_by_date_range(
@@ -301,11 +382,17 @@ class OptionDailyFactorRepository:
         underlying_id: str
     ) -> Optional[OptionDailyFactor]:
         """Get latest option daily factor for underlying"""
-        return db.query(OptionDailyFactor).filter(
-            OptionDailyFactor.underlying_id == underlying_id
-        ).order_by(
-            OptionDailyFactor.date.desc()
-        ).first()
+        stmt = OptionDailyFactorRepository._by_underlying_stmt(underlying_id, None, None, 1)
+        return db.execute(stmt).scalars().first()
+
+    @staticmethod
+    async def get_latest_async(
+        db: AsyncSession,
+        underlying_id: str
+    ) -> Optional[OptionDailyFactor]:
+        """AsyncSession version of get_latest"""
+        stmt = OptionDailyFactorRepository._by_underlying_stmt(underlying_id, None, None, 1)
+        return (await db.execute(stmt)).scalars().first()
 
     @staticmethod
     def get_latest_date(
@@ -382,6 +469,19 @@ class OptionDailyFactorRepository:
 
         return db_factor
 
+    @staticmethod
+    def bulk_upsert(
+        db: Session,
+        factors: List[OptionDailyFactorCreate]
+    ) -> Dict[str, int]:
+        """
+        Bulk insert or update option daily factors (single commit)
+
+        Returns:
+            {"inserted": int, "updated": int}
+        """
+        return _bulk_upsert_schemas(db, OptionDailyFactor, factors, ['underlying_id', 'date'])
+
     @staticmethod
     def delete_by_date_range(
         db: Session,
@@ -623,18 +723,16 @@ class OptionGreeksRepository:
         ).all()
 
     @staticmethod
-    def create(db: Session, greeks_data: 'OptionGreeksCreate') -> OptionGreeks:
+    def create(db: Session, greeks_data: OptionGreeksCreate) -> OptionGreeks:
         """Create new Greeks record"""
-        from app.schemas.option import OptionGreeksCreate
-
-        db_greeks = OptionGreeks(**greeks_data.model_dump())
+        db_greeks = OptionGreeks(**greeks_data.model_dump(by_alias=True))
         db.add(db_greeks)
         db.commit()
         db.refresh(db_greeks)
         return db_greeks
 
     @staticmethod
-    def upsert(db: Session, greeks_data: 'OptionGreeksCreate') -> OptionGreeks:
+    def upsert(db: Session, greeks_data: OptionGreeksCreate) -> OptionGreeks:
         """
         Insert or update Greeks record
 
@@ -645,18 +743,16 @@ class OptionGreeksRepository:
         Returns:
             Saved Greeks record
         """
-        from app.schemas.option import OptionGreeksCreate
-
         # 檢查是否已存在
         existing = OptionGreeksRepository.get_by_contract_and_datetime(
             db,
             greeks_data.contract_id,
-            greeks_data.datetime
+            greeks_data.dt
         )
 
         if existing:
             # 更新現有記錄
-            update_data = greeks_data.model_dump(exclude_unset=True)
+            update_data = greeks_data.model_dump(exclude_unset=True, by_alias=True)
             for field, value in update_data.items():
                 setattr(existing, field, value)
 
@@ -667,6 +763,22 @@ class OptionGreeksRepository:
             # 創建新記錄
             return OptionGreeksRepository.create(db, greeks_data)
 
+    @staticmethod
+    def bulk_upsert(db: Session, greeks_list: List[OptionGreeksCreate]) -> Dict[str, int]:
+        """
+        Bulk insert or update Greeks records (single commit)
+
+        用於整條選擇權鏈：每批一個 INSERT ... ON CONFLICT 語句，取代逐筆 SELECT/commit/refresh
+
+        Args:
+            db: Database session
+            greeks_list: Greeks data to upsert
+
+        Returns:
+            {"inserted": int, "updated": int}
+        """
+        return _bulk_upsert_schemas(db, OptionGreeks, greeks_list, ['contract_id', 'datetime'])
+
     @staticmethod
     def delete_old_records(
         db: Session,
@@ -737,40 +849,53 @@ class OptionMinutePriceRepository:
         Returns:
             Dictionary mapping contract_id to latest OptionMinutePrice (or None)
         """
-        from sqlalchemy import select
-        from sqlalchemy.orm import aliased
+        prices = db.execute(
+            OptionMinutePriceRepository._latest_prices_stmt(contract_ids)
+        ).scalars().all()
+        return OptionMinutePriceRepository._map_latest_prices(contract_ids, prices)
 
-        # 使用字典推導式初始化所有合約為 None
-        result = {contract_id: None for contract_id in contract_ids}
+    @staticmethod
+    async def get_latest_prices_for_contracts_async(
+        db: AsyncSession,
+        contract_ids: List[str]
+    ) -> Dict[str, Optional[OptionMinutePrice]]:
+        """AsyncSession version of get_latest_prices_for_contracts"""
+        prices = (await db.execute(
+            OptionMinutePriceRepository._latest_prices_stmt(contract_ids)
+        )).scalars().all()
+        return OptionMinutePriceRepository._map_latest_prices(contract_ids, prices)
 
+    @staticmethod
+    def _latest_prices_stmt(contract_ids: List[str]) -> Select:
         # 查詢所有合約的最新價格（一次性查詢，避免 N+1 問題）
         # 使用 subquery 找到每個合約的最新時間，然後 join 獲取完整記錄
         subquery = (
-            db.query(
+            select(
                 OptionMinutePrice.contract_id,
                 func.max(OptionMinutePrice.datetime).label('max_datetime')
             )
-            .filter(OptionMinutePrice.contract_id.in_(contract_ids))
+            .where(OptionMinutePrice.contract_id.in_(contract_ids))
             .group_by(OptionMinutePrice.contract_id)
             .subquery()
         )
 
-        prices = (
-            db.query(OptionMinutePrice)
-            .join(
-                subquery,
-                and_(
-                    OptionMinutePrice.contract_id == subquery.c.contract_id,
-                    OptionMinutePrice.datetime == subquery.c.max_datetime
-                )
+        return select(OptionMinutePrice).join(
+            subquery,
+            and_(
+                OptionMinutePrice.contract_id == subquery.c.contract_id,
+                OptionMinutePrice.datetime == subquery.c.max_datetime
             )
-            .all()
         )
 
-        # 更新結果字典
+    @staticmethod
+    def _map_latest_prices(
+        contract_ids: List[str],
+        prices: List[OptionMinutePrice]
+    ) -> Dict[str, Optional[OptionMinutePrice]]:
+        # 沒有價格的合約保留為 None
+        result = {contract_id: None for contract_id in contract_ids}
         for price in prices:
             result[price.contract_id] = price
-
         return result
 
     @staticmethod
@@ -807,3 +932,99 @@ class OptionMinutePriceRepository:
         return query.order_by(
             OptionMinutePrice.datetime.asc()
         ).limit(limit).all()
+
+    @staticmethod
+    def bulk_upsert(db: Session, prices: List[OptionMinutePriceCreate]) -> Dict[str, int]:
+        """
+        Bulk insert or update minute prices (single commit)
+
+        Args:
+            db: Database session
+            prices: Minute prices to upsert
+
+        Returns:
+            {"inserted": int, "updated": int}
+        """
+        return _bulk_upsert_schemas(db, OptionMinutePrice, prices, ['contract_id', 'datetime'])
+
+
+class OptionChainSnapshotRepository:
+    """Repository for daily option chain snapshots"""
+
+    @staticmethod
+    def get_chain(
+        db: Session,
+        underlying_id: str,
+        snapshot_date: date
+    ) -> List[OptionChainSnapshot]:
+        """Get the stored option chain of an underlying on a date"""
+        return db.query(OptionChainSnapshot).filter(
+            and_(
+                OptionChainSnapshot.underlying_id == underlying_id,
+                OptionChainSnapshot.date == snapshot_date
+            )
+        ).order_by(
+            OptionChainSnapshot.expiry_date.asc(),
+            OptionChainSnapshot.strike_price.asc(),
+            OptionChainSnapshot.option_type.asc()
+        ).all()
+
+    @staticmethod
+    def get_dates(
+        db: Session,
+        underlying_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> List[date]:
+        """Get dates that have a stored chain (ascending)"""
+        query = db.query(OptionChainSnapshot.date).filter(
+            OptionChainSnapshot.underlying_id == underlying_id
+        )
+        if start_date:
+            query = query.filter(OptionChainSnapshot.date >= start_date)
+        if end_date:
+            query = query.filter(OptionChainSnapshot.date <= end_date)
+
+        return [row[0] for row in query.distinct().order_by(OptionChainSnapshot.date.asc()).all()]
+
+    @staticmethod
+    def save_chain(
+        db: Session,
+        rows: List[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """
+        Insert or update chain rows (single commit)
+
+        Args:
+            db: Database session
+            rows: 以資料表欄位為鍵的字典（所有列的鍵須相同）
+
+        Returns:
+            {"inserted": int, "updated": int}
+        """
+        try:
+            counts = bulk_upsert(db, OptionChainSnapshot, rows, ['underlying_id', 'date', 'contract_id'])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return counts
+
+    @staticmethod
+    def delete_by_date_range(
+        db: Session,
+        underlying_id: str,
+        start_date: date,
+        end_date: date
+    ) -> int:
+        """Delete stored chains within date range"""
+        result = db.query(OptionChainSnapshot).filter(
+            and_(
+                OptionChainSnapshot.underlying_id == underlying_id,
+                OptionChainSnapshot.date >= start_date,
+                OptionChainSnapshot.date <= end_date
+            )
+        ).delete()
+
+        db.commit()
+        return result
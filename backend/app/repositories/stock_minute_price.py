@@ -9,13 +9,16 @@ Stock Minute Price Repository
 - 寫入時：確保傳入的 datetime 已經是台灣 naive datetime
 - 返回時：返回台灣 naive datetime（Service 層負責轉回 UTC）
 """
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import Select, and_, desc, select, cast, Float
 from app.models.stock_minute_price import StockMinutePrice
 from app.schemas.stock_minute_price import StockMinutePriceCreate, StockMinutePriceUpdate
 from app.utils.timezone_helpers import utc_to_naive_taipei
+from app.utils.query_helpers import fetch_columns
 from datetime import datetime, timezone
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from loguru import logger
 
 
@@ -81,6 +84,53 @@ class StockMinutePriceRepository:
             - 如果指定時間範圍：返回範圍內的記錄（升序）
             - 如果未指定時間範圍：返回最新的 N 筆記錄（升序）
         """
+        stmt, newest_first = StockMinutePriceRepository._range_stmt(
+            stock_id, start_datetime, end_datetime, limit
+        )
+        records = db.execute(stmt).scalars().all()
+        # 關鍵修復：如果沒有指定時間範圍，先降序取最新 N 筆，再反轉為升序
+        return list(reversed(records)) if newest_first else list(records)
+
+    @staticmethod
+    async def get_by_stock_async(
+        db: AsyncSession,
+        stock_id: str,
+        start_datetime: Optional[datetime] = None,
+        end_datetime: Optional[datetime] = None,
+        limit: int = 10000
+    ) -> List[StockMinutePrice]:
+        """
+        範圍查詢（AsyncSession 版本，語義同 get_by_stock）
+
+        Args:
+            db: 非同步資料庫會話
+            stock_id: 股票代碼
+            start_datetime: 開始時間（可選，UTC aware 或 naive）
+            end_datetime: 結束時間（可選，UTC aware 或 naive）
+            limit: 最大筆數（預設 10000）
+
+        Returns:
+            StockMinutePrice 列表，按時間升序排列
+        """
+        stmt, newest_first = StockMinutePriceRepository._range_stmt(
+            stock_id, start_datetime, end_datetime, limit
+        )
+        records = (await db.execute(stmt)).scalars().all()
+        return list(reversed(records)) if newest_first else list(records)
+
+    @staticmethod
+    def _range_stmt(
+        stock_id: str,
+        start_datetime: Optional[datetime],
+        end_datetime: Optional[datetime],
+        limit: int
+    ) -> Tuple[Select, bool]:
+        """
+        建立範圍查詢語句（同步 / 非同步版本共用）
+
+        Returns:
+            (SELECT 語句, 是否為降序查詢需由呼叫端反轉)
+        """
         # 時區轉換：如果傳入 UTC aware datetime，轉換為台灣 naive datetime
         if start_datetime and start_datetime.tzinfo is not None:
             start_datetime = utc_to_naive_taipei(start_datetime)
@@ -91,23 +141,81 @@ class StockMinutePriceRepository:
             logger.debug(f"Converted UTC end_datetime to Taiwan time: {end_datetime}")
 
         # 資料庫只有 1min 資料，移除 timeframe 過濾條件
-        query = db.query(StockMinutePrice).filter(
-            StockMinutePrice.stock_id == stock_id
-        )
+        stmt = select(StockMinutePrice).where(StockMinutePrice.stock_id == stock_id)
 
         if start_datetime:
-            query = query.filter(StockMinutePrice.datetime >= start_datetime)
+            stmt = stmt.where(StockMinutePrice.datetime >= start_datetime)
         if end_datetime:
-            query = query.filter(StockMinutePrice.datetime <= end_datetime)
+            stmt = stmt.where(StockMinutePrice.datetime <= end_datetime)
 
-        # 關鍵修復：如果沒有指定時間範圍，返回最新的 N 筆記錄
+        # 沒有指定時間範圍時取最新的 N 筆記錄
         if not start_datetime and not end_datetime:
-            # 先降序取最新 N 筆，再反轉為升序
-            records = query.order_by(StockMinutePrice.datetime.desc()).limit(limit).all()
-            return list(reversed(records))  # 反轉為升序（時間從早到晚）
-        else:
-            # 有時間範圍時，直接升序返回
-            return query.order_by(StockMinutePrice.datetime.asc()).limit(limit).all()
+            return stmt.order_by(StockMinutePrice.datetime.desc()).limit(limit), True
+        # 有時間範圍時，直接升序返回
+        return stmt.order_by(StockMinutePrice.datetime.asc()).limit(limit), False
+
+    @staticmethod
+    def get_ohlcv_columns(
+        db: Session,
+        stock_id: str,
+        start_datetime: Optional[datetime] = None,
+        end_datetime: Optional[datetime] = None,
+        limit: int = 10000
+    ) -> Dict[str, np.ndarray]:
+        """
+        範圍查詢（欄位陣列版本，不建立 ORM 物件）
+
+        與 get_by_stock 語義相同，但以單一投影查詢直接輸出 NumPy 陣列，
+        價格於 SQL 端轉為浮點數，適合回測等大量讀取場景。
+
+        Args:
+            db: 資料庫會話
+            stock_id: 股票代碼
+            start_datetime: 開始時間（可選，UTC aware 或 naive）
+            end_datetime: 結束時間（可選，UTC aware 或 naive）
+            limit: 最大筆數（預設 10000）
+
+        Returns:
+            {'datetime', 'open', 'high', 'low', 'close', 'volume'} 陣列字典，按時間升序排列
+        """
+        if start_datetime and start_datetime.tzinfo is not None:
+            start_datetime = utc_to_naive_taipei(start_datetime)
+
+        if end_datetime and end_datetime.tzinfo is not None:
+            end_datetime = utc_to_naive_taipei(end_datetime)
+
+        stmt = select(
+            StockMinutePrice.datetime,
+            cast(StockMinutePrice.open, Float),
+            cast(StockMinutePrice.high, Float),
+            cast(StockMinutePrice.low, Float),
+            cast(StockMinutePrice.close, Float),
+            StockMinutePrice.volume,
+        ).where(StockMinutePrice.stock_id == stock_id)
+
+        if start_datetime:
+            stmt = stmt.where(StockMinutePrice.datetime >= start_datetime)
+        if end_datetime:
+            stmt = stmt.where(StockMinutePrice.datetime <= end_datetime)
+
+        columns = ['datetime', 'open', 'high', 'low', 'close', 'volume']
+
+        # 未指定時間範圍：取最新 N 筆後反轉為升序（與 get_by_stock 一致）
+        if not start_datetime and not end_datetime:
+            result = fetch_columns(
+                db,
+                stmt.order_by(StockMinutePrice.datetime.desc()).limit(limit),
+                columns,
+                parse_dates=['datetime']
+            )
+            return {name: values[::-1] for name, values in result.items()}
+
+        return fetch_columns(
+            db,
+            stmt.order_by(StockMinutePrice.datetime.asc()).limit(limit),
+            columns,
+            parse_dates=['datetime']
+        )
 
     @staticmethod
     def get_latest(
@@ -126,12 +234,28 @@ class StockMinutePriceRepository:
         Returns:
             最新的 StockMinutePrice 物件，不存在返回 None
         """
-        return db.query(StockMinutePrice).filter(
+        return db.execute(
+            StockMinutePriceRepository._latest_stmt(stock_id, timeframe)
+        ).scalars().first()
+
+    @staticmethod
+    async def get_latest_async(
+        db: AsyncSession,
+        stock_id: str,
+        timeframe: str = '1min'
+    ) -> Optional[StockMinutePrice]:
+        """獲取最新價格（AsyncSession 版本）"""
+        result = await db.execute(StockMinutePriceRepository._latest_stmt(stock_id, timeframe))
+        return result.scalars().first()
+
+    @staticmethod
+    def _latest_stmt(stock_id: str, timeframe: str) -> Select:
+        return select(StockMinutePrice).where(
             and_(
                 StockMinutePrice.stock_id == stock_id,
                 StockMinutePrice.timeframe == timeframe
             )
-        ).order_by(desc(StockMinutePrice.datetime)).first()
+        ).order_by(desc(StockMinutePrice.datetime)).limit(1)
 
     @staticmethod
     def create(
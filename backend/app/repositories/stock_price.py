@@ -2,13 +2,17 @@
 StockPrice repository for database operations
 """
 
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
 from datetime import date as DateType
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
+from sqlalchemy import Select, and_, desc, func, select, cast, Float
 from app.models.stock_price import StockPrice
 from app.schemas.stock_price import StockPriceCreate, StockPriceUpdate
 from app.utils.price_validator import PriceValidator, PriceValidationError
+from app.utils.query_helpers import bulk_upsert, fetch_columns
 from loguru import logger
 
 
@@ -86,21 +90,143 @@ class StockPriceRepository:
         Returns:
             List of stock prices
         """
-        query = db.query(StockPrice).filter(StockPrice.stock_id == stock_id)
+        stmt = StockPriceRepository._by_stock_stmt(
+            stock_id, start_date, end_date, skip, limit, ascending
+        )
+        return list(db.execute(stmt).scalars().all())
+
+    @staticmethod
+    async def get_by_stock_async(
+        db: AsyncSession,
+        stock_id: str,
+        start_date: Optional[DateType] = None,
+        end_date: Optional[DateType] = None,
+        skip: int = 0,
+        limit: int = 100,
+        ascending: bool = False
+    ) -> List[StockPrice]:
+        """Get stock prices for a specific stock (AsyncSession version of get_by_stock)"""
+        stmt = StockPriceRepository._by_stock_stmt(
+            stock_id, start_date, end_date, skip, limit, ascending
+        )
+        return list((await db.execute(stmt)).scalars().all())
+
+    @staticmethod
+    def _by_stock_stmt(
+        stock_id: str,
+        start_date: Optional[DateType],
+        end_date: Optional[DateType],
+        skip: int,
+        limit: int,
+        ascending: bool
+    ) -> Select:
+        """Build the get_by_stock query (shared by the sync and async versions)"""
+        stmt = select(StockPrice).where(StockPrice.stock_id == stock_id)
 
         if start_date:
-            query = query.filter(StockPrice.date >= start_date)
+            stmt = stmt.where(StockPrice.date >= start_date)
 
         if end_date:
-            query = query.filter(StockPrice.date <= end_date)
+            stmt = stmt.where(StockPrice.date <= end_date)
 
         # Apply ordering
         if ascending:
-            query = query.order_by(StockPrice.date)
+            stmt = stmt.order_by(StockPrice.date)
         else:
-            query = query.order_by(desc(StockPrice.date))
+            stmt = stmt.order_by(desc(StockPrice.date))
+
+        return stmt.offset(skip).limit(limit)
+
+    @staticmethod
+    def get_ohlcv_columns(
+        db: Session,
+        stock_id: str,
+        start_date: Optional[DateType] = None,
+        end_date: Optional[DateType] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Get OHLCV for a stock as column arrays (oldest first)
+
+        Uses a single projected query without building ORM objects; prices are
+        cast to float in SQL so no per-row Decimal conversion is needed.
+
+        Args:
+            db: Database session
+            stock_id: Stock ID
+            start_date: Start date (optional)
+            end_date: End date (optional)
+
+        Returns:
+            Dict with 'date' (datetime64), 'open'/'high'/'low'/'close' (float64)
+            and 'volume' (int64) arrays
+        """
+        stmt = select(
+            StockPrice.date,
+            cast(StockPrice.open, Float),
+            cast(StockPrice.high, Float),
+            cast(StockPrice.low, Float),
+            cast(StockPrice.close, Float),
+            StockPrice.volume,
+        ).where(StockPrice.stock_id == stock_id)
+
+        if start_date:
+            stmt = stmt.where(StockPrice.date >= start_date)
+
+        if end_date:
+            stmt = stmt.where(StockPrice.date <= end_date)
+
+        return fetch_columns(
+            db,
+            stmt.order_by(StockPrice.date),
+            ['date', 'open', 'high', 'low', 'close', 'volume'],
+            parse_dates=['date']
+        )
+
+    @staticmethod
+    def get_ohlcv_columns_multi(
+        db: Session,
+        stock_ids: List[str],
+        start_date: Optional[DateType] = None,
+        end_date: Optional[DateType] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Get OHLCV for several stocks in one query as column arrays
+
+        Rows are ordered by (stock_id, date), so each stock occupies one
+        contiguous slice of the arrays.
 
-        return query.offset(skip).limit(limit).all()
+        Args:
+            db: Database session
+            stock_ids: Stock IDs
+            start_date: Start date (optional)
+            end_date: End date (optional)
+
+        Returns:
+            Same columns as get_ohlcv_columns plus a 'stock_id' array
+        """
+        stmt = select(
+            StockPrice.stock_id,
+            StockPrice.date,
+            cast(StockPrice.open, Float),
+            cast(StockPrice.high, Float),
+            cast(StockPrice.low, Float),
+            cast(StockPrice.close, Float),
+            StockPrice.volume,
+        ).where(StockPrice.stock_id.in_(stock_ids))
+
+        if start_date:
+            stmt = stmt.where(StockPrice.date >= start_date)
+
+        if end_date:
+            stmt = stmt.where(StockPrice.date <= end_date)
+
+        return fetch_columns(
+            db,
+            stmt.order_by(StockPrice.stock_id, StockPrice.date),
+            ['stock_id', 'date', 'open', 'high', 'low', 'close', 'volume'],
+            parse_dates=['date'],
+            str_columns=['stock_id']
+        )
 
     @staticmethod
     def get_latest(db: Session, stock_id: str) -> Optional[StockPrice]:
@@ -266,6 +392,69 @@ class StockPriceRepository:
             "total": len(prices)
         }
 
+    @staticmethod
+    def bulk_ingest(db: Session, df: pd.DataFrame, skip_validation: bool = False) -> dict:
+        """
+        Set-based upsert of a whole OHLCV frame
+
+        Validation runs vectorized over the frame (same rules as
+        PriceValidator.validate_price_data), valid rows are written with
+        ``INSERT ... ON CONFLICT DO UPDATE`` in a few statements and the
+        session is committed once. Invalid rows are skipped and reported
+        instead of aborting the batch.
+
+        Args:
+            db: Database session
+            df: Columns stock_id, date, open, high, low, close, volume and
+                optionally adj_close; one row per (stock_id, date)
+            skip_validation: 跳過價格驗證（預設 False，不建議使用）
+
+        Returns:
+            包含統計信息的字典：
+            - inserted: 新增的記錄數
+            - updated: 更新的記錄數
+            - rejected: 因驗證失敗而跳過的記錄數
+            - total: 總輸入記錄數
+            - rejections: [{"stock_id", "date", "reason"}, ...]
+        """
+        result = {"inserted": 0, "updated": 0, "rejected": 0, "total": len(df), "rejections": []}
+        if df.empty:
+            return result
+
+        frame = df.reset_index(drop=True).copy()
+        frame['stock_id'] = frame['stock_id'].astype(str)
+        frame['date'] = pd.to_datetime(frame['date']).dt.date
+        if 'adj_close' not in frame.columns:
+            frame['adj_close'] = None
+
+        if not skip_validation:
+            reasons = PriceValidator.validate_price_frame(frame, allow_zero_placeholder=True)
+            invalid = reasons.notna()
+            if invalid.any():
+                for row, reason in zip(frame.loc[invalid, ['stock_id', 'date']].itertuples(index=False),
+                                       reasons[invalid]):
+                    result["rejections"].append({"stock_id": row.stock_id, "date": row.date, "reason": reason})
+                logger.warning(
+                    f"⚠️  [BULK_VALIDATION] 跳過 {int(invalid.sum())} 筆無效記錄，"
+                    f"例如: {result['rejections'][0]['reason']}"
+                )
+                frame = frame[~invalid]
+            result["rejected"] = int(invalid.sum())
+
+        columns = ['stock_id', 'date', 'open', 'high', 'low', 'close', 'volume', 'adj_close']
+        frame = frame[columns].astype(object).where(frame[columns].notna(), None)
+        rows = frame.to_dict('records')
+
+        try:
+            counts = bulk_upsert(db, StockPrice, rows, ['stock_id', 'date'])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        result.update(counts)
+        return result
+
     @staticmethod
     def update(
         db: Session,
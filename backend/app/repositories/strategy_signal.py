@@ -2,7 +2,7 @@
 Strategy Signal Repository for database operations
 """
 
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 from datetime import date, datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func, desc, or_
@@ -273,6 +273,47 @@ class StrategySignalRepository:
 
         return duplicate is not None
 
+    @staticmethod
+    def get_recent_signal_keys(
+        db: Session,
+        strategy_ids: List[int],
+        time_threshold: datetime
+    ) -> Set[Tuple[int, str, str]]:
+        """
+        Get (strategy_id, stock_id, signal_type) of signals detected after a threshold
+
+        Batched form of check_duplicate: one query for all strategies in a
+        monitoring run instead of one query per signal.
+
+        Args:
+            db: Database session
+            strategy_ids: Strategy IDs
+            time_threshold: Only signals detected at or after this time
+
+        Returns:
+            Set of (strategy_id, stock_id, signal_type)
+        """
+        if not strategy_ids:
+            return set()
+
+        rows = (
+            db.query(
+                StrategySignal.strategy_id,
+                StrategySignal.stock_id,
+                StrategySignal.signal_type
+            )
+            .filter(
+                and_(
+                    StrategySignal.strategy_id.in_(strategy_ids),
+                    StrategySignal.detected_at >= time_threshold
+                )
+            )
+            .distinct()
+            .all()
+        )
+
+        return {(strategy_id, stock_id, signal_type) for strategy_id, stock_id, signal_type in rows}
+
     @staticmethod
     def get_unnotified(db: Session, limit: int = 100) -> List[StrategySignal]:
         """
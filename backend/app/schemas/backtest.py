@@ -107,6 +107,13 @@ class BacktestBase(BaseModel):
         description="時間粒度：1min, 5min, 15min, 30min, 60min, 1day"
     )
 
+    # 多標的投組回測
+    universe: Optional[List[str]] = Field(
+        default=None,
+        max_length=200,
+        description="投組回測的股票代碼清單（設定時 symbol 作為投組名稱，共用資金與持倉）"
+    )
+
     @field_validator('timeframe')
     @classmethod
     def validate_timeframe(cls, v: str) -> str:
@@ -118,6 +125,19 @@ class BacktestBase(BaseModel):
             )
         return v
 
+    @field_validator('universe')
+    @classmethod
+    def validate_universe(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        """驗證股票池：去除空白與重複，保留原始順序"""
+        if v is None:
+            return v
+        cleaned = list(dict.fromkeys(s.strip() for s in v if s and s.strip()))
+        if not cleaned:
+            raise ValueError('universe must contain at least one symbol')
+        if any(len(s) > 10 for s in cleaned):
+            raise ValueError('universe symbols must be at most 10 characters')
+        return cleaned
+
 
 class BacktestCreate(BacktestBase):
     """Schema for creating a new backtest"""
@@ -194,3 +214,75 @@ class BacktestProgress(BaseModel):
     progress: float = Field(..., ge=0, le=100, description="進度百分比")
     current_date: Optional[DateType] = None
     message: Optional[str] = None
+
+
+# ============ Parameter Sweep Schemas ============
+
+class BacktestSweepRequest(BaseModel):
+    """Request to run a parameter sweep for one strategy on one symbol"""
+    strategy_id: int = Field(..., gt=0, description="策略 ID")
+    symbol: str = Field(..., min_length=1, max_length=20, description="股票代碼")
+    start_date: DateType = Field(..., description="回測開始日期")
+    end_date: DateType = Field(..., description="回測結束日期")
+    timeframe: str = Field(default='1day', description="時間粒度：1min, 5min, 15min, 30min, 60min, 1day")
+    initial_capital: Decimal = Field(default=Decimal("1000000"), ge=0, description="初始資金")
+    commission: Decimal = Field(default=Decimal("0.001425"), ge=0, le=1, description="手續費率")
+    slippage: Decimal = Field(default=Decimal("0.0"), ge=0, le=1, description="滑點率")
+
+    base_params: Dict[str, Any] = Field(default_factory=dict, description="所有組合共用的策略參數")
+    param_grid: Dict[str, List[Any]] = Field(..., description="參數網格：{參數名稱: 候選值列表}")
+    search: str = Field(default='grid', description="搜尋模式：grid（全部組合）或 random（隨機抽樣）")
+    n_samples: Optional[int] = Field(default=None, ge=1, le=2000, description="隨機搜尋的抽樣數量")
+    seed: Optional[int] = Field(default=None, description="隨機搜尋的種子")
+    rank_by: str = Field(default='sharpe_ratio', description="排序指標")
+
+    @field_validator('timeframe')
+    @classmethod
+    def validate_timeframe(cls, v: str) -> str:
+        """驗證 timeframe 是否為有效值"""
+        valid_timeframes = ['1min', '5min', '15min', '30min', '60min', '1day']
+        if v not in valid_timeframes:
+            raise ValueError(
+                f'timeframe must be one of {valid_timeframes}, got: {v}'
+            )
+        return v
+
+    @field_validator('search')
+    @classmethod
+    def validate_search(cls, v: str) -> str:
+        """驗證搜尋模式"""
+        if v not in ('grid', 'random'):
+            raise ValueError(f"search must be 'grid' or 'random', got: {v}")
+        return v
+
+    @field_validator('rank_by')
+    @classmethod
+    def validate_rank_by(cls, v: str) -> str:
+        """驗證排序指標（與 backtest_sweep.SWEEP_RANK_METRICS 一致）"""
+        valid_metrics = [
+            'sharpe_ratio', 'total_return', 'total_pnl', 'win_rate',
+            'profit_factor', 'final_value', 'max_drawdown_pct', 'max_drawdown',
+        ]
+        if v not in valid_metrics:
+            raise ValueError(f'rank_by must be one of {valid_metrics}, got: {v}')
+        return v
+
+
+class BacktestSweepResult(BaseModel):
+    """Single ranked parameter combination"""
+    rank: int
+    params: Dict[str, Any]
+    metrics: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class BacktestSweepStatus(BaseModel):
+    """Parameter sweep progress and current leaderboard"""
+    sweep_id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    rank_by: str
+    error: Optional[str] = None
+    results: List[BacktestSweepResult] = Field(default_factory=list)
@@ -8,9 +8,55 @@ Alpha158+ 因子計算引擎
 
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple
+from dataclasses import dataclass
+from typing import Callable, List, Dict, Optional, Tuple
 from loguru import logger
 
+from app.services import alpha158_kernels
+
+
+# 滾動因子計算後端：
+# - numpy:  alpha158_kernels 的向量化核心（預設）
+# - pandas: rolling().apply 逐窗口 Python 回呼（參考實作）
+ALPHA158_BACKENDS = ('numpy', 'pandas')
+
+# 預設因子配置（179 個因子）
+DEFAULT_ALPHA158_CONFIG = {
+    'kbar': {},
+    'price': {'windows': [0, 1, 2, 3, 4], 'feature': ['OPEN', 'HIGH', 'LOW', 'CLOSE']},
+    'volume': {'windows': [0, 1, 2, 3, 4]},
+    'rolling': {'windows': [5, 10, 20, 30, 60]}
+}
+
+# Panel 模式必要的 OHLCV 欄位
+PANEL_FIELDS = ('$open', '$high', '$low', '$close', '$volume')
+
+
+@dataclass
+class Alpha158Panel:
+    """
+    Alpha158 因子立方體
+
+    values 形狀為 (日期, 標的, 因子)、dtype float32；
+    reshape(-1, n_factors) 即為 (datetime, instrument) 長格式的因子矩陣（不複製）。
+    """
+    values: np.ndarray
+    factor_names: List[str]
+    dates: Optional[pd.Index] = None
+    instruments: Optional[pd.Index] = None
+
+    def factor(self, name: str) -> np.ndarray:
+        """取得單一因子的 (日期, 標的) 矩陣"""
+        return self.values[:, :, self.factor_names.index(name)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """轉為 Qlib 長格式 DataFrame（index: datetime, instrument；columns: 因子）"""
+        n_dates, n_instruments, n_factors = self.values.shape
+        dates = self.dates if self.dates is not None else pd.RangeIndex(n_dates)
+        instruments = self.instruments if self.instruments is not None else pd.RangeIndex(n_instruments)
+        index = pd.MultiIndex.from_product([dates, instruments], names=['datetime', 'instrument'])
+        return pd.DataFrame(self.values.reshape(-1, n_factors), index=index, columns=self.factor_names)
+
 
 class Alpha158Calculator:
     """
@@ -21,22 +67,62 @@ class Alpha158Calculator:
     - 20 個 Price 因子
     - 5 個 Volume 因子
     - 145 個 Rolling 因子（含增強版成交量分析）
+
+    slope/rsquare/resi/rank/idx_max/idx_min 依 backend 選擇 pandas 參考實作
+    或 NumPy 向量化核心，兩者結果一致（浮點誤差內）。
     """
 
-    def __init__(self):
+    def __init__(self, backend: str = 'numpy'):
         self.default_windows = [5, 10, 20, 30, 60]
+        self.backend = self._validate_backend(backend)
+
+    @staticmethod
+    def _validate_backend(backend: str) -> str:
+        if backend not in ALPHA158_BACKENDS:
+            raise ValueError(f"Unsupported Alpha158 backend: {backend} (expected one of {ALPHA158_BACKENDS})")
+        return backend
+
+    @staticmethod
+    def _series_kernel(kernel: Callable[[np.ndarray, int], np.ndarray]) -> Callable[[pd.Series, int], pd.Series]:
+        """將 NumPy 核心包裝為與 pandas 實作相同介面（Series/DataFrame 進、同型別出）"""
+        def apply(series: pd.Series, window: int) -> pd.Series:
+            values = kernel(series.to_numpy(dtype=np.float64), window)
+            if isinstance(series, pd.DataFrame):
+                return pd.DataFrame(values, index=series.index, columns=series.columns)
+            return pd.Series(values, index=series.index, name=series.name)
+        return apply
+
+    def _rolling_operators(self, backend: str) -> Dict[str, Callable[[pd.Series, int], pd.Series]]:
+        """取得指定後端的滾動運算函數"""
+        if self._validate_backend(backend) == 'pandas':
+            return {
+                'slope': self.slope,
+                'rsquare': self.rsquare,
+                'resi': self.resi,
+                'rank': self.rank,
+                'idx_max': self.idx_max,
+                'idx_min': self.idx_min,
+            }
+        return {
+            'slope': self._series_kernel(alpha158_kernels.rolling_slope),
+            'rsquare': self._series_kernel(alpha158_kernels.rolling_rsquare),
+            'resi': self._series_kernel(alpha158_kernels.rolling_resi),
+            'rank': self._series_kernel(alpha158_kernels.rolling_rank),
+            'idx_max': self._series_kernel(alpha158_kernels.rolling_idx_max),
+            'idx_min': self._series_kernel(alpha158_kernels.rolling_idx_min),
+        }
 
     # ==================== 輔助函數 ====================
 
     @staticmethod
     def greater(a: pd.Series, b: pd.Series) -> pd.Series:
-        """Greater($a, $b): 返回兩者中較大的值"""
-        return pd.concat([a, b], axis=1).max(axis=1)
+        """Greater($a, $b): 返回兩者中較大的值（忽略 NaN，Series 與 DataFrame 皆可）"""
+        return np.fmax(a, b)
 
     @staticmethod
     def less(a: pd.Series, b: pd.Series) -> pd.Series:
-        """Less($a, $b): 返回兩者中較小的值"""
-        return pd.concat([a, b], axis=1).min(axis=1)
+        """Less($a, $b): 返回兩者中較小的值（忽略 NaN，Series 與 DataFrame 皆可）"""
+        return np.fmin(a, b)
 
     @staticmethod
     def slope(series: pd.Series, window: int) -> pd.Series:
@@ -136,40 +222,39 @@ class Alpha158Calculator:
         輸出：9 個 KBar 因子
         """
         result = df.copy()
+        for name, values in self._kbar_items(df['$open'], df['$high'], df['$low'], df['$close']):
+            result[name] = values
 
-        open_p = df['$open']
-        high = df['$high']
-        low = df['$low']
-        close = df['$close']
+        return result
 
+    def _kbar_items(self, open_p, high, low, close):
+        """逐一產出 KBar 因子 (名稱, 值)；輸入可為 Series（單一股票）或 DataFrame（日期 × 標的）"""
         # 1. KMID: (close-open)/open - 實體相對於開盤價的比例
-        result['KMID'] = (close - open_p) / open_p
+        yield 'KMID', (close - open_p) / open_p
 
         # 2. KLEN: (high-low)/open - 影線長度相對於開盤價
-        result['KLEN'] = (high - low) / open_p
+        yield 'KLEN', (high - low) / open_p
 
         # 3. KMID2: (close-open)/(high-low+1e-12) - 實體佔總波動的比例
-        result['KMID2'] = (close - open_p) / (high - low + 1e-12)
+        yield 'KMID2', (close - open_p) / (high - low + 1e-12)
 
         # 4. KUP: (high-max(open,close))/open - 上影線
-        result['KUP'] = (high - self.greater(open_p, close)) / open_p
+        yield 'KUP', (high - self.greater(open_p, close)) / open_p
 
         # 5. KUP2: (high-max(open,close))/(high-low+1e-12) - 上影線比例
-        result['KUP2'] = (high - self.greater(open_p, close)) / (high - low + 1e-12)
+        yield 'KUP2', (high - self.greater(open_p, close)) / (high - low + 1e-12)
 
         # 6. KLOW: (min(open,close)-low)/open - 下影線
-        result['KLOW'] = (self.less(open_p, close) - low) / open_p
+        yield 'KLOW', (self.less(open_p, close) - low) / open_p
 
         # 7. KLOW2: (min(open,close)-low)/(high-low+1e-12) - 下影線比例
-        result['KLOW2'] = (self.less(open_p, close) - low) / (high - low + 1e-12)
+        yield 'KLOW2', (self.less(open_p, close) - low) / (high - low + 1e-12)
 
         # 8. KSFT: (2*close-high-low)/open - 收盤價位置
-        result['KSFT'] = (2 * close - high - low) / open_p
+        yield 'KSFT', (2 * close - high - low) / open_p
 
         # 9. KSFT2: (2*close-high-low)/(high-low+1e-12) - 收盤價相對位置
-        result['KSFT2'] = (2 * close - high - low) / (high - low + 1e-12)
-
-        return result
+        yield 'KSFT2', (2 * close - high - low) / (high - low + 1e-12)
 
     # ==================== Price 因子 (20個) ====================
 
@@ -193,22 +278,27 @@ class Alpha158Calculator:
                 features.append('VWAP')
 
         result = df.copy()
-        close = df['$close']
+        prices = {
+            feature: df[f'${feature.lower()}']
+            for feature in features
+            if f'${feature.lower()}' in df.columns
+        }
+        for name, values in self._price_items(prices, df['$close'], windows):
+            result[name] = values
 
-        for feature in features:
-            field = f'${feature.lower()}'
-            if field not in df.columns:
-                continue
+        return result
 
+    @staticmethod
+    def _price_items(prices: Dict, close, windows: List[int]):
+        """逐一產出 Price 因子 (名稱, 值)；prices 為 {特徵名稱: 價格序列}"""
+        for feature, price in prices.items():
             for d in windows:
                 if d == 0:
                     # 當天價格 / 收盤價
-                    result[f'{feature}{d}'] = df[field] / close
+                    yield f'{feature}{d}', price / close
                 else:
                     # d 天前價格 / 當天收盤價
-                    result[f'{feature}{d}'] = df[field].shift(d) / close
-
-        return result
+                    yield f'{feature}{d}', price.shift(d) / close
 
     # ==================== Volume 因子 (5個) ====================
 
@@ -227,17 +317,21 @@ class Alpha158Calculator:
             windows = [0, 1, 2, 3, 4]
 
         result = df.copy()
-        volume = df['$volume']
+        for name, values in self._volume_items(df['$volume'], windows):
+            result[name] = values
 
+        return result
+
+    @staticmethod
+    def _volume_items(volume, windows: List[int]):
+        """逐一產出 Volume 因子 (名稱, 值)"""
         for d in windows:
             if d == 0:
                 # 當天成交量 / (成交量+epsilon)
-                result[f'VOLUME{d}'] = volume / (volume + 1e-12)
+                yield f'VOLUME{d}', volume / (volume + 1e-12)
             else:
                 # d 天前成交量 / (當天成交量+epsilon)
-                result[f'VOLUME{d}'] = volume.shift(d) / (volume + 1e-12)
-
-        return result
+                yield f'VOLUME{d}', volume.shift(d) / (volume + 1e-12)
 
     # ==================== Rolling 因子 (145個，含增強版成交量分析) ====================
 
@@ -246,124 +340,132 @@ class Alpha158Calculator:
         df: pd.DataFrame,
         windows: List[int] = None,
         include: List[str] = None,
-        exclude: List[str] = None
+        exclude: List[str] = None,
+        backend: str = None
     ) -> pd.DataFrame:
         """
         計算 Rolling 因子（滾動窗口技術指標）
 
         輸入需要：$close, $high, $low, $volume
         輸出：最多 145 個 rolling 因子（含增強版成交量分析）
+        backend: 'numpy' 或 'pandas'（None 使用實例預設）
         """
         if windows is None:
             windows = self.default_windows
         if exclude is None:
             exclude = []
 
+        ops = self._rolling_operators(backend or self.backend)
+
         def use(name):
             return name not in exclude and (include is None or name in include)
 
         result = df.copy()
-        close = df['$close']
-        high = df['$high']
-        low = df['$low']
-        volume = df['$volume']
+        items = self._rolling_items(df['$close'], df['$high'], df['$low'], df['$volume'], windows, use, ops)
+        for name, values in items:
+            result[name] = values
+
+        return result
 
+    @staticmethod
+    def _rolling_items(close, high, low, volume, windows: List[int], use: Callable[[str], bool], ops: Dict):
+        """逐一產出 Rolling 因子 (名稱, 值)；輸入可為 Series（單一股票）或 DataFrame（日期 × 標的）"""
         for d in windows:
             # ROC: Rate of Change (變化率)
             if use('ROC'):
-                result[f'ROC{d}'] = close.shift(d) / close
+                yield f'ROC{d}', close.shift(d) / close
 
             # MA: Moving Average (移動平均)
             if use('MA'):
-                result[f'MA{d}'] = close.rolling(window=d, min_periods=1).mean() / close
+                yield f'MA{d}', close.rolling(window=d, min_periods=1).mean() / close
 
             # STD: Standard Deviation (標準差)
             if use('STD'):
-                result[f'STD{d}'] = close.rolling(window=d, min_periods=1).std() / close
+                yield f'STD{d}', close.rolling(window=d, min_periods=1).std() / close
 
             # BETA: Slope (線性回歸斜率)
             if use('BETA'):
-                result[f'BETA{d}'] = self.slope(close, d) / close
+                yield f'BETA{d}', ops['slope'](close, d) / close
 
             # RSQR: R-square (R²)
             if use('RSQR'):
-                result[f'RSQR{d}'] = self.rsquare(close, d)
+                yield f'RSQR{d}', ops['rsquare'](close, d)
 
             # RESI: Residual (殘差)
             if use('RESI'):
-                result[f'RESI{d}'] = self.resi(close, d) / close
+                yield f'RESI{d}', ops['resi'](close, d) / close
 
             # MAX: Maximum High (最高價)
             if use('MAX'):
-                result[f'MAX{d}'] = high.rolling(window=d, min_periods=1).max() / close
+                yield f'MAX{d}', high.rolling(window=d, min_periods=1).max() / close
 
             # MIN: Minimum Low (最低價)
             if use('MIN'):
-                result[f'MIN{d}'] = low.rolling(window=d, min_periods=1).min() / close
+                yield f'MIN{d}', low.rolling(window=d, min_periods=1).min() / close
 
             # QTLU: Upper Quantile (80% 分位數)
             if use('QTLU'):
-                result[f'QTLU{d}'] = close.rolling(window=d, min_periods=1).quantile(0.8) / close
+                yield f'QTLU{d}', close.rolling(window=d, min_periods=1).quantile(0.8) / close
 
             # QTLD: Lower Quantile (20% 分位數)
             if use('QTLD'):
-                result[f'QTLD{d}'] = close.rolling(window=d, min_periods=1).quantile(0.2) / close
+                yield f'QTLD{d}', close.rolling(window=d, min_periods=1).quantile(0.2) / close
 
             # RANK: Percentile Rank (百分位排名)
             if use('RANK'):
-                result[f'RANK{d}'] = self.rank(close, d)
+                yield f'RANK{d}', ops['rank'](close, d)
 
             # RSV: Relative Strength Value (相對強弱值)
             if use('RSV'):
                 min_low = low.rolling(window=d, min_periods=1).min()
                 max_high = high.rolling(window=d, min_periods=1).max()
-                result[f'RSV{d}'] = (close - min_low) / (max_high - min_low + 1e-12)
+                yield f'RSV{d}', (close - min_low) / (max_high - min_low + 1e-12)
 
             # IMAX: Index of Maximum (最高價距今天數)
             if use('IMAX'):
-                result[f'IMAX{d}'] = self.idx_max(high, d) / d
+                yield f'IMAX{d}', ops['idx_max'](high, d) / d
 
             # IMIN: Index of Minimum (最低價距今天數)
             if use('IMIN'):
-                result[f'IMIN{d}'] = self.idx_min(low, d) / d
+                yield f'IMIN{d}', ops['idx_min'](low, d) / d
 
             # IMXD: Max-Min Index Difference (最高最低價時間差)
             if use('IMXD'):
-                result[f'IMXD{d}'] = (self.idx_max(high, d) - self.idx_min(low, d)) / d
+                yield f'IMXD{d}', (ops['idx_max'](high, d) - ops['idx_min'](low, d)) / d
 
             # CORR: Correlation (價格與成交量相關性)
             if use('CORR'):
                 log_volume = np.log(volume + 1)
-                result[f'CORR{d}'] = close.rolling(window=d, min_periods=1).corr(log_volume)
+                yield f'CORR{d}', close.rolling(window=d, min_periods=1).corr(log_volume)
 
             # CORD: Change Correlation (變化率相關性)
             if use('CORD'):
                 close_change = close / close.shift(1)
                 volume_change = np.log(volume / volume.shift(1) + 1)
-                result[f'CORD{d}'] = close_change.rolling(window=d, min_periods=1).corr(volume_change)
+                yield f'CORD{d}', close_change.rolling(window=d, min_periods=1).corr(volume_change)
 
             # CNTP: Count Positive (上漲天數比例)
             if use('CNTP'):
                 up_days = (close > close.shift(1)).astype(int)
-                result[f'CNTP{d}'] = up_days.rolling(window=d, min_periods=1).mean()
+                yield f'CNTP{d}', up_days.rolling(window=d, min_periods=1).mean()
 
             # CNTN: Count Negative (下跌天數比例)
             if use('CNTN'):
                 down_days = (close < close.shift(1)).astype(int)
-                result[f'CNTN{d}'] = down_days.rolling(window=d, min_periods=1).mean()
+                yield f'CNTN{d}', down_days.rolling(window=d, min_periods=1).mean()
 
             # CNTD: Count Difference (漲跌天數差)
             if use('CNTD'):
                 up_days = (close > close.shift(1)).astype(int)
                 down_days = (close < close.shift(1)).astype(int)
-                result[f'CNTD{d}'] = (up_days - down_days).rolling(window=d, min_periods=1).mean()
+                yield f'CNTD{d}', (up_days - down_days).rolling(window=d, min_periods=1).mean()
 
             # SUMP: Sum Positive (總上漲/總變化)
             if use('SUMP'):
                 change = close - close.shift(1)
                 positive = np.maximum(change, 0)
                 abs_change = np.abs(change)
-                result[f'SUMP{d}'] = positive.rolling(window=d, min_periods=1).sum() / (
+                yield f'SUMP{d}', positive.rolling(window=d, min_periods=1).sum() / (
                     abs_change.rolling(window=d, min_periods=1).sum() + 1e-12
                 )
 
@@ -372,7 +474,7 @@ class Alpha158Calculator:
                 change = close - close.shift(1)
                 negative = np.maximum(-change, 0)
                 abs_change = np.abs(change)
-                result[f'SUMN{d}'] = negative.rolling(window=d, min_periods=1).sum() / (
+                yield f'SUMN{d}', negative.rolling(window=d, min_periods=1).sum() / (
                     abs_change.rolling(window=d, min_periods=1).sum() + 1e-12
                 )
 
@@ -382,23 +484,23 @@ class Alpha158Calculator:
                 positive = np.maximum(change, 0)
                 negative = np.maximum(-change, 0)
                 abs_change = np.abs(change)
-                result[f'SUMD{d}'] = (positive - negative).rolling(window=d, min_periods=1).sum() / (
+                yield f'SUMD{d}', (positive - negative).rolling(window=d, min_periods=1).sum() / (
                     abs_change.rolling(window=d, min_periods=1).sum() + 1e-12
                 )
 
             # VMA: Volume Moving Average (成交量移動平均)
             if use('VMA'):
-                result[f'VMA{d}'] = volume.rolling(window=d, min_periods=1).mean() / (volume + 1e-12)
+                yield f'VMA{d}', volume.rolling(window=d, min_periods=1).mean() / (volume + 1e-12)
 
             # VSTD: Volume Standard Deviation (成交量標準差)
             if use('VSTD'):
-                result[f'VSTD{d}'] = volume.rolling(window=d, min_periods=1).std() / (volume + 1e-12)
+                yield f'VSTD{d}', volume.rolling(window=d, min_periods=1).std() / (volume + 1e-12)
 
             # WVMA: Weighted Volume Moving Average (加權成交量移動平均)
             if use('WVMA'):
                 price_change = np.abs(close / close.shift(1) - 1)
                 weighted = price_change * volume
-                result[f'WVMA{d}'] = weighted.rolling(window=d, min_periods=1).std() / (
+                yield f'WVMA{d}', weighted.rolling(window=d, min_periods=1).std() / (
                     weighted.rolling(window=d, min_periods=1).mean() + 1e-12
                 )
 
@@ -407,7 +509,7 @@ class Alpha158Calculator:
                 volume_change = volume - volume.shift(1)
                 positive = np.maximum(volume_change, 0)
                 abs_change = np.abs(volume_change)
-                result[f'VSUMP{d}'] = positive.rolling(window=d, min_periods=1).sum() / (
+                yield f'VSUMP{d}', positive.rolling(window=d, min_periods=1).sum() / (
                     abs_change.rolling(window=d, min_periods=1).sum() + 1e-12
                 )
 
@@ -416,7 +518,7 @@ class Alpha158Calculator:
                 volume_change = volume - volume.shift(1)
                 negative = np.maximum(-volume_change, 0)
                 abs_change = np.abs(volume_change)
-                result[f'VSUMN{d}'] = negative.rolling(window=d, min_periods=1).sum() / (
+                yield f'VSUMN{d}', negative.rolling(window=d, min_periods=1).sum() / (
                     abs_change.rolling(window=d, min_periods=1).sum() + 1e-12
                 )
 
@@ -426,18 +528,17 @@ class Alpha158Calculator:
                 positive = np.maximum(volume_change, 0)
                 negative = np.maximum(-volume_change, 0)
                 abs_change = np.abs(volume_change)
-                result[f'VSUMD{d}'] = (positive - negative).rolling(window=d, min_periods=1).sum() / (
+                yield f'VSUMD{d}', (positive - negative).rolling(window=d, min_periods=1).sum() / (
                     abs_change.rolling(window=d, min_periods=1).sum() + 1e-12
                 )
 
-        return result
-
     # ==================== 完整 Alpha158+ 計算（179 個因子） ====================
 
     def compute_all_factors(
         self,
         df: pd.DataFrame,
-        config: Dict = None
+        config: Dict = None,
+        backend: str = None
     ) -> Tuple[pd.DataFrame, List[str]]:
         """
         計算完整的 Alpha158+ 因子集（179 個因子）
@@ -449,17 +550,13 @@ class Alpha158Calculator:
                 - price: {windows: [...], feature: [...]} - Price 因子配置（20個）
                 - volume: {windows: [...]} - Volume 因子配置（5個）
                 - rolling: {windows: [...], include: [...], exclude: [...]} - Rolling 因子配置（145個）
+            backend: 滾動因子計算後端 'numpy' 或 'pandas'（None 使用實例預設）
 
         Returns:
             (result_df, factor_names): 包含所有因子的 DataFrame 和因子名稱列表
         """
         if config is None:
-            config = {
-                'kbar': {},
-                'price': {'windows': [0, 1, 2, 3, 4], 'feature': ['OPEN', 'HIGH', 'LOW', 'CLOSE']},
-                'volume': {'windows': [0, 1, 2, 3, 4]},
-                'rolling': {'windows': [5, 10, 20, 30, 60]}
-            }
+            config = DEFAULT_ALPHA158_CONFIG
 
         result = df.copy()
         factor_names = []
@@ -500,7 +597,8 @@ class Alpha158Calculator:
                 result,
                 windows=config['rolling'].get('windows', [5, 10, 20, 30, 60]),
                 include=config['rolling'].get('include', None),
-                exclude=config['rolling'].get('exclude', [])
+                exclude=config['rolling'].get('exclude', []),
+                backend=backend
             )
             # Rolling 因子名稱會根據配置動態生成
             # 這裡簡化處理，實際使用時可以從 result.columns 提取
@@ -510,5 +608,132 @@ class Alpha158Calculator:
         return result, factor_names
 
 
+    # ==================== Panel 模式（日期 × 標的） ====================
+
+    def _factor_items(self, fields: Dict, config: Dict, ops: Dict):
+        """依 compute_all_factors 的順序逐一產出所有因子 (名稱, 值)"""
+        open_p, high, low = fields['$open'], fields['$high'], fields['$low']
+        close, volume = fields['$close'], fields['$volume']
+
+        if 'kbar' in config:
+            yield from self._kbar_items(open_p, high, low, close)
+
+        if 'price' in config:
+            features = config['price'].get('feature', ['OPEN', 'HIGH', 'LOW', 'CLOSE'])
+            prices = {
+                feature: fields[f'${feature.lower()}']
+                for feature in features
+                if f'${feature.lower()}' in fields
+            }
+            yield from self._price_items(prices, close, config['price'].get('windows', [0, 1, 2, 3, 4]))
+
+        if 'volume' in config:
+            yield from self._volume_items(volume, config['volume'].get('windows', [0, 1, 2, 3, 4]))
+
+        if 'rolling' in config:
+            include = config['rolling'].get('include', None)
+            exclude = config['rolling'].get('exclude', [])
+
+            def use(name):
+                return name not in exclude and (include is None or name in include)
+
+            yield from self._rolling_items(
+                close, high, low, volume,
+                config['rolling'].get('windows', [5, 10, 20, 30, 60]),
+                use, ops
+            )
+
+    def compute_panel_factors(
+        self,
+        fields: Dict[str, np.ndarray],
+        config: Dict = None,
+        backend: str = None,
+        dates: Optional[pd.Index] = None,
+        instruments: Optional[pd.Index] = None,
+        chunk_size: int = 500
+    ) -> Alpha158Panel:
+        """
+        一次計算全市場的 Alpha158+ 因子
+
+        每個 OHLCV 欄位為 (日期, 標的) 的 2-D 陣列，所有滾動運算沿日期軸對全部標的同時執行；
+        公式與 compute_all_factors 共用，每個標的的結果與單獨計算一致。
+        缺值（NaN，例如上市前或停牌）視為窗口內的缺失觀測，與 Qlib 表達式引擎相同。
+
+        Args:
+            fields: {'$open', '$high', '$low', '$close', '$volume'（選填 '$vwap'）: 2-D 陣列}
+            config: 因子配置（同 compute_all_factors）
+            backend: 滾動因子計算後端 'numpy' 或 'pandas'（None 使用實例預設）
+            dates: 日期索引（選填，供 to_frame 使用）
+            instruments: 標的索引（選填，供 to_frame 使用）
+            chunk_size: 每批計算的標的數量（控制 float64 中間結果的記憶體）
+
+        Returns:
+            Alpha158Panel: (日期, 標的, 因子) float32 因子立方體
+
+        Raises:
+            ValueError: 缺少必要欄位或陣列形狀不一致
+        """
+        if config is None:
+            config = DEFAULT_ALPHA158_CONFIG
+
+        missing = [name for name in PANEL_FIELDS if name not in fields]
+        if missing:
+            raise ValueError(f"Panel fields missing: {missing}")
+
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in fields.items()}
+        shape = arrays['$close'].shape
+        if len(shape) != 2 or any(values.shape != shape for values in arrays.values()):
+            raise ValueError(f"Panel fields must be 2-D arrays with identical shape, got "
+                             f"{ {name: values.shape for name, values in arrays.items()} }")
+
+        n_dates, n_instruments = shape
+        ops = self._rolling_operators(backend or self.backend)
+
+        # 以 1×1 的假資料取得因子名稱與順序（生成器為惰性計算，成本可忽略）
+        probe = {name: pd.DataFrame(np.ones((1, 1))) for name in arrays}
+        factor_names = [name for name, _ in self._factor_items(probe, config, ops)]
+
+        logger.info(
+            f"Computing {len(factor_names)} Alpha158+ factors for panel "
+            f"{n_dates} dates × {n_instruments} instruments"
+        )
+
+        cube = np.empty((n_dates, n_instruments, len(factor_names)), dtype=np.float32)
+        for lo in range(0, n_instruments, chunk_size):
+            hi = min(lo + chunk_size, n_instruments)
+            frames = {name: pd.DataFrame(values[:, lo:hi]) for name, values in arrays.items()}
+            for position, (_, values) in enumerate(self._factor_items(frames, config, ops)):
+                cube[:, lo:hi, position] = values.to_numpy(dtype=np.float32)
+
+        return Alpha158Panel(
+            values=cube,
+            factor_names=factor_names,
+            dates=dates,
+            instruments=instruments,
+        )
+
+    @staticmethod
+    def panel_fields_from_frame(
+        df: pd.DataFrame
+    ) -> Tuple[Dict[str, np.ndarray], pd.Index, pd.Index]:
+        """
+        將 Qlib 長格式 DataFrame（index 含 datetime、instrument 兩層）轉為 Panel 欄位
+
+        Returns:
+            (fields, dates, instruments): 每個欄位為 (日期, 標的) 陣列，缺少的組合為 NaN
+        """
+        if not isinstance(df.index, pd.MultiIndex) or not {'datetime', 'instrument'} <= set(df.index.names):
+            raise ValueError("DataFrame index must have 'datetime' and 'instrument' levels")
+
+        wide = df.unstack('instrument').sort_index()
+        dates = wide.index
+        instruments = wide.columns.get_level_values('instrument').unique()
+        fields = {
+            column: wide[column].reindex(columns=instruments).to_numpy(dtype=np.float64)
+            for column in df.columns
+        }
+        return fields, dates, instruments
+
+
 # 全局實例
 alpha158_calculator = Alpha158Calculator()
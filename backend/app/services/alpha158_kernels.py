@@ -0,0 +1,203 @@
+"""
+Alpha158 滾動窗口計算核心（NumPy）
+
+取代 Alpha158Calculator 以 rolling().apply 逐窗口呼叫 Python 函數的實作：
+- slope / rsquare / resi：以滾動和求線性回歸閉式解（前綴和相減為 O(n)，2-D 輸入一次處理所有標的，
+  並分段、段內去均值以控制數值誤差）
+- rank / idx_max / idx_min：sliding_window_view 一次比較所有窗口（C 迴圈，無 Python 回呼）
+
+輸入為 1-D（時間）或 2-D（時間 × 標的）陣列，輸出 float64 陣列，語意與原實作一致：
+- 前 N-1 筆使用可用的部分窗口
+- 回歸類：窗口長度 < 2 或窗口內含 NaN 時為 NaN
+- rank / idx_max / idx_min：窗口內全為 NaN 時為 NaN
+"""
+
+from typing import Callable, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# sliding_window_view 每批處理的元素上限（控制 2-D 輸入的暫存記憶體）
+_WINDOW_CHUNK_ELEMENTS = 8_000_000
+
+# 回歸類滾動和的分段長度（限制 t·y 的量級以控制相消誤差）
+_REGRESSION_BLOCK = 256
+
+
+def _as_2d(values) -> Tuple[np.ndarray, bool]:
+    """轉為 (時間, 標的) 的 float64 陣列，並回傳是否為 1-D 輸入"""
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[:, None], True
+    return arr, False
+
+
+def _restore(result: np.ndarray, squeeze: bool) -> np.ndarray:
+    return result[:, 0] if squeeze else result
+
+
+def _window_sums(arr: np.ndarray, window: int) -> np.ndarray:
+    """沿時間軸的滾動和（部分窗口使用可用資料）：前綴和相減，所有標的一次算完"""
+    prefix = np.zeros((arr.shape[0] + 1,) + arr.shape[1:], dtype=arr.dtype)
+    np.cumsum(arr, axis=0, out=prefix[1:])
+    sums = prefix[1:].copy()
+    sums[window:] -= prefix[1:-window]
+    return sums
+
+
+def _regression_terms(values, window: int):
+    """
+    計算每個窗口的回歸統計量
+
+    x 為窗口內位置 0..m-1，m = min(t + 1, window)。
+    前綴和相減的相消誤差與 t、y 的量級成正比，因此按時間分段（每段前方重疊 window-1 筆）
+    計算：段內 t 從 0 起算，y 減去段內均值（回歸係數與殘差對 y 平移不變）。
+    NaN 數量與常數窗口以整數前綴和精確判斷。
+    """
+    y, squeeze = _as_2d(values)
+    n = y.shape[0]
+
+    yc = np.empty_like(y)
+    sum_y = np.empty_like(y)
+    sxy = np.empty_like(y)
+    syy = np.empty_like(y)
+    invalid = np.empty(y.shape, dtype=bool)
+    constant = np.empty(y.shape, dtype=bool)
+
+    t_global = np.arange(n, dtype=np.float64)[:, None]
+    m = np.minimum(t_global + 1, window)
+    x_mean = (m - 1) / 2
+    sxx = m * (m * m - 1) / 12
+
+    for lo in range(0, n, _REGRESSION_BLOCK):
+        hi = min(lo + _REGRESSION_BLOCK, n)
+        ext = max(0, lo - window + 1)
+        block = y[ext:hi]
+
+        missing = np.isnan(block)
+        counts = (~missing).sum(axis=0)
+        # 以循序累加求段內總和，1-D 與 2-D 輸入的加總順序一致（結果逐欄相同）
+        sums = np.cumsum(np.where(missing, 0.0, block), axis=0)[-1]
+        center = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        block_c = np.where(missing, 0.0, block - center)
+
+        t = np.arange(hi - ext, dtype=np.float64)[:, None]
+        block_m = m[ext:hi]
+        start = t - block_m + 1
+
+        block_sum_y = _window_sums(block_c, window)
+        block_sum_ty = _window_sums(t * block_c, window)
+        block_sum_yy = _window_sums(block_c * block_c, window)
+        block_nan = _window_sums(missing.astype(np.int64), window)
+        # 窗口內 m-1 個相鄰對皆無變動 ⇔ 常數窗口（避免前綴和殘差使 R² 失真）
+        changed = np.zeros(block.shape, dtype=np.int64)
+        changed[1:] = block[1:] != block[:-1]
+        block_changes = _window_sums(changed, max(window - 1, 1))
+
+        keep = slice(lo - ext, None)
+        yc[lo:hi] = block_c[keep]
+        sum_y[lo:hi] = block_sum_y[keep]
+        # Σ(x - x̄)(y - ȳ) = Σ x·y - x̄·Σy，其中 Σ x·y = Σ t·y - start·Σy
+        sxy[lo:hi] = (block_sum_ty - start * block_sum_y - x_mean[ext:hi] * block_sum_y)[keep]
+        syy[lo:hi] = (block_sum_yy - block_sum_y * block_sum_y / block_m)[keep]
+        invalid[lo:hi] = (block_nan > 0)[keep]
+        constant[lo:hi] = (block_changes == 0)[keep]
+
+    invalid |= m < 2
+    syy[constant] = 0.0
+    return yc, m, sum_y, sxx, sxy, syy, invalid, squeeze
+
+
+def rolling_slope(values, window: int) -> np.ndarray:
+    """Slope(x, N)：N 期線性回歸斜率"""
+    _, _, _, sxx, sxy, _, invalid, squeeze = _regression_terms(values, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+    slope[np.broadcast_to(invalid, slope.shape)] = np.nan
+    return _restore(slope, squeeze)
+
+
+def rolling_rsquare(values, window: int) -> np.ndarray:
+    """Rsquare(x, N)：N 期線性回歸 R²（常數窗口為 0）"""
+    _, _, _, sxx, sxy, syy, invalid, squeeze = _regression_terms(values, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsquare = np.where(syy > 0, sxy * sxy / (sxx * syy), 0.0)
+    rsquare[np.broadcast_to(invalid, rsquare.shape)] = np.nan
+    return _restore(rsquare, squeeze)
+
+
+def rolling_resi(values, window: int) -> np.ndarray:
+    """Resi(x, N)：N 期線性回歸在最後一期的殘差"""
+    yc, m, sum_y, sxx, sxy, _, invalid, squeeze = _regression_terms(values, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+        # y_t - (slope·(m-1) + ȳ - slope·x̄) = (y_t - ȳ) - slope·(m-1)/2
+        resi = yc - sum_y / m - slope * (m - 1) / 2
+    resi[np.broadcast_to(invalid, resi.shape)] = np.nan
+    return _restore(resi, squeeze)
+
+
+def _window_reduce(
+    values,
+    window: int,
+    pad_value: float,
+    reducer: Callable[[np.ndarray, np.ndarray], np.ndarray]
+) -> np.ndarray:
+    """
+    對每個 (t, 標的) 的窗口套用向量化 reducer
+
+    前方補 window-1 個 pad_value 使部分窗口等長；
+    reducer(windows, current) 收到 (t, 標的, window) 的窗口與 (t, 標的) 的當期值。
+    """
+    y, squeeze = _as_2d(values)
+    n, k = y.shape
+    result = np.full((n, k), np.nan)
+    if n == 0:
+        return _restore(result, squeeze)
+
+    padded = np.concatenate([np.full((window - 1, k), pad_value), y], axis=0)
+    step = max(1, _WINDOW_CHUNK_ELEMENTS // max(n * window, 1))
+    for lo in range(0, k, step):
+        hi = min(lo + step, k)
+        windows = sliding_window_view(padded[:, lo:hi], window, axis=0)
+        result[:, lo:hi] = reducer(windows, y[:, lo:hi])
+
+    return _restore(result, squeeze)
+
+
+def rolling_rank(values, window: int) -> np.ndarray:
+    """Rank(x, N)：當期值在 N 期窗口內的百分位排名（平均名次，忽略 NaN）"""
+    def reducer(windows, current):
+        current = current[..., None]
+        less = (windows < current).sum(axis=-1)
+        equal = (windows == current).sum(axis=-1)
+        valid = (~np.isnan(windows)).sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = (less + (equal + 1) / 2) / valid
+        return np.where(np.isnan(current[..., 0]), np.nan, pct)
+
+    return _window_reduce(values, window, np.nan, reducer)
+
+
+def _rolling_arg_distance(values, window: int, pad_value: float, argfunc) -> np.ndarray:
+    def reducer(windows, current):
+        distance = (window - 1 - argfunc(windows, axis=-1)).astype(np.float64)
+        # 補值不會被選中；全為 NaN 的窗口（含補值）沒有有效觀測
+        all_missing = np.isnan(windows).sum(axis=-1) == np.minimum(
+            np.arange(1, windows.shape[0] + 1), window
+        )[:, None]
+        distance[all_missing] = np.nan
+        return distance
+
+    return _window_reduce(values, window, pad_value, reducer)
+
+
+def rolling_idx_max(values, window: int) -> np.ndarray:
+    """IdxMax(x, N)：N 期窗口內最大值距今的期數（同值取最早者）"""
+    return _rolling_arg_distance(values, window, -np.inf, np.argmax)
+
+
+def rolling_idx_min(values, window: int) -> np.ndarray:
+    """IdxMin(x, N)：N 期窗口內最小值距今的期數（同值取最早者）"""
+    return _rolling_arg_distance(values, window, np.inf, np.argmin)
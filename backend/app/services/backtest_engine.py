@@ -9,6 +9,7 @@ Backtrader 回測引擎核心
 """
 
 import backtrader as bt
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta, timezone, date
 from typing import Dict, List, Optional, Any, Tuple
@@ -159,6 +160,7 @@ class TrackingStrategy(bt.Strategy):
 
             # 記錄交易詳情
             trade_record = {
+                'symbol': data_name,
                 'entry_date': position_info.get('entry_date', bt.num2date(trade.dtopen)),
                 'exit_date': bt.num2date(trade.dtclose),
                 'entry_price': position_info.get('entry_price', trade.price),
@@ -447,18 +449,15 @@ class BacktestEngine:
                 )
                 return None
 
-            # 查詢調整後的日期範圍內的數據
-            prices = StockPriceRepository.get_by_stock(
+            # 查詢調整後的日期範圍內的數據（欄位陣列，不建立 ORM 物件）
+            columns = StockPriceRepository.get_ohlcv_columns(
                 self.db,
                 stock_id,
                 start_date=start_date,
-                end_date=end_date,
-                skip=0,
-                limit=999999,  # 回測需要所有數據
-                ascending=True  # 回測需要按時間順序
+                end_date=end_date
             )
 
-            if not prices:
+            if len(columns['date']) == 0:
                 logger.warning(f"No data found for {stock_id} in adjusted range {start_date} to {end_date}")
                 return None
 
@@ -470,19 +469,7 @@ class BacktestEngine:
                 )
 
             # 轉換為 DataFrame
-            data = []
-            for price in prices:
-                data.append({
-                    'date': pd.Timestamp(price.date),
-                    'open': float(price.open),
-                    'high': float(price.high),
-                    'low': float(price.low),
-                    'close': float(price.close),
-                    'volume': int(price.volume),
-                })
-
-            df = pd.DataFrame(data)
-            df.set_index('date', inplace=True)
+            df = self._columns_to_frame(columns, 'date')
 
             logger.info(f"Loaded {len(df)} records for {stock_id}")
             return df
@@ -525,16 +512,15 @@ class BacktestEngine:
             )
 
             # 總是查詢 1 分鐘資料（數據庫中只存儲 1 分鐘原始數據）
-            prices = StockMinutePriceRepository.get_by_stock(
+            columns = StockMinutePriceRepository.get_ohlcv_columns(
                 self.db,
                 stock_id,
                 start_datetime,
                 end_datetime,
-                '1min',  # 總是查詢 1 分鐘資料
                 limit
             )
 
-            if not prices:
+            if len(columns['datetime']) == 0:
                 logger.warning(
                     f"No minute data found for {stock_id} "
                     f"(1min, {start_datetime} to {end_datetime})"
@@ -542,19 +528,7 @@ class BacktestEngine:
                 return None
 
             # 轉換為 DataFrame
-            data = []
-            for price in prices:
-                data.append({
-                    'datetime': pd.Timestamp(price.datetime),
-                    'open': float(price.open),
-                    'high': float(price.high),
-                    'low': float(price.low),
-                    'close': float(price.close),
-                    'volume': int(price.volume),
-                })
-
-            df = pd.DataFrame(data)
-            df.set_index('datetime', inplace=True)
+            df = self._columns_to_frame(columns, 'datetime')
 
             logger.info(
                 f"Loaded {len(df)} 1-minute bars for {stock_id}"
@@ -573,6 +547,120 @@ class BacktestEngine:
             logger.error(f"Error loading minute data for {stock_id}: {str(e)}")
             return None
 
+    def load_universe_data(
+        self,
+        stock_ids: List[str],
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        以單次批次查詢載入多檔股票日線 OHLCV，並對齊共同交易日曆
+
+        各股票從自身第一筆資料開始對齊到共同日曆；停牌等缺漏日以前一收盤價
+        補齊 OHLC、成交量補 0，讓 Backtrader 多資料饋送的時間軸一致。
+
+        Args:
+            stock_ids: 股票代碼清單
+            start_date: 開始日期
+            end_date: 結束日期
+
+        Returns:
+            {stock_id: OHLCV DataFrame}（依 stock_ids 順序，無資料的股票不包含在內）
+        """
+        if isinstance(start_date, str):
+            start_date = date.fromisoformat(start_date)
+        elif isinstance(start_date, datetime):
+            start_date = start_date.date()
+
+        if isinstance(end_date, str):
+            end_date = date.fromisoformat(end_date)
+        elif isinstance(end_date, datetime):
+            end_date = end_date.date()
+
+        columns = StockPriceRepository.get_ohlcv_columns_multi(
+            self.db,
+            stock_ids,
+            start_date=start_date,
+            end_date=end_date
+        )
+
+        ids = columns['stock_id']
+        if len(ids) == 0:
+            logger.warning(f"No data found for universe of {len(stock_ids)} symbols")
+            return {}
+
+        # 共同交易日曆：所有股票交易日的聯集
+        calendar = pd.DatetimeIndex(np.unique(columns['date']), name='date')
+
+        # 查詢結果依 (stock_id, date) 排序，每檔股票是一段連續切片
+        boundaries = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(ids)]))
+
+        loaded = {}
+        for begin, finish in zip(starts, ends):
+            frame = self._columns_to_frame(
+                {name: values[begin:finish] for name, values in columns.items()},
+                'date'
+            )
+            loaded[str(ids[begin])] = self._align_to_calendar(frame, calendar)
+
+        missing = [stock_id for stock_id in stock_ids if stock_id not in loaded]
+        if missing:
+            logger.warning(f"No data for {len(missing)} symbols, skipped: {missing[:10]}")
+
+        logger.info(
+            f"Loaded {len(ids)} records for {len(loaded)} symbols "
+            f"on a {len(calendar)}-day calendar"
+        )
+        return {stock_id: loaded[stock_id] for stock_id in stock_ids if stock_id in loaded}
+
+    @staticmethod
+    def _align_to_calendar(df: pd.DataFrame, calendar: pd.DatetimeIndex) -> pd.DataFrame:
+        """
+        將單一股票 OHLCV 對齊到共同交易日曆（從該股票第一筆資料開始）
+
+        Args:
+            df: 單一股票 OHLCV（index 為日期）
+            calendar: 共同交易日曆
+
+        Returns:
+            對齊後的 DataFrame
+        """
+        aligned = df.reindex(calendar[calendar >= df.index[0]])
+
+        close = aligned['close'].ffill()
+        aligned['close'] = close
+        for field in ('open', 'high', 'low'):
+            aligned[field] = aligned[field].fillna(close)
+        aligned['volume'] = aligned['volume'].fillna(0).astype(np.int64)
+
+        return aligned
+
+    @staticmethod
+    def _columns_to_frame(columns: Dict[str, np.ndarray], index_name: str) -> pd.DataFrame:
+        """
+        將 Repository 回傳的欄位陣列組成 OHLCV DataFrame
+
+        Args:
+            columns: {index_name, 'open', 'high', 'low', 'close', 'volume'} 陣列
+            index_name: 時間欄位名稱（'date' 或 'datetime'）
+
+        Returns:
+            以時間為 index 的 DataFrame（價格 float64、成交量 int64）
+        """
+        df = pd.DataFrame(
+            {
+                'open': columns['open'].astype(np.float64, copy=False),
+                'high': columns['high'].astype(np.float64, copy=False),
+                'low': columns['low'].astype(np.float64, copy=False),
+                'close': columns['close'].astype(np.float64, copy=False),
+                'volume': columns['volume'].astype(np.int64, copy=False),
+            },
+            index=pd.DatetimeIndex(columns[index_name], name=index_name),
+        )
+        return df
+
     def _resample_ohlcv(self, df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
         """
         將 OHLCV 資料重採樣到指定時間粒度
@@ -852,12 +940,170 @@ class BacktestEngine:
         # 2. 創建策略類
         strategy_class = self.create_strategy_class(strategy_code)
 
+        # 3-10. 設定 Cerebro
+        start_value = self._configure_cerebro(
+            strategy_class=strategy_class,
+            feeds={stock_id: data_df},
+            initial_cash=initial_cash,
+            commission=commission,
+            slippage=slippage,
+            strategy_params=strategy_params,
+            commission_info=self._get_commission_info(stock_id),
+        )
+
+        # 11. 執行回測
+        try:
+            results = self.cerebro.run()
+            strategy_instance = results[0]
+        except Exception as e:
+            logger.error(f"Backtest execution failed: {str(e)}")
+            safe_message = get_safe_error_message(e, "回測執行")
+            raise ValueError(safe_message)
+
+        # 12. 記錄最終資金
+        final_value = self.cerebro.broker.getvalue()
+        logger.info(f"Final Portfolio Value: {final_value:.2f}")
+
+        # 13-15. 提取交易記錄、每日淨值並計算績效指標
+        results = self._assemble_results(
+            strategy_instance=strategy_instance,
+            initial_cash=initial_cash,
+            start_value=start_value,
+            final_value=final_value,
+            start_date=start_date,
+            end_date=end_date,
+        )
+
+        logger.info(f"Backtest completed. Total Return: {results['metrics']['total_return']}%")
+
+        return results
+
+    def run_portfolio_backtest(
+        self,
+        backtest_id: int,
+        strategy_code: str,
+        stock_ids: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        initial_cash: float = 1000000.0,
+        commission: float = 0.001425,
+        tax: float = 0.003,
+        slippage: float = 0.0,
+        position_size: Optional[int] = None,
+        max_position_pct: float = 1.0,
+        strategy_params: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """
+        執行多標的投組回測（日線）
+
+        一次批次查詢載入整個股票池、對齊共同交易日曆後，
+        全部加入同一個 Cerebro 執行，共用現金與持倉。
+        策略可透過 self.datas / self.getdatabyname(stock_id) 存取各標的。
+
+        Args:
+            backtest_id: 回測 ID
+            strategy_code: 策略代碼
+            stock_ids: 股票代碼清單
+            start_date: 開始日期
+            end_date: 結束日期
+            其餘參數同 run_backtest
+
+        Returns:
+            回測結果字典（投組層級指標，detailed_results 另含 symbol_attribution）
+        """
+        logger.info(f"Starting portfolio backtest {backtest_id} for {len(stock_ids)} symbols")
+
+        # 1. 批次載入並對齊資料
+        feeds = self.load_universe_data(stock_ids, start_date, end_date)
+
+        if not feeds:
+            raise ValueError(
+                f"No data available for universe ({len(stock_ids)} symbols, "
+                f"{start_date} to {end_date})"
+            )
+
+        # 2. 創建策略類
+        strategy_class = self.create_strategy_class(strategy_code)
+
+        # 3-10. 設定 Cerebro（所有標的共用同一個 broker）
+        start_value = self._configure_cerebro(
+            strategy_class=strategy_class,
+            feeds=feeds,
+            initial_cash=initial_cash,
+            commission=commission,
+            slippage=slippage,
+            strategy_params=strategy_params,
+            commission_info=None,
+        )
+
+        # 11. 執行回測
+        try:
+            results = self.cerebro.run()
+            strategy_instance = results[0]
+        except Exception as e:
+            logger.error(f"Backtest execution failed: {str(e)}")
+            safe_message = get_safe_error_message(e, "回測執行")
+            raise ValueError(safe_message)
+
+        # 12. 記錄最終資金
+        final_value = self.cerebro.broker.getvalue()
+        logger.info(f"Final Portfolio Value: {final_value:.2f}")
+
+        # 13-15. 投組層級結果
+        results = self._assemble_results(
+            strategy_instance=strategy_instance,
+            initial_cash=initial_cash,
+            start_value=start_value,
+            final_value=final_value,
+            start_date=start_date,
+            end_date=end_date,
+        )
+
+        # 16. 各標的績效歸因
+        attribution = self._calculate_symbol_attribution(strategy_instance, results['trades'])
+        if results['detailed_results'] is not None:
+            results['detailed_results']['symbol_attribution'] = attribution
+        results['symbols'] = list(feeds.keys())
+
+        logger.info(
+            f"Portfolio backtest completed. Symbols: {len(feeds)}, "
+            f"Total Return: {results['metrics']['total_return']}%"
+        )
+
+        return results
+
+    def _configure_cerebro(
+        self,
+        strategy_class: type,
+        feeds: Dict[str, pd.DataFrame],
+        initial_cash: float,
+        commission: float,
+        slippage: float,
+        strategy_params: Optional[Dict],
+        commission_info: Optional[bt.CommInfoBase]
+    ) -> float:
+        """
+        設定 Cerebro（資料、策略、資金、交易成本、分析器）
+
+        Args:
+            strategy_class: 策略類
+            feeds: {資料名稱: OHLCV DataFrame}，依序加入 Cerebro
+            initial_cash: 初始資金
+            commission: 股票手續費率（commission_info 為 None 時使用）
+            slippage: 滑點率
+            strategy_params: 策略參數
+            commission_info: 期貨交易成本配置（None 表示股票百分比手續費）
+
+        Returns:
+            初始資產
+        """
         # 3. 初始化 Cerebro
         self.cerebro = bt.Cerebro()
 
         # 4. 添加資料饋送
-        data_feed = DatabaseDataFeed(dataname=data_df)
-        self.cerebro.adddata(data_feed)
+        for name, data_df in feeds.items():
+            data_feed = DatabaseDataFeed(dataname=data_df)
+            self.cerebro.adddata(data_feed, name=name)
 
         # 5. 添加策略
         if strategy_params:
@@ -869,12 +1115,10 @@ class BacktestEngine:
         self.cerebro.broker.setcash(initial_cash)
 
         # 7. 設定交易成本（根據標的類型）
-        commission_info = self._get_commission_info(stock_id)
-
         if commission_info:
             # 期货：使用自定义 CommissionInfo（固定手续费 + 保证金）
             self.cerebro.broker.addcommissioninfo(commission_info)
-            logger.info(f"✅ 使用期货交易成本配置: {stock_id}")
+            logger.info(f"✅ 使用期货交易成本配置: {', '.join(feeds)}")
         else:
             # 股票：使用百分比手续费
             # Backtrader 的 commission 參數會同時應用於買入和賣出
@@ -883,7 +1127,7 @@ class BacktestEngine:
             # 注意：Backtrader 不直接支援單向稅率，這裡簡化為總成本
             # 實際應用中可以通過自定義 CommissionInfo 類別來實現
             self.cerebro.broker.setcommission(commission=total_commission)
-            logger.info(f"✅ 使用股票交易成本配置: {stock_id} (手续费: {commission*100}%)")
+            logger.info(f"✅ 使用股票交易成本配置: {len(feeds)} 檔 (手续费: {commission*100}%)")
 
         # 8. 設定滑點（如果有）
         if slippage > 0:
@@ -901,19 +1145,23 @@ class BacktestEngine:
         start_value = self.cerebro.broker.getvalue()
         logger.info(f"Starting Portfolio Value: {start_value:.2f}")
 
-        # 11. 執行回測
-        try:
-            results = self.cerebro.run()
-            strategy_instance = results[0]
-        except Exception as e:
-            logger.error(f"Backtest execution failed: {str(e)}")
-            safe_message = get_safe_error_message(e, "回測執行")
-            raise ValueError(safe_message)
+        return start_value
 
-        # 12. 記錄最終資金
-        final_value = self.cerebro.broker.getvalue()
-        logger.info(f"Final Portfolio Value: {final_value:.2f}")
+    def _assemble_results(
+        self,
+        strategy_instance,
+        initial_cash: float,
+        start_value: float,
+        final_value: float,
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[str, Any]:
+        """
+        從策略實例提取交易、淨值並計算績效指標
 
+        Returns:
+            回測結果字典（metrics, trades, initial_cash, final_value, detailed_results）
+        """
         # 13. 提取交易記錄
         trades = self._extract_trades(strategy_instance)
 
@@ -949,8 +1197,6 @@ class BacktestEngine:
             initial_cash=initial_cash
         )
 
-        logger.info(f"Backtest completed. Total Return: {metrics['total_return']}%")
-
         return {
             "metrics": metrics,
             "trades": trades,
@@ -959,6 +1205,57 @@ class BacktestEngine:
             "detailed_results": detailed_results,  # 新增詳細結果
         }
 
+    def _calculate_symbol_attribution(self, strategy_instance, trades: List[Dict]) -> List[Dict]:
+        """
+        計算投組回測中各標的的績效歸因
+
+        已實現損益來自已平倉交易；未實現損益來自回測結束時的持倉。
+
+        Returns:
+            [{'symbol', 'trades', 'winning_trades', 'realized_pnl', 'realized_pnl_net',
+              'position_size', 'market_value', 'unrealized_pnl', 'total_pnl'}, ...]
+            依 total_pnl 由高到低排序
+        """
+        stats = defaultdict(lambda: {
+            'trades': 0,
+            'winning_trades': 0,
+            'realized_pnl': 0.0,
+            'realized_pnl_net': 0.0,
+        })
+
+        for trade in trades:
+            symbol = trade.get('symbol')
+            if not symbol:
+                continue
+            record = stats[symbol]
+            record['trades'] += 1
+            record['winning_trades'] += 1 if trade.get('pnl', 0) > 0 else 0
+            record['realized_pnl'] += float(trade.get('pnl', 0))
+            record['realized_pnl_net'] += float(trade.get('pnl_net', trade.get('pnl', 0)))
+
+        attribution = []
+        for data in strategy_instance.datas:
+            symbol = data._name
+            position = strategy_instance.getposition(data)
+            last_close = float(data.close[0]) if len(data) else 0.0
+            unrealized = float(position.size) * (last_close - float(position.price)) if position.size else 0.0
+            record = stats[symbol]
+
+            attribution.append({
+                'symbol': symbol,
+                'trades': record['trades'],
+                'winning_trades': record['winning_trades'],
+                'realized_pnl': round(record['realized_pnl'], 2),
+                'realized_pnl_net': round(record['realized_pnl_net'], 2),
+                'position_size': float(position.size),
+                'market_value': round(float(position.size) * last_close, 2),
+                'unrealized_pnl': round(unrealized, 2),
+                'total_pnl': round(record['realized_pnl_net'] + unrealized, 2),
+            })
+
+        attribution.sort(key=lambda item: item['total_pnl'], reverse=True)
+        return attribution
+
     def _extract_trades(self, strategy_instance) -> List[Dict]:
         """
         從策略實例提取交易記錄
@@ -1403,10 +1700,13 @@ class BacktestEngine:
                     buy_commission = commission / 2
                     sell_commission = commission / 2
 
+                    # 投組回測的交易記錄帶有各自的標的代碼
+                    trade_stock_id = trade_data.get('symbol') or stock_id
+
                     # 創建 BUY 記錄
                     buy_trade = Trade(
                         backtest_id=backtest_id,
-                        stock_id=stock_id,
+                        stock_id=trade_stock_id,
                         date=entry_date,
                         action=TradeAction.BUY,
                         quantity=size,
@@ -1421,7 +1721,7 @@ class BacktestEngine:
                     # 創建 SELL 記錄
                     sell_trade = Trade(
                         backtest_id=backtest_id,
-                        stock_id=stock_id,
+                        stock_id=trade_stock_id,
                         date=exit_date,
                         action=TradeAction.SELL,
                         quantity=size,
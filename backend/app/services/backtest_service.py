@@ -2,14 +2,15 @@
 Backtest service for business logic
 """
 
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict, Any, Union
 from datetime import date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func, text
 from fastapi import HTTPException, status
 from loguru import logger
 from app.models.backtest import Backtest, BacktestStatus
-from app.schemas.backtest import BacktestCreate, BacktestUpdate
+from app.schemas.backtest import BacktestCreate, BacktestUpdate, BacktestSweepRequest
 from app.repositories.backtest import BacktestRepository
 from app.repositories.strategy import StrategyRepository
 from app.core.config import settings
@@ -18,7 +19,11 @@ from app.core.config import settings
 class BacktestService:
     """Service for backtest-related business logic"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Union[Session, AsyncSession]):
+        """
+        Args:
+            db: Database session（*_async 方法需傳入 AsyncSession）
+        """
         self.db = db
         self.repo = BacktestRepository()
         self.strategy_repo = StrategyRepository()
@@ -83,6 +88,42 @@ class BacktestService:
 
         return backtest
 
+    async def get_backtest_with_result_async(
+        self,
+        backtest_id: int,
+        user_id: int,
+        with_trades: bool = False
+    ) -> Backtest:
+        """
+        Get backtest by ID with result preloaded (requires an AsyncSession)
+
+        擁有者直接比對已載入的 user_id，不另外查詢 is_owner。
+
+        Args:
+            backtest_id: Backtest ID
+            user_id: User ID (for ownership verification)
+            with_trades: Also preload trades
+
+        Raises:
+            HTTPException: If backtest not found or user is not owner
+        """
+        backtest = await self.repo.get_by_id_with_result_async(
+            self.db, backtest_id, with_trades=with_trades
+        )
+        if not backtest:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Backtest not found",
+            )
+
+        if backtest.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to access this backtest",
+            )
+
+        return backtest
+
     def get_user_backtests(
         self,
         user_id: int,
@@ -232,27 +273,102 @@ class BacktestService:
                 detail="Initial capital must be greater than 0",
             )
 
-        # Smart date adjustment: adjust dates to available data range
-        adjusted_start, adjusted_end, adjustment_msg = self._adjust_dates_to_available_data(
-            symbol=backtest_create.symbol,
-            timeframe=backtest_create.timeframe,
-            requested_start=backtest_create.start_date,
-            requested_end=backtest_create.end_date
-        )
+        # Determine engine type: use request override or inherit from strategy
+        engine_type = backtest_create.engine_type or strategy.engine_type
 
-        # Update backtest dates with adjusted values
-        backtest_create.start_date = adjusted_start
-        backtest_create.end_date = adjusted_end
+        if backtest_create.universe:
+            # Portfolio backtests run one daily Backtrader pass over the whole universe;
+            # each symbol is aligned to its own data range by the engine
+            if engine_type != 'backtrader' or backtest_create.timeframe != '1day':
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Universe backtests require the backtrader engine and 1day timeframe",
+                )
+        else:
+            # Smart date adjustment: adjust dates to available data range
+            adjusted_start, adjusted_end, adjustment_msg = self._adjust_dates_to_available_data(
+                symbol=backtest_create.symbol,
+                timeframe=backtest_create.timeframe,
+                requested_start=backtest_create.start_date,
+                requested_end=backtest_create.end_date
+            )
 
-        # Log adjustment if dates were changed
-        if adjustment_msg:
-            logger.info(f"📅 Date adjustment for backtest: {adjustment_msg}")
+            # Update backtest dates with adjusted values
+            backtest_create.start_date = adjusted_start
+            backtest_create.end_date = adjusted_end
 
-        # Determine engine type: use request override or inherit from strategy
-        engine_type = backtest_create.engine_type or strategy.engine_type
+            # Log adjustment if dates were changed
+            if adjustment_msg:
+                logger.info(f"📅 Date adjustment for backtest: {adjustment_msg}")
 
         return self.repo.create(self.db, user_id, backtest_create, engine_type=engine_type)
 
+    def prepare_sweep(self, sweep_request: BacktestSweepRequest, user_id: int) -> Dict[str, Any]:
+        """
+        Validate a parameter sweep request and expand its parameter combinations
+
+        Args:
+            sweep_request: Sweep request data
+            user_id: User ID
+
+        Returns:
+            Sweep config for the run_backtest_sweep task (includes expanded combos)
+
+        Raises:
+            HTTPException: If strategy not found, user is not owner, or the grid is invalid
+        """
+        from app.services.backtest_sweep import expand_parameter_grid
+
+        strategy = self.strategy_repo.get_by_id(self.db, sweep_request.strategy_id)
+        if not strategy:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Strategy not found",
+            )
+
+        if not self.strategy_repo.is_owner(self.db, sweep_request.strategy_id, user_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to run sweeps for this strategy",
+            )
+
+        if strategy.engine_type == 'qlib':
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Parameter sweeps require a backtrader strategy",
+            )
+
+        if sweep_request.start_date >= sweep_request.end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="End date must be after start date",
+            )
+
+        try:
+            combos = expand_parameter_grid(
+                sweep_request.param_grid,
+                search=sweep_request.search,
+                n_samples=sweep_request.n_samples,
+                seed=sweep_request.seed,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        return {
+            'strategy_id': strategy.id,
+            'strategy_code': strategy.code,
+            'symbol': sweep_request.symbol,
+            'start_date': sweep_request.start_date.isoformat(),
+            'end_date': sweep_request.end_date.isoformat(),
+            'timeframe': sweep_request.timeframe,
+            'initial_capital': float(sweep_request.initial_capital),
+            'commission': float(sweep_request.commission),
+            'slippage': float(sweep_request.slippage),
+            'base_params': {**(strategy.parameters or {}), **sweep_request.base_params},
+            'rank_by': sweep_request.rank_by,
+            'combos': combos,
+        }
+
     def update_backtest(
         self,
         backtest_id: int,
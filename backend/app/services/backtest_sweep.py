@@ -0,0 +1,454 @@
+"""
+回測參數掃描（Parameter Sweep）
+
+對同一策略、同一標的執行大量參數組合：
+- 資料只載入一次（SweepSnapshot），策略代碼只編譯一次（每個進程）
+- 本地可用 fork 進程池平行執行（子進程直接繼承快照，無需序列化）
+- Celery 模式下快照存於 Redis，由多個 chunk 子任務共享
+- 結果依指定績效指標排序
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+from app.services.backtest_engine import BacktestEngine, PerformanceAnalyzer
+from app.utils.error_handler import get_safe_error_message
+from app.utils.timezone_helpers import parse_datetime_safe
+
+
+# 可用於排序的績效指標：True 表示越大越好
+SWEEP_RANK_METRICS: Dict[str, bool] = {
+    'sharpe_ratio': True,
+    'total_return': True,
+    'total_pnl': True,
+    'win_rate': True,
+    'profit_factor': True,
+    'final_value': True,
+    'max_drawdown_pct': False,
+    'max_drawdown': False,
+}
+
+# 單次掃描允許的最大組合數
+MAX_SWEEP_COMBINATIONS = 2000
+
+
+def count_combinations(param_grid: Dict[str, List[Any]]) -> int:
+    """計算參數網格的組合總數"""
+    return math.prod(len(values) for values in param_grid.values()) if param_grid else 0
+
+
+def expand_parameter_grid(
+    param_grid: Dict[str, List[Any]],
+    search: str = 'grid',
+    n_samples: Optional[int] = None,
+    seed: Optional[int] = None,
+    max_combinations: int = MAX_SWEEP_COMBINATIONS
+) -> List[Dict[str, Any]]:
+    """
+    展開參數網格
+
+    Args:
+        param_grid: {參數名稱: 候選值列表}
+        search: 'grid'（全部組合）或 'random'（隨機抽樣不重複組合）
+        n_samples: 隨機搜尋的抽樣數量
+        seed: 隨機種子
+        max_combinations: 組合數上限
+
+    Returns:
+        參數組合列表
+
+    Raises:
+        ValueError: 參數網格為空、搜尋模式不支援或組合數超過上限
+    """
+    if not param_grid or any(len(values) == 0 for values in param_grid.values()):
+        raise ValueError("param_grid must contain at least one value for every parameter")
+
+    names = list(param_grid.keys())
+    value_lists = [list(param_grid[name]) for name in names]
+    total = count_combinations(param_grid)
+
+    if search == 'grid':
+        if total > max_combinations:
+            raise ValueError(
+                f"Grid has {total} combinations, exceeds limit {max_combinations}; "
+                f"use search='random' with n_samples"
+            )
+        return [dict(zip(names, combo)) for combo in itertools.product(*value_lists)]
+
+    if search == 'random':
+        sample_size = min(n_samples or max_combinations, total)
+        if sample_size > max_combinations:
+            raise ValueError(f"n_samples {sample_size} exceeds limit {max_combinations}")
+
+        # 以混合進位解碼組合索引，不需展開完整網格
+        rng = random.Random(seed)
+        combos = []
+        for index in rng.sample(range(total), sample_size):
+            combo = {}
+            for name, values in zip(reversed(names), reversed(value_lists)):
+                index, position = divmod(index, len(values))
+                combo[name] = values[position]
+            combos.append({name: combo[name] for name in names})
+        return combos
+
+    raise ValueError(f"Unsupported search mode: {search} (expected 'grid' or 'random')")
+
+
+def rank_results(
+    results: List[Dict[str, Any]],
+    rank_by: str = 'sharpe_ratio',
+    top: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    依績效指標排序掃描結果（失敗的組合排在最後）
+
+    Args:
+        results: run_combination 回傳的結果列表
+        rank_by: 排序指標（SWEEP_RANK_METRICS 之一）
+        top: 只回傳前 N 名
+
+    Returns:
+        排序後的結果（附 rank 欄位）
+    """
+    if rank_by not in SWEEP_RANK_METRICS:
+        raise ValueError(f"Unsupported rank metric: {rank_by}")
+
+    higher_is_better = SWEEP_RANK_METRICS[rank_by]
+    succeeded = [r for r in results if r.get('metrics')]
+    failed = [r for r in results if not r.get('metrics')]
+
+    succeeded.sort(key=lambda r: r['metrics'].get(rank_by, 0), reverse=higher_is_better)
+    ranked = succeeded + failed
+
+    for position, result in enumerate(ranked, start=1):
+        result['rank'] = position
+
+    return ranked[:top] if top else ranked
+
+
+def sweep_score(metrics: Dict[str, Any], rank_by: str) -> float:
+    """將指標轉為「越大越好」的分數（用於 Redis sorted set）"""
+    value = float(metrics.get(rank_by, 0) or 0)
+    return value if SWEEP_RANK_METRICS[rank_by] else -value
+
+
+@dataclass
+class SweepSnapshot:
+    """
+    參數掃描共享的資料快照
+
+    包含已載入的 OHLCV 資料與回測設定，一次載入後供所有參數組合重複使用。
+    """
+    strategy_code: str
+    stock_id: str
+    data: pd.DataFrame
+    initial_cash: float = 1000000.0
+    commission: float = 0.001425
+    slippage: float = 0.0
+    timeframe: str = '1day'
+    base_params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def code_hash(self) -> str:
+        """策略代碼雜湊（編譯結果快取鍵）"""
+        return hashlib.sha256(self.strategy_code.encode()).hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可快取的字典（DataFrame 由快取層簽章序列化）"""
+        return {
+            'strategy_code': self.strategy_code,
+            'stock_id': self.stock_id,
+            'data': self.data,
+            'initial_cash': self.initial_cash,
+            'commission': self.commission,
+            'slippage': self.slippage,
+            'timeframe': self.timeframe,
+            'base_params': self.base_params,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'SweepSnapshot':
+        """由快取字典還原快照"""
+        return cls(**payload)
+
+    @classmethod
+    def load(
+        cls,
+        engine: BacktestEngine,
+        strategy_code: str,
+        stock_id: str,
+        start_date,
+        end_date,
+        timeframe: str = '1day',
+        **settings
+    ) -> 'SweepSnapshot':
+        """
+        從資料庫載入一次資料並建立快照
+
+        Raises:
+            ValueError: 無可用資料
+        """
+        if timeframe == '1day':
+            data = engine.load_data(stock_id, start_date, end_date)
+        else:
+            data = engine.load_minute_data(stock_id, start_date, end_date, timeframe)
+
+        if data is None or len(data) == 0:
+            raise ValueError(
+                f"No data available for {stock_id} ({timeframe}, {start_date} to {end_date})"
+            )
+
+        return cls(strategy_code=strategy_code, stock_id=stock_id, data=data, timeframe=timeframe, **settings)
+
+
+# 每個進程的策略編譯快取（fork 出的子進程直接繼承）
+_compiled_strategies: Dict[str, type] = {}
+
+# fork 進程池共享的快照（子進程繼承，不經序列化）
+_worker_snapshot: Optional[SweepSnapshot] = None
+
+
+def _get_strategy_class(snapshot: SweepSnapshot) -> type:
+    """取得（或編譯一次）策略類"""
+    strategy_class = _compiled_strategies.get(snapshot.code_hash)
+    if strategy_class is None:
+        strategy_class = BacktestEngine(db=None).create_strategy_class(snapshot.strategy_code)
+        _compiled_strategies[snapshot.code_hash] = strategy_class
+    return strategy_class
+
+
+def run_combination(snapshot: SweepSnapshot, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    以快照資料執行單一參數組合
+
+    只計算績效指標（不產生視覺化明細），失敗時回傳 error 欄位而非拋出例外。
+
+    Args:
+        snapshot: 資料快照
+        params: 策略參數（覆蓋 base_params）
+
+    Returns:
+        {'params', 'metrics'} 或 {'params', 'error'}
+    """
+    strategy_params = {**snapshot.base_params, **params}
+
+    try:
+        engine = BacktestEngine(db=None)
+        start_value = engine._configure_cerebro(
+            strategy_class=_get_strategy_class(snapshot),
+            feeds={snapshot.stock_id: snapshot.data},
+            initial_cash=snapshot.initial_cash,
+            commission=snapshot.commission,
+            slippage=snapshot.slippage,
+            strategy_params=strategy_params,
+            commission_info=engine._get_commission_info(snapshot.stock_id),
+        )
+        strategy_instance = engine.cerebro.run()[0]
+        final_value = engine.cerebro.broker.getvalue()
+
+        trades = engine._extract_trades(strategy_instance)
+        equity_curve = [
+            (parse_datetime_safe(record['date']), record['value'])
+            for record in engine._extract_daily_nav(strategy_instance)
+        ] or [(snapshot.data.index[0], start_value), (snapshot.data.index[-1], final_value)]
+
+        metrics = PerformanceAnalyzer.calculate_metrics(
+            initial_cash=snapshot.initial_cash,
+            final_value=final_value,
+            trades=trades,
+            equity_curve=equity_curve,
+        )
+        return {'params': params, 'metrics': metrics}
+
+    except Exception as e:
+        logger.warning(f"Sweep combination {params} failed: {str(e)}")
+        return {'params': params, 'error': get_safe_error_message(e, "參數組合回測")}
+
+
+def _run_in_worker(params: Dict[str, Any]) -> Dict[str, Any]:
+    """進程池工作函數：使用繼承自父進程的快照"""
+    return run_combination(_worker_snapshot, params)
+
+
+class ParameterSweepRunner:
+    """
+    參數掃描執行器
+
+    用法：
+        snapshot = SweepSnapshot.load(engine, code, '2330', start, end)
+        runner = ParameterSweepRunner(snapshot)
+        for result in runner.iter_results(combos, max_workers=8):
+            ...  # 結果依完成順序串流回傳
+    """
+
+    def __init__(self, snapshot: SweepSnapshot):
+        self.snapshot = snapshot
+
+    @staticmethod
+    def can_fork() -> bool:
+        """
+        是否可建立 fork 進程池
+
+        Celery prefork worker 為 daemon 進程，不允許再建立子進程；
+        非 POSIX 平台也沒有 fork。
+        """
+        return (
+            'fork' in multiprocessing.get_all_start_methods()
+            and not multiprocessing.current_process().daemon
+        )
+
+    def iter_results(
+        self,
+        combos: List[Dict[str, Any]],
+        max_workers: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        執行所有參數組合，依完成順序逐一產出結果
+
+        Args:
+            combos: 參數組合列表
+            max_workers: 進程數（None 表示 CPU 核心數；1 或無法 fork 時在本進程循序執行）
+        """
+        global _worker_snapshot
+
+        # 先在父進程編譯一次：驗證代碼並讓 fork 出的子進程直接繼承
+        _get_strategy_class(self.snapshot)
+
+        workers = max_workers or os.cpu_count() or 1
+        workers = min(workers, len(combos))
+
+        if workers <= 1 or not self.can_fork():
+            for params in combos:
+                yield run_combination(self.snapshot, params)
+            return
+
+        _worker_snapshot = self.snapshot
+        try:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = [executor.submit(_run_in_worker, params) for params in combos]
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            _worker_snapshot = None
+
+    def run(
+        self,
+        combos: List[Dict[str, Any]],
+        rank_by: str = 'sharpe_ratio',
+        max_workers: Optional[int] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        執行掃描並回傳排序後的結果
+
+        Args:
+            combos: 參數組合列表
+            rank_by: 排序指標
+            max_workers: 進程數
+            on_result: 每完成一個組合時的回呼（串流進度）
+
+        Returns:
+            依 rank_by 排序的結果列表
+        """
+        results = []
+        for result in self.iter_results(combos, max_workers=max_workers):
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+        return rank_results(results, rank_by)
+
+
+class SweepResultStore:
+    """
+    Redis 上的掃描狀態與結果
+
+    Keys（TTL 皆為 SWEEP_TTL）：
+    - backtest_sweep:{id}:meta      Hash，掃描設定與進度計數
+    - backtest_sweep:{id}:snapshot  簽章序列化的 SweepSnapshot（chunk 子任務共享）
+    - backtest_sweep:{id}:results   Hash，組合索引 → 結果 JSON
+    - backtest_sweep:{id}:ranking   Sorted set，組合索引 → 排序分數
+    """
+
+    SWEEP_TTL = 24 * 3600
+
+    def __init__(self, sweep_id: str, cache_backend=None):
+        from app.utils.cache import cache as default_cache
+
+        self.sweep_id = sweep_id
+        self.cache = cache_backend or default_cache
+        self.prefix = f"backtest_sweep:{sweep_id}"
+
+    @property
+    def redis(self):
+        return self.cache.redis_client
+
+    def init(self, meta: Dict[str, Any]) -> None:
+        """建立掃描狀態"""
+        key = f"{self.prefix}:meta"
+        self.redis.hset(key, mapping={
+            k: json.dumps(v) for k, v in {**meta, 'completed': 0, 'failed': 0}.items()
+        })
+        self.redis.expire(key, self.SWEEP_TTL)
+
+    def get_meta(self) -> Optional[Dict[str, Any]]:
+        """讀取掃描設定與進度（不存在時回傳 None）"""
+        raw = self.redis.hgetall(f"{self.prefix}:meta")
+        if not raw:
+            return None
+        return {k.decode(): json.loads(v) for k, v in raw.items()}
+
+    def update_meta(self, **fields) -> None:
+        """更新掃描設定欄位（例如 status）"""
+        self.redis.hset(f"{self.prefix}:meta", mapping={k: json.dumps(v) for k, v in fields.items()})
+
+    def save_snapshot(self, snapshot: SweepSnapshot) -> bool:
+        """儲存共享資料快照"""
+        return self.cache.set(f"{self.prefix}:snapshot", snapshot.to_dict(), expiry=self.SWEEP_TTL)
+
+    def load_snapshot(self) -> Optional[SweepSnapshot]:
+        """讀取共享資料快照"""
+        payload = self.cache.get(f"{self.prefix}:snapshot")
+        return SweepSnapshot.from_dict(payload) if payload else None
+
+    def add_result(self, index: int, result: Dict[str, Any], rank_by: str) -> None:
+        """寫入單一組合結果並更新排名與進度"""
+        pipe = self.redis.pipeline()
+        pipe.hset(f"{self.prefix}:results", index, json.dumps(result, default=str))
+        if result.get('metrics'):
+            pipe.zadd(f"{self.prefix}:ranking", {index: sweep_score(result['metrics'], rank_by)})
+            pipe.hincrby(f"{self.prefix}:meta", 'completed', 1)
+        else:
+            pipe.hincrby(f"{self.prefix}:meta", 'failed', 1)
+        for suffix in ('results', 'ranking'):
+            pipe.expire(f"{self.prefix}:{suffix}", self.SWEEP_TTL)
+        pipe.execute()
+
+    def top_results(self, top: int = 20) -> List[Dict[str, Any]]:
+        """依排名讀取前 N 名結果"""
+        indexes = self.redis.zrevrange(f"{self.prefix}:ranking", 0, top - 1)
+        if not indexes:
+            return []
+
+        raw_results = self.redis.hmget(f"{self.prefix}:results", indexes)
+        ranked = []
+        for position, raw in enumerate(raw_results, start=1):
+            if raw:
+                ranked.append({**json.loads(raw), 'rank': position})
+        return ranked
+
+    def delete_snapshot(self) -> None:
+        """掃描結束後釋放快照"""
+        self.cache.delete(f"{self.prefix}:snapshot")
@@ -0,0 +1,207 @@
+"""
+批次因子評估（共享資料）
+
+對同一股票池、同一區間評估大量 Qlib 因子表達式（例如 RD-Agent 挖掘出的數百個因子）：
+- 股票池、收盤價與未來收益只載入一次（FactorBatchSnapshot），所有因子共用
+- 表達式正規化後去重，相同公式只計算一次
+- 多個表達式合併在同一次 D.features() 中計算：Qlib 以 (表達式, 標的, 區間) 記憶化
+  子表達式（H["f"]），共用的 $close、Mean($close, 20) 等每個標的只算一次
+- 同一批中有表達式錯誤時，改為逐一計算以隔離錯誤，不影響其他因子
+- 本地可用 fork 進程池平行計算（子進程直接繼承快照，無需序列化）
+"""
+
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+
+# 每次 D.features() 合併計算的表達式數
+DEFAULT_FORMULA_CHUNK = 16
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_formula(formula: str) -> str:
+    """正規化表達式（移除空白），作為去重鍵"""
+    return _WHITESPACE.sub('', formula)
+
+
+def dedupe_formulas(formulas: Dict[int, str]) -> Dict[str, List[int]]:
+    """
+    將 {因子 ID: 公式} 依正規化後的公式分組
+
+    Returns:
+        {正規化公式: [因子 ID, ...]}（保留首次出現的順序）
+    """
+    groups: Dict[str, List[int]] = {}
+    for factor_id, formula in formulas.items():
+        groups.setdefault(normalize_formula(formula), []).append(factor_id)
+    return groups
+
+
+@dataclass
+class FactorBatchSnapshot:
+    """所有因子共用的評估資料：股票池、收盤價與 1 日未來收益（index 為日期，columns 為股票代碼）"""
+
+    stock_list: List[str]
+    start_date: str
+    end_date: str
+    close: pd.DataFrame
+    returns: pd.DataFrame
+
+    @classmethod
+    def load(cls, adapter, stock_list: List[str], start_date: str, end_date: str) -> 'FactorBatchSnapshot':
+        """
+        以一次批次 D.features() 讀取收盤價並計算未來收益
+
+        Raises:
+            ValueError: Qlib 未初始化或沒有任何本地數據
+        """
+        panel = adapter.get_qlib_features_panel(stock_list, start_date, end_date, fields=['$close'])
+        if not panel:
+            raise ValueError(
+                "批次因子評估需要本地 Qlib 數據。請先執行數據同步：bash scripts/sync-qlib-smart.sh"
+            )
+
+        close = panel['$close']
+        returns = close.pct_change(1).shift(-1)  # shift(-1) 表示未來報酬
+        logger.info(f"Batch snapshot loaded: {close.shape[1]} stocks × {close.shape[0]} days")
+        return cls(stock_list, start_date, end_date, close, returns)
+
+
+# fork 子進程繼承的評估器（僅在 evaluate() 執行期間設定）
+_worker_evaluator: Optional['FactorBatchEvaluator'] = None
+
+
+def _evaluate_in_worker(formulas: List[str]) -> Dict[str, Dict]:
+    """進程池工作函數：使用繼承自父進程的評估器"""
+    return _worker_evaluator.evaluate_chunk(formulas)
+
+
+class FactorBatchEvaluator:
+    """
+    共享資料的批次因子評估器
+
+    用法：
+        snapshot = FactorBatchSnapshot.load(service.qlib_adapter, stock_list, start, end)
+        evaluator = FactorBatchEvaluator(service, snapshot)
+        results = evaluator.evaluate({factor_id: formula, ...}, max_workers=4)
+
+    指標與單一因子評估相同（FactorEvaluationService._calculate_metrics / _simple_backtest）。
+    """
+
+    def __init__(self, service, snapshot: FactorBatchSnapshot, chunk_size: int = DEFAULT_FORMULA_CHUNK):
+        self.service = service
+        self.snapshot = snapshot
+        self.chunk_size = max(1, chunk_size)
+
+    @staticmethod
+    def can_fork() -> bool:
+        """
+        是否可建立 fork 進程池
+
+        Celery prefork worker 為 daemon 進程，不允許再建立子進程；
+        非 POSIX 平台也沒有 fork。
+        """
+        return (
+            'fork' in multiprocessing.get_all_start_methods()
+            and not multiprocessing.current_process().daemon
+        )
+
+    def evaluate(self, formulas: Dict[int, str], max_workers: Optional[int] = 1) -> Dict[int, Dict]:
+        """
+        評估所有因子
+
+        Args:
+            formulas: {因子 ID: Qlib 表達式}
+            max_workers: 進程數（None 表示 CPU 核心數；1 或無法 fork 時在本進程循序執行）
+
+        Returns:
+            {因子 ID: 評估結果}；失敗的因子結果為 {"error": 錯誤訊息}
+        """
+        groups = dedupe_formulas(formulas)
+        # 每組以第一個因子的原始公式計算（Qlib 解析不受空白影響）
+        unique = {key: formulas[ids[0]] for key, ids in groups.items()}
+        logger.info(f"Batch evaluation: {len(formulas)} factors, {len(unique)} unique expressions")
+
+        by_formula: Dict[str, Dict] = {}
+        for chunk_results in self._iter_chunks(list(unique.values()), max_workers):
+            by_formula.update(chunk_results)
+
+        return {
+            factor_id: by_formula[unique[key]]
+            for key, ids in groups.items()
+            for factor_id in ids
+        }
+
+    def _iter_chunks(self, formulas: List[str], max_workers: Optional[int]) -> Iterator[Dict[str, Dict]]:
+        global _worker_evaluator
+
+        chunks = [formulas[i:i + self.chunk_size] for i in range(0, len(formulas), self.chunk_size)]
+        workers = min(max_workers or os.cpu_count() or 1, len(chunks))
+
+        if workers <= 1 or not self.can_fork():
+            for chunk in chunks:
+                yield self.evaluate_chunk(chunk)
+            return
+
+        _worker_evaluator = self
+        try:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = [executor.submit(_evaluate_in_worker, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            _worker_evaluator = None
+
+    def evaluate_chunk(self, formulas: List[str]) -> Dict[str, Dict]:
+        """
+        在同一次 D.features() 中計算一批表達式並評分
+
+        Returns:
+            {表達式: 評估結果或 {"error": ...}}
+        """
+        try:
+            panel = self._load(formulas)
+        except Exception as e:
+            if len(formulas) == 1:
+                logger.warning(f"Failed to evaluate expression {formulas[0]}: {e}")
+                return {formulas[0]: {"error": str(e)}}
+            # 隔離錯誤的表達式：逐一重新計算（子表達式仍由 Qlib 記憶化共用）
+            logger.warning(f"Batch of {len(formulas)} expressions failed ({e}), evaluating one by one")
+            results: Dict[str, Dict] = {}
+            for formula in formulas:
+                results.update(self.evaluate_chunk([formula]))
+            return results
+
+        return {formula: self._score(formula, panel.get(formula)) for formula in formulas}
+
+    def _load(self, formulas: List[str]) -> Dict[str, pd.DataFrame]:
+        snapshot = self.snapshot
+        return self.service.qlib_adapter.get_qlib_features_panel(
+            list(snapshot.close.columns),
+            snapshot.start_date,
+            snapshot.end_date,
+            fields=formulas
+        )
+
+    def _score(self, formula: str, factor_data: Optional[pd.DataFrame]) -> Dict:
+        if factor_data is None or factor_data.empty:
+            return {"error": f"無法計算因子數據（公式：{formula}）"}
+
+        returns = self.snapshot.returns
+        metrics = self.service._calculate_metrics(factor_data, returns)
+        backtest = self.service._simple_backtest(factor_data, returns)
+        return {
+            **metrics,
+            **backtest,
+            "n_periods": len(factor_data),
+        }
+
@@ -22,7 +22,6 @@ from loguru import logger
 from app.utils.cache import cached_method, cache
 
 try:
-    from qlib.data import D
     from qlib.data.dataset import DatasetH
     from qlib.data.dataset.handler import DataHandlerLP
     QLIB_AVAILABLE = True
@@ -32,10 +31,16 @@ except ImportError:
 
 from app.models.rdagent import GeneratedFactor, FactorEvaluation
 from app.services.qlib_data_adapter import QlibDataAdapter
+from app.services.factor_ic import cross_sectional_ic, forward_returns, ic_summary
+from app.services.factor_batch_evaluation import FactorBatchEvaluator, FactorBatchSnapshot
 from app.repositories.generated_factor import GeneratedFactorRepository
 from app.repositories.factor_evaluation import FactorEvaluationRepository
 
 
+# 截面 IC 每日至少需要的股票數
+MIN_IC_STOCKS = 5
+
+
 def _evaluation_cache_key(
     factor_id: int,
     stock_pool: str = "all",
@@ -62,6 +67,37 @@ def _evaluation_cache_key(
     return f"{factor_id}:{stock_pool}:{start}:{end}"
 
 
+# 所有評估快取共用的標籤；單一因子另有 factor_evaluation:factor:<id>
+EVALUATION_CACHE_TAG = "factor_evaluation"
+
+
+def _factor_cache_tag(factor_id: int) -> str:
+    return f"{EVALUATION_CACHE_TAG}:factor:{factor_id}"
+
+
+def _evaluation_cache_tags(factor_id: int, *args, **kwargs) -> List[str]:
+    """評估快取的失效標籤（參數與 _evaluation_cache_key 相同）"""
+    return [EVALUATION_CACHE_TAG, _factor_cache_tag(factor_id)]
+
+
+# 標記舊版（未帶標籤）評估快取已以前綴掃描清除過
+LEGACY_CACHE_CLEARED_KEY = "factor_evaluation_legacy_cleared"
+
+
+def _clear_legacy_evaluation_cache() -> int:
+    """
+    一次性清除標籤機制上線前寫入的評估快取
+
+    舊鍵沒有加入標籤集合，invalidate_tags 清不到；以 SCAN 清除整個前綴一次
+    （包含其他因子，僅多一次重算），之後寫入的鍵都帶標籤，不需再掃描。
+    """
+    if cache.get(LEGACY_CACHE_CLEARED_KEY):
+        return 0
+    count = cache.clear_pattern(f"{EVALUATION_CACHE_TAG}:*")
+    cache.set(LEGACY_CACHE_CLEARED_KEY, True, expiry=30 * 24 * 3600)
+    return count
+
+
 class FactorEvaluationService:
     """因子評估服務"""
 
@@ -83,8 +119,8 @@ class FactorEvaluationService:
         Returns:
             刪除的快取數量
         """
-        pattern = f"factor_evaluation:{factor_id}:*"
-        count = cache.clear_pattern(pattern)
+        count = cache.invalidate_tags(_factor_cache_tag(factor_id))
+        count += _clear_legacy_evaluation_cache()
         logger.info(f"Cleared {count} cache entries for factor {factor_id}")
         return count
 
@@ -95,8 +131,8 @@ class FactorEvaluationService:
         Returns:
             刪除的快取數量
         """
-        pattern = "factor_evaluation:*"
-        count = cache.clear_pattern(pattern)
+        count = cache.invalidate_tags(EVALUATION_CACHE_TAG)
+        count += _clear_legacy_evaluation_cache()
         logger.info(f"Cleared {count} evaluation cache entries")
         return count
 
@@ -159,7 +195,8 @@ class FactorEvaluationService:
     @cached_method(
         key_prefix="factor_evaluation",
         expiry=3600,  # 1 小時快取
-        key_func=_evaluation_cache_key
+        key_func=_evaluation_cache_key,
+        tags=_evaluation_cache_tags
     )
     def evaluate_factor(
         self,
@@ -268,6 +305,90 @@ class FactorEvaluationService:
 
         return final_results
 
+    def evaluate_factors_batch(
+        self,
+        factor_ids: List[int],
+        stock_pool: str = "all",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        save_to_db: bool = True,
+        max_workers: Optional[int] = 1
+    ) -> Dict[int, Dict]:
+        """
+        批次評估多個因子（共享股票池、收盤價與未來收益）
+
+        股票池與未來收益只載入一次，相同公式只計算一次，
+        多個表達式合併在同一次 D.features() 中計算（見 factor_batch_evaluation）。
+        結果欄位與 evaluate_factor 相同，但不經過單一因子的 Redis 快取。
+
+        Args:
+            factor_ids: 因子 ID 列表
+            stock_pool: 股票池（all, top100, etc.）
+            start_date: 開始日期 (YYYY-MM-DD)
+            end_date: 結束日期 (YYYY-MM-DD)
+            save_to_db: 是否保存到資料庫
+            max_workers: 進程數（None 表示 CPU 核心數；Celery worker 內一律循序執行）
+
+        Returns:
+            {因子 ID: 評估結果}；失敗的因子結果為 {"error": 錯誤訊息}
+
+        Raises:
+            ValueError: Qlib 不可用或沒有本地數據
+        """
+        if not QLIB_AVAILABLE or not self.qlib_adapter.qlib_initialized:
+            raise ValueError("批次因子評估需要本地 Qlib 數據。請先執行數據同步：bash scripts/sync-qlib-smart.sh")
+
+        factors = GeneratedFactorRepository.get_by_ids(self.db, factor_ids)
+        found = {factor.id: factor for factor in factors}
+        results: Dict[int, Dict] = {
+            factor_id: {"error": "Factor not found"}
+            for factor_id in factor_ids if factor_id not in found
+        }
+        if not found:
+            return results
+
+        # 設定預設日期範圍（過去 2 年）
+        if not end_date:
+            end_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if not start_date:
+            start_dt = datetime.now(timezone.utc) - timedelta(days=730)  # 2 年
+            start_date = start_dt.strftime("%Y-%m-%d")
+
+        stock_list = self._get_stock_pool(stock_pool)
+        logger.info(
+            f"Batch evaluating {len(found)} factors from {start_date} to {end_date}, "
+            f"stock pool: {len(stock_list)} stocks"
+        )
+
+        snapshot = FactorBatchSnapshot.load(self.qlib_adapter, stock_list, start_date, end_date)
+        evaluator = FactorBatchEvaluator(self, snapshot)
+        scored = evaluator.evaluate(
+            {factor_id: factor.formula for factor_id, factor in found.items()},
+            max_workers=max_workers
+        )
+
+        for factor_id, result in scored.items():
+            if "error" in result:
+                results[factor_id] = result
+                continue
+
+            final_results = self._sanitize_results({
+                **result,
+                "stock_pool": stock_pool,
+                "start_date": start_date,
+                "end_date": end_date,
+                "n_stocks": len(stock_list),
+            })
+            if save_to_db:
+                try:
+                    self._save_evaluation(factor_id, final_results)
+                except Exception as e:
+                    results[factor_id] = {"error": f"Failed to save evaluation: {e}"}
+                    continue
+            results[factor_id] = final_results
+
+        return results
+
     def _get_stock_pool(self, pool_name: str) -> List[str]:
         """獲取股票池列表"""
         # 簡化版：返回所有台股或前 100 大
@@ -300,61 +421,61 @@ class FactorEvaluationService:
         Returns:
             (factor_data, returns_data) - 兩個 DataFrame，index 為日期，columns 為股票代碼
         """
-        try:
-            if not QLIB_AVAILABLE:
-                logger.warning("Qlib not available, using fallback calculation")
-                return self._fallback_calculate(stock_list, start_date, end_date)
-
-            # 使用 Qlib 計算因子值
-            instruments = [f"SH{s}" if s.startswith("6") else f"SZ{s}" for s in stock_list]
-
-            # 解析因子公式（假設是 Qlib 表達式）
-            fields = [factor_formula, "$close"]  # 因子值 + 收盤價計算報酬
-
-            # 使用 QlibDataAdapter 獲取數據
-            factor_values_list = []
-            close_prices_list = []
+        if not QLIB_AVAILABLE:
+            logger.warning("Qlib not available, using fallback calculation")
+            return self._fallback_calculate(stock_list, start_date, end_date)
 
-            for stock_id in stock_list:
-                try:
-                    # 獲取因子數據
-                    df = self.qlib_adapter.get_qlib_features(
-                        stock_id,
-                        start_date,
-                        end_date,
-                        fields=[factor_formula, "$close"]
-                    )
+        factor_data, close_data = self._load_factor_panel(factor_formula, stock_list, start_date, end_date)
+        if factor_data is None:
+            return None, None
 
-                    if df is not None and not df.empty:
-                        factor_values_list.append(df.iloc[:, 0].rename(stock_id))
-                        close_prices_list.append(df.iloc[:, 1].rename(stock_id))
-                except SyntaxError as e:
-                    # Qlib 表達式語法錯誤，直接拋出
-                    logger.error(f"Invalid Qlib expression: {factor_formula}")
-                    raise
-                except Exception as e:
-                    logger.warning(f"Failed to get data for {stock_id}: {e}")
-                    continue
+        # 計算未來收益（1 日報酬率）
+        returns_data = close_data.pct_change(1).shift(-1)  # shift(-1) 表示未來報酬
 
-            if not factor_values_list:
-                logger.error("No factor data available")
-                return None, None
+        logger.info(f"Factor data shape: {factor_data.shape}, Returns data shape: {returns_data.shape}")
 
-            # 合併成 DataFrame
-            factor_data = pd.concat(factor_values_list, axis=1)
-            close_data = pd.concat(close_prices_list, axis=1)
+        return factor_data, returns_data
 
-            # 計算未來收益（1 日報酬率）
-            returns_data = close_data.pct_change(1).shift(-1)  # shift(-1) 表示未來報酬
+    def _load_factor_panel(
+        self,
+        factor_formula: str,
+        stock_list: List[str],
+        start_date: str,
+        end_date: str
+    ) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """
+        以批次 D.features() 一次讀取整個股票池的因子值與收盤價
 
-            logger.info(f"Factor data shape: {factor_data.shape}, Returns data shape: {returns_data.shape}")
+        因子與 $close 在同一次呼叫中計算（每個 bin 檔只讀一次），
+        收盤價供 IC、回測與 IC 衰減共用，不再另外讀取。
 
-            return factor_data, returns_data
+        Returns:
+            (factor_data, close_data) - index 為日期，columns 為股票代碼；無數據時為 (None, None)
 
+        Raises:
+            SyntaxError: 因子公式不是有效的 Qlib 表達式
+        """
+        try:
+            panel = self.qlib_adapter.get_qlib_features_panel(
+                stock_list,
+                start_date,
+                end_date,
+                fields=[factor_formula, "$close"]
+            )
+        except SyntaxError:
+            # Qlib 表達式語法錯誤，直接拋出
+            logger.error(f"Invalid Qlib expression: {factor_formula}")
+            raise
         except Exception as e:
             logger.error(f"Error calculating factor and returns: {e}")
             return None, None
 
+        if not panel:
+            logger.error("No factor data available")
+            return None, None
+
+        return panel[factor_formula], panel["$close"]
+
     def _fallback_calculate(
         self,
         stock_list: List[str],
@@ -407,49 +528,14 @@ class FactorEvaluationService:
             # 確保兩個 DataFrame 對齊
             aligned_factor, aligned_returns = factor_data.align(returns_data, join='inner')
 
-            # 計算每個時間點的截面 IC
-            ic_series = []
-            rank_ic_series = []
-
-            for date in aligned_factor.index:
-                factor_values = aligned_factor.loc[date].dropna()
-                return_values = aligned_returns.loc[date].dropna()
-
-                # 只保留兩者都有的股票
-                common_stocks = factor_values.index.intersection(return_values.index)
-
-                if len(common_stocks) < 5:  # 至少需要 5 支股票
-                    continue
-
-                f = factor_values[common_stocks]
-                r = return_values[common_stocks]
-
-                # Pearson IC
-                ic = f.corr(r)
-                if not np.isnan(ic):
-                    ic_series.append(ic)
-
-                # Rank IC (Spearman correlation)
-                rank_ic = f.rank().corr(r.rank())
-                if not np.isnan(rank_ic):
-                    rank_ic_series.append(rank_ic)
-
-            # 計算 IC 的均值和標準差
-            if ic_series:
-                mean_ic = np.mean(ic_series)
-                std_ic = np.std(ic_series)
-                icir = mean_ic / std_ic if std_ic > 0 else 0
-            else:
-                mean_ic = 0
-                icir = 0
-
-            if rank_ic_series:
-                mean_rank_ic = np.mean(rank_ic_series)
-                std_rank_ic = np.std(rank_ic_series)
-                rank_icir = mean_rank_ic / std_rank_ic if std_rank_ic > 0 else 0
-            else:
-                mean_rank_ic = 0
-                rank_icir = 0
+            # 一次計算所有日期的截面 IC（至少需要 5 支股票）
+            ic, rank_ic = cross_sectional_ic(
+                aligned_factor.to_numpy(dtype=np.float64),
+                aligned_returns.to_numpy(dtype=np.float64),
+                min_stocks=MIN_IC_STOCKS
+            )
+            mean_ic, icir, ic_series = ic_summary(ic)
+            mean_rank_ic, rank_icir, _ = ic_summary(rank_ic)
 
             logger.info(f"Calculated metrics - IC: {mean_ic:.4f}, ICIR: {icir:.4f}, "
                        f"Rank IC: {mean_rank_ic:.4f}, Rank ICIR: {rank_icir:.4f}")
@@ -459,7 +545,7 @@ class FactorEvaluationService:
                 "icir": float(icir),
                 "rank_ic": float(mean_rank_ic),
                 "rank_icir": float(rank_icir),
-                "ic_time_series": [float(x) for x in ic_series] if ic_series else [],
+                "ic_time_series": ic_series,
             }
 
         except Exception as e:
@@ -754,8 +840,8 @@ class FactorEvaluationService:
         stock_list = self._get_stock_pool(stock_pool)
         logger.info(f"Stock pool: {len(stock_list)} stocks")
 
-        # 4. 計算因子值
-        factor_data, _ = self._calculate_factor_and_returns(
+        # 4. 一次讀取因子值與收盤價
+        factor_data, close_prices = self._load_factor_panel(
             factor.formula,
             stock_list,
             start_date,
@@ -770,27 +856,15 @@ class FactorEvaluationService:
         if max_lag < 20:
             lag_periods = [lag for lag in lag_periods if lag <= max_lag]
 
-        # 6. 計算每個滯後期的 IC
-        ic_by_lag = []
-        rank_ic_by_lag = []
-
-        for lag in lag_periods:
-            logger.info(f"Calculating IC for lag={lag}")
-
-            # 計算該滯後期的未來收益
-            returns_data = self._calculate_future_returns(stock_list, start_date, end_date, lag)
-
-            if returns_data is None:
-                logger.warning(f"Failed to calculate returns for lag={lag}, skipping")
-                ic_by_lag.append(0.0)
-                rank_ic_by_lag.append(0.0)
-                continue
-
-            # 計算該滯後期的 IC
-            metrics = self._calculate_metrics(factor_data, returns_data)
-
-            ic_by_lag.append(metrics.get("ic", 0.0))
-            rank_ic_by_lag.append(metrics.get("rank_ic", 0.0))
+        # 6. 所有滯後期的未來收益與 IC 在同一次計算中完成
+        returns_by_lag = forward_returns(close_prices.to_numpy(dtype=np.float64), lag_periods)
+        ic, rank_ic = cross_sectional_ic(
+            factor_data.to_numpy(dtype=np.float64),
+            returns_by_lag,
+            min_stocks=MIN_IC_STOCKS
+        )
+        ic_by_lag = [ic_summary(row)[0] for row in ic]
+        rank_ic_by_lag = [ic_summary(row)[0] for row in rank_ic]
 
         logger.info(f"IC decay analysis completed. IC values: {ic_by_lag}")
 
@@ -804,70 +878,3 @@ class FactorEvaluationService:
             "start_date": start_date,
             "end_date": end_date
         }
-
-    def _calculate_future_returns(
-        self,
-        stock_list: List[str],
-        start_date: str,
-        end_date: str,
-        lag: int = 1
-    ) -> Optional[pd.DataFrame]:
-        """
-        計算未來 N 天的收益率
-
-        Args:
-            stock_list: 股票列表
-            start_date: 開始日期
-            end_date: 結束日期
-            lag: 滯後期（天數）
-
-        Returns:
-            DataFrame，索引為日期，列為股票代碼，值為未來 N 天的收益率
-        """
-        try:
-            # 檢查 Qlib 是否可用
-            if not QLIB_AVAILABLE:
-                raise ValueError("Qlib not available. Please install Qlib and sync data.")
-
-            # 使用 Qlib 獲取價格數據（僅使用本地數據，不使用 API fallback）
-            instruments = [f"SH{s}" if s.startswith('6') else f"SZ{s}" for s in stock_list]
-
-            # 獲取收盤價
-            close_prices = D.features(
-                instruments=instruments,
-                fields=['$close'],
-                start_time=start_date,
-                end_time=end_date
-            )
-
-            if close_prices is None or close_prices.empty:
-                error_msg = (
-                    f"無法獲取 lag={lag} 天的價格數據。本地 Qlib 數據可能不完整或不存在。\n"
-                    "請執行數據同步：./scripts/sync-qlib-smart.sh"
-                )
-                logger.warning(error_msg)
-                raise ValueError(error_msg)
-
-            # 重塑數據：轉換為 (date, stock) 的透視表
-            close_prices = close_prices.reset_index()
-            close_prices['stock'] = close_prices['instrument'].str[2:]  # 移除 SH/SZ 前綴
-
-            pivot_df = close_prices.pivot_table(
-                index='datetime',
-                columns='stock',
-                values='$close'
-            )
-
-            # 計算未來 N 天的收益率：(close[t+N] - close[t]) / close[t]
-            returns_df = (pivot_df.shift(-lag) - pivot_df) / pivot_df
-
-            # 移除 NaN（最後 N 天沒有未來收益）
-            returns_df = returns_df.dropna(how='all')
-
-            logger.info(f"Calculated {lag}-day forward returns: shape={returns_df.shape}")
-
-            return returns_df
-
-        except Exception as e:
-            logger.error(f"Error calculating future returns for lag={lag}: {e}")
-            return None
@@ -0,0 +1,145 @@
+"""
+截面 IC 計算核心（NumPy）
+
+以 (日期, 股票) 的 2-D 陣列一次計算所有日期的 Pearson IC 與 Rank IC（Spearman），
+取代逐日 dropna / intersection / Series.corr / rank 的 pandas 迴圈。
+前方可加任意維度（例如 (持有期, 日期, 股票)），多個持有期在同一次呼叫中完成。
+
+語意與原逐日實作一致：
+- 每個 (日期) 只使用因子與報酬皆非 NaN 的股票
+- 有效股票數少於 min_stocks 時該日 IC 為 NaN
+- Rank IC 以有效股票重新排名（同值取平均名次），再計算 Pearson 相關
+- 變異數為 0（或含 inf）時 IC 為 NaN
+"""
+
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+
+# 每批處理的截面數（控制排名暫存陣列的記憶體）
+_ROW_CHUNK = 512
+
+
+def _masked_corr(x: np.ndarray, y: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """沿最後一軸、只用 valid 位置的 Pearson 相關（兩段式：先求均值再求離差和）"""
+    n = valid.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = np.where(valid, x, 0.0).sum(axis=-1) / n
+        mean_y = np.where(valid, y, 0.0).sum(axis=-1) / n
+        dx = np.where(valid, x - mean_x[..., None], 0.0)
+        dy = np.where(valid, y - mean_y[..., None], 0.0)
+        denom = np.sqrt((dx * dx).sum(axis=-1) * (dy * dy).sum(axis=-1))
+        corr = (dx * dy).sum(axis=-1) / denom
+    corr[denom == 0] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _average_rank(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    沿最後一軸、只在 valid 位置之間排名（1 起算，同值取平均名次）
+
+    values / valid 為 2-D (截面, 股票)；無效位置回傳 NaN。
+    """
+    rows, cols = values.shape
+    # 無效位置設為 NaN：argsort 將 NaN 排在 inf 之後，有效值恆在前段
+    masked = np.where(valid, values, np.nan)
+    order = np.argsort(masked, axis=-1)
+    sorted_values = np.take_along_axis(masked, order, axis=-1)
+    sorted_valid = ~np.isnan(sorted_values)
+
+    # 同值群組的起訖位置（NaN 彼此不相等，各自成群，不影響有效值）
+    starts = np.ones((rows, cols), dtype=bool)
+    starts[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    position = np.broadcast_to(np.arange(cols), (rows, cols))
+    group_start = np.maximum.accumulate(np.where(starts, position, 0), axis=-1)
+    ends = np.ones((rows, cols), dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    group_end = np.minimum.accumulate(np.where(ends, position, cols - 1)[:, ::-1], axis=-1)[:, ::-1]
+
+    sorted_rank = np.where(sorted_valid, (group_start + group_end) / 2 + 1, np.nan)
+    ranks = np.empty((rows, cols))
+    np.put_along_axis(ranks, order, sorted_rank, axis=-1)
+    return ranks
+
+
+def cross_sectional_ic(
+    factor: np.ndarray,
+    returns: np.ndarray,
+    min_stocks: int = 5
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    計算每個截面的 Pearson IC 與 Rank IC
+
+    Args:
+        factor: (..., 日期, 股票) 因子值，可與 returns 廣播（例如 (日期, 股票) 對 (持有期, 日期, 股票)）
+        returns: (..., 日期, 股票) 未來報酬
+        min_stocks: 每個截面至少需要的有效股票數
+
+    Returns:
+        (ic, rank_ic)：形狀為廣播後去掉股票軸，無法計算的截面為 NaN
+    """
+    factor, returns = np.broadcast_arrays(
+        np.asarray(factor, dtype=np.float64), np.asarray(returns, dtype=np.float64)
+    )
+    shape = factor.shape[:-1]
+    n_stocks = factor.shape[-1] if factor.ndim else 0
+    flat_factor = factor.reshape(-1, n_stocks)
+    flat_returns = returns.reshape(-1, n_stocks)
+
+    ic = np.full(flat_factor.shape[0], np.nan)
+    rank_ic = np.full(flat_factor.shape[0], np.nan)
+
+    for lo in range(0, flat_factor.shape[0], _ROW_CHUNK):
+        f = flat_factor[lo:lo + _ROW_CHUNK]
+        r = flat_returns[lo:lo + _ROW_CHUNK]
+        valid = ~np.isnan(f) & ~np.isnan(r)
+        enough = valid.sum(axis=-1) >= min_stocks
+        if not enough.any():
+            continue
+
+        f, r, valid = f[enough], r[enough], valid[enough]
+        idx = np.arange(lo, lo + len(enough))[enough]
+        ic[idx] = _masked_corr(f, r, valid)
+        rank_ic[idx] = _masked_corr(_average_rank(f, valid), _average_rank(r, valid), valid)
+
+    return ic.reshape(shape), rank_ic.reshape(shape)
+
+
+def forward_returns(close: np.ndarray, horizons: Iterable[int]) -> np.ndarray:
+    """
+    以收盤價矩陣計算多個持有期的未來報酬
+
+    Args:
+        close: (日期, 股票) 收盤價
+        horizons: 持有期列表（交易日數）
+
+    Returns:
+        (持有期, 日期, 股票)：(close[t+h] - close[t]) / close[t]，最後 h 期為 NaN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    horizons = list(horizons)
+    result = np.full((len(horizons),) + close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i, h in enumerate(horizons):
+            if 0 < h < close.shape[0]:
+                result[i, :-h] = (close[h:] - close[:-h]) / close[:-h]
+    return result
+
+
+def ic_summary(ic: np.ndarray) -> Tuple[float, float, List[float]]:
+    """
+    IC 時間序列摘要
+
+    Returns:
+        (平均 IC, ICIR, 去除 NaN 後的 IC 序列)；無有效值時為 (0, 0, [])
+    """
+    series = np.asarray(ic, dtype=np.float64)
+    series = series[~np.isnan(series)]
+    if series.size == 0:
+        return 0.0, 0.0, []
+
+    mean_ic = float(np.mean(series))
+    std_ic = float(np.std(series))
+    icir = mean_ic / std_ic if std_ic > 0 else 0.0
+    return mean_ic, icir, series.tolist()
@@ -0,0 +1,440 @@
+"""
+持久化因子儲存（磁碟 memmap）
+
+以 (計算鍵, 標的) 內容定址，將因子計算結果存為 float32 矩陣（交易日 × 欄位）：
+- 命中：以 np.memmap 讀取所需日期區間，不重新計算
+- 請求區間超出已存區間：只計算新增的交易日並附加到檔尾
+- 來源 Qlib bin 檔變動：只在檔尾附加新資料（舊內容不變）視為增量，其餘改寫一律失效重算
+- 超出磁碟預算：依最近存取時間（LRU）淘汰
+
+檔案佈局 <root>/<instrument>/<digest>.*：
+- .values  float32，row-major（rows × columns）
+- .dates   int64（datetime64[ns]）
+- .json    中繼資料（欄位、覆蓋區間、來源檔簽章）
+
+同一標的的讀寫以目錄 flock 序列化（Celery 多 worker 共用同一儲存目錄）；
+計算本身在鎖外執行，不阻擋同一標的其他鍵的讀取。
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.core.qlib_config import qlib_config
+
+
+ComputeFn = Callable[[pd.Timestamp, pd.Timestamp], Optional[pd.DataFrame]]
+
+_FIELD_PATTERN = re.compile(r'\$(\w+)')
+_ONE_DAY = pd.Timedelta(days=1)
+
+
+def qlib_source_files(
+    instrument: str,
+    expressions: Iterable[str],
+    freq: str = 'day',
+    data_path: Optional[str] = None
+) -> List[Path]:
+    """
+    列出 Qlib 表達式依賴的 bin 檔（含交易日曆）
+
+    Args:
+        instrument: 標的代碼
+        expressions: Qlib 表達式（如 'Mean($close, 5)'），依 $欄位 解析依賴
+        freq: 資料頻率
+        data_path: Qlib 資料目錄（預設為 qlib_config 設定）
+
+    Returns:
+        來源檔路徑列表：calendars/<freq>.txt 與 features/<instrument>/<field>.<freq>.bin
+    """
+    root = Path(data_path or qlib_config.get_data_path())
+    fields = sorted({field.lower() for expr in expressions for field in _FIELD_PATTERN.findall(expr)})
+    feature_dir = root / 'features' / instrument.lower()
+    return [root / 'calendars' / f'{freq}.txt'] + [feature_dir / f'{field}.{freq}.bin' for field in fields]
+
+
+class FactorStore:
+    """
+    磁碟因子儲存
+
+    使用方式：
+        frame = factor_store.get_or_compute(
+            key='day|Mean($close, 5)', instrument='2330',
+            start='2024-01-01', end='2024-12-31',
+            compute=lambda s, e: ...,          # 回傳 datetime 索引的 DataFrame
+            sources=qlib_source_files('2330', ['Mean($close, 5)']),
+        )
+
+    compute(start, end) 必須回傳與完整計算一致的區間結果（增量附加時 start 為已存區間的隔日）。
+    來源檔不存在（例如資料來自 FinLab API）時不快取，直接呼叫 compute。
+    """
+
+    def __init__(self, root: str, max_bytes: int, enabled: bool = True):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats: Dict[str, int] = {
+            'hits': 0, 'misses': 0, 'appends': 0, 'invalidations': 0, 'evictions': 0
+        }
+        # (path, size, mtime_ns) → crc32，避免每個標的重讀交易日曆
+        self._crc_cache: Dict[Tuple[str, int, int], int] = {}
+        # 估計的磁碟用量（首次寫入時掃描一次，之後累加寫入量；超過預算才重新掃描）
+        self._usage: Optional[int] = None
+
+    # ------------------------------------------------------------------
+    # 公開介面
+    # ------------------------------------------------------------------
+
+    def get_or_compute(
+        self,
+        key: str,
+        instrument: str,
+        start,
+        end,
+        compute: ComputeFn,
+        sources: List[Path]
+    ) -> Optional[pd.DataFrame]:
+        """
+        讀取 [start, end] 區間的因子值，缺少的部分呼叫 compute 計算並寫入
+
+        Returns:
+            DataFrame（datetime 索引，float32 欄位）；compute 無資料時回傳其結果
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if not self.enabled or not sources or not all(Path(p).exists() for p in sources):
+            return compute(start, end)
+
+        paths = self._entry_paths(key, instrument)
+
+        try:
+            with self._locked(paths['dir']):
+                meta = self._load_valid_meta(paths, sources)
+                if meta is not None and meta['start'] <= start.isoformat() and end.isoformat() <= meta['end']:
+                    self.stats['hits'] += 1
+                    os.utime(paths['meta'])
+                    return self._read(paths, meta, start, end)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Factor store read failed for {instrument}: {e}")
+            return compute(start, end)
+
+        # 增量：已存區間涵蓋 start，只計算已存區間之後的交易日
+        if meta is not None and meta['start'] <= start.isoformat():
+            tail = compute(pd.Timestamp(meta['end']) + _ONE_DAY, end)
+            try:
+                with self._locked(paths['dir']):
+                    meta = self._append(paths, sources, tail, end)
+                    if meta is not None:
+                        self.stats['appends'] += 1
+                        return self._read(paths, meta, start, end)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Factor store append failed for {instrument}: {e}")
+            return compute(start, end)
+
+        self.stats['misses'] += 1
+        frame = compute(start, end)
+        if frame is None or frame.empty:
+            return frame
+
+        try:
+            with self._locked(paths['dir']):
+                meta = self._write(paths, key, instrument, sources, frame, start, end)
+                result = self._read(paths, meta, start, end)
+            self._evict(keep=paths['meta'])
+            return result
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Factor store write failed for {instrument}: {e}")
+            return frame
+
+    def get(self, key: str, instrument: str, start, end, sources: List[Path]) -> Optional[pd.DataFrame]:
+        """只讀取：已存區間涵蓋 [start, end] 時回傳資料，否則回傳 None（供批次讀取先查快取）"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if not self.enabled or not sources or not all(Path(p).exists() for p in sources):
+            return None
+
+        paths = self._entry_paths(key, instrument)
+        try:
+            with self._locked(paths['dir']):
+                meta = self._load_valid_meta(paths, sources)
+                if meta is None or not (meta['start'] <= start.isoformat() and end.isoformat() <= meta['end']):
+                    return None
+                self.stats['hits'] += 1
+                os.utime(paths['meta'])
+                return self._read(paths, meta, start, end)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Factor store read failed for {instrument}: {e}")
+            return None
+
+    def put(self, key: str, instrument: str, start, end, frame: pd.DataFrame, sources: List[Path]) -> None:
+        """寫入 [start, end] 區間的計算結果（取代既有項目）"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if not self.enabled or frame is None or frame.empty or not sources \
+                or not all(Path(p).exists() for p in sources):
+            return
+
+        paths = self._entry_paths(key, instrument)
+        try:
+            with self._locked(paths['dir']):
+                self._write(paths, key, instrument, sources, frame, start, end)
+            self.stats['misses'] += 1
+            self._evict(keep=paths['meta'])
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Factor store write failed for {instrument}: {e}")
+
+    def clear(self) -> int:
+        """刪除所有儲存項目，回傳刪除數量"""
+        count = 0
+        for meta_path in self.root.glob('*/*.json'):
+            self._remove_entry(meta_path)
+            count += 1
+        self._usage = None
+        logger.info(f"Cleared {count} factor store entries")
+        return count
+
+    def disk_usage(self) -> int:
+        """儲存目錄目前佔用的位元組數"""
+        return sum(size for _, size, _ in self._scan_entries())
+
+    # ------------------------------------------------------------------
+    # 儲存項目
+    # ------------------------------------------------------------------
+
+    def _entry_paths(self, key: str, instrument: str) -> Dict[str, Path]:
+        digest = hashlib.sha1(f'{instrument}\n{key}'.encode('utf-8')).hexdigest()
+        directory = self.root / re.sub(r'[^\w.-]', '_', instrument.lower())
+        return {
+            'dir': directory,
+            'meta': directory / f'{digest}.json',
+            'values': directory / f'{digest}.values',
+            'dates': directory / f'{digest}.dates',
+        }
+
+    @contextmanager
+    def _locked(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _load_valid_meta(self, paths: Dict[str, Path], sources: List[Path]) -> Optional[Dict]:
+        """讀取中繼資料並比對來源檔簽章；失效時刪除項目並回傳 None"""
+        if not paths['meta'].exists():
+            return None
+
+        meta = json.loads(paths['meta'].read_text())
+        if list(meta['sources']) != [str(p) for p in sources]:
+            state, signature = 'stale', {}
+        else:
+            state, signature = self._source_state(meta['sources'])
+
+        if state == 'stale':
+            self.stats['invalidations'] += 1
+            logger.info(f"Factor store entry invalidated: {meta['instrument']} ({paths['meta'].stem})")
+            self._remove_entry(paths['meta'])
+            return None
+
+        if state == 'appended':
+            # 來源新增交易日：已存的列仍有效，覆蓋區間縮回最後一筆已存日期，後續請求補算其後的資料
+            dates = self._dates(paths, meta)
+            last = pd.Timestamp(dates[-1]) if len(dates) else pd.Timestamp(meta['start']) - _ONE_DAY
+            meta['end'] = min(meta['end'], last.isoformat())
+            meta['sources'] = signature
+            self._save_meta(paths, meta)
+        elif signature != meta['sources']:
+            meta['sources'] = signature
+            self._save_meta(paths, meta)
+
+        return meta
+
+    def _write(self, paths, key, instrument, sources, frame, start, end) -> Dict:
+        """以新計算結果取代儲存項目（先寫暫存檔再 rename）"""
+        frame = frame.sort_index()
+        signature = {str(p): self._signature(Path(p)) for p in sources}
+        self._replace(paths['values'], frame.to_numpy(dtype=np.float32))
+        self._replace(paths['dates'], self._index_to_int64(frame.index))
+        meta = {
+            'key': key,
+            'instrument': instrument,
+            'columns': [str(c) for c in frame.columns],
+            'rows': len(frame),
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'sources': signature,
+        }
+        self._save_meta(paths, meta)
+        return meta
+
+    def _append(self, paths, sources, tail: Optional[pd.DataFrame], end: pd.Timestamp) -> Optional[Dict]:
+        """附加新交易日的資料並延伸覆蓋區間；項目已被其他行程失效時回傳 None"""
+        meta = self._load_valid_meta(paths, sources)
+        if meta is None:
+            return None
+
+        if tail is not None and not tail.empty:
+            tail = tail.sort_index()
+            dates = self._dates(paths, meta)
+            if len(dates):
+                # 其他行程可能已附加同一段資料
+                tail = tail[tail.index > pd.Timestamp(dates[-1])]
+            values = tail[meta['columns']].to_numpy(dtype=np.float32)
+            cols = len(meta['columns'])
+            rows = meta['rows']
+            # 先截斷到中繼資料記錄的列數，丟棄上次中斷寫入殘留的位元組
+            for path, data, width in (
+                (paths['values'], values, cols * 4),
+                (paths['dates'], self._index_to_int64(tail.index), 8),
+            ):
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * width)
+                    f.seek(rows * width)
+                    f.write(np.ascontiguousarray(data).tobytes())
+            meta['rows'] = rows + len(tail)
+
+        meta['end'] = max(meta['end'], end.isoformat())
+        self._save_meta(paths, meta)
+        return meta
+
+    def _read(self, paths, meta: Dict, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        dates = self._dates(paths, meta)
+        lo = np.searchsorted(dates, start.to_datetime64(), side='left')
+        hi = np.searchsorted(dates, end.to_datetime64(), side='right')
+        if meta['rows']:
+            values = np.memmap(paths['values'], dtype=np.float32, mode='r',
+                               shape=(meta['rows'], len(meta['columns'])))
+            block = np.array(values[lo:hi])
+        else:
+            block = np.empty((0, len(meta['columns'])), dtype=np.float32)
+        return pd.DataFrame(block, index=pd.DatetimeIndex(dates[lo:hi], name='datetime'), columns=meta['columns'])
+
+    @staticmethod
+    def _dates(paths, meta: Dict) -> np.ndarray:
+        if not meta['rows']:
+            return np.array([], dtype='datetime64[ns]')
+        return np.memmap(paths['dates'], dtype=np.int64, mode='r', shape=(meta['rows'],)).view('datetime64[ns]')
+
+    @staticmethod
+    def _index_to_int64(index) -> np.ndarray:
+        return pd.DatetimeIndex(index).values.astype('datetime64[ns]').view(np.int64)
+
+    @staticmethod
+    def _replace(path: Path, data: np.ndarray) -> None:
+        tmp = path.with_name(path.name + '.tmp')
+        np.ascontiguousarray(data).tofile(tmp)
+        os.replace(tmp, path)
+
+    def _save_meta(self, paths, meta: Dict) -> None:
+        tmp = paths['meta'].with_name(paths['meta'].name + '.tmp')
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, paths['meta'])
+
+    @staticmethod
+    def _remove_entry(meta_path: Path) -> None:
+        for suffix in ('.json', '.values', '.dates'):
+            meta_path.with_suffix(suffix).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # 來源檔簽章
+    # ------------------------------------------------------------------
+
+    def _crc(self, path: Path, size: int, mtime_ns: int, prefix: Optional[int] = None) -> int:
+        if prefix is None:
+            cache_key = (str(path), size, mtime_ns)
+            if cache_key not in self._crc_cache:
+                self._crc_cache[cache_key] = zlib.crc32(path.read_bytes())
+            return self._crc_cache[cache_key]
+        with open(path, 'rb') as f:
+            return zlib.crc32(f.read(prefix))
+
+    def _signature(self, path: Path) -> List[int]:
+        st = path.stat()
+        return [st.st_size, st.st_mtime_ns, self._crc(path, st.st_size, st.st_mtime_ns)]
+
+    def _source_state(self, stored: Dict[str, List[int]]) -> Tuple[str, Dict[str, List[int]]]:
+        """
+        比對來源檔與儲存時的簽章
+
+        Returns:
+            (state, signature)：state 為 'valid'（未變）、'appended'（僅檔尾附加）或 'stale'（內容改寫）
+        """
+        state = 'valid'
+        current = {}
+        for name, (size, mtime_ns, crc) in stored.items():
+            path = Path(name)
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                return 'stale', {}
+
+            if st.st_size == size and st.st_mtime_ns == mtime_ns:
+                current[name] = [size, mtime_ns, crc]
+                continue
+            # 大小或時間改變：舊內容前綴不變才視為附加
+            if st.st_size < size or self._crc(path, st.st_size, st.st_mtime_ns, prefix=size) != crc:
+                return 'stale', {}
+            current[name] = [st.st_size, st.st_mtime_ns, self._crc(path, st.st_size, st.st_mtime_ns)]
+            if st.st_size > size:
+                state = 'appended'
+
+        return state, current
+
+    # ------------------------------------------------------------------
+    # 磁碟預算
+    # ------------------------------------------------------------------
+
+    def _scan_entries(self) -> List[Tuple[Path, int, int]]:
+        """列出 (中繼資料路徑, 佔用位元組, 最近存取 mtime_ns)"""
+        entries = []
+        for meta_path in self.root.glob('*/*.json'):
+            try:
+                size = sum(meta_path.with_suffix(s).stat().st_size for s in ('.json', '.values', '.dates'))
+                entries.append((meta_path, size, meta_path.stat().st_mtime_ns))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _evict(self, keep: Path) -> None:
+        """超過磁碟預算時，從最久未存取的項目開始刪除"""
+        written = sum(keep.with_suffix(s).stat().st_size for s in ('.json', '.values', '.dates'))
+        if self._usage is not None:
+            self._usage += written
+            if self._usage <= self.max_bytes:
+                return
+
+        entries = self._scan_entries()
+        total = sum(size for _, size, _ in entries)
+        self._usage = total
+        if total <= self.max_bytes:
+            return
+
+        for meta_path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            if meta_path == keep:
+                continue
+            self._remove_entry(meta_path)
+            total -= size
+            self.stats['evictions'] += 1
+
+        self._usage = total
+        logger.info(f"Factor store evicted entries, usage now {total / 1024 / 1024:.1f} MB")
+
+
+# 全局實例
+factor_store = FactorStore(
+    root=qlib_config.factor_store_path,
+    max_bytes=qlib_config.factor_store_max_mb * 1024 * 1024,
+    enabled=qlib_config.factor_store_enabled,
+)
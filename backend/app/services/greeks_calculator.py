@@ -3,16 +3,33 @@ Black-Scholes Greeks Calculator
 
 使用 Black-Scholes 模型計算選擇權 Greeks
 支援：Delta, Gamma, Theta, Vega, Rho, Vanna
+
+兩種介面：
+- calculate_greeks：單一合約（純量）
+- calculate_chain_greeks：整條選擇權鏈（NumPy 陣列，一次計算所有合約的 Greeks 與隱含波動率）
 """
 
 import numpy as np
+import pandas as pd
 from scipy.stats import norm
+from scipy.special import ndtr
 from decimal import Decimal
 from typing import Dict, Optional
 from datetime import date, datetime
 from loguru import logger
 
 
+# 隱含波動率的合理範圍（與 estimate_volatility_from_option_prices 一致）
+IV_MIN = 0.01
+IV_MAX = 2.0
+
+# 無法反推隱含波動率時的近似波動率範圍
+APPROX_VOL_MIN = 0.05
+APPROX_VOL_MAX = 1.0
+
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+
 class BlackScholesGreeksCalculator:
     """Black-Scholes Greeks 計算器"""
 
@@ -96,6 +113,59 @@ class BlackScholesGreeksCalculator:
             )
             return self._empty_greeks()
 
+    def calculate_chain_greeks(
+        self,
+        spot_price,
+        strike_price,
+        time_to_expiry,
+        option_type,
+        option_price=None,
+        volatility=None
+    ) -> Dict[str, np.ndarray]:
+        """
+        一次計算整條選擇權鏈的 Greeks（向量化）
+
+        參數皆可為純量或等長陣列（自動廣播）。未指定 volatility 時，
+        以 option_price 反推隱含波動率；無法反推的合約改用近似波動率
+        （approximate_volatility，限制在 5%-100%）。
+
+        Args:
+            spot_price: 標的現價
+            strike_price: 履約價
+            time_to_expiry: 到期時間（年）
+            option_type: 選擇權類型（'CALL'/'PUT' 字串陣列）
+            option_price: 選擇權市價（反推隱含波動率用）
+            volatility: 波動率（年化），指定時不反推
+
+        Returns:
+            {delta, gamma, theta, vega, rho, vanna, implied_volatility, volatility}，
+            皆為 float64 陣列；輸入無效（價格或波動率非正、已到期）的合約為 NaN
+        """
+        is_call = np.asarray(option_type) == 'CALL'
+
+        if volatility is None:
+            if option_price is None:
+                raise ValueError("option_price or volatility is required")
+            implied = implied_volatility_chain(
+                spot_price, strike_price, time_to_expiry, option_price, is_call,
+                risk_free_rate=self.risk_free_rate
+            )
+            vol = np.where(
+                np.isnan(implied),
+                approximate_volatility(strike_price, option_price, time_to_expiry),
+                implied
+            )
+        else:
+            vol = np.asarray(volatility, dtype=np.float64)
+            implied = np.full(np.broadcast(vol, is_call).shape, np.nan)
+
+        greeks = black_scholes_greeks(
+            spot_price, strike_price, time_to_expiry, vol, is_call, self.risk_free_rate
+        )
+        greeks['implied_volatility'] = implied
+        greeks['volatility'] = np.where(np.isnan(greeks['delta']), np.nan, vol)
+        return greeks
+
     def _calculate_d1(
         self,
         spot_price: float,
@@ -271,6 +341,193 @@ def calculate_time_to_expiry(expiry_date: date, current_date: date) -> float:
     return days_to_expiry / 365.0
 
 
+def time_to_expiry_array(expiry_dates, current_date: date) -> np.ndarray:
+    """
+    計算多個合約的到期時間（年），與 calculate_time_to_expiry 相同規則（已到期為 0）
+
+    Args:
+        expiry_dates: 到期日序列（date / datetime / 字串）
+        current_date: 當前日期
+
+    Returns:
+        到期時間陣列（年）
+    """
+    expiry = pd.to_datetime(pd.Series(expiry_dates)).dt.normalize()
+    days = (expiry - pd.Timestamp(current_date)).dt.days.to_numpy(dtype=np.float64)
+    return np.where(days > 0, days / 365.0, 0.0)
+
+
+def approximate_volatility(strike_price, option_price, time_to_expiry) -> np.ndarray:
+    """
+    近似波動率：σ ≈ (P / K) × √(2π / T)，限制在 5%-100%
+
+    用於無法反推隱含波動率的合約（例如現價僅以 ATM 履約價近似時）。
+    """
+    strike = np.asarray(strike_price, dtype=np.float64)
+    price = np.asarray(option_price, dtype=np.float64)
+    t = np.asarray(time_to_expiry, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol = (price / strike) * np.sqrt(2 * np.pi / t)
+    return np.clip(vol, APPROX_VOL_MIN, APPROX_VOL_MAX)
+
+
+def _d1_d2(spot, strike, t, vol, r):
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(spot / strike) + (r + 0.5 * vol * vol) * t) / (vol * sqrt_t)
+    return d1, d1 - vol * sqrt_t, sqrt_t
+
+
+def black_scholes_price_chain(spot_price, strike_price, time_to_expiry, volatility, is_call,
+                              risk_free_rate: float = 0.01) -> np.ndarray:
+    """
+    Black-Scholes 理論價格（向量化）
+
+    Call = S·N(d1) - K·e^(-rT)·N(d2)
+    Put  = K·e^(-rT)·N(-d2) - S·N(-d1)
+
+    價內的一方以價外一方加上買賣權平價（Call - Put = S - K·e^(-rT)）計算：
+    深度價內時 N(d1)、N(d2) 趨近 1，直接相減會把時間價值淹沒在捨入誤差中，
+    反推隱含波動率時價格對波動率的變化無法分辨。
+    """
+    spot, strike, t, vol = (np.asarray(x, dtype=np.float64)
+                            for x in (spot_price, strike_price, time_to_expiry, volatility))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2, _ = _d1_d2(spot, strike, t, vol, risk_free_rate)
+        discounted_strike = strike * np.exp(-risk_free_rate * t)
+        call = spot * ndtr(d1) - discounted_strike * ndtr(d2)
+        put = discounted_strike * ndtr(-d2) - spot * ndtr(-d1)
+        parity = spot - discounted_strike
+        call = np.where(parity > 0, put + parity, call)
+        put = np.where(parity < 0, call - parity, put)
+    return np.where(is_call, call, put)
+
+
+def black_scholes_greeks(spot_price, strike_price, time_to_expiry, volatility, is_call,
+                         risk_free_rate: float = 0.01) -> Dict[str, np.ndarray]:
+    """
+    Black-Scholes Greeks（向量化）
+
+    公式與單位與 BlackScholesGreeksCalculator.calculate_greeks 相同：
+    Theta 為每日、Vega 與 Rho 為對 1% 變化的敏感度。
+    輸入無效（價格或波動率非正、已到期）的位置為 NaN。
+
+    Returns:
+        {delta, gamma, theta, vega, rho, vanna}
+    """
+    spot, strike, t, vol, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (spot_price, strike_price, time_to_expiry, volatility)),
+        np.asarray(is_call, dtype=bool)
+    )
+    valid = (spot > 0) & (strike > 0) & (t > 0) & (vol > 0)
+    r = risk_free_rate
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2, sqrt_t = _d1_d2(spot, strike, t, vol, r)
+        pdf_d1 = np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI
+        discount = np.exp(-r * t)
+        n_d2 = np.where(is_call, ndtr(d2), ndtr(-d2))
+        sign = np.where(is_call, 1.0, -1.0)
+
+        greeks = {
+            'delta': ndtr(d1) - np.where(is_call, 0.0, 1.0),
+            'gamma': pdf_d1 / (spot * vol * sqrt_t),
+            'theta': (-(spot * pdf_d1 * vol) / (2 * sqrt_t) - sign * r * strike * discount * n_d2) / 365.0,
+            'vega': spot * pdf_d1 * sqrt_t / 100.0,
+            'rho': sign * strike * t * discount * n_d2 / 100.0,
+            'vanna': -(pdf_d1 * d2) / vol,
+        }
+
+    return {name: np.where(valid, value, np.nan) for name, value in greeks.items()}
+
+
+def implied_volatility_chain(
+    spot_price,
+    strike_price,
+    time_to_expiry,
+    option_price,
+    is_call,
+    risk_free_rate: float = 0.01,
+    max_iterations: int = 100,
+    tolerance: float = 0.0001,
+    vol_min: float = IV_MIN,
+    vol_max: float = IV_MAX
+) -> np.ndarray:
+    """
+    向量化隱含波動率求解（安全 Newton 法）
+
+    理論價格對波動率單調遞增，每個合約維護 [lo, hi] 區間：
+    Newton 步落在區間外或 Vega 過小時改用二分法，保證收斂。
+    市價不在 [vol_min, vol_max] 對應的理論價格區間內（無解或超出合理範圍）者為 NaN。
+
+    Args:
+        spot_price / strike_price / time_to_expiry / option_price: 純量或等長陣列
+        is_call: 是否為買權（布林陣列）
+        risk_free_rate: 無風險利率
+        max_iterations: 最大迭代次數
+        tolerance: 波動率收斂容忍度（價格殘差 / Vega）
+        vol_min / vol_max: 波動率搜尋範圍
+
+    Returns:
+        隱含波動率陣列（無解為 NaN）
+    """
+    spot, strike, t, price, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (spot_price, strike_price, time_to_expiry, option_price)),
+        np.asarray(is_call, dtype=bool)
+    )
+    shape = spot.shape
+    spot, strike, t, price, is_call = (np.ravel(x) for x in (spot, strike, t, price, is_call))
+    iv = np.full(spot.shape, np.nan)
+
+    with np.errstate(invalid='ignore'):
+        valid = np.isfinite(spot + strike + t + price) & (spot > 0) & (strike > 0) & (t > 0) & (price > 0)
+    idx = np.flatnonzero(valid)
+    if idx.size == 0:
+        return iv.reshape(shape)
+
+    s, k, tt, p, c = spot[idx], strike[idx], t[idx], price[idx], is_call[idx]
+    r = risk_free_rate
+
+    # 市價必須落在搜尋範圍對應的理論價格之間
+    p_lo = black_scholes_price_chain(s, k, tt, vol_min, c, r)
+    p_hi = black_scholes_price_chain(s, k, tt, vol_max, c, r)
+    keep = (p >= p_lo) & (p <= p_hi)
+    idx, s, k, tt, p, c = idx[keep], s[keep], k[keep], tt[keep], p[keep], c[keep]
+
+    lo = np.full(idx.shape, vol_min)
+    hi = np.full(idx.shape, vol_max)
+    # 初始猜測：ATM 近似公式
+    sigma = np.clip(p / (s * np.sqrt(tt / (2 * np.pi))), vol_min, vol_max)
+    active = np.ones(idx.shape, dtype=bool)
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        a = np.flatnonzero(active)
+        sa = sigma[a]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d1, _, sqrt_t = _d1_d2(s[a], k[a], tt[a], sa, r)
+            diff = black_scholes_price_chain(s[a], k[a], tt[a], sa, c[a], r) - p[a]
+            vega = s[a] * np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI * sqrt_t
+
+            # 價格隨波動率遞增：縮小區間
+            hi[a] = np.where(diff > 0, sa, hi[a])
+            lo[a] = np.where(diff < 0, sa, lo[a])
+
+            newton = sa - diff / vega
+        bisect = 0.5 * (lo[a] + hi[a])
+        use_newton = np.isfinite(newton) & (newton > lo[a]) & (newton < hi[a])
+        step = np.where(use_newton, newton, bisect)
+
+        # 以價格殘差判斷收斂：|理論價 - 市價| / Vega 即目前波動率的誤差估計
+        with np.errstate(invalid='ignore'):
+            done = (np.abs(diff) <= tolerance * vega) | (hi[a] - lo[a] < tolerance)
+        sigma[a] = np.where(diff == 0, sa, step)
+        active[a[done]] = False
+
+    iv[idx[~active]] = sigma[~active]
+    return iv.reshape(shape)
+
+
 def estimate_volatility_from_option_prices(
     spot_price: float,
     strike_price: float,
@@ -282,7 +539,7 @@ def estimate_volatility_from_option_prices(
     tolerance: float = 0.0001
 ) -> Optional[float]:
     """
-    使用 Newton-Raphson 方法從選擇權價格反推隱含波動率
+    從選擇權價格反推隱含波動率（單一合約版的 implied_volatility_chain）
 
     Args:
         spot_price: 標的現價
@@ -295,57 +552,17 @@ def estimate_volatility_from_option_prices(
         tolerance: 收斂容忍度
 
     Returns:
-        隱含波動率（如果收斂）或 None
+        隱含波動率（如果收斂且在 1%-200% 內）或 None
     """
-    try:
-        from scipy.optimize import newton
-
-        def black_scholes_price(volatility):
-            """Black-Scholes 定價公式"""
-            if volatility <= 0:
-                return float('inf')
-
-            d1 = (np.log(spot_price / strike_price) +
-                  (risk_free_rate + 0.5 * volatility ** 2) * time_to_expiry) / \
-                 (volatility * np.sqrt(time_to_expiry))
-            d2 = d1 - volatility * np.sqrt(time_to_expiry)
-
-            if option_type == "CALL":
-                price = (spot_price * norm.cdf(d1) -
-                        strike_price * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2))
-            else:  # PUT
-                price = (strike_price * np.exp(-risk_free_rate * time_to_expiry) * norm.cdf(-d2) -
-                        spot_price * norm.cdf(-d1))
-
-            return price
-
-        def objective(volatility):
-            """目標函數：理論價格 - 市價"""
-            return black_scholes_price(volatility) - option_price
-
-        # 初始猜測：使用 ATM 近似公式
-        initial_guess = option_price / (spot_price * np.sqrt(time_to_expiry / (2 * np.pi)))
-        initial_guess = max(0.01, min(initial_guess, 2.0))  # 限制在 1%-200%
-
-        # Newton-Raphson 求解
-        implied_vol = newton(
-            objective,
-            initial_guess,
-            maxiter=max_iterations,
-            tol=tolerance
-        )
-
-        # 合理性檢查
-        if 0.01 <= implied_vol <= 2.0:
-            return implied_vol
-        else:
-            logger.warning(
-                f"[GREEKS] Implied volatility out of range: {implied_vol:.4f}"
-            )
-            return None
-
-    except Exception as e:
+    implied_vol = implied_volatility_chain(
+        spot_price, strike_price, time_to_expiry, option_price, option_type == "CALL",
+        risk_free_rate=risk_free_rate, max_iterations=max_iterations, tolerance=tolerance
+    )
+    value = float(implied_vol)
+    if np.isnan(value):
         logger.debug(
-            f"[GREEKS] IV calculation failed: {type(e).__name__}: {str(e)}"
+            f"[GREEKS] IV calculation failed: no solution in [{IV_MIN}, {IV_MAX}] "
+            f"for price={option_price}, strike={strike_price}"
         )
         return None
+    return value
@@ -3,7 +3,7 @@ Industry Service
 
 Business logic for industry classification and metrics aggregation.
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 from datetime import date, datetime
 from statistics import mean
@@ -17,6 +17,29 @@ from app.utils.cache import cache
 from loguru import logger
 
 
+# Key indicators aggregated per industry
+FUNDAMENTAL_INDICATORS = [
+    "ROE稅後", "ROA稅後息前", "營業毛利率", "營業利益率",
+    "每股稅後淨利", "營收成長率", "稅後淨利成長率"
+]
+
+# Number of quarters in trend_data (including current)
+TREND_QUARTERS = 10
+
+# Redis TTL for computed industry metrics (30 days)
+INDUSTRY_METRICS_CACHE_TTL = 86400 * 30
+
+# Industry tree cache TTL; the key carries the table version, so changes never serve a stale tree
+INDUSTRY_TREE_CACHE_TTL = 86400
+
+# Stock ID -> name lookup from FinLab company_basic_info
+STOCK_NAMES_CACHE_KEY = "industry:stock_names"
+STOCK_NAMES_CACHE_TTL = 86400
+
+# Quarter -> (month, day) of the quarter end, used as industry_metrics_cache.date
+QUARTER_END_MONTH_DAY = {"Q1": (3, 31), "Q2": (6, 30), "Q3": (9, 30), "Q4": (12, 31)}
+
+
 class IndustryService:
     """Service layer for industry-related business logic."""
 
@@ -58,47 +81,54 @@ class IndustryService:
         """
         Get complete industry tree structure.
 
+        The serialized tree is cached under the current industries /
+        stock_industries version, so it is only rebuilt after those tables change.
+
         Returns:
             List of industry trees with nested children
         """
-        roots = self.get_root_industries()
-        trees = []
-
-        for root in roots:
-            tree = self._build_industry_tree(root)
-            trees.append(tree)
-
-        return trees
+        version = self.repo.get_industry_tree_version(self.db)
+        return cache.get_or_set(
+            f"industry_tree:{version}",
+            self._build_industry_tree,
+            expiry=INDUSTRY_TREE_CACHE_TTL
+        )
 
-    def _build_industry_tree(self, industry: Industry) -> Dict[str, Any]:
+    def _build_industry_tree(self) -> List[Dict[str, Any]]:
         """
-        Recursively build industry tree.
-
-        Args:
-            industry: Industry node
+        Build the industry tree from one adjacency query and one grouped count query.
 
         Returns:
-            Industry dict with nested children
+            Root industry dicts with nested children (ordered by code)
         """
-        # Get children
-        children = self.repo.get_all_industries(
-            self.db, parent_code=industry.code
+        industries = self.repo.get_all_industries(self.db)
+        stock_counts = self.repo.get_stock_counts_bulk(
+            self.db, [industry.code for industry in industries]
         )
 
-        # Build tree
-        tree = {
-            "code": industry.code,
-            "name_zh": industry.name_zh,
-            "name_en": industry.name_en,
-            "level": industry.level,
-            "parent_code": industry.parent_code,
-            "stock_count": self.repo.get_stock_count_by_industry(
-                self.db, industry.code
-            ),
-            "children": [self._build_industry_tree(child) for child in children]
+        nodes = {
+            industry.code: {
+                "code": industry.code,
+                "name_zh": industry.name_zh,
+                "name_en": industry.name_en,
+                "level": industry.level,
+                "parent_code": industry.parent_code,
+                "stock_count": stock_counts.get(industry.code, 0),
+                "children": []
+            }
+            for industry in industries
         }
 
-        return tree
+        # Industries are ordered by code, so children keep the same order
+        trees = []
+        for industry in industries:
+            node = nodes[industry.code]
+            if industry.parent_code is None:
+                trees.append(node)
+            elif industry.parent_code in nodes:
+                nodes[industry.parent_code]["children"].append(node)
+
+        return trees
 
     # Stock-Industry Relationship Methods
 
@@ -114,8 +144,6 @@ class IndustryService:
         self, industry_code: str, primary_only: bool = False
     ) -> List[Dict[str, str]]:
         """Get stocks associated with an industry with names."""
-        from finlab import data
-
         # Get stock IDs from database
         stock_ids = self.repo.get_stocks_by_industry(
             self.db, industry_code, primary_only
@@ -123,29 +151,34 @@ class IndustryService:
 
         # Get stock names from FinLab
         try:
-            company_info = data.get('company_basic_info')
-
-            # Build stock info list
-            stocks_with_names = []
-            for stock_id in stock_ids:
-                # Find stock name
-                stock_data = company_info[company_info['stock_id'] == stock_id]
-                if len(stock_data) > 0:
-                    stock_name = stock_data.iloc[0]['公司簡稱']
-                else:
-                    stock_name = stock_id  # Fallback to stock ID
-
-                stocks_with_names.append({
-                    'stock_id': stock_id,
-                    'stock_name': stock_name
-                })
-
-            return stocks_with_names
+            stock_names = self._get_stock_names()
+            return [
+                {'stock_id': sid, 'stock_name': stock_names.get(sid, sid)}
+                for sid in stock_ids
+            ]
         except Exception as e:
             logger.warning(f"Failed to get stock names: {str(e)}, returning IDs only")
             # Fallback: return just IDs
             return [{'stock_id': sid, 'stock_name': sid} for sid in stock_ids]
 
+    def _get_stock_names(self) -> Dict[str, str]:
+        """Get stock ID -> short name lookup (cached, FinLab is read at most once a day)."""
+        return cache.get_or_set(
+            STOCK_NAMES_CACHE_KEY,
+            self._load_stock_names,
+            expiry=STOCK_NAMES_CACHE_TTL
+        )
+
+    @staticmethod
+    def _load_stock_names() -> Dict[str, str]:
+        """Build the stock name lookup from FinLab company_basic_info."""
+        from finlab import data
+
+        company_info = data.get('company_basic_info')
+        # Keep the first row per stock (same as the previous per-stock lookup)
+        company_info = company_info.drop_duplicates(subset='stock_id', keep='first')
+        return dict(zip(company_info['stock_id'], company_info['公司簡稱']))
+
     # Industry Metrics Calculation Methods
 
     def _get_previous_quarter(self, quarter_str: str) -> Optional[str]:
@@ -196,6 +229,128 @@ class IndustryService:
 
         return quarters
 
+    def _get_quarter_end_date(self, quarter_str: str) -> Optional[date]:
+        """
+        Get the last calendar day of a quarter.
+
+        Args:
+            quarter_str: Quarter string like "2025-Q3"
+
+        Returns:
+            Quarter end date like date(2025, 9, 30), or None if invalid
+        """
+        try:
+            year, q = quarter_str.split('-')
+            month, day = QUARTER_END_MONTH_DAY[q]
+            return date(int(year), month, day)
+        except Exception:
+            logger.warning(f"Failed to parse quarter string '{quarter_str}'")
+            return None
+
+    def _get_latest_quarter(self) -> Optional[str]:
+        """Get the latest quarter available in fundamental_data (e.g., "2025-Q3")."""
+        from sqlalchemy import text
+
+        # Fundamental data uses quarter format like "2024-Q4", not daily dates
+        result = self.db.execute(
+            text("SELECT date FROM fundamental_data ORDER BY date DESC LIMIT 1")
+        ).fetchone()
+        return result[0] if result else None
+
+    def _aggregate_fundamentals(
+        self,
+        quarters: List[str],
+        industry_codes: Optional[List[str]] = None,
+        indicators: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Dict[str, Tuple[float, int]]]]:
+        """
+        Average indicators per industry and quarter with a single grouped query.
+
+        Args:
+            quarters: Quarter strings to aggregate
+            industry_codes: Industries to aggregate (None = all industries)
+            indicators: Indicator names (defaults to FUNDAMENTAL_INDICATORS)
+
+        Returns:
+            {industry_code: {indicator: {quarter: (average, sample_size)}}}
+        """
+        rows = self.repo.aggregate_fundamentals(
+            self.db,
+            indicators or FUNDAMENTAL_INDICATORS,
+            quarters,
+            industry_codes=industry_codes,
+            primary_only=True
+        )
+
+        aggregates: Dict[str, Dict[str, Dict[str, Tuple[float, int]]]] = {}
+        for industry_code, indicator, quarter, average, sample_size in rows:
+            aggregates.setdefault(industry_code, {}).setdefault(indicator, {})[quarter] = (
+                average, sample_size
+            )
+        return aggregates
+
+    def _build_industry_metrics(
+        self,
+        industry_code: str,
+        latest_quarter: str,
+        stocks_count: int,
+        aggregates: Dict[str, Dict[str, Tuple[float, int]]]
+    ) -> Dict[str, Any]:
+        """
+        Build the industry metrics response from per-quarter aggregates.
+
+        Args:
+            industry_code: Industry code
+            latest_quarter: Current quarter (e.g., "2025-Q3")
+            stocks_count: Number of stocks in the industry
+            aggregates: {indicator: {quarter: (average, sample_size)}}
+
+        Returns:
+            Dict containing aggregated metrics
+        """
+        previous_quarter = self._get_previous_quarter(latest_quarter)
+        last_quarters = self._get_last_n_quarters(latest_quarter, TREND_QUARTERS)
+
+        metrics = {}
+        for indicator in FUNDAMENTAL_INDICATORS:
+            by_quarter = aggregates.get(indicator, {})
+            if latest_quarter not in by_quarter:
+                continue
+
+            avg_value, sample_size = by_quarter[latest_quarter]
+            prev_avg = by_quarter[previous_quarter][0] if previous_quarter in by_quarter else None
+
+            # Calculate change percent
+            change_percent = None
+            if prev_avg and prev_avg != 0:
+                change_percent = round(((avg_value - prev_avg) / prev_avg) * 100, 2)
+
+            # Trend data (last N quarters, newest first)
+            trend_values = [
+                round(by_quarter[quarter][0], 4) if quarter in by_quarter else None
+                for quarter in last_quarters
+            ]
+
+            metrics[indicator] = {
+                "average": round(avg_value, 4),
+                "sample_size": sample_size,
+                "previous_value": round(prev_avg, 4) if prev_avg else None,
+                "change_percent": change_percent,
+                "trend_data": trend_values if any(v is not None for v in trend_values) else None
+            }
+
+        return {
+            "industry_code": industry_code,
+            "date": latest_quarter,
+            "stocks_count": stocks_count,
+            "stocks_with_data_count": max(
+                (m.get('sample_size', 0) for m in metrics.values()),
+                default=0
+            ),
+            "metrics": metrics,
+            "has_data": len(metrics) > 0
+        }
+
     def calculate_industry_fundamental_metrics(
         self,
         industry_code: str,
@@ -206,7 +361,8 @@ class IndustryService:
         Calculate aggregated fundamental metrics for an industry.
 
         Calculates average values for key financial metrics across all stocks
-        in the industry.
+        in the industry. Current, previous and trend averages come from one
+        grouped query; precompute_industry_metrics warms the cache nightly.
 
         Args:
             industry_code: Industry code
@@ -216,14 +372,9 @@ class IndustryService:
         Returns:
             Dict containing aggregated metrics
         """
-        # Get latest available quarter from fundamental_data
-        # Fundamental data uses quarter format like "2024-Q4", not daily dates
-        from sqlalchemy import text
-        latest_quarter_result = self.db.execute(
-            text("SELECT date FROM fundamental_data ORDER BY date DESC LIMIT 1")
-        ).fetchone()
+        latest_quarter = self._get_latest_quarter()
 
-        if not latest_quarter_result:
+        if not latest_quarter:
             logger.warning("No fundamental data available in database")
             return {
                 "industry_code": industry_code,
@@ -232,7 +383,6 @@ class IndustryService:
                 "metrics": {}
             }
 
-        latest_quarter = latest_quarter_result[0]
         logger.info(f"Using latest available quarter: {latest_quarter}")
 
         # Check cache first (using quarter string as key)
@@ -246,10 +396,12 @@ class IndustryService:
                 )
                 return cached_value
 
-        # Get all stocks in this industry
-        stocks_with_info = self.get_stocks_by_industry(industry_code, primary_only=True)
+        # Count stocks in this industry (names are not needed here)
+        stocks_count = len(
+            self.repo.get_stocks_by_industry(self.db, industry_code, primary_only=True)
+        )
 
-        if not stocks_with_info:
+        if not stocks_count:
             logger.warning(f"No stocks found for industry {industry_code}")
             return {
                 "industry_code": industry_code,
@@ -258,161 +410,95 @@ class IndustryService:
                 "metrics": {}
             }
 
-        # Extract stock IDs from the list of dicts
-        stock_ids = [stock['stock_id'] for stock in stocks_with_info]
-        logger.info(f"Processing {len(stock_ids)} stocks for industry {industry_code}")
+        aggregates = self._aggregate_fundamentals(
+            self._get_last_n_quarters(latest_quarter, TREND_QUARTERS),
+            industry_codes=[industry_code]
+        )
+        result = self._build_industry_metrics(
+            industry_code, latest_quarter, stocks_count,
+            aggregates.get(industry_code, {})
+        )
+        cache.set(cache_key, result, expiry=INDUSTRY_METRICS_CACHE_TTL)
 
-        # Get previous quarter for comparison
-        previous_quarter = self._get_previous_quarter(latest_quarter)
+        logger.info(
+            f"Calculated industry metrics for {industry_code}: "
+            f"{len(result['metrics'])} indicators, {stocks_count} stocks, "
+            f"{result['stocks_with_data_count']} stocks with data"
+        )
 
-        # Get last 10 quarters for trend data
-        last_10_quarters = self._get_last_n_quarters(latest_quarter, 10)
+        return result
 
-        # Calculate metrics for each indicator
-        metrics = {}
-        indicators = [
-            "ROE稅後", "ROA稅後息前", "營業毛利率", "營業利益率",
-            "每股稅後淨利", "營收成長率", "稅後淨利成長率"
-        ]
+    def precompute_industry_metrics(self) -> Dict[str, Any]:
+        """
+        Precompute fundamental metrics for all industries in one pass.
 
-        for indicator in indicators:
-            # Current quarter values
-            values = []
+        Runs one grouped query over every industry, warms the Redis entries read
+        by calculate_industry_fundamental_metrics and upserts the per-quarter
+        "avg_<indicator>" rows in industry_metrics_cache.
 
-            # Previous quarter values
-            prev_values = []
+        Returns:
+            Dict with the quarter and counts of industries / cache rows written
+        """
+        latest_quarter = self._get_latest_quarter()
+        if not latest_quarter:
+            logger.warning("No fundamental data available in database")
+            return {"date": None, "industries": 0, "cache_rows": 0}
 
-            # Trend data (last 10 quarters)
-            trend_values = []
+        industry_codes = [industry.code for industry in self.repo.get_all_industries(self.db)]
+        stocks_counts = self.repo.get_stock_counts_bulk(
+            self.db, industry_codes, primary_only=True
+        )
+        aggregates = self._aggregate_fundamentals(
+            self._get_last_n_quarters(latest_quarter, TREND_QUARTERS)
+        )
 
-            # Get indicator data for each stock (using quarter string)
-            for stock_id in stock_ids:
-                try:
-                    # Current quarter
-                    data = self.db.execute(
-                        text("""
-                            SELECT value
-                            FROM fundamental_data
-                            WHERE stock_id = :stock_id
-                              AND indicator = :indicator
-                              AND date = :quarter
-                        """),
-                        {
-                            "stock_id": stock_id,
-                            "indicator": indicator,
-                            "quarter": latest_quarter
-                        }
-                    ).fetchone()
-
-                    if data and data[0] is not None:
-                        values.append(float(data[0]))
-
-                except Exception as e:
-                    logger.debug(
-                        f"Could not get {indicator} for {stock_id}: {str(e)}"
-                    )
-                    continue
+        quarter_dates: Dict[str, Optional[date]] = {}
+        rows = []
+        industries = 0
 
-            # Get previous quarter average
-            if previous_quarter:
-                for stock_id in stock_ids:
-                    try:
-                        prev_data = self.db.execute(
-                            text("""
-                                SELECT value
-                                FROM fundamental_data
-                                WHERE stock_id = :stock_id
-                                  AND indicator = :indicator
-                                  AND date = :quarter
-                            """),
-                            {
-                                "stock_id": stock_id,
-                                "indicator": indicator,
-                                "quarter": previous_quarter
-                            }
-                        ).fetchone()
-
-                        if prev_data and prev_data[0] is not None:
-                            prev_values.append(float(prev_data[0]))
-                    except Exception:
-                        continue
+        for industry_code in industry_codes:
+            stocks_count = stocks_counts.get(industry_code, 0)
+            if not stocks_count:
+                continue
 
-            # Get trend data (last 10 quarters average)
-            for quarter in last_10_quarters:
-                quarter_values = []
-                for stock_id in stock_ids:
-                    try:
-                        trend_data = self.db.execute(
-                            text("""
-                                SELECT value
-                                FROM fundamental_data
-                                WHERE stock_id = :stock_id
-                                  AND indicator = :indicator
-                                  AND date = :quarter
-                            """),
-                            {
-                                "stock_id": stock_id,
-                                "indicator": indicator,
-                                "quarter": quarter
-                            }
-                        ).fetchone()
-
-                        if trend_data and trend_data[0] is not None:
-                            quarter_values.append(float(trend_data[0]))
-                    except Exception:
-                        continue
+            industry_aggregates = aggregates.get(industry_code, {})
+            result = self._build_industry_metrics(
+                industry_code, latest_quarter, stocks_count, industry_aggregates
+            )
+            cache.set(
+                f"industry_metrics:{industry_code}:{latest_quarter}",
+                result,
+                expiry=INDUSTRY_METRICS_CACHE_TTL
+            )
+            industries += 1
 
-                # Calculate average for this quarter
-                if quarter_values:
-                    trend_values.append(round(mean(quarter_values), 4))
-                else:
-                    trend_values.append(None)
+            for indicator, by_quarter in industry_aggregates.items():
+                for quarter, (average, sample_size) in by_quarter.items():
+                    if quarter not in quarter_dates:
+                        quarter_dates[quarter] = self._get_quarter_end_date(quarter)
+                    if quarter_dates[quarter] is None:
+                        continue
+                    rows.append({
+                        "industry_code": industry_code,
+                        "date": quarter_dates[quarter],
+                        "metric_name": f"avg_{indicator}",
+                        "value": round(average, 4),
+                        "stocks_count": sample_size
+                    })
 
-            # Calculate average if we have values
-            if values:
-                avg_value = mean(values)
-                prev_avg = mean(prev_values) if prev_values else None
-
-                # Calculate change percent
-                change_percent = None
-                if prev_avg and prev_avg != 0:
-                    change_percent = round(((avg_value - prev_avg) / prev_avg) * 100, 2)
-
-                metrics[indicator] = {
-                    "average": round(avg_value, 4),
-                    "sample_size": len(values),
-                    "previous_value": round(prev_avg, 4) if prev_avg else None,
-                    "change_percent": change_percent,
-                    "trend_data": trend_values if any(v is not None for v in trend_values) else None
-                }
+        counts = self.repo.bulk_upsert_industry_metrics(self.db, rows)
 
-        # Check how many stocks have data
-        stocks_with_data = sum(
-            1 for indicator_data in metrics.values()
-            if indicator_data.get('sample_size', 0) > 0
+        logger.info(
+            f"Precomputed industry metrics for {latest_quarter}: "
+            f"{industries} industries, {len(rows)} cache rows "
+            f"({counts['inserted']} inserted, {counts['updated']} updated)"
         )
 
-        # Cache the result (30 days TTL)
-        result = {
-            "industry_code": industry_code,
+        return {
             "date": latest_quarter,
-            "stocks_count": len(stock_ids),
-            "stocks_with_data_count": max(
-                (m.get('sample_size', 0) for m in metrics.values()),
-                default=0
-            ),
-            "metrics": metrics,
-            "has_data": len(metrics) > 0
+            "industries": industries,
+            "cache_rows": len(rows)
         }
-        cache.set(cache_key, result, expiry=86400 * 30)  # 30 days
-
-        logger.info(
-            f"Calculated industry metrics for {industry_code}: "
-            f"{len(metrics)} indicators, {len(stock_ids)} stocks, "
-            f"{result['stocks_with_data_count']} stocks with data"
-        )
-
-        return result
 
     def get_industry_metrics_historical(
         self,
@@ -665,75 +751,43 @@ class IndustryService:
         Returns:
             Dict containing comparison data
         """
-        from sqlalchemy import text
+        latest_quarter = self._get_latest_quarter()
 
-        # Get latest quarter
-        latest_quarter_result = self.db.execute(
-            text("SELECT date FROM fundamental_data ORDER BY date DESC LIMIT 1")
-        ).fetchone()
-
-        if not latest_quarter_result:
+        if not latest_quarter:
             return {
                 "metric_name": metric_name,
                 "date": "N/A",
                 "industries": []
             }
 
-        latest_quarter = latest_quarter_result[0]
+        # Industry info and averages for all requested industries in one query each
+        industries = {
+            industry.code: industry
+            for industry in self.repo.get_industries_by_codes(self.db, industry_codes)
+        }
+        aggregates = self._aggregate_fundamentals(
+            [latest_quarter],
+            industry_codes=list(industries),
+            indicators=[metric_name]
+        )
 
-        # Get metrics for each industry
         comparison_data = []
         for industry_code in industry_codes:
-            # Get industry info
-            industry = self.get_industry_by_code(industry_code)
+            industry = industries.get(industry_code)
             if not industry:
                 continue
 
-            # Get stocks in this industry
-            stocks_with_info = self.get_stocks_by_industry(industry_code, primary_only=True)
-            stock_ids = [stock['stock_id'] for stock in stocks_with_info]
-
-            if not stock_ids:
-                comparison_data.append({
-                    "industry_code": industry_code,
-                    "industry_name": industry.name_zh,
-                    "value": None,
-                    "sample_size": 0
-                })
-                continue
-
-            # Get indicator data for each stock
-            values = []
-            for stock_id in stock_ids:
-                try:
-                    data = self.db.execute(
-                        text("""
-                            SELECT value
-                            FROM fundamental_data
-                            WHERE stock_id = :stock_id
-                              AND indicator = :indicator
-                              AND date = :quarter
-                        """),
-                        {
-                            "stock_id": stock_id,
-                            "indicator": metric_name,
-                            "quarter": latest_quarter
-                        }
-                    ).fetchone()
-
-                    if data and data[0] is not None:
-                        values.append(float(data[0]))
-                except Exception:
-                    continue
-
-            # Calculate average
-            avg_value = mean(values) if values else None
+            avg_value, sample_size = (
+                aggregates.get(industry_code, {})
+                .get(metric_name, {})
+                .get(latest_quarter, (None, 0))
+            )
 
             comparison_data.append({
                 "industry_code": industry_code,
                 "industry_name": industry.name_zh,
                 "value": round(avg_value, 4) if avg_value else None,
-                "sample_size": len(values)
+                "sample_size": sample_size
             })
 
         return {
@@ -0,0 +1,487 @@
+"""
+分鐘線同步管線
+
+將「逐檔抓取 → 寫 PostgreSQL → 寫 Qlib → 下一檔」的循序流程拆成四個階段，
+以有界佇列串接，各階段同時運作：
+
+    plan + fetch（N 執行緒，受速率限制） → decode（正規化） → ┬ DB writer
+                                                               └ Qlib writer
+
+- fetch 階段以執行緒池並發呼叫 Shioaji（I/O 等待為主），RateLimiter 控制每個時間窗的呼叫數
+  （同步腳本傳入行程共用的 Shioaji 行情額度，與選擇權 snapshots 共享）
+- 佇列有上限：下游寫入跟不上時，上游自動阻塞（backpressure），記憶體用量有界
+- DB 與 Qlib 各只有一個寫入執行緒（SQLAlchemy Session 與 Qlib 檔案寫入皆非執行緒安全）
+- 兩個寫入端都成功後才寫入 checkpoint；中斷後重跑會跳過已完成的標的
+- 每個階段記錄處理筆數、錯誤數與忙碌時間，結束時輸出吞吐量
+
+StubShioajiClient 提供與 ShioajiClient 相同介面的離線假資料，用於基準測試與單元測試。
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from queue import Empty, Queue
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.utils.rate_limiter import RateLimiter
+
+
+# 佇列結束標記
+_DONE = object()
+
+
+def kbars_to_dataframe(kbars) -> Optional[pd.DataFrame]:
+    """
+    將 Shioaji Kbars 物件（ts/Open/High/Low/Close/Volume 序列）向量化轉為 DataFrame
+
+    ts 為台灣本地時間的 nanosecond 時間戳，直接轉為 naive datetime（見 TIMEZONE_STRATEGY.md）。
+
+    Returns:
+        columns=[datetime, open, high, low, close, volume]；沒有資料時返回 None
+    """
+    if kbars is None or len(kbars.ts) == 0:
+        return None
+
+    return pd.DataFrame({
+        'datetime': pd.to_datetime(np.asarray(kbars.ts, dtype=np.int64), unit='ns'),
+        'open': np.asarray(kbars.Open, dtype=np.float64),
+        'high': np.asarray(kbars.High, dtype=np.float64),
+        'low': np.asarray(kbars.Low, dtype=np.float64),
+        'close': np.asarray(kbars.Close, dtype=np.float64),
+        'volume': np.asarray(kbars.Volume, dtype=np.int64),
+    })
+
+
+@dataclass
+class StageMetrics:
+    """單一階段的吞吐量統計"""
+
+    name: str
+    workers: int = 1
+    items: int = 0
+    errors: int = 0
+    rows: int = 0
+    busy_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, seconds: float, rows: int = 0, error: bool = False):
+        with self._lock:
+            self.items += 1
+            self.rows += rows
+            self.busy_seconds += seconds
+            if error:
+                self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        """
+        Args:
+            elapsed: 管線總執行時間（秒）
+
+        Returns:
+            items/errors/rows、每秒處理數與利用率（忙碌時間 / 可用執行緒時間）
+        """
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "rows": self.rows,
+            "items_per_second": self.items / elapsed if elapsed > 0 else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": self.busy_seconds / (elapsed * self.workers) if elapsed > 0 else 0.0,
+        }
+
+
+class SyncCheckpoint:
+    """
+    可續傳的同步進度（純文字、只追加）
+
+    第一行為本次同步的識別鍵（例如 "smart:2025-12-13"），之後每行一個已完成的標的。
+    識別鍵不同時視為新的同步，舊進度作廢。
+    """
+
+    def __init__(self, path: str, key: str):
+        self.path = Path(path)
+        self.key = key
+        self._lock = threading.Lock()
+        self.completed: Set[str] = self._load()
+
+    def _load(self) -> Set[str]:
+        if self.path.exists():
+            lines = self.path.read_text().splitlines()
+            if lines and lines[0] == self.key:
+                return {line for line in lines[1:] if line}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(self.key + "\n")
+        return set()
+
+    def mark(self, stock_id: str):
+        """記錄標的已完成（立即 flush，程序中斷也不會遺失）"""
+        with self._lock:
+            if stock_id in self.completed:
+                return
+            self.completed.add(stock_id)
+            with self.path.open('a') as f:
+                f.write(stock_id + "\n")
+
+    def clear(self):
+        """整批同步完成後刪除進度檔"""
+        self.path.unlink(missing_ok=True)
+
+
+@dataclass
+class SyncJob:
+    """單一標的的同步工作（在各階段間傳遞）"""
+
+    stock_id: str
+    start_date: date
+    end_date: date
+    sync_type: str = 'user_specified'
+    actual_id: Optional[str] = None
+    payload: Any = None
+    data: Optional[pd.DataFrame] = None
+    context: Dict[str, Any] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    db_rows: int = 0
+    qlib_ok: bool = False
+    _pending: int = 0
+
+
+@dataclass
+class PipelineResult:
+    """管線執行結果"""
+
+    total: int = 0
+    resumed: int = 0
+    skipped: int = 0
+    no_data: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    db_rows: int = 0
+    qlib_updated: int = 0
+    elapsed: float = 0.0
+    sync_types: Dict[str, int] = field(default_factory=dict)
+    stages: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    failures: Dict[str, List[str]] = field(default_factory=dict)
+
+    def log_summary(self):
+        logger.info(f"{'='*60}")
+        logger.info(f"🎉 管線同步完成（{self.elapsed:.1f}s）")
+        logger.info(
+            f"   標的: {self.total} | 成功 {self.succeeded} | 無數據 {self.no_data} | "
+            f"已最新 {self.skipped} | 續傳略過 {self.resumed} | 失敗 {self.failed}"
+        )
+        if self.sync_types:
+            logger.info(f"   同步類型: {self.sync_types}")
+        logger.info(f"   💾 PostgreSQL: {self.db_rows:,} 筆 | 📈 Qlib: {self.qlib_updated} 檔")
+        for name, stats in self.stages.items():
+            logger.info(
+                f"   [{name:<6}] {stats['items']:>6} 項 {stats['rows']:>10,} 筆 "
+                f"{stats['items_per_second']:>7.2f} 項/s  利用率 {stats['utilization']:>5.0%}  "
+                f"錯誤 {stats['errors']}"
+            )
+        logger.info(f"{'='*60}")
+
+
+class MinuteSyncPipeline:
+    """
+    分階段、有界並發的分鐘線同步管線
+
+    各階段以回呼函數注入，與資料來源/儲存解耦：
+        plan(stock_id) -> Optional[SyncJob]       決定同步區間；None 表示已是最新
+        fetch(job) -> Any                         呼叫 API（可設定 job.actual_id）；None 表示無數據
+        decode(job, payload) -> Optional[DataFrame]  轉換/正規化；可在 job.context 放寫入端需要的資料
+        write_db(job, df) -> int                  寫入 PostgreSQL，返回筆數
+        write_qlib(job, df) -> bool               寫入 Qlib
+
+    用法：
+        pipeline = MinuteSyncPipeline(plan, fetch, decode, write_db, write_qlib, fetch_workers=4)
+        result = pipeline.run(stock_ids)
+    """
+
+    def __init__(
+        self,
+        plan: Callable[[str], Optional[SyncJob]],
+        fetch: Callable[[SyncJob], Any],
+        decode: Callable[[SyncJob, Any], Optional[pd.DataFrame]],
+        write_db: Optional[Callable[[SyncJob, pd.DataFrame], int]] = None,
+        write_qlib: Optional[Callable[[SyncJob, pd.DataFrame], bool]] = None,
+        fetch_workers: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+        queue_size: int = 16,
+        checkpoint: Optional[SyncCheckpoint] = None,
+        progress_interval: float = 30.0
+    ):
+        self.plan = plan
+        self.fetch = fetch
+        self.decode = decode
+        self.write_db = write_db
+        self.write_qlib = write_qlib
+        self.fetch_workers = max(1, fetch_workers)
+        self.rate_limiter = rate_limiter
+        self.queue_size = max(1, queue_size)
+        self.checkpoint = checkpoint
+        self.progress_interval = progress_interval
+
+        self._writers = [
+            (name, writer)
+            for name, writer in (('db', write_db), ('qlib', write_qlib))
+            if writer is not None
+        ]
+
+    def run(self, stock_ids: Iterable[str]) -> PipelineResult:
+        """
+        同步所有標的，阻塞直到全部階段完成
+
+        Returns:
+            PipelineResult（含各階段吞吐量）
+        """
+        stock_ids = list(dict.fromkeys(stock_ids))
+        result = PipelineResult(total=len(stock_ids))
+
+        if self.checkpoint:
+            pending = [s for s in stock_ids if s not in self.checkpoint.completed]
+            result.resumed = len(stock_ids) - len(pending)
+            if result.resumed:
+                logger.info(f"⏩ 續傳：略過已完成的 {result.resumed} 檔")
+        else:
+            pending = stock_ids
+
+        self._result = result
+        self._result_lock = threading.Lock()
+        self._metrics = {
+            'fetch': StageMetrics('fetch', workers=self.fetch_workers),
+            'decode': StageMetrics('decode'),
+            **{name: StageMetrics(name) for name, _ in self._writers},
+        }
+
+        task_queue: Queue = Queue()
+        for stock_id in pending:
+            task_queue.put(stock_id)
+        decode_queue: Queue = Queue(maxsize=self.queue_size)
+        writer_queues = {name: Queue(maxsize=self.queue_size) for name, _ in self._writers}
+
+        fetchers = [
+            threading.Thread(target=self._fetch_loop, args=(task_queue, decode_queue), name=f"fetch-{i}", daemon=True)
+            for i in range(self.fetch_workers)
+        ]
+        decoder = threading.Thread(
+            target=self._decode_loop, args=(decode_queue, writer_queues), name="decode", daemon=True
+        )
+        writers = [
+            threading.Thread(target=self._write_loop, args=(name, writer, writer_queues[name]), name=name, daemon=True)
+            for name, writer in self._writers
+        ]
+
+        start = time.monotonic()
+        for thread in [*fetchers, decoder, *writers]:
+            thread.start()
+
+        self._wait(fetchers, start, len(pending))
+        decode_queue.put(_DONE)
+        decoder.join()
+        for thread in writers:
+            thread.join()
+
+        result.elapsed = time.monotonic() - start
+        result.stages = {name: metrics.summary(result.elapsed) for name, metrics in self._metrics.items()}
+        return result
+
+    def _wait(self, fetchers: List[threading.Thread], start: float, total: int):
+        """等待 fetch 階段結束，定期輸出進度"""
+        for thread in fetchers:
+            while thread.is_alive():
+                thread.join(self.progress_interval)
+                if thread.is_alive():
+                    done = self._metrics['fetch'].items
+                    logger.info(
+                        f"📊 進度: 已抓取 {done}/{total} 檔 ({time.monotonic() - start:.0f}s) | "
+                        f"已完成 {self._result.succeeded + self._result.no_data + self._result.skipped}"
+                    )
+
+    def _fetch_loop(self, task_queue: Queue, decode_queue: Queue):
+        while True:
+            try:
+                stock_id = task_queue.get_nowait()
+            except Empty:
+                return
+
+            t0 = time.monotonic()
+            job = None
+            try:
+                job = self.plan(stock_id)
+                if job is None:
+                    self._metrics['fetch'].record(time.monotonic() - t0)
+                    self._finish_skipped(stock_id)
+                    continue
+
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                job.payload = self.fetch(job)
+                self._metrics['fetch'].record(time.monotonic() - t0)
+            except Exception as e:
+                self._metrics['fetch'].record(time.monotonic() - t0, error=True)
+                logger.error(f"  ❌ {stock_id}: 抓取失敗 - {e}")
+                job = job or SyncJob(stock_id, None, None)
+                job.errors.append(f"fetch: {e}")
+                job.payload = None
+
+            # 佇列已滿時在此阻塞（backpressure）
+            decode_queue.put(job)
+
+    def _decode_loop(self, decode_queue: Queue, writer_queues: Dict[str, Queue]):
+        while True:
+            job = decode_queue.get()
+            if job is _DONE:
+                for queue in writer_queues.values():
+                    queue.put(_DONE)
+                return
+
+            if job.errors or job.payload is None:
+                self._finish(job)
+                continue
+
+            t0 = time.monotonic()
+            try:
+                df = self.decode(job, job.payload)
+                job.payload = None  # 釋放原始資料
+                self._metrics['decode'].record(time.monotonic() - t0, rows=0 if df is None else len(df))
+            except Exception as e:
+                self._metrics['decode'].record(time.monotonic() - t0, error=True)
+                logger.error(f"  ❌ {job.stock_id}: 解碼失敗 - {e}")
+                job.errors.append(f"decode: {e}")
+                df = None
+
+            if df is None or df.empty or not writer_queues:
+                self._finish(job)
+                continue
+
+            job.data = df
+            job._pending = len(writer_queues)
+            for queue in writer_queues.values():
+                queue.put(job)
+
+    def _write_loop(self, name: str, writer: Callable, queue: Queue):
+        metrics = self._metrics[name]
+        while True:
+            job = queue.get()
+            if job is _DONE:
+                return
+
+            t0 = time.monotonic()
+            try:
+                outcome = writer(job, job.data)
+                if name == 'db':
+                    job.db_rows = int(outcome or 0)
+                else:
+                    job.qlib_ok = bool(outcome)
+                    if not outcome:
+                        job.errors.append("qlib: 寫入未完全成功")
+                metrics.record(time.monotonic() - t0, rows=len(job.data), error=name == 'qlib' and not outcome)
+            except Exception as e:
+                metrics.record(time.monotonic() - t0, error=True)
+                logger.error(f"  ❌ {job.stock_id}: {name} 寫入失敗 - {e}")
+                job.errors.append(f"{name}: {e}")
+
+            with self._result_lock:
+                job._pending -= 1
+                last = job._pending == 0
+            if last:
+                self._finish(job)
+
+    def _finish_skipped(self, stock_id: str):
+        with self._result_lock:
+            self._result.skipped += 1
+            self._result.sync_types['skip'] = self._result.sync_types.get('skip', 0) + 1
+        if self.checkpoint:
+            self.checkpoint.mark(stock_id)
+
+    def _finish(self, job: SyncJob):
+        """標的處理完畢（所有寫入端都已返回）"""
+        job.data = None
+        with self._result_lock:
+            result = self._result
+            result.sync_types[job.sync_type] = result.sync_types.get(job.sync_type, 0) + 1
+            if job.errors:
+                result.failed += 1
+                result.failures[job.stock_id] = job.errors
+            elif job.db_rows == 0 and not job.qlib_ok:
+                result.no_data += 1
+            else:
+                result.succeeded += 1
+                result.db_rows += job.db_rows
+                result.qlib_updated += int(job.qlib_ok)
+
+        # 失敗的標的不寫入 checkpoint，續傳時會重試
+        if self.checkpoint and not job.errors:
+            self.checkpoint.mark(job.stock_id)
+
+
+class StubShioajiClient:
+    """
+    離線假 Shioaji 客戶端（與 ShioajiClient 相同的 kbars 介面）
+
+    以固定延遲模擬網路往返，返回確定性的隨機分鐘線，用於管線基準測試與單元測試。
+    """
+
+    def __init__(self, latency: float = 0.2, seed: int = 0, fail_ids: Iterable[str] = ()):
+        self.latency = latency
+        self.seed = seed
+        self.fail_ids = set(fail_ids)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return True
+
+    def get_futures_contract_id(self, symbol: str, current_date: Optional[date] = None) -> Optional[str]:
+        current = current_date or date.today()
+        return f"{symbol}{current:%Y%m}"
+
+    def fetch_kbars(
+        self,
+        stock_id: str,
+        start_datetime: datetime,
+        end_datetime: datetime,
+        contract_type: str = 'auto'
+    ) -> Optional[SimpleNamespace]:
+        """返回 Kbars 形式的物件（ts 為 nanosecond 時間戳）"""
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if stock_id in self.fail_ids:
+            raise ConnectionError(f"stub failure for {stock_id}")
+
+        days = pd.bdate_range(start_datetime.date(), end_datetime.date())
+        minutes = pd.timedelta_range('09:01:00', '13:30:00', freq='1min')
+        index = (days.values[:, None] + minutes.values[None, :]).ravel()
+        if len(index) == 0:
+            return None
+
+        rng = np.random.default_rng([self.seed, int(stock_id) if stock_id.isdigit() else len(stock_id)])
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.001, len(index)))
+        spread = np.abs(rng.normal(0, 0.002, len(index))) * close
+        return SimpleNamespace(
+            ts=index.astype('datetime64[ns]').astype(np.int64),
+            Open=close + rng.uniform(-1, 1, len(index)) * spread,
+            High=close + spread,
+            Low=close - spread,
+            Close=close,
+            Volume=rng.integers(0, 500, len(index)),
+        )
+
+    def get_kbars(
+        self,
+        stock_id: str,
+        start_datetime: datetime,
+        end_datetime: datetime,
+        timeframe: str = '1min',
+        contract_type: str = 'auto'
+    ) -> Optional[pd.DataFrame]:
+        return kbars_to_dataframe(self.fetch_kbars(stock_id, start_datetime, end_datetime, contract_type))
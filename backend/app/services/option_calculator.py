@@ -423,7 +423,7 @@ class OptionFactorCalculator:
         try:
             from app.services.greeks_calculator import (
                 BlackScholesGreeksCalculator,
-                calculate_time_to_expiry
+                time_to_expiry_array
             )
 
             # 驗證必要欄位
@@ -478,66 +478,47 @@ class OptionFactorCalculator:
             from app.utils.timezone_helpers import today_taiwan
             current_date = today_taiwan()
 
-            # 儲存 Greeks 計算結果
-            call_deltas = []
-            put_deltas = []
-            gamma_exposures = []
-            vanna_exposures = []
-
-            # 逐個合約計算 Greeks
-            for _, row in valid_data.iterrows():
-                try:
-                    strike_price = float(row['strike_price'])
-                    expiry_date = row['expiry_date']
-                    option_type = row['option_type']
-                    option_price = float(row['close'])
-
-                    # 計算到期時間
-                    time_to_expiry = calculate_time_to_expiry(expiry_date, current_date)
-                    if time_to_expiry <= 0:
-                        continue
-
-                    # 估算隱含波動率（使用簡化方法）
-                    volatility = (option_price / strike_price) * np.sqrt(2 * np.pi / time_to_expiry)
-                    volatility = max(0.05, min(volatility, 1.0))  # 限制在 5%-100%
-
-                    # 計算 Greeks
-                    greeks = calculator.calculate_greeks(
-                        spot_price=spot_price,
-                        strike_price=strike_price,
-                        time_to_expiry=time_to_expiry,
-                        volatility=volatility,
-                        option_type=option_type
-                    )
+            # 整條鏈一次計算 Greeks（隱含波動率由市價反推，無解時使用近似波動率）
+            time_to_expiry = time_to_expiry_array(valid_data['expiry_date'], current_date)
+            live = time_to_expiry > 0
+            if not live.any():
+                logger.warning("[GREEKS] All contracts expired, skipping Greeks summary")
+                return {
+                    'avg_call_delta': None,
+                    'avg_put_delta': None,
+                    'gamma_exposure': None,
+                    'vanna_exposure': None
+                }
 
-                    if greeks['delta'] is not None:
-                        if option_type == 'CALL':
-                            call_deltas.append(greeks['delta'])
-                        else:
-                            put_deltas.append(greeks['delta'])
-
-                    if greeks['gamma'] is not None:
-                        # Gamma Exposure = Gamma × Open Interest × Contract Size
-                        open_interest = float(row.get('open_interest', 0))
-                        gamma_exposure = greeks['gamma'] * open_interest * spot_price
-                        gamma_exposures.append(gamma_exposure)
-
-                    if greeks['vanna'] is not None:
-                        open_interest = float(row.get('open_interest', 0))
-                        vanna_exposure = greeks['vanna'] * open_interest
-                        vanna_exposures.append(vanna_exposure)
-
-                except Exception as e:
-                    logger.debug(
-                        f"[GREEKS] Failed to calculate Greeks for contract: {str(e)}"
-                    )
-                    continue
+            live_data = valid_data[live]
+            greeks = calculator.calculate_chain_greeks(
+                spot_price=spot_price,
+                strike_price=live_data['strike_price'].to_numpy(dtype=np.float64),
+                time_to_expiry=time_to_expiry[live],
+                option_type=live_data['option_type'].to_numpy(),
+                option_price=live_data['close'].to_numpy(dtype=np.float64)
+            )
+
+            is_call = live_data['option_type'].to_numpy() == 'CALL'
+            if 'open_interest' in live_data.columns:
+                open_interest = live_data['open_interest'].fillna(0).to_numpy(dtype=np.float64)
+            else:
+                open_interest = np.zeros(len(live_data))
+
+            delta = greeks['delta']
+            call_deltas = delta[is_call & ~np.isnan(delta)]
+            put_deltas = delta[~is_call & ~np.isnan(delta)]
+            # Gamma Exposure = Gamma × Open Interest × Contract Size
+            gamma_ok = ~np.isnan(greeks['gamma'])
+            gamma_exposures = greeks['gamma'][gamma_ok] * open_interest[gamma_ok] * spot_price
+            vanna_ok = ~np.isnan(greeks['vanna'])
+            vanna_exposures = greeks['vanna'][vanna_ok] * open_interest[vanna_ok]
 
             # 計算摘要統計
-            avg_call_delta = Decimal(str(np.mean(call_deltas))) if call_deltas else None
-            avg_put_delta = Decimal(str(np.mean(put_deltas))) if put_deltas else None
-            gamma_exposure = Decimal(str(np.sum(gamma_exposures))) if gamma_exposures else None
-            vanna_exposure = Decimal(str(np.sum(vanna_exposures))) if vanna_exposures else None
+            avg_call_delta = Decimal(str(np.mean(call_deltas))) if call_deltas.size else None
+            avg_put_delta = Decimal(str(np.mean(put_deltas))) if put_deltas.size else None
+            gamma_exposure = Decimal(str(np.sum(gamma_exposures))) if gamma_exposures.size else None
+            vanna_exposure = Decimal(str(np.sum(vanna_exposures))) if vanna_exposures.size else None
 
             logger.info(
                 f"[GREEKS] ✅ Greeks summary calculated: "
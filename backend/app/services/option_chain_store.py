@@ -0,0 +1,198 @@
+"""
+選擇權鏈快照儲存
+
+每個標的每天保存一份選擇權鏈（option_chain_snapshots 表），
+每日因子、Greeks 計算與歷史回補共用同一份資料：
+- 已保存：直接讀取，不呼叫券商 API
+- 未保存：由後備資料源（如 ShioajiOptionDataSource）抓取後寫入（fetch-if-missing）
+
+Shioaji snapshots 只反映當下行情，因此預設只對當天（台灣時間）啟用後備抓取，
+避免把今天的快照存成歷史日期；歷史資料由回補腳本（kbars）寫入。
+部分合約抓取失敗（attrs['failed_count'] > 0）的鏈只用於本次計算，不保存。
+"""
+
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from app.repositories.option import OptionChainSnapshotRepository
+from app.services.option_data_source import OptionDataSource
+from app.utils.timezone_helpers import today_taiwan
+
+CHAIN_COLUMNS = [
+    'contract_id', 'underlying_id', 'underlying_type', 'option_type',
+    'strike_price', 'expiry_date', 'close', 'volume', 'open_interest',
+]
+
+SOURCE_SNAPSHOT = 'snapshot'
+SOURCE_KBARS = 'kbars'
+
+
+def load_option_chain(db: Session, underlying_id: str, snapshot_date: date) -> pd.DataFrame:
+    """
+    讀取已保存的選擇權鏈
+
+    Returns:
+        與 OptionDataSource.get_option_chain 相同欄位的 DataFrame（未保存時為空）
+    """
+    rows = OptionChainSnapshotRepository.get_chain(db, underlying_id, snapshot_date)
+    if not rows:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(
+        [{column: getattr(row, column) for column in CHAIN_COLUMNS} for row in rows],
+        columns=CHAIN_COLUMNS
+    )
+    # Numeric 欄位讀出為 Decimal，轉回與即時資料源相同的 float
+    df['strike_price'] = df['strike_price'].astype(float)
+    df['close'] = pd.to_numeric(df['close'], errors='coerce').astype(float)
+    return df
+
+
+def save_option_chain(
+    db: Session,
+    underlying_id: str,
+    snapshot_date: date,
+    chain: pd.DataFrame,
+    source: str = SOURCE_SNAPSHOT
+) -> int:
+    """
+    保存選擇權鏈（同一標的同一天重複保存時覆蓋）
+
+    Args:
+        db: 資料庫 Session
+        underlying_id: 標的代碼
+        snapshot_date: 資料日期
+        chain: get_option_chain 格式的 DataFrame（缺少的行情欄位存為 NULL）
+        source: 資料來源（snapshot / kbars）
+
+    Returns:
+        寫入筆數
+    """
+    if chain.empty:
+        return 0
+
+    chain = chain.reindex(columns=CHAIN_COLUMNS)
+    chain = chain[chain['contract_id'].notna() & chain['strike_price'].notna() & chain['expiry_date'].notna()]
+    # ShioajiOptionDataSource 的到期日為 'YYYY-MM-DD' 字串，kbars 回補為 date
+    chain = chain.assign(expiry_date=pd.to_datetime(chain['expiry_date']).dt.date)
+    chain = chain.astype(object).where(chain.notna(), None)
+
+    rows = []
+    for record in chain.to_dict('records'):
+        rows.append({
+            'underlying_id': underlying_id,
+            'date': snapshot_date,
+            'contract_id': record['contract_id'],
+            'underlying_type': record['underlying_type'] or 'FUTURES',
+            'option_type': record['option_type'],
+            'strike_price': record['strike_price'],
+            'expiry_date': record['expiry_date'],
+            'close': record['close'],
+            'volume': int(record['volume']) if record['volume'] is not None else None,
+            'open_interest': int(record['open_interest']) if record['open_interest'] is not None else None,
+            'source': source,
+        })
+
+    counts = OptionChainSnapshotRepository.save_chain(db, rows)
+    logger.info(
+        f"[OPTION] 💾 Stored option chain: {underlying_id} | Date: {snapshot_date} | "
+        f"{len(rows)} contracts ({source})"
+    )
+    return counts['inserted'] + counts['updated']
+
+
+class StoredOptionDataSource(OptionDataSource):
+    """
+    以 option_chain_snapshots 為主的資料源（fetch-if-missing）
+
+    用法：
+        data_source = StoredOptionDataSource(db, ShioajiOptionDataSource(shioaji))
+        calculator = OptionFactorCalculator(data_source, db)
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        fetcher: Optional[OptionDataSource] = None,
+        fetch_past_dates: bool = False,
+        source: str = SOURCE_SNAPSHOT,
+        refresh: bool = False
+    ):
+        """
+        Args:
+            db: 資料庫 Session
+            fetcher: 未保存時的後備資料源（None 表示只讀取已保存的資料）
+            fetch_past_dates: 是否對過去日期使用後備資料源（後備資料源能取得歷史行情時才開啟）
+            source: 後備資料寫入時記錄的來源
+            refresh: 已保存仍重新抓取並覆蓋（抓取失敗或不完整時沿用已保存的鏈）
+        """
+        self.db = db
+        self.fetcher = fetcher
+        self.fetch_past_dates = fetch_past_dates
+        self.source = source
+        self.refresh = refresh
+
+    def get_option_chain(self, underlying: str, date: date) -> pd.DataFrame:
+        """讀取已保存的選擇權鏈，未保存（或 refresh）時由後備資料源抓取，完整時才保存"""
+        stored = load_option_chain(self.db, underlying, date)
+        if not stored.empty and not self.refresh:
+            logger.info(
+                f"[OPTION] 📂 Using stored option chain: {underlying} | Date: {date} | "
+                f"{len(stored)} contracts"
+            )
+            return stored
+
+        if self.fetcher is None:
+            if stored.empty:
+                logger.warning(f"[OPTION] ⚠️  No stored option chain for {underlying} on {date}")
+            return stored
+
+        if date < today_taiwan() and not self.fetch_past_dates:
+            if stored.empty:
+                logger.warning(
+                    f"[OPTION] ⚠️  No stored option chain for {underlying} on {date}. "
+                    f"Live snapshots only reflect today's market; run the backfill script for past dates."
+                )
+            return stored
+
+        chain = self.fetcher.get_option_chain(underlying, date)
+        if chain.empty:
+            return stored
+
+        failed_count = chain.attrs.get('failed_count', 0)
+        if failed_count:
+            if not stored.empty:
+                logger.warning(
+                    f"[OPTION] ⚠️  Refreshed option chain for {underlying} on {date} is incomplete "
+                    f"({failed_count} contracts failed); keeping the stored chain"
+                )
+                return stored
+            logger.warning(
+                f"[OPTION] ⚠️  Option chain for {underlying} on {date} is incomplete "
+                f"({failed_count} contracts failed); using it without storing"
+            )
+            return chain
+
+        try:
+            save_option_chain(self.db, underlying, date, chain, self.source)
+        except Exception as e:
+            # 保存失敗不影響本次計算
+            logger.warning(
+                f"[OPTION] ⚠️  Failed to store option chain for {underlying} on {date}: "
+                f"{type(e).__name__}: {str(e)}"
+            )
+        return chain
+
+    def get_minute_kbars(self, contract_id: str, start: date, end: date) -> pd.DataFrame:
+        """分鐘線不經過快照儲存，直接交給後備資料源"""
+        if self.fetcher is None:
+            return pd.DataFrame()
+        return self.fetcher.get_minute_kbars(contract_id, start, end)
+
+    def is_available(self) -> bool:
+        """已保存的資料隨時可讀；後備資料源只在缺資料時才需要"""
+        return True
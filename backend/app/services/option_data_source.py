@@ -7,13 +7,53 @@ Option Data Source
 - 階段三：Tick 數據（即時 Greeks 計算）
 """
 
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import date, datetime
 from decimal import Decimal
 import pandas as pd
 from loguru import logger
 
+from app.utils.rate_limiter import RateLimiter, get_shioaji_rate_limiter
+
+
+# Shioaji snapshots 單次請求上限為 500 檔；分成較小的批次讓多個批次並行、失敗時重試的範圍較小
+SNAPSHOT_CHUNK_SIZE = 200
+# 同時進行中的 snapshots 請求數
+SNAPSHOT_MAX_WORKERS = 4
+
+# 行程共用的執行緒池（速率限制器為 get_shioaji_rate_limiter()，與分鐘線同步共享 Shioaji 額度）
+_snapshot_executor: Optional[ThreadPoolExecutor] = None
+_snapshot_executor_pid: Optional[int] = None
+_snapshot_executor_lock = threading.Lock()
+
+
+def get_snapshot_executor() -> ThreadPoolExecutor:
+    """
+    取得行程共用的 snapshots 執行緒池（首次使用時建立）
+
+    Celery prefork 的子行程不會繼承父行程的執行緒，因此以 pid 判斷 fork 後重新建立。
+    """
+    global _snapshot_executor, _snapshot_executor_pid
+    with _snapshot_executor_lock:
+        if _snapshot_executor is None or _snapshot_executor_pid != os.getpid():
+            _snapshot_executor = ThreadPoolExecutor(
+                max_workers=SNAPSHOT_MAX_WORKERS,
+                thread_name_prefix="option-snapshot"
+            )
+            _snapshot_executor_pid = os.getpid()
+        return _snapshot_executor
+
+
+def _is_token_expired(error: Exception) -> bool:
+    """Shioaji token 過期的錯誤訊息"""
+    message = str(error)
+    return "401" in message or "expired" in message.lower()
+
 
 class OptionDataSource(ABC):
     """選擇權資料源抽象基類"""
@@ -41,6 +81,7 @@ class OptionDataSource(ABC):
                 - close: 收盤價
                 - volume: 成交量
                 - open_interest: 未平倉量（階段一可選）
+            attrs['failed_count']: 抓取失敗的合約數（> 0 表示選擇權鏈不完整，不應保存為當天資料）
         """
         pass
 
@@ -79,15 +120,38 @@ class ShioajiOptionDataSource(OptionDataSource):
     階段三：獲取 Tick 數據
     """
 
-    def __init__(self, shioaji_client):
+    def __init__(
+        self,
+        shioaji_client,
+        chunk_size: int = SNAPSHOT_CHUNK_SIZE,
+        max_retries: int = 2,
+        timeout: float = 30.0,
+        retry_delay: float = 0.5,
+        rate_limiter: Optional[RateLimiter] = None,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
         """
         初始化
 
         Args:
             shioaji_client: ShioajiClient 實例
+            chunk_size: 每次 snapshots 請求的合約數（上限 500）
+            max_retries: 每個批次失敗後的最大重試次數
+            timeout: 單次 snapshots 請求逾時（秒）
+            retry_delay: 重試的基礎延遲（秒，指數退避）
+            rate_limiter: 速率限制器（預設為行程共用的 Shioaji 行情額度，與分鐘線同步共享）
+            executor: 執行緒池（預設為行程共用的 snapshots 執行緒池）
         """
         self.client = shioaji_client
         self._api = shioaji_client._api if shioaji_client else None
+        self.chunk_size = min(max(1, chunk_size), 500)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self._rate_limiter = rate_limiter or get_shioaji_rate_limiter()
+        self._executor = executor
+        # 每次重新連線遞增；用來判斷失敗的請求是否已在連線刷新之後送出
+        self._api_generation = 0
 
     def is_available(self) -> bool:
         """檢查 Shioaji 客戶端是否可用"""
@@ -140,31 +204,8 @@ class ShioajiOptionDataSource(OptionDataSource):
 
             logger.debug(f"[OPTION] Found {len(contracts)} option contracts")
 
-            # 步驟 2：獲取每個合約的快照數據
-            data = []
-            failed_count = 0
-
-            for i, contract in enumerate(contracts):
-                try:
-                    snapshot = self._get_contract_snapshot(contract, date)
-                    if snapshot:
-                        data.append(snapshot)
-                    else:
-                        failed_count += 1
-                except Exception as e:
-                    failed_count += 1
-                    if failed_count <= 5:  # 只記錄前 5 個錯誤
-                        logger.warning(
-                            f"[OPTION] Failed to get snapshot for {contract.code}: "
-                            f"{type(e).__name__}: {str(e)}"
-                        )
-
-                # 每 100 個合約記錄進度
-                if (i + 1) % 100 == 0:
-                    logger.debug(
-                        f"[OPTION] Progress: {i + 1}/{len(contracts)} contracts processed, "
-                        f"{len(data)} successful, {failed_count} failed"
-                    )
+            # 步驟 2：分批並行獲取快照數據
+            data, failed_count = self._fetch_snapshots(contracts)
 
             if failed_count > 0:
                 logger.warning(
@@ -180,8 +221,9 @@ class ShioajiOptionDataSource(OptionDataSource):
                 )
                 return pd.DataFrame()
 
-            # 步驟 3：轉換為 DataFrame
+            # 步驟 3：轉換為 DataFrame（失敗數隨結果返回，StoredOptionDataSource 不保存不完整的鏈）
             df = pd.DataFrame(data)
+            df.attrs['failed_count'] = failed_count
             logger.info(
                 f"[OPTION] ✅ Retrieved {len(df)} option contracts for {underlying} "
                 f"({len(df)/len(contracts)*100:.1f}% success rate)"
@@ -303,86 +345,144 @@ class ShioajiOptionDataSource(OptionDataSource):
             logger.error(f"[OPTION] Error getting option contracts: {str(e)}")
             return []
 
-    def _get_contract_snapshot(self, contract, date: date, max_retries: int = 2, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+    def _fetch_snapshots(self, contracts: List) -> Tuple[List[Dict[str, Any]], int]:
         """
-        獲取單一合約的快照數據（帶重試機制）
+        分批獲取合約快照
+
+        合約依 chunk_size 分批，每批一次 snapshots 請求，於共用執行緒池中並行送出
+        （同時受速率限制器約束）。失敗的批次個別重試：token 過期時先刷新連線
+        （同一輪失敗只刷新一次），其他錯誤以指數退避重試。
 
         Args:
-            contract: Shioaji contract object
-            date: 資料日期
-            max_retries: 最大重試次數
-            timeout: 單次請求超時時間（秒）
+            contracts: Shioaji contract 物件列表
 
         Returns:
-            字典包含合約資訊和價格數據，失敗返回 None
+            (快照數據列表, 失敗的合約數)
         """
-        import time
-        from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+        parsed = []
+        for contract in contracts:
+            contract_info = self._parse_contract(contract)
+            if contract_info:
+                parsed.append((contract, contract_info))
+
+        failed_count = len(contracts) - len(parsed)
+        chunks = [
+            parsed[i:i + self.chunk_size]
+            for i in range(0, len(parsed), self.chunk_size)
+        ]
+
+        executor = self._executor or get_snapshot_executor()
+        pending: Dict[Future, Tuple[List, int, int]] = {}
+
+        def submit(chunk: List, attempt: int, delay: float):
+            future = executor.submit(
+                self._request_snapshots, [contract for contract, _ in chunk], delay
+            )
+            pending[future] = (chunk, attempt, self._api_generation)
 
-        # 解析合約資訊（放在重試循環外）
-        contract_info = self._parse_contract(contract)
-        if not contract_info:
-            return None
+        for chunk in chunks:
+            submit(chunk, 0, 0.0)
 
-        # 重試邏輯
-        for attempt in range(max_retries + 1):
-            try:
-                # 使用 ThreadPoolExecutor 實現超時控制
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(self._api.snapshots, [contract])
-                    try:
-                        snapshot = future.result(timeout=timeout)
-                    except FuturesTimeoutError:
-                        if attempt < max_retries:
-                            logger.debug(f"[OPTION] Timeout getting snapshot for {contract.code}, retrying ({attempt+1}/{max_retries})...")
-                            time.sleep(0.5)  # 短暫延遲後重試
-                            continue
+        data = []
+        # 等待速率限制與重試延遲的上限；超過仍沒有任何批次完成時視為卡住
+        stall_timeout = self.timeout * 2 + self._rate_limiter.period + self.retry_delay * 2 ** self.max_retries
+
+        while pending:
+            done, _ = wait(pending, timeout=stall_timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                stalled = sum(len(chunk) for chunk, _, _ in pending.values())
+                logger.error(
+                    f"[OPTION] Snapshot requests stalled for {stall_timeout:.0f}s, "
+                    f"giving up on {stalled} contracts"
+                )
+                failed_count += stalled
+                break
+
+            for future in done:
+                chunk, attempt, generation = pending.pop(future)
+                try:
+                    snapshots = future.result()
+                except Exception as e:
+                    if attempt < self.max_retries:
+                        if _is_token_expired(e):
+                            # 連線已被其他批次刷新過時直接重送
+                            if generation == self._api_generation and not self._refresh_connection():
+                                failed_count += len(chunk)
+                                continue
+                            submit(chunk, attempt + 1, 0.0)
                         else:
-                            logger.debug(f"[OPTION] Timeout getting snapshot for {contract.code} after {max_retries} retries")
-                            return None
+                            logger.debug(
+                                f"[OPTION] Snapshot chunk of {len(chunk)} failed "
+                                f"(attempt {attempt + 1}/{self.max_retries + 1}): {e}"
+                            )
+                            submit(chunk, attempt + 1, self.retry_delay * 2 ** attempt)
+                        continue
+
+                    failed_count += len(chunk)
+                    logger.warning(
+                        f"[OPTION] Snapshot chunk of {len(chunk)} contracts failed after "
+                        f"{attempt + 1} attempts: {type(e).__name__}: {e}"
+                    )
+                    continue
 
-                if not snapshot or len(snapshot) == 0:
-                    logger.debug(f"[OPTION] No snapshot data for {contract.code}")
-                    return None
+                chunk_rows = self._match_snapshots(chunk, snapshots)
+                data.extend(chunk_rows)
+                failed_count += len(chunk) - len(chunk_rows)
 
-                snap_data = snapshot[0]
+            logger.debug(
+                f"[OPTION] Progress: {len(data)} successful, {failed_count} failed, "
+                f"{len(pending)} chunks pending"
+            )
 
-                # 提取價格和成交量數據
-                data = {
-                    **contract_info,
-                    'close': float(snap_data.close) if hasattr(snap_data, 'close') else None,
-                    'volume': int(snap_data.volume) if hasattr(snap_data, 'volume') else 0,
-                    'open_interest': int(snap_data.open_interest) if hasattr(snap_data, 'open_interest') else None,
-                }
+        return data, failed_count
 
-                return data
+    def _request_snapshots(self, contracts: List, delay: float = 0.0) -> List:
+        """單次 snapshots 請求（於執行緒池中執行）"""
+        if delay > 0:
+            time.sleep(delay)
+        self._rate_limiter.acquire()
+        return self._api.snapshots(contracts, timeout=int(self.timeout * 1000))
 
-            except Exception as e:
-                error_msg = str(e)
-
-                # 檢查是否為 token 過期錯誤
-                if "401" in error_msg or "Token is expired" in error_msg or "expired" in error_msg.lower():
-                    logger.warning(f"[OPTION] Token expired, refreshing connection...")
-
-                    # 刷新 Shioaji 連接
-                    if hasattr(self._shioaji_client, 'refresh_connection'):
-                        if self._shioaji_client.refresh_connection():
-                            logger.info(f"[OPTION] Connection refreshed, retrying {contract.code}...")
-                            time.sleep(1)
-                            continue
-                        else:
-                            logger.error(f"[OPTION] Failed to refresh connection")
-                            return None
+    def _match_snapshots(self, chunk: List, snapshots: Optional[List]) -> List[Dict[str, Any]]:
+        """
+        依合約代碼對應快照（回傳順序不保證與請求相同，無資料的合約不會出現）
 
-                if attempt < max_retries:
-                    logger.debug(f"[OPTION] Error getting snapshot for {contract.code} (attempt {attempt+1}/{max_retries+1}): {error_msg}")
-                    time.sleep(0.5)
-                    continue
-                else:
-                    logger.debug(f"[OPTION] Error getting snapshot for {contract.code} after {max_retries+1} attempts: {error_msg}")
-                    return None
+        Returns:
+            有快照的合約數據列表
+        """
+        by_code = {getattr(snap, 'code', None): snap for snap in snapshots or []}
+        rows = []
+        for contract, contract_info in chunk:
+            snap_data = by_code.get(contract.code)
+            if snap_data is None:
+                logger.debug(f"[OPTION] No snapshot data for {contract.code}")
+                continue
+
+            # 提取價格和成交量數據
+            rows.append({
+                **contract_info,
+                'close': float(snap_data.close) if hasattr(snap_data, 'close') else None,
+                'volume': int(snap_data.volume) if hasattr(snap_data, 'volume') else 0,
+                'open_interest': int(snap_data.open_interest) if hasattr(snap_data, 'open_interest') else None,
+            })
+        return rows
+
+    def _refresh_connection(self) -> bool:
+        """
+        刷新 Shioaji 連線（token 過期時）
+
+        只在協調執行緒中呼叫；成功後遞增 _api_generation，之後送出的請求使用新連線。
+        """
+        logger.warning("[OPTION] Token expired, refreshing connection...")
 
-        return None
+        if not hasattr(self.client, 'refresh_connection') or not self.client.refresh_connection():
+            logger.error("[OPTION] Failed to refresh connection")
+            return False
+
+        self._api = self.client._api
+        self._api_generation += 1
+        logger.info("[OPTION] Connection refreshed, retrying snapshot requests")
+        return True
 
     def _parse_contract(self, contract) -> Optional[Dict[str, Any]]:
         """
@@ -468,3 +568,4 @@ class QlibOptionDataSource(OptionDataSource):
     def is_available(self) -> bool:
         """檢查 Qlib 資料源是否可用"""
         return False  # 階段一不實作
+
@@ -3,8 +3,9 @@ Option Service for option-related business logic
 選擇權服務層，處理選擇權相關業務邏輯
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from loguru import logger
 
@@ -24,10 +25,24 @@ from app.schemas.option import (
 )
 
 
+# 沒有價格資料時的快照（前端顯示 "-"）
+_EMPTY_SNAPSHOT = {
+    'last_price': None,
+    'bid_price': None,
+    'ask_price': None,
+    'volume': None,
+    'open_interest': None
+}
+
+
 class OptionService:
     """Service for option-related operations"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Union[Session, AsyncSession]):
+        """
+        Args:
+            db: 資料庫會話（*_async 方法需傳入 AsyncSession）
+        """
         self.db = db
 
     # ============ Option Chain ============
@@ -69,6 +84,68 @@ class OptionService:
         # 獲取選擇權合約的價格數據（使用 Repository）
         snapshot_data = self._get_option_prices(contracts)
 
+        return self._build_chain_response(
+            underlying_id, expiry_date, contracts, spot_price, snapshot_data
+        )
+
+    async def get_option_chain_async(
+        self,
+        underlying_id: str,
+        expiry_date: date
+    ) -> OptionChainResponse:
+        """
+        構建 Option Chain（AsyncSession 版本，self.db 須為 AsyncSession）
+
+        查詢順序與 get_option_chain 相同（同一個 session 上的查詢無法並行），
+        但等待資料庫時不佔用 event loop。
+
+        Raises:
+            ValueError: 如果找不到合約
+        """
+        contracts = await OptionContractRepository.get_by_underlying_and_expiry_async(
+            db=self.db,
+            underlying_id=underlying_id,
+            expiry_date=expiry_date,
+            is_active='active'
+        )
+
+        if not contracts:
+            raise ValueError(
+                f"No option contracts found for {underlying_id} expiring on {expiry_date}"
+            )
+
+        try:
+            latest_price = await StockMinutePriceRepository.get_latest_async(
+                db=self.db,
+                stock_id=underlying_id
+            )
+            spot_price = self._spot_price_from(underlying_id, latest_price)
+        except Exception as e:
+            logger.error(f"[OPTION] Error getting spot price for {underlying_id}: {str(e)}")
+            spot_price = None
+
+        try:
+            latest_prices = await OptionMinutePriceRepository.get_latest_prices_for_contracts_async(
+                db=self.db,
+                contract_ids=[c.contract_id for c in contracts]
+            )
+            snapshot_data = self._snapshot_from_prices(latest_prices)
+        except Exception as e:
+            logger.error(f"[OPTION] Error getting option prices: {str(e)}")
+            snapshot_data = self._empty_snapshots(contracts)
+
+        return self._build_chain_response(
+            underlying_id, expiry_date, contracts, spot_price, snapshot_data
+        )
+
+    def _build_chain_response(
+        self,
+        underlying_id: str,
+        expiry_date: date,
+        contracts: List,
+        spot_price: Optional[float],
+        snapshot_data: Dict[str, Dict[str, Any]]
+    ) -> OptionChainResponse:
         # 分離 CALL 和 PUT
         calls, puts = self._build_chain_items(contracts, snapshot_data)
 
@@ -95,17 +172,20 @@ class OptionService:
                 db=self.db,
                 stock_id=underlying_id
             )
-            if latest_price:
-                spot_price = float(latest_price.close)
-                logger.info(f"[OPTION] Got spot price for {underlying_id}: {spot_price}")
-                return spot_price
-            else:
-                logger.warning(f"[OPTION] No spot price found for {underlying_id}")
-                return None
+            return self._spot_price_from(underlying_id, latest_price)
         except Exception as e:
             logger.error(f"[OPTION] Error getting spot price for {underlying_id}: {str(e)}")
             return None
 
+    @staticmethod
+    def _spot_price_from(underlying_id: str, latest_price) -> Optional[float]:
+        if latest_price:
+            spot_price = float(latest_price.close)
+            logger.info(f"[OPTION] Got spot price for {underlying_id}: {spot_price}")
+            return spot_price
+        logger.warning(f"[OPTION] No spot price found for {underlying_id}")
+        return None
+
     def _get_option_prices(self, contracts: List) -> Dict[str, Dict[str, Any]]:
         """
         獲取選擇權合約的價格數據（批次查詢）
@@ -116,8 +196,6 @@ class OptionService:
         Returns:
             合約 ID -> 價格數據的字典
         """
-        snapshot_data = {}
-
         try:
             # 提取所有合約 ID
             contract_ids = [c.contract_id for c in contracts]
@@ -127,44 +205,39 @@ class OptionService:
                 db=self.db,
                 contract_ids=contract_ids
             )
-
-            # 構建快照數據
-            for contract_id, price_record in latest_prices.items():
-                if price_record:
-                    snapshot_data[contract_id] = {
-                        'last_price': float(price_record.close) if price_record.close else None,
-                        'bid_price': float(price_record.bid_price) if price_record.bid_price else None,
-                        'ask_price': float(price_record.ask_price) if price_record.ask_price else None,
-                        'volume': int(price_record.volume) if price_record.volume else None,
-                        'open_interest': int(price_record.open_interest) if price_record.open_interest else None
-                    }
-                    logger.debug(f"[OPTION] Got price data for {contract_id} from minute_prices")
-                else:
-                    # 沒有分鐘線數據，使用 None（前端會顯示 "-"）
-                    snapshot_data[contract_id] = {
-                        'last_price': None,
-                        'bid_price': None,
-                        'ask_price': None,
-                        'volume': None,
-                        'open_interest': None
-                    }
-
-            logger.info(f"[OPTION] Loaded price data for {len(snapshot_data)} contracts")
+            return self._snapshot_from_prices(latest_prices)
 
         except Exception as e:
             logger.error(f"[OPTION] Error getting option prices: {str(e)}")
             # 發生錯誤時，所有合約都使用 None
-            for contract in contracts:
-                snapshot_data[contract.contract_id] = {
-                    'last_price': None,
-                    'bid_price': None,
-                    'ask_price': None,
-                    'volume': None,
-                    'open_interest': None
+            return self._empty_snapshots(contracts)
+
+    @staticmethod
+    def _snapshot_from_prices(latest_prices: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """合約 ID -> 最新分鐘價格記錄 轉為快照數據"""
+        snapshot_data = {}
+
+        for contract_id, price_record in latest_prices.items():
+            if price_record:
+                snapshot_data[contract_id] = {
+                    'last_price': float(price_record.close) if price_record.close else None,
+                    'bid_price': float(price_record.bid_price) if price_record.bid_price else None,
+                    'ask_price': float(price_record.ask_price) if price_record.ask_price else None,
+                    'volume': int(price_record.volume) if price_record.volume else None,
+                    'open_interest': int(price_record.open_interest) if price_record.open_interest else None
                 }
+                logger.debug(f"[OPTION] Got price data for {contract_id} from minute_prices")
+            else:
+                # 沒有分鐘線數據，使用 None（前端會顯示 "-"）
+                snapshot_data[contract_id] = dict(_EMPTY_SNAPSHOT)
 
+        logger.info(f"[OPTION] Loaded price data for {len(snapshot_data)} contracts")
         return snapshot_data
 
+    @staticmethod
+    def _empty_snapshots(contracts: List) -> Dict[str, Dict[str, Any]]:
+        return {contract.contract_id: dict(_EMPTY_SNAPSHOT) for contract in contracts}
+
     def _build_chain_items(
         self,
         contracts: List,
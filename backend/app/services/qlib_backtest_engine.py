@@ -4,15 +4,22 @@ Qlib 回測引擎
 此模組負責使用 Qlib 執行量化策略回測。
 支援機器學習模型和傳統策略。
 """
-from datetime import date, datetime
+import json
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Any
+import numpy as np
 import pandas as pd
 from loguru import logger
 from sqlalchemy.orm import Session
 
 from app.services.qlib_data_adapter import QlibDataAdapter
 from app.core.qlib_config import qlib_config
-from app.services.alpha158_factors import alpha158_calculator
+from app.services.alpha158_factors import DEFAULT_ALPHA158_CONFIG, PANEL_FIELDS, alpha158_calculator
+from app.services.factor_store import factor_store, qlib_source_files
+
+
+# Alpha158 最長回看約 61 個交易日；增量補算時往前多取的日曆天數（約 120 個交易日）
+ALPHA158_WARMUP = timedelta(days=180)
 
 
 class QlibBacktestEngine:
@@ -25,6 +32,9 @@ class QlibBacktestEngine:
     - 組合優化策略
     """
 
+    # 交易模擬使用向量化實作（False 時使用逐筆迴圈）
+    use_vectorized_simulation = True
+
     def __init__(self, db: Session):
         self.db = db
         self.data_adapter = QlibDataAdapter()
@@ -197,8 +207,39 @@ class QlibBacktestEngine:
                 logger.warning(f"No base data available for {symbol}")
                 return None
 
-            # 2. 計算 Alpha158 因子
-            result_df, factor_names = alpha158_calculator.compute_all_factors(base_df, config)
+            # 2. 計算 Alpha158 因子（磁碟因子儲存命中時直接讀取，新交易日只補算尾段）
+            config = config or DEFAULT_ALPHA158_CONFIG
+            anchor = pd.Timestamp(start_date)
+
+            def compute(start_ts: pd.Timestamp, end_ts: pd.Timestamp) -> Optional[pd.DataFrame]:
+                if start_ts <= anchor:
+                    source_df = base_df
+                else:
+                    # 增量補算：往前多取暖機資料，使尾段的滾動窗口與完整計算一致
+                    fetch_start = max(anchor, start_ts - ALPHA158_WARMUP)
+                    source_df = self.data_adapter.get_qlib_ohlcv(symbol, fetch_start.date(), end_ts.date())
+                    if source_df is None or source_df.empty:
+                        return None
+                factors_df, names = alpha158_calculator.compute_all_factors(source_df, config)
+                return factors_df.loc[factors_df.index >= start_ts, names]
+
+            factors_df = factor_store.get_or_compute(
+                key='alpha158|{}|{}|{}'.format(
+                    anchor.date().isoformat(),
+                    alpha158_calculator.backend,
+                    json.dumps(config, sort_keys=True)
+                ),
+                instrument=symbol,
+                start=start_date,
+                end=end_date,
+                compute=compute,
+                sources=qlib_source_files(symbol, PANEL_FIELDS),
+            )
+            if factors_df is None:
+                return None
+
+            factor_names = list(factors_df.columns)
+            result_df = pd.concat([base_df, factors_df.reindex(base_df.index)], axis=1)
 
             logger.info(f"Computed {len(factor_names)} Alpha158 factors with {len(result_df)} rows")
             logger.debug(f"Sample factors: {factor_names[:10]}")
@@ -761,6 +802,11 @@ class QlibBacktestEngine:
         """
         模擬交易執行
 
+        僅做多、全倉進出：信號 1 且空手時以收盤價買入 int(cash / price) 股，
+        信號 -1 且持倉時全部賣出，期末仍持倉則以最後收盤價結算。
+        預設使用 NumPy 向量化模擬（_simulate_trading_vectorized），
+        輸出與逐筆迴圈（_simulate_trading_loop）完全一致。
+
         Args:
             signals: 交易信號
             dataset: 價格數據
@@ -774,14 +820,152 @@ class QlibBacktestEngine:
         logger.info(f"   Initial capital: ${initial_capital:,.2f}")
         logger.info(f"   Symbol: {symbol}")
 
+        if self.use_vectorized_simulation:
+            trades, equity_curve, final_equity = self._simulate_trading_vectorized(
+                signals, dataset, initial_capital, symbol
+            )
+        else:
+            trades, equity_curve, final_equity = self._simulate_trading_loop(
+                signals, dataset, initial_capital, symbol
+            )
+
+        # 計算總體統計
+        total_return = (final_equity / initial_capital - 1) * 100
+        total_trades = len(trades)
+        buy_count = sum(1 for t in trades if t['action'] == 'BUY')
+        sell_count = total_trades - buy_count
+
+        logger.info(f"✅ Trade simulation completed:")
+        logger.info(f"   📊 Total trades:    {total_trades} ({buy_count} BUY + {sell_count} SELL)")
+        logger.info(f"   💵 Initial capital: ${initial_capital:,.2f}")
+        logger.info(f"   💰 Final equity:    ${final_equity:,.2f}")
+        logger.info(f"   📈 Total return:    {total_return:+.2f}%")
+
+        return trades, equity_curve
+
+    @staticmethod
+    def _simulate_trading_vectorized(
+        signals: pd.Series,
+        dataset: pd.DataFrame,
+        initial_capital: float,
+        symbol: str
+    ) -> tuple[List[dict], List[dict], float]:
+        """
+        向量化交易模擬
+
+        1. 以 searchsorted 在買/賣信號位置間跳躍，只對「實際成交」做 Python 迴圈
+           （迴圈次數 = 交易次數，而非 K 棒數）
+        2. 每根 K 棒的現金與持倉由「該 K 棒之前最後一筆成交」向前填補
+        3. 權益 = 現金 + 持倉 × 收盤價，整段一次計算
+
+        Returns:
+            tuple: (交易記錄列表, 資金曲線列表, 期末現金)
+        """
+        n = len(dataset)
+        if n == 0:
+            return [], [], initial_capital
+
+        # 與逐筆迴圈相同的數值：float32 收盤價在純量運算中同樣會提升為 float64
+        close = dataset['$close'].to_numpy(dtype=np.float64)
+        signal_values = signals.reindex(dataset.index).to_numpy()
+        buy_bars = np.flatnonzero(signal_values == 1)
+        sell_bars = np.flatnonzero(signal_values == -1)
+
+        # 成交事件：(K 棒位置, 動作, 股數, 成交後現金, 成交後持倉, 損益)
+        fill_bars, fill_cash, fill_position = [], [], []
+        events = []
+
+        cash = initial_capital
+        cursor = 0
+        while True:
+            # 下一個可執行的買入信號
+            b = np.searchsorted(buy_bars, cursor)
+            if b >= len(buy_bars):
+                break
+            entry_bar = int(buy_bars[b])
+            entry_price = close[entry_bar]
+            shares = int(cash / entry_price)
+            if shares <= 0:
+                # 資金不足：略過此信號，繼續尋找下一個買入信號
+                cursor = entry_bar + 1
+                continue
+
+            cash -= shares * entry_price
+            events.append((entry_bar, 'BUY', shares, None))
+            fill_bars.append(entry_bar)
+            fill_cash.append(cash)
+            fill_position.append(shares)
+
+            # 買入之後的第一個賣出信號；沒有則期末結算
+            s = np.searchsorted(sell_bars, entry_bar + 1)
+            if s >= len(sell_bars):
+                final_price = close[-1]
+                final_pnl = (final_price - entry_price) * shares
+                cash += shares * final_price
+                events.append((n - 1, 'SELL', shares, final_pnl))
+                logger.info(f"   🔚 Final settlement: Selling {shares} shares @ ${final_price:.2f} (PnL: ${final_pnl:+,.2f})")
+                break
+
+            exit_bar = int(sell_bars[s])
+            exit_price = close[exit_bar]
+            cash += shares * exit_price
+            events.append((exit_bar, 'SELL', shares, (exit_price - entry_price) * shares))
+            fill_bars.append(exit_bar)
+            fill_cash.append(cash)
+            fill_position.append(0)
+            cursor = exit_bar + 1
+
+        # 每根 K 棒交易前的現金/持倉 = 前一根 K 棒（含）之前最後一筆成交後的狀態
+        bars = np.arange(n)
+        last_fill = np.searchsorted(np.asarray(fill_bars, dtype=np.int64), bars, side='left') - 1
+        has_fill = last_fill >= 0
+        cash_before = np.full(n, float(initial_capital))
+        position_before = np.zeros(n, dtype=np.int64)
+        if fill_bars:
+            cash_before[has_fill] = np.asarray(fill_cash)[last_fill[has_fill]]
+            position_before[has_fill] = np.asarray(fill_position, dtype=np.int64)[last_fill[has_fill]]
+        equity = cash_before + position_before * close
+
+        date_strings = dataset.index.strftime('%Y-%m-%d').tolist()
+        equity_curve = [
+            {'date': d, 'equity': e}
+            for d, e in zip(date_strings, equity.tolist())
+        ]
+
+        trades = []
+        for bar, action, shares, pnl in events:
+            trade = {
+                'date': date_strings[bar],
+                'action': action,
+                'price': float(close[bar]),
+                'shares': shares,
+                'symbol': symbol
+            }
+            if action == 'SELL':
+                trade['pnl'] = float(pnl)
+            trades.append(trade)
+
+        return trades, equity_curve, cash
+
+    def _simulate_trading_loop(
+        self,
+        signals: pd.Series,
+        dataset: pd.DataFrame,
+        initial_capital: float,
+        symbol: str
+    ) -> tuple[List[dict], List[dict], float]:
+        """
+        逐筆迴圈交易模擬（參考實作，用於一致性驗證）
+
+        Returns:
+            tuple: (交易記錄列表, 資金曲線列表, 期末現金)
+        """
         trades = []
         equity_curve = []
 
         cash = initial_capital
         position = 0
         entry_price = 0
-        buy_count = 0
-        sell_count = 0
 
         for idx in dataset.index:
             signal = signals.get(idx, 0)
@@ -801,7 +985,6 @@ class QlibBacktestEngine:
                     position = shares
                     entry_price = price
                     cash -= shares * price
-                    buy_count += 1
 
                     trade_value = shares * price
                     logger.debug(f"   📈 BUY  {idx.strftime('%Y-%m-%d')}: {shares} shares @ ${price:.2f} = ${trade_value:,.2f}")
@@ -817,7 +1000,6 @@ class QlibBacktestEngine:
             elif signal == -1 and position > 0:  # 賣出信號
                 cash += position * price
                 pnl = (price - entry_price) * position
-                sell_count += 1
 
                 trade_value = position * price
                 pnl_pct = (price / entry_price - 1) * 100
@@ -840,7 +1022,6 @@ class QlibBacktestEngine:
             final_price = dataset.iloc[-1]['$close']
             final_pnl = (final_price - entry_price) * position
             cash += position * final_price
-            sell_count += 1
 
             logger.info(f"   🔚 Final settlement: Selling {position} shares @ ${final_price:.2f} (PnL: ${final_pnl:+,.2f})")
 
@@ -853,18 +1034,7 @@ class QlibBacktestEngine:
                 'pnl': float(final_pnl)
             })
 
-        # 計算總體統計
-        final_equity = cash
-        total_return = (final_equity / initial_capital - 1) * 100
-        total_trades = len(trades)
-
-        logger.info(f"✅ Trade simulation completed:")
-        logger.info(f"   📊 Total trades:    {total_trades} ({buy_count} BUY + {sell_count} SELL)")
-        logger.info(f"   💵 Initial capital: ${initial_capital:,.2f}")
-        logger.info(f"   💰 Final equity:    ${final_equity:,.2f}")
-        logger.info(f"   📈 Total return:    {total_return:+.2f}%")
-
-        return trades, equity_curve
+        return trades, equity_curve, cash
 
     def _calculate_metrics(
         self,
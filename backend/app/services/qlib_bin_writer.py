@@ -0,0 +1,385 @@
+"""
+Qlib bin 檔增量寫入器
+
+Qlib 特徵檔格式：features/<instrument>/<field>.<freq>.bin 為 little-endian float32，
+第一個值是起始位置（在 calendars/<freq>.txt 中的索引），其後依序為每個交易時點的值。
+
+FileFeatureStorage.write 每次都重寫（或盲目附加）整個陣列，新增一天就要改寫多年的資料。
+本模組只寫入新的交易時點：
+- 新資料在檔尾之後：原地附加（中間缺少的時點補 NaN）
+- 新資料與檔尾重疊（例如智慧同步重抓最後一天）：只覆寫重疊的尾段
+- 新資料早於檔頭：才合併後整檔改寫
+
+交易日曆只允許附加（中間插入會使所有 bin 檔的位置失效）。
+
+防止寫到一半中斷：
+- 日曆與 instruments 檔：寫入暫存檔 → fsync → os.replace
+- bin 檔原地寫入前先寫 write-ahead journal（<file>.wal：寫入位移 + 該位移之後的原始內容），
+  寫完 fsync 後刪除；下次寫入同一檔（或呼叫 recover()）時若 journal 仍在，還原為寫入前狀態
+
+多個行程可同時寫入同一資料目錄（例如股票與期貨同步重疊執行）：
+- 日曆的「讀取 → 附加 → 寫回」以 calendars/.<freq>.lock 的 flock 序列化，並在鎖內重新讀取日曆
+- 寫入器快取的日曆過期（其他行程已附加時點）時，計算位置前會重新讀取
+
+尾段附加保持檔案前段不變，FactorStore 會將其視為增量（只計算新增交易日）。
+單一寫入器不是執行緒安全的，同一標的的 bin 檔同時只應有一個寫入端。
+"""
+
+import fcntl
+import os
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+_HEADER = struct.Struct('<q')
+_DTYPE = np.dtype('<f4')
+
+
+def _atomic_write_bytes(path: Path, data: bytes):
+    """寫入暫存檔並 fsync 後 rename，讀取端只會看到完整的舊檔或新檔"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class QlibBinWriter:
+    """
+    以交易日曆為基準、只寫入新資料的 Qlib 特徵寫入器
+
+    用法：
+        writer = QlibBinWriter('/data/qlib/tw_stock_v2', freq='day')
+        writer.extend_calendar(trading_dates)
+        writer.write_instrument('2330', df.set_index('date'), ['open', 'high', 'low', 'close', 'volume'])
+        writer.update_instruments()
+    """
+
+    def __init__(self, root, freq: str = 'day'):
+        self.root = Path(root)
+        self.freq = freq
+        self.calendar_format = '%Y-%m-%d' if freq == 'day' else '%Y-%m-%d %H:%M:%S'
+        self.stats: Dict[str, int] = {'bytes_written': 0, 'appends': 0, 'overwrites': 0, 'rewrites': 0}
+        # 本次寫入過的標的 → (起始位置, 結束位置)，供 update_instruments() 使用
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        self._calendar = self._read_calendar()
+
+    # ------------------------------------------------------------------
+    # 交易日曆
+    # ------------------------------------------------------------------
+
+    @property
+    def calendar_path(self) -> Path:
+        return self.root / 'calendars' / f'{self.freq}.txt'
+
+    @property
+    def calendar(self) -> pd.DatetimeIndex:
+        return self._calendar
+
+    def _read_calendar(self) -> pd.DatetimeIndex:
+        if not self.calendar_path.exists():
+            return pd.DatetimeIndex([])
+        lines = [line.strip() for line in self.calendar_path.read_text().splitlines() if line.strip()]
+        return pd.DatetimeIndex(pd.to_datetime(lines))
+
+    @contextmanager
+    def _calendar_lock(self):
+        """跨行程的日曆排他鎖（flock，行程結束時由核心自動釋放）"""
+        lock_path = self.calendar_path.with_name(f'.{self.freq}.lock')
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def extend_calendar(self, timestamps: Iterable) -> int:
+        """
+        將晚於日曆最後一天的時點附加到交易日曆（原子替換）
+
+        在日曆鎖內重新讀取磁碟上的日曆再附加，其他行程同時附加的時點不會被覆蓋。
+        早於日曆結尾但不在日曆中的時點無法插入（需完整重新導出），記錄警告後略過。
+
+        Returns:
+            新增的時點數
+        """
+        stamps = pd.DatetimeIndex(pd.to_datetime(list(timestamps))).unique().sort_values()
+        with self._calendar_lock():
+            self._calendar = self._read_calendar()
+            if len(self._calendar):
+                last = self._calendar[-1]
+                missing = stamps[(stamps < last) & ~stamps.isin(self._calendar)]
+                if len(missing):
+                    logger.warning(
+                        f"⚠️  {len(missing)} 個時點早於交易日曆結尾 {last} 且不在日曆中，無法插入"
+                        f"（例如 {missing[0]}），需完整重新導出"
+                    )
+                stamps = stamps[stamps > last]
+
+            if len(stamps) == 0:
+                return 0
+
+            calendar = self._calendar.append(stamps)
+            text = '\n'.join(calendar.strftime(self.calendar_format)) + '\n'
+            _atomic_write_bytes(self.calendar_path, text.encode())
+            self._calendar = calendar
+        return len(stamps)
+
+    def _positions(self, timestamps) -> np.ndarray:
+        """時點在交易日曆中的位置（不在日曆中為 -1）"""
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps))
+        positions = self._calendar.get_indexer(index)
+        if (positions < 0).any():
+            # 日曆只會附加：快取過期（其他行程已延長日曆）時重新讀取，既有位置不變
+            self._calendar = self._read_calendar()
+            positions = self._calendar.get_indexer(index)
+        return positions
+
+    # ------------------------------------------------------------------
+    # 特徵檔
+    # ------------------------------------------------------------------
+
+    def feature_path(self, instrument: str, field: str) -> Path:
+        return self.root / 'features' / instrument.lower() / f'{field}.{self.freq}.bin'
+
+    def feature_span(self, instrument: str, field: str = 'close') -> Optional[Tuple[int, int]]:
+        """
+        特徵檔涵蓋的日曆位置（只讀檔頭與檔案大小）
+
+        Returns:
+            (起始位置, 結束位置)；檔案不存在或為空時返回 None
+        """
+        path = self.feature_path(instrument, field)
+        self._recover_file(path)
+        return self._span(path)
+
+    def last_timestamp(self, instrument: str, field: str = 'close') -> Optional[pd.Timestamp]:
+        """特徵檔最後一個時點（不讀取資料本體）"""
+        span = self.feature_span(instrument, field)
+        if span is not None and span[1] >= len(self._calendar):
+            self._calendar = self._read_calendar()
+        if span is None or span[1] >= len(self._calendar):
+            return None
+        return self._calendar[span[1]]
+
+    @staticmethod
+    def _span(path: Path) -> Optional[Tuple[int, int]]:
+        if not path.exists():
+            return None
+        count = path.stat().st_size // _DTYPE.itemsize - 1
+        if count <= 0:
+            return None
+        start = int(np.fromfile(path, dtype=_DTYPE, count=1)[0])
+        return start, start + count - 1
+
+    def write_instrument(
+        self,
+        instrument: str,
+        frame: pd.DataFrame,
+        fields: Optional[Sequence[str]] = None,
+        replace: bool = False,
+        strict: bool = False
+    ) -> Dict[str, int]:
+        """
+        寫入單一標的的特徵（frame 以時點為索引，欄位為特徵名稱）
+
+        frame 涵蓋的區間（最早到最晚時點）視為權威資料：區間內缺少的時點寫入 NaN。
+        時點須已在交易日曆中（先呼叫 extend_calendar），否則略過並記錄警告。
+
+        Args:
+            instrument: 標的代碼
+            frame: 時點索引的 DataFrame
+            fields: 要寫入的欄位（預設為 frame 所有欄位）
+            replace: True 表示整檔改寫（完整重新導出）
+            strict: True 表示有任何時點不在日曆中就整筆不寫入並拋出 ValueError
+
+        Returns:
+            {"slots": 寫入的時點數, "dropped": 不在日曆中而略過的列數}
+        """
+        fields = [f for f in (fields or frame.columns) if f in frame.columns]
+        if frame.empty or not fields:
+            return {"slots": 0, "dropped": 0}
+
+        positions = self._positions(frame.index)
+        valid = positions >= 0
+        dropped = int((~valid).sum())
+        if dropped and strict:
+            outside = frame.index[~valid]
+            raise ValueError(
+                f"{instrument}: {dropped} 筆資料不在 {self.freq} 交易日曆中"
+                f"（{outside.min()} ~ {outside.max()}）"
+            )
+        if dropped:
+            logger.warning(f"⚠️  {instrument}: {dropped} 筆資料不在 {self.freq} 交易日曆中，已略過")
+        if not valid.any():
+            return {"slots": 0, "dropped": dropped}
+
+        positions = positions[valid]
+        first, last = int(positions.min()), int(positions.max())
+        slots = last - first + 1
+
+        for field in fields:
+            values = np.full(slots, np.nan, dtype=_DTYPE)
+            # 重複時點以最後一筆為準（numpy 花式索引賦值依序覆寫）
+            values[positions - first] = frame[field].to_numpy(dtype=np.float64)[valid]
+            self._write_field(self.feature_path(instrument, field), first, values, replace)
+
+        span = self._span(self.feature_path(instrument, fields[0]))
+        if span:
+            self._spans[instrument] = span
+        return {"slots": slots, "dropped": dropped}
+
+    def _write_field(self, path: Path, first: int, values: np.ndarray, replace: bool):
+        self._recover_file(path)
+        span = None if replace else self._span(path)
+
+        if span is None:
+            self._rewrite(path, first, values)
+            return
+
+        start, end = span
+        if first < start:
+            # 新資料早於檔頭：合併後整檔改寫
+            existing = np.fromfile(path, dtype=_DTYPE)[1:]
+            hi = max(end, first + len(values) - 1)
+            merged = np.full(hi - first + 1, np.nan, dtype=_DTYPE)
+            merged[start - first:end - first + 1] = existing
+            merged[:len(values)] = values
+            self._rewrite(path, first, merged)
+            return
+
+        if first > end + 1:
+            # 與檔尾之間的空缺補 NaN
+            values = np.concatenate([np.full(first - end - 1, np.nan, dtype=_DTYPE), values])
+            first = end + 1
+
+        offset = _DTYPE.itemsize * (1 + first - start)
+        self._write_in_place(path, offset, values.astype(_DTYPE).tobytes())
+        self.stats['appends' if first == end + 1 else 'overwrites'] += 1
+
+    def _rewrite(self, path: Path, first: int, values: np.ndarray):
+        data = np.concatenate([np.array([first], dtype=_DTYPE), values.astype(_DTYPE)]).tobytes()
+        _atomic_write_bytes(path, data)
+        self.stats['rewrites'] += 1
+        self.stats['bytes_written'] += len(data)
+
+    def _write_in_place(self, path: Path, offset: int, payload: bytes):
+        """先寫 journal（位移 + 該位移之後的原始內容），再原地寫入"""
+        journal = self._journal_path(path)
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            original = f.read()
+        _atomic_write_bytes(journal, _HEADER.pack(offset) + original)
+
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        journal.unlink()
+        self.stats['bytes_written'] += len(payload)
+
+    @staticmethod
+    def _journal_path(path: Path) -> Path:
+        return path.with_name(path.name + '.wal')
+
+    def _recover_file(self, path: Path) -> bool:
+        """若上次原地寫入中斷（journal 仍在），還原為寫入前的內容"""
+        journal = self._journal_path(path)
+        if not journal.exists():
+            return False
+
+        data = journal.read_bytes()
+        if len(data) >= _HEADER.size and path.exists():
+            (offset,) = _HEADER.unpack_from(data)
+            original = data[_HEADER.size:]
+            with open(path, 'r+b') as f:
+                f.seek(offset)
+                f.write(original)
+                f.truncate(offset + len(original))
+                f.flush()
+                os.fsync(f.fileno())
+            logger.warning(f"⚠️  已從 journal 還原中斷的寫入: {path}")
+        # journal 本身以原子替換寫入，長度不足表示 journal 寫入前就已中斷，原檔未被修改
+        journal.unlink()
+        return True
+
+    def recover(self) -> int:
+        """
+        還原資料目錄中所有中斷的寫入
+
+        Returns:
+            還原的檔案數
+        """
+        recovered = 0
+        for journal in (self.root / 'features').glob(f'*/*.{self.freq}.bin.wal'):
+            recovered += self._recover_file(journal.with_name(journal.name[:-len('.wal')]))
+        return recovered
+
+    # ------------------------------------------------------------------
+    # instruments
+    # ------------------------------------------------------------------
+
+    def update_instruments(self, spans: Optional[Dict[str, Tuple[int, int]]] = None, market: str = 'all'):
+        """
+        更新 instruments/*.txt 的起迄時點（原子替換）
+
+        每個 instruments 檔中已列出的標的更新起迄；market 檔（預設 all.txt）另外加入新標的。
+
+        Args:
+            spans: {標的: (起始位置, 結束位置)}（預設為本次 write_instrument 寫入過的標的）
+            market: 新標的要加入的市場檔名
+        """
+        spans = self._spans if spans is None else spans
+        if not spans or not len(self._calendar):
+            return
+
+        updates = {
+            instrument.upper(): (self._calendar[start], self._calendar[min(end, len(self._calendar) - 1)])
+            for instrument, (start, end) in spans.items()
+        }
+
+        inst_dir = self.root / 'instruments'
+        market_path = inst_dir / f'{market}.txt'
+        paths: List[Path] = sorted(inst_dir.glob('*.txt')) if inst_dir.exists() else []
+        if market_path not in paths:
+            paths.append(market_path)
+
+        for path in paths:
+            self._update_instrument_file(path, updates, add_new=path == market_path)
+
+    def _update_instrument_file(self, path: Path, updates: Dict[str, Tuple[pd.Timestamp, pd.Timestamp]], add_new: bool):
+        entries: Dict[str, Tuple[pd.Timestamp, pd.Timestamp]] = {}
+        if path.exists():
+            for line in path.read_text().splitlines():
+                parts = line.strip().split('\t')
+                if len(parts) == 3:
+                    entries[parts[0]] = (pd.Timestamp(parts[1]), pd.Timestamp(parts[2]))
+
+        changed = False
+        for instrument, (start, end) in updates.items():
+            if instrument in entries:
+                old_start, old_end = entries[instrument]
+                merged = (min(old_start, start), max(old_end, end))
+                if merged != entries[instrument]:
+                    entries[instrument] = merged
+                    changed = True
+            elif add_new:
+                entries[instrument] = (start, end)
+                changed = True
+
+        if changed:
+            text = ''.join(
+                f"{instrument}\t{start.strftime(self.calendar_format)}\t{end.strftime(self.calendar_format)}\n"
+                for instrument, (start, end) in sorted(entries.items())
+            )
+            _atomic_write_bytes(path, text.encode())
@@ -14,6 +14,7 @@ from pathlib import Path
 from app.services.finlab_client import FinLabClient
 from app.utils.cache import cached_method
 from app.core.qlib_config import qlib_config
+from app.services.factor_store import factor_store, qlib_source_files
 
 
 class QlibDataAdapter:
@@ -247,19 +248,30 @@ class QlibDataAdapter:
                     start_str = start_date if isinstance(start_date, str) else start_date.isoformat()
                     end_str = end_date if isinstance(end_date, str) else end_date.isoformat()
 
-                    df = D.features(
-                        instruments=[symbol],
-                        fields=fields,
-                        start_time=start_str,
-                        end_time=end_str,
-                        freq='day'  # 指定日線數據頻率
+                    def compute(start_ts: pd.Timestamp, end_ts: pd.Timestamp) -> Optional[pd.DataFrame]:
+                        frame = D.features(
+                            instruments=[symbol],
+                            fields=fields,
+                            start_time=start_ts.strftime('%Y-%m-%d'),
+                            end_time=end_ts.strftime('%Y-%m-%d'),
+                            freq='day'  # 指定日線數據頻率
+                        )
+                        # 提取單一股票數據
+                        if frame is not None and isinstance(frame.index, pd.MultiIndex):
+                            frame = frame.xs(symbol, level=0)
+                        return frame
+
+                    # 先查磁碟因子儲存，只計算缺少的交易日（Qlib 會自動延伸滾動窗口所需的歷史）
+                    df = factor_store.get_or_compute(
+                        key='day|' + '|'.join(fields),
+                        instrument=symbol,
+                        start=start_str,
+                        end=end_str,
+                        compute=compute,
+                        sources=qlib_source_files(symbol, fields),
                     )
 
                     if df is not None and not df.empty:
-                        # 提取單一股票數據
-                        if isinstance(df.index, pd.MultiIndex):
-                            df = df.xs(symbol, level=0)
-
                         logger.info(f"✅ Computed {len(df.columns)} features, {len(df)} rows")
                         return df
 
@@ -276,6 +288,109 @@ class QlibDataAdapter:
             logger.debug(traceback.format_exc())
             return None
 
+    def get_qlib_features_panel(
+        self,
+        symbols: List[str],
+        start_date,  # Union[date, str]
+        end_date,    # Union[date, str]
+        fields: List[str],
+        chunk_size: int = 500
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        批次獲取多檔股票的 Qlib 表達式數據（寬表）
+
+        先逐一表達式查磁碟因子儲存（與 get_qlib_features 單一表達式的快取鍵相同，
+        不同批次組合的同一表達式可共用），其餘股票依 chunk_size 分批呼叫一次 D.features()
+        （只計算有股票缺少的表達式），每個 bin 檔只讀取一次，並逐一表達式寫回因子儲存。
+        僅使用本地 Qlib 數據（沒有本地數據的股票略過，不使用 FinLab API fallback）。
+
+        Args:
+            symbols: 股票代碼列表
+            start_date: 開始日期 (date 或 str)
+            end_date: 結束日期 (date 或 str)
+            fields: Qlib 表達式列表
+            chunk_size: 每次 D.features() 的股票數（控制記憶體）
+
+        Returns:
+            {表達式: DataFrame}，DataFrame 索引為日期、欄位為股票代碼（依 symbols 順序）；
+            Qlib 未初始化或沒有任何數據時回傳空字典
+
+        Raises:
+            D.features() 的例外（例如表達式語法錯誤）直接拋出，由呼叫端決定如何回報
+        """
+        if not self.qlib_initialized:
+            return {}
+
+        from qlib.data import D
+
+        fields = list(dict.fromkeys(fields))
+        start_str = start_date if isinstance(start_date, str) else start_date.isoformat()
+        end_str = end_date if isinstance(end_date, str) else end_date.isoformat()
+
+        # {股票: {表達式: Series}}
+        columns: Dict[str, Dict[str, pd.Series]] = {}
+        pending = []
+        missing_fields = set()
+        for symbol in symbols:
+            if not self._check_qlib_data_exists(symbol):
+                continue
+            cached = {}
+            for field in fields:
+                frame = factor_store.get(
+                    'day|' + field, symbol, start_str, end_str, qlib_source_files(symbol, [field])
+                )
+                if frame is not None:
+                    cached[field] = frame[field]
+            columns[symbol] = cached
+            if len(cached) < len(fields):
+                pending.append(symbol)
+                missing_fields.update(field for field in fields if field not in cached)
+
+        logger.info(
+            f"📊 Qlib features panel: {len(columns) - len(pending)} cached, {len(pending)} to compute "
+            f"({len(missing_fields)}/{len(fields)} expressions, "
+            f"{len(symbols) - len(columns)} without local data)"
+        )
+
+        compute_fields = [field for field in fields if field in missing_fields]
+        computed = set()
+        for lo in range(0, len(pending), chunk_size):
+            chunk = pending[lo:lo + chunk_size]
+            df = D.features(
+                instruments=chunk,
+                fields=compute_fields,
+                start_time=start_str,
+                end_time=end_str,
+                freq='day'
+            )
+            if df is None or df.empty:
+                continue
+
+            by_name = {symbol.lower(): symbol for symbol in chunk}
+            for instrument, group in df.groupby(level=0, sort=False):
+                symbol = by_name.get(str(instrument).lower(), str(instrument))
+                frame = group.droplevel(0)
+                for field in compute_fields:
+                    factor_store.put(
+                        'day|' + field, symbol, start_str, end_str, frame[[field]],
+                        qlib_source_files(symbol, [field])
+                    )
+                    columns.setdefault(symbol, {})[field] = frame[field]
+                computed.add(symbol)
+
+        # 快取不完整且 D.features() 沒有返回資料的股票不列入
+        ordered = [
+            symbol for symbol in symbols
+            if symbol in columns and (symbol in computed or len(columns[symbol]) == len(fields))
+        ]
+        if not ordered:
+            return {}
+
+        return {
+            field: pd.concat({symbol: columns[symbol][field] for symbol in ordered}, axis=1)
+            for field in fields
+        }
+
     def calculate_technical_factors(
         self,
         ohlcv_df: pd.DataFrame
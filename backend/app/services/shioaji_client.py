@@ -12,6 +12,7 @@ import pandas as pd
 from loguru import logger
 from app.core.config import settings
 from app.core.trading_hours import filter_trading_hours
+from app.services.minute_sync_pipeline import kbars_to_dataframe
 
 
 def get_third_wednesday(year: int, month: int) -> date:
@@ -403,6 +404,44 @@ class ShioajiClient:
             logger.error(f"Error getting futures contract for {symbol}: {str(e)}")
             return None
 
+    def fetch_kbars(
+        self,
+        stock_id: str,
+        start_datetime: datetime,
+        end_datetime: datetime,
+        contract_type: str = 'auto'
+    ):
+        """
+        獲取原始 Kbars 物件（不轉換為 DataFrame）
+
+        供分鐘線同步管線使用：API 呼叫在抓取執行緒，轉換與過濾在解碼階段
+        （見 minute_sync_pipeline.kbars_to_dataframe）。
+
+        Returns:
+            Kbars 物件（ts/Open/High/Low/Close/Volume）；沒有資料返回 None
+
+        Raises:
+            Exception: API 呼叫失敗（由呼叫端決定是否重試）
+        """
+        if not self.is_available():
+            logger.error("Shioaji client not available")
+            return None
+
+        contract = self.get_contract(stock_id, contract_type=contract_type)
+        if not contract:
+            return None
+
+        kbars = self._api.kbars(
+            contract=contract,
+            start=start_datetime.strftime('%Y-%m-%d'),
+            end=end_datetime.strftime('%Y-%m-%d'),
+            timeout=30000
+        )
+
+        if not kbars or len(kbars.ts) == 0:
+            return None
+        return kbars
+
     def get_kbars(
         self,
         stock_id: str,
@@ -449,7 +488,6 @@ class ShioajiClient:
             logger.info(f"Fetching {timeframe} kbars for {stock_id} "
                        f"from {start_datetime} to {end_datetime}")
 
-            # 調用 Shioaji API（新版僅支援 1min，其他粒度需後處理）
             kbars = self._api.kbars(
                 contract=contract,
                 start=start_datetime.strftime('%Y-%m-%d'),
@@ -457,39 +495,14 @@ class ShioajiClient:
                 timeout=30000
             )
 
-            if not kbars or len(kbars.ts) == 0:
-                logger.warning(f"No kbars data returned for {stock_id}")
-                return None
-
             # 轉換為 DataFrame（新版 Shioaji API 返回 Kbars 物件，有 ts/Open/High/Low/Close/Volume 列表）
-            data = []
-            for i in range(len(kbars.ts)):
-                # ts 是 nanosecond 時間戳（台灣時區 UTC+8）
-                # Shioaji API 返回台灣證券交易所的本地時間（已經是台灣時間戳）
-                # 轉換為 naive datetime（無時區標記，但實際為台灣時間）
-                # 這是設計決策：stock_minute_prices 表使用台灣時間（見 TIMEZONE_STRATEGY.md）
-                timestamp_ns = kbars.ts[i]
-                # 修復：Shioaji 時間戳已經是台灣時間，不需要 tz_convert
-                dt = pd.to_datetime(timestamp_ns, unit='ns').tz_localize('Asia/Taipei').tz_localize(None)
-
-                data.append({
-                    'datetime': dt,
-                    'open': float(kbars.Open[i]),
-                    'high': float(kbars.High[i]),
-                    'low': float(kbars.Low[i]),
-                    'close': float(kbars.Close[i]),
-                    'volume': int(kbars.Volume[i])
-                })
+            # ts 是台灣本地時間的 nanosecond 時間戳，轉換為 naive datetime（見 TIMEZONE_STRATEGY.md）
+            df = kbars_to_dataframe(kbars)
 
-            df = pd.DataFrame(data)
-
-            if df.empty:
-                logger.warning(f"Empty DataFrame for {stock_id}")
+            if df is None:
+                logger.warning(f"No kbars data returned for {stock_id}")
                 return None
 
-            # 確保 datetime 為 datetime 類型
-            df['datetime'] = pd.to_datetime(df['datetime'])
-
             # 期貨：不過濾交易時段（包含夜盤）
             # 股票：過濾交易時段（日盤 09:00-13:30）
             if not is_futures:
@@ -3,11 +3,13 @@ Stock Minute Price Service
 
 業務邏輯層，負責分鐘級股票價格的同步、驗證和管理
 """
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.repositories.stock_minute_price import StockMinutePriceRepository
 from app.schemas.stock_minute_price import StockMinutePriceCreate
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 import pandas as pd
 from loguru import logger
 
@@ -23,12 +25,12 @@ except ImportError:
 class StockMinutePriceService:
     """分鐘級股票價格業務邏輯層"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Union[Session, AsyncSession]):
         """
         初始化 Service
 
         Args:
-            db: 資料庫會話
+            db: 資料庫會話（*_async 方法需傳入 AsyncSession）
         """
         self.db = db
         self.repo = StockMinutePriceRepository
@@ -139,7 +141,29 @@ class StockMinutePriceService:
         prices = self.repo.get_by_stock(
             self.db, stock_id, start_datetime, end_datetime, '1min', limit
         )
+        return self._format_ohlcv(stock_id, timeframe, prices)
 
+    async def get_intraday_ohlcv_async(
+        self,
+        stock_id: str,
+        start_datetime: Optional[datetime] = None,
+        end_datetime: Optional[datetime] = None,
+        timeframe: str = '1min',
+        limit: int = 10000
+    ) -> Dict:
+        """
+        獲取分鐘級 OHLCV 數據（AsyncSession 版本，self.db 須為 AsyncSession）
+
+        查詢以 asyncpg 非同步執行；聚合與格式化（最多 10000 筆）屬 CPU 工作，
+        交給執行緒池處理以免阻塞 event loop。回傳格式同 get_intraday_ohlcv。
+        """
+        prices = await self.repo.get_by_stock_async(
+            self.db, stock_id, start_datetime, end_datetime, limit
+        )
+        return await run_in_threadpool(self._format_ohlcv, stock_id, timeframe, prices)
+
+    def _format_ohlcv(self, stock_id: str, timeframe: str, prices: List) -> Dict:
+        """分鐘價格記錄 → 聚合後的 OHLCV 回應"""
         if not prices:
             logger.warning(f"No data found for {stock_id} ({timeframe})")
             return {
@@ -238,7 +262,19 @@ class StockMinutePriceService:
             dict: {datetime, open, high, low, close, volume} 或 None
         """
         price = self.repo.get_latest(self.db, stock_id, timeframe)
+        return self._format_latest(price)
+
+    async def get_latest_price_async(
+        self,
+        stock_id: str,
+        timeframe: str = '1min'
+    ) -> Optional[Dict]:
+        """獲取最新分鐘價格（AsyncSession 版本，self.db 須為 AsyncSession）"""
+        price = await self.repo.get_latest_async(self.db, stock_id, timeframe)
+        return self._format_latest(price)
 
+    @staticmethod
+    def _format_latest(price) -> Optional[Dict]:
         if not price:
             return None
 
@@ -13,6 +13,11 @@ from app.core.config import settings
 from app.utils.cache import cached_method, cache
 
 
+def _strategy_list_tag(user_id: int) -> str:
+    """用戶策略列表快取的失效標籤（所有 status / 分頁組合共用）"""
+    return f"strategy:list:user:{user_id}"
+
+
 class StrategyService:
     """Service for strategy-related business logic"""
 
@@ -58,7 +63,8 @@ class StrategyService:
     @cached_method(
         key_prefix="strategy:list",
         expiry=120,
-        key_func=lambda user_id, status_filter=None, skip=0, limit=20: f"{user_id}:{status_filter}:{skip}:{limit}"
+        key_func=lambda user_id, status_filter=None, skip=0, limit=20: f"{user_id}:{status_filter}:{skip}:{limit}",
+        tags=lambda user_id, *args, **kwargs: [_strategy_list_tag(user_id)]
     )
     def get_user_strategies(
         self,
@@ -158,7 +164,7 @@ class StrategyService:
         strategy = self.repo.create(self.db, user_id, strategy_create)
 
         # Invalidate list cache for this user
-        cache.clear_pattern(f"strategy:list:{user_id}*")
+        cache.invalidate_tags(_strategy_list_tag(user_id))
 
         return strategy
 
@@ -213,7 +219,7 @@ class StrategyService:
 
         # Invalidate caches
         cache.delete(f"strategy:detail:{strategy_id}:{user_id}")
-        cache.clear_pattern(f"strategy:list:{user_id}*")
+        cache.invalidate_tags(_strategy_list_tag(user_id))
 
         return updated_strategy
 
@@ -255,7 +261,7 @@ class StrategyService:
 
         # Invalidate caches
         cache.delete(f"strategy:detail:{strategy_id}:{user_id}")
-        cache.clear_pattern(f"strategy:list:{user_id}*")
+        cache.invalidate_tags(_strategy_list_tag(user_id))
 
         return updated_strategy
 
@@ -288,7 +294,7 @@ class StrategyService:
 
         # Invalidate caches
         cache.delete(f"strategy:detail:{strategy_id}:{user_id}")
-        cache.clear_pattern(f"strategy:list:{user_id}*")
+        cache.invalidate_tags(_strategy_list_tag(user_id))
 
     def validate_strategy_code(self, code: str, engine_type: str = 'backtrader') -> dict:
         """
@@ -2,12 +2,18 @@
 策略信號檢測服務
 
 輕量級執行策略並檢測買賣信號（不進行完整回測）
+
+增量檢測：每個（策略, 股票）在 Redis 保存檢查點（最後一根 K 棒指紋 + 該 K 棒的信號），
+監控週期內 K 棒沒有變化時直接沿用檢查點，只有新 K 棒（或盤中更新）才重新執行 Backtrader。
 """
 
+import hashlib
+from functools import lru_cache
+
 import backtrader as bt
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from loguru import logger
@@ -25,6 +31,11 @@ from app.repositories.strategy import StrategyRepository
 from app.repositories.stock_price import StockPriceRepository
 from app.repositories.stock_minute_price import StockMinutePriceRepository
 from app.repositories.strategy_signal import StrategySignalRepository
+from app.utils.cache import cache
+
+# 檢查點 Redis 鍵與存活時間（隔日的回溯視窗不同，必然重新計算）
+SIGNAL_CHECKPOINT_KEY = "strategy_signals:checkpoint:{strategy_id}"
+SIGNAL_CHECKPOINT_TTL = 86400
 
 
 class SignalDetectionStrategy(bt.Strategy):
@@ -56,12 +67,57 @@ class SignalDetectionStrategy(bt.Strategy):
             logger.debug(f"📊 檢測到信號: {signal}")
 
 
+@lru_cache(maxsize=256)
+def _compile_strategy_class(code: str) -> type:
+    """
+    動態編譯用戶策略代碼（同一份代碼只編譯一次）
+
+    Args:
+        code: 策略代碼
+
+    Returns:
+        策略類
+    """
+    # 準備執行環境
+    exec_globals = {
+        'bt': bt,
+        'pd': pd,
+        'datetime': datetime,
+        'timedelta': timedelta,
+        'SignalDetectionStrategy': SignalDetectionStrategy,
+    }
+
+    # 執行用戶代碼
+    exec(code, exec_globals)
+
+    # 尋找策略類（假設用戶定義了一個繼承自 bt.Strategy 的類）
+    for name, obj in exec_globals.items():
+        if (
+            isinstance(obj, type) and
+            issubclass(obj, bt.Strategy) and
+            obj not in [bt.Strategy, SignalDetectionStrategy]
+        ):
+            # 找到用戶定義的策略類
+            # 需要讓它繼承 SignalDetectionStrategy 以捕獲信號
+
+            # 創建混合類
+            class MixedStrategy(SignalDetectionStrategy, obj):
+                """混合策略：繼承信號檢測 + 用戶策略"""
+                pass
+
+            return MixedStrategy
+
+    raise ValueError("未找到有效的策略類（應繼承自 bt.Strategy）")
+
+
 class StrategySignalDetector:
     """策略信號檢測器"""
 
     def __init__(self, db: Session):
         self.db = db
         self.minute_price_repo = StockMinutePriceRepository()
+        # 本次檢測的重新執行 / 沿用檢查點次數
+        self.stats = {'replayed': 0, 'reused': 0}
 
     def detect_signals_for_active_strategies(
         self,
@@ -70,6 +126,8 @@ class StrategySignalDetector:
         """
         檢測所有 ACTIVE 狀態策略的信號
 
+        所有策略用到的股票以一次查詢載入，K 棒沒有變化的（策略, 股票）沿用檢查點。
+
         Args:
             lookback_days: 回溯天數（用於獲取歷史數據）
 
@@ -85,13 +143,23 @@ class StrategySignalDetector:
 
         logger.info(f"📊 找到 {len(active_strategies)} 個 ACTIVE 策略，開始檢測信號...")
 
+        # 一次載入所有 Backtrader 策略用到的股票
+        stock_ids = sorted({
+            stock_id
+            for strategy in active_strategies
+            if strategy.engine_type == 'backtrader'
+            for stock_id in (strategy.parameters or {}).get('stocks', [])
+        })
+        stock_data = self._load_stock_data(stock_ids, lookback_days)
+
         all_signals = []
 
         for strategy in active_strategies:
             try:
                 signals = self.detect_signals_for_strategy(
                     strategy=strategy,
-                    lookback_days=lookback_days
+                    lookback_days=lookback_days,
+                    stock_data=stock_data
                 )
 
                 if signals:
@@ -106,12 +174,18 @@ class StrategySignalDetector:
                 )
                 continue
 
+        logger.info(
+            f"📊 信號檢測完成: 重新執行 {self.stats['replayed']} 組, "
+            f"沿用檢查點 {self.stats['reused']} 組"
+        )
+
         return all_signals
 
     def detect_signals_for_strategy(
         self,
         strategy: Strategy,
-        lookback_days: int = 60
+        lookback_days: int = 60,
+        stock_data: Optional[Dict[str, pd.DataFrame]] = None
     ) -> List[Dict]:
         """
         檢測單個策略的信號
@@ -119,6 +193,7 @@ class StrategySignalDetector:
         Args:
             strategy: 策略對象
             lookback_days: 回溯天數
+            stock_data: 已載入的股票數據（None 時自行載入）
 
         Returns:
             檢測到的信號列表
@@ -146,17 +221,55 @@ class StrategySignalDetector:
             logger.error(f"策略代碼編譯失敗: {str(e)}")
             return []
 
+        if stock_data is None:
+            stock_data = self._load_stock_data(stocks, lookback_days)
+
+        # 代碼或參數變更時檢查點失效
+        version = hashlib.sha1(
+            f"{strategy.code}\n{sorted(parameters.items())!r}".encode()
+        ).hexdigest()
+        checkpoint = self._load_checkpoint(strategy.id, version)
+        checkpoint_changed = False
+
         # 對每支股票檢測信號
         all_signals = []
 
         for stock_id in stocks:
             try:
-                signals = self._detect_signals_for_stock(
-                    strategy=strategy,
-                    strategy_class=strategy_class,
-                    stock_id=stock_id,
-                    lookback_days=lookback_days
-                )
+                data = stock_data.get(stock_id)
+
+                if data is None or data.empty:
+                    logger.warning(f"股票 {stock_id} 沒有足夠的歷史數據")
+                    continue
+
+                bar = self._bar_fingerprint(data)
+                entry = checkpoint['stocks'].get(stock_id)
+
+                if entry is not None and entry['bar'] == bar:
+                    # K 棒沒有變化：沿用上次的結果
+                    signals = [self._deserialize_signal(s) for s in entry['signals']]
+                    self.stats['reused'] += 1
+                else:
+                    signals = self._detect_signals_for_stock(
+                        strategy_class=strategy_class,
+                        stock_id=stock_id,
+                        data=data
+                    )
+                    self.stats['replayed'] += 1
+                    if signals is None:
+                        continue
+
+                    checkpoint['stocks'][stock_id] = {
+                        'bar': bar,
+                        'signals': [self._serialize_signal(s) for s in signals],
+                    }
+                    checkpoint_changed = True
+
+                # 添加策略和用戶信息
+                for signal in signals:
+                    signal['strategy_id'] = strategy.id
+                    signal['user_id'] = strategy.user_id
+                    signal['strategy_name'] = strategy.name
 
                 all_signals.extend(signals)
 
@@ -166,34 +279,32 @@ class StrategySignalDetector:
                 )
                 continue
 
+        if checkpoint_changed:
+            cache.set(
+                SIGNAL_CHECKPOINT_KEY.format(strategy_id=strategy.id),
+                checkpoint,
+                expiry=SIGNAL_CHECKPOINT_TTL
+            )
+
         return all_signals
 
     def _detect_signals_for_stock(
         self,
-        strategy: Strategy,
         strategy_class: type,
         stock_id: str,
-        lookback_days: int
-    ) -> List[Dict]:
+        data: pd.DataFrame
+    ) -> Optional[List[Dict]]:
         """
-        檢測單支股票的信號
+        執行策略並取出最後一根 K 棒的信號
 
         Args:
-            strategy: 策略對象
             strategy_class: 編譯後的策略類
             stock_id: 股票代碼
-            lookback_days: 回溯天數
+            data: OHLCV 數據（datetime 索引）
 
         Returns:
-            檢測到的信號列表
+            最後一根 K 棒的信號列表；執行失敗時為 None
         """
-        # 獲取歷史數據
-        data = self._get_stock_data(stock_id, lookback_days)
-
-        if data is None or data.empty:
-            logger.warning(f"股票 {stock_id} 沒有足夠的歷史數據")
-            return []
-
         # 創建 Cerebro 實例
         cerebro = bt.Cerebro()
 
@@ -220,92 +331,61 @@ class StrategySignalDetector:
         try:
             strategies = cerebro.run()
             strategy_instance = strategies[0]
-
-            # 提取信號
-            if hasattr(strategy_instance, 'signals'):
-                signals = strategy_instance.signals
-
-                # 只保留最近的信號（最後一個 bar 的信號）
-                if signals:
-                    # 獲取最後一個交易日
-                    last_date = data.index[-1]
-
-                    # 過濾出最後一個交易日的信號
-                    recent_signals = [
-                        s for s in signals
-                        if s['datetime'].date() == last_date.date()
-                    ]
-
-                    # 添加策略和用戶信息
-                    for signal in recent_signals:
-                        signal['strategy_id'] = strategy.id
-                        signal['user_id'] = strategy.user_id
-                        signal['strategy_name'] = strategy.name
-
-                    return recent_signals
-
         except Exception as e:
             logger.error(f"運行策略失敗: {str(e)}")
-            return []
+            return None
 
-        return []
+        # 只保留最近的信號（最後一個交易日的信號）
+        signals = getattr(strategy_instance, 'signals', None) or []
+        last_date = data.index[-1].date()
 
-    def _get_stock_data(
+        return [s for s in signals if s['datetime'].date() == last_date]
+
+    def _load_stock_data(
         self,
-        stock_id: str,
+        stock_ids: List[str],
         lookback_days: int
-    ) -> Optional[pd.DataFrame]:
+    ) -> Dict[str, pd.DataFrame]:
         """
-        獲取股票歷史數據
+        以一次查詢載入多支股票的日線數據
 
         Args:
-            stock_id: 股票代碼
+            stock_ids: 股票代碼列表
             lookback_days: 回溯天數
 
         Returns:
-            DataFrame 或 None
+            {股票代碼: OHLCV DataFrame（datetime 索引，時間順序）}
         """
+        if not stock_ids:
+            return {}
+
         # 計算起始日期（使用台灣日期，因為股價數據基於台灣交易日）
         from app.utils.timezone_helpers import today_taiwan
         end_date = today_taiwan()
         start_date = end_date - timedelta(days=lookback_days)
 
-        # 優先使用日線數據（更穩定）
-        rows = StockPriceRepository.get_by_stock(
+        # 使用日線數據（更穩定）
+        columns = StockPriceRepository.get_ohlcv_columns_multi(
             self.db,
-            stock_id,
+            stock_ids,
             start_date=start_date,
-            end_date=end_date,
-            skip=0,
-            limit=999999,  # 需要所有數據
-            ascending=True  # 按時間順序
+            end_date=end_date
         )
 
-        if not rows:
-            logger.warning(f"股票 {stock_id} 沒有日線數據")
-            return None
-
-        # 轉換為 DataFrame
-        data = pd.DataFrame([
-            {
-                'datetime': row.date,
-                'open': float(row.open) if row.open else None,
-                'high': float(row.high) if row.high else None,
-                'low': float(row.low) if row.low else None,
-                'close': float(row.close) if row.close else None,
-                'volume': int(row.volume) if row.volume else 0,
-            }
-            for row in rows
-        ])
+        frame = pd.DataFrame(columns)
+        if frame.empty:
+            return {}
 
-        # 設置索引
-        data['datetime'] = pd.to_datetime(data['datetime'])
-        data.set_index('datetime', inplace=True)
+        frame = frame.rename(columns={'date': 'datetime'})
+        frame['volume'] = frame['volume'].fillna(0).astype('int64')
 
         # 移除缺失值
-        data = data.dropna(subset=['open', 'high', 'low', 'close'])
+        frame = frame.dropna(subset=['open', 'high', 'low', 'close'])
 
-        return data
+        return {
+            stock_id: group.drop(columns='stock_id').set_index('datetime')
+            for stock_id, group in frame.groupby('stock_id', sort=False)
+        }
 
     def _build_strategy_class(self, code: str) -> type:
         """
@@ -317,42 +397,42 @@ class StrategySignalDetector:
         Returns:
             策略類
         """
-        # 準備執行環境
-        exec_globals = {
-            'bt': bt,
-            'pd': pd,
-            'datetime': datetime,
-            'timedelta': timedelta,
-            'SignalDetectionStrategy': SignalDetectionStrategy,
+        return _compile_strategy_class(code)
+
+    @staticmethod
+    def _bar_fingerprint(data: pd.DataFrame) -> List[Any]:
+        """回溯視窗的起訖日與最後一根 K 棒（新 K 棒或盤中更新都會改變）"""
+        last = data.iloc[-1]
+        return [
+            data.index[0].isoformat(),
+            data.index[-1].isoformat(),
+            len(data),
+            float(last['open']),
+            float(last['high']),
+            float(last['low']),
+            float(last['close']),
+            int(last['volume']),
+        ]
+
+    def _load_checkpoint(self, strategy_id: int, version: str) -> Dict[str, Any]:
+        """讀取策略的檢查點（版本不同或不存在時回傳空檢查點）"""
+        checkpoint = cache.get(SIGNAL_CHECKPOINT_KEY.format(strategy_id=strategy_id))
+        if not checkpoint or checkpoint.get('version') != version:
+            return {'version': version, 'stocks': {}}
+        return checkpoint
+
+    @staticmethod
+    def _serialize_signal(signal: Dict) -> Dict:
+        return {
+            'stock_id': signal['stock_id'],
+            'signal_type': signal['signal_type'],
+            'price': float(signal['price']) if signal.get('price') is not None else None,
+            'datetime': signal['datetime'].isoformat(),
         }
 
-        # 執行用戶代碼
-        exec(code, exec_globals)
-
-        # 尋找策略類（假設用戶定義了一個繼承自 bt.Strategy 的類）
-        strategy_class = None
-
-        for name, obj in exec_globals.items():
-            if (
-                isinstance(obj, type) and
-                issubclass(obj, bt.Strategy) and
-                obj not in [bt.Strategy, SignalDetectionStrategy]
-            ):
-                # 找到用戶定義的策略類
-                # 需要讓它繼承 SignalDetectionStrategy 以捕獲信號
-
-                # 創建混合類
-                class MixedStrategy(SignalDetectionStrategy, obj):
-                    """混合策略：繼承信號檢測 + 用戶策略"""
-                    pass
-
-                strategy_class = MixedStrategy
-                break
-
-        if strategy_class is None:
-            raise ValueError("未找到有效的策略類（應繼承自 bt.Strategy）")
-
-        return strategy_class
+    @staticmethod
+    def _deserialize_signal(data: Dict) -> Dict:
+        return {**data, 'datetime': datetime.fromisoformat(data['datetime'])}
 
     def save_signal(
         self,
@@ -414,3 +494,39 @@ class StrategySignalDetector:
             signal_type=signal_type,
             time_threshold=time_threshold
         )
+
+    def filter_duplicate_signals(
+        self,
+        signals: List[Dict],
+        minutes: int = 15
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        批次過濾重複信號（一次查詢取代每個信號的 is_duplicate_signal）
+
+        與 is_duplicate_signal 規則相同；同一批中相同策略、股票、方向的信號只保留第一個。
+
+        Args:
+            signals: 信號列表
+            minutes: 時間範圍（分鐘）
+
+        Returns:
+            (非重複信號, 重複信號)
+        """
+        time_threshold = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+
+        seen: Set[Tuple[int, str, str]] = StrategySignalRepository.get_recent_signal_keys(
+            self.db,
+            strategy_ids=sorted({s['strategy_id'] for s in signals}),
+            time_threshold=time_threshold
+        )
+
+        fresh, duplicates = [], []
+        for signal in signals:
+            key = (signal['strategy_id'], signal['stock_id'], signal['signal_type'])
+            if key in seen:
+                duplicates.append(signal)
+            else:
+                seen.add(key)
+                fresh.append(signal)
+
+        return fresh, duplicates
@@ -9,10 +9,13 @@ from app.tasks.stock_data import (
 from app.tasks.backtest import (
     run_backtest_async,
     get_backtest_progress,
+    run_backtest_sweep,
+    run_backtest_sweep_chunk,
 )
 from app.tasks.fundamental_sync import (
     sync_fundamental_data,
     sync_fundamental_latest,
+    precompute_industry_metrics,
 )
 from app.tasks.rdagent_tasks import (
     run_factor_mining_task,
@@ -73,8 +76,11 @@ __all__ = [
     "cleanup_old_cache",
     "run_backtest_async",
     "get_backtest_progress",
+    "run_backtest_sweep",
+    "run_backtest_sweep_chunk",
     "sync_fundamental_data",
     "sync_fundamental_latest",
+    "precompute_industry_metrics",
     "run_factor_mining_task",
     "run_strategy_optimization_task",
     "evaluate_factor_async",
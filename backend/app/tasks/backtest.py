@@ -24,7 +24,7 @@ from app.utils.error_handler import get_safe_error_message
 from app.utils.chart_generator import backtest_chart_generator
 from loguru import logger
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 # from app.tasks.telegram_notifications import send_telegram_notification  # 暫時註解，等待 python-telegram-bot 安裝完成
 
 
@@ -177,21 +177,40 @@ def run_backtest_async(
                         params = backtest.parameters or {}
                         backtest_config = params.get('backtest_config', {})
 
-                        results = engine.run_backtest(
-                            backtest_id=backtest.id,
-                            strategy_code=backtest.strategy.code,
-                            stock_id=backtest.symbol,
-                            start_date=datetime.fromisoformat(backtest.start_date) if isinstance(backtest.start_date, str) else backtest.start_date,
-                            end_date=datetime.fromisoformat(backtest.end_date) if isinstance(backtest.end_date, str) else backtest.end_date,
-                            initial_cash=float(backtest.initial_capital),
-                            commission=float(backtest_config.get('commission', 0.001425)),
-                            tax=float(backtest_config.get('tax', 0.003)),
-                            slippage=float(backtest_config.get('slippage', 0.0)),
-                            position_size=backtest_config.get('position_size'),
-                            max_position_pct=float(backtest_config.get('max_position_pct', 1.0)),
-                            strategy_params=params.get('strategy_params', {}),
-                            timeframe=backtest.timeframe
-                        )
+                        universe = backtest_config.get('universe')
+
+                        if universe:
+                            # 多標的投組回測：單次載入、單一 Cerebro、共用資金
+                            results = engine.run_portfolio_backtest(
+                                backtest_id=backtest.id,
+                                strategy_code=backtest.strategy.code,
+                                stock_ids=universe,
+                                start_date=backtest.start_date,
+                                end_date=backtest.end_date,
+                                initial_cash=float(backtest.initial_capital),
+                                commission=float(backtest_config.get('commission', 0.001425)),
+                                tax=float(backtest_config.get('tax', 0.003)),
+                                slippage=float(backtest_config.get('slippage', 0.0)),
+                                position_size=backtest_config.get('position_size'),
+                                max_position_pct=float(backtest_config.get('max_position_pct', 1.0)),
+                                strategy_params=params.get('strategy_params', {})
+                            )
+                        else:
+                            results = engine.run_backtest(
+                                backtest_id=backtest.id,
+                                strategy_code=backtest.strategy.code,
+                                stock_id=backtest.symbol,
+                                start_date=datetime.fromisoformat(backtest.start_date) if isinstance(backtest.start_date, str) else backtest.start_date,
+                                end_date=datetime.fromisoformat(backtest.end_date) if isinstance(backtest.end_date, str) else backtest.end_date,
+                                initial_cash=float(backtest.initial_capital),
+                                commission=float(backtest_config.get('commission', 0.001425)),
+                                tax=float(backtest_config.get('tax', 0.003)),
+                                slippage=float(backtest_config.get('slippage', 0.0)),
+                                position_size=backtest_config.get('position_size'),
+                                max_position_pct=float(backtest_config.get('max_position_pct', 1.0)),
+                                strategy_params=params.get('strategy_params', {}),
+                                timeframe=backtest.timeframe
+                            )
 
                     # 更新進度
                     self.update_state(
@@ -434,3 +453,153 @@ def get_backtest_progress(task_id: str) -> Dict[str, Any]:
         }
 
     return response
+
+
+# 每個 chunk 子任務執行的參數組合數量
+SWEEP_CHUNK_SIZE = 25
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.run_backtest_sweep",
+    acks_late=True,
+    time_limit=600,
+    soft_time_limit=540,
+)
+def run_backtest_sweep(
+    self: Task,
+    sweep_id: str,
+    user_id: int,
+    config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    參數掃描協調任務
+
+    資料載入一次並以快照存入 Redis，再將參數組合切成 chunk，
+    以 Celery 子任務分散到 backtest 隊列的多個 worker 執行。
+
+    Args:
+        sweep_id: 掃描 ID
+        user_id: 使用者 ID
+        config: 掃描設定（strategy_code, symbol, start_date, end_date, timeframe,
+                initial_capital, commission, slippage, base_params, combos）
+
+    Returns:
+        派送結果摘要
+    """
+    from celery import group
+    from app.services.backtest_sweep import SweepSnapshot, SweepResultStore, _get_strategy_class
+
+    store = SweepResultStore(sweep_id)
+    db = SessionLocal()
+
+    try:
+        logger.info(f"Celery task started: run_backtest_sweep(sweep_id={sweep_id}, user_id={user_id})")
+        store.update_meta(status='loading')
+
+        snapshot = SweepSnapshot.load(
+            BacktestEngine(db),
+            strategy_code=config['strategy_code'],
+            stock_id=config['symbol'],
+            start_date=datetime.fromisoformat(config['start_date']).date(),
+            end_date=datetime.fromisoformat(config['end_date']).date(),
+            timeframe=config.get('timeframe', '1day'),
+            initial_cash=config['initial_capital'],
+            commission=config['commission'],
+            slippage=config.get('slippage', 0.0),
+            base_params=config.get('base_params') or {},
+        )
+        # 派送前先驗證策略代碼可編譯，避免所有子任務重複失敗
+        _get_strategy_class(snapshot)
+        store.save_snapshot(snapshot)
+
+        combos = config['combos']
+        indexed = list(enumerate(combos))
+        chunks = [indexed[i:i + SWEEP_CHUNK_SIZE] for i in range(0, len(indexed), SWEEP_CHUNK_SIZE)]
+
+        group(
+            run_backtest_sweep_chunk.s(sweep_id, chunk).set(queue='backtest')
+            for chunk in chunks
+        ).apply_async()
+
+        store.update_meta(status='running', bars=len(snapshot.data))
+        logger.info(f"Sweep {sweep_id}: {len(combos)} combinations dispatched in {len(chunks)} chunks")
+
+        return {
+            "status": "dispatched",
+            "sweep_id": sweep_id,
+            "total": len(combos),
+            "chunks": len(chunks),
+        }
+
+    except Exception as e:
+        error_msg = get_safe_error_message(e, "參數掃描")
+        logger.error(f"Sweep {sweep_id} failed to start: {str(e)}")
+        store.update_meta(status='failed', error=error_msg)
+        return {"status": "failed", "sweep_id": sweep_id, "error": error_msg}
+
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    bind=True,
+    name="app.tasks.run_backtest_sweep_chunk",
+    acks_late=True,
+    time_limit=1800,
+    soft_time_limit=1740,
+)
+def run_backtest_sweep_chunk(
+    self: Task,
+    sweep_id: str,
+    indexed_combos: List[List[Any]]
+) -> Dict[str, Any]:
+    """
+    執行一批參數組合（共享 Redis 中的資料快照）
+
+    Args:
+        sweep_id: 掃描 ID
+        indexed_combos: [[組合索引, 參數字典], ...]
+
+    Returns:
+        此批次的完成/失敗數量
+    """
+    from app.services.backtest_sweep import ParameterSweepRunner, SweepResultStore
+
+    store = SweepResultStore(sweep_id)
+    meta = store.get_meta()
+    snapshot = store.load_snapshot()
+
+    if meta is None or snapshot is None:
+        logger.warning(f"Sweep {sweep_id} expired or missing, skipping chunk")
+        return {"status": "not_found", "sweep_id": sweep_id}
+
+    rank_by = meta.get('rank_by', 'sharpe_ratio')
+    runner = ParameterSweepRunner(snapshot)
+    completed = failed = 0
+
+    try:
+        # prefork worker 為 daemon 進程，無法再建立進程池：循序執行，結果依輸入順序產出
+        indexes = [index for index, _ in indexed_combos]
+        results = runner.iter_results([params for _, params in indexed_combos], max_workers=1)
+        for index, result in zip(indexes, results):
+            store.add_result(index, result, rank_by)
+            if result.get('metrics'):
+                completed += 1
+            else:
+                failed += 1
+
+    except SoftTimeLimitExceeded:
+        logger.warning(f"Sweep {sweep_id} chunk hit soft time limit after {completed + failed} combinations")
+        # 未執行的組合記為失敗，否則進度永遠達不到 total，掃描會停在 running
+        for index, params in indexed_combos[completed + failed:]:
+            store.add_result(index, {'params': params, 'error': "批次執行超過時間上限，未執行"}, rank_by)
+            failed += 1
+
+    meta = store.get_meta() or {}
+    if meta.get('completed', 0) + meta.get('failed', 0) >= meta.get('total', 0):
+        store.update_meta(status='completed', finished_at=datetime.now().isoformat())
+        store.delete_snapshot()
+        logger.info(f"Sweep {sweep_id} completed")
+
+    return {"status": "ok", "sweep_id": sweep_id, "completed": completed, "failed": failed}
@@ -130,16 +130,24 @@ def batch_evaluate_factors(
     factor_ids: list[int],
     stock_pool: str = "all",
     start_date: str = None,
-    end_date: str = None
+    end_date: str = None,
+    shared_data: bool = True,
+    max_workers: int = 1
 ) -> dict:
     """
     批量評估多個因子
 
+    預設使用共享資料模式（FactorEvaluationService.evaluate_factors_batch）：
+    股票池與未來收益只載入一次，相同公式只計算一次。
+    本地 Qlib 數據不可用時退回逐一評估。
+
     Args:
         factor_ids: 因子 ID 列表
         stock_pool: 股票池
         start_date: 開始日期
         end_date: 結束日期
+        shared_data: 是否使用共享資料的批次模式
+        max_workers: 批次模式的進程數（Celery prefork worker 內無法建立子進程，會循序執行）
 
     Returns:
         批量評估結果
@@ -152,9 +160,44 @@ def batch_evaluate_factors(
 
     try:
         service = FactorEvaluationService(db)
+        pending = list(factor_ids)
+
+        if shared_data:
+            try:
+                batch = service.evaluate_factors_batch(
+                    factor_ids,
+                    stock_pool=stock_pool,
+                    start_date=start_date,
+                    end_date=end_date,
+                    save_to_db=True,
+                    max_workers=max_workers
+                )
+                names = {
+                    factor.id: factor.name
+                    for factor in db.query(GeneratedFactor).filter(GeneratedFactor.id.in_(factor_ids))
+                }
+                for factor_id in factor_ids:
+                    eval_result = batch[factor_id]
+                    if "error" in eval_result:
+                        failed.append({"factor_id": factor_id, "error": eval_result["error"]})
+                        continue
+                    results.append({
+                        "factor_id": factor_id,
+                        "factor_name": names.get(factor_id),
+                        "ic": eval_result.get("ic"),
+                        "icir": eval_result.get("icir"),
+                        "sharpe_ratio": eval_result.get("sharpe_ratio"),
+                        "annual_return": eval_result.get("annual_return"),
+                    })
+                pending = []
+            except ValueError as e:
+                logger.warning(
+                    f"[Task {self.request.id}] Shared-data batch unavailable ({e}), "
+                    f"evaluating factors one by one"
+                )
 
-        for i, factor_id in enumerate(factor_ids, 1):
-            logger.info(f"[Task {self.request.id}] Evaluating factor {i}/{len(factor_ids)}: {factor_id}")
+        for i, factor_id in enumerate(pending, 1):
+            logger.info(f"[Task {self.request.id}] Evaluating factor {i}/{len(pending)}: {factor_id}")
 
             try:
                 # 檢查因子是否存在
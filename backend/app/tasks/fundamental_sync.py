@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from app.core.celery_app import celery_app
 from app.db.session import SessionLocal
 from app.services.fundamental_service import FundamentalService
+from app.services.industry_service import IndustryService
 from app.services.finlab_client import FinLabClient
 from app.utils.task_history import record_task_history
 from app.utils.task_deduplication import skip_if_recently_executed
@@ -201,3 +202,42 @@ def sync_fundamental_latest(self: Task) -> dict:
 
     finally:
         db.close()
+
+
+@celery_app.task(bind=True, name="app.tasks.precompute_industry_metrics")
+@skip_if_recently_executed(min_interval_hours=12)
+@record_task_history
+def precompute_industry_metrics(self: Task) -> dict:
+    """
+    預先計算所有產業的基本面指標
+
+    在每日財務數據同步後執行：以單一分組查詢計算所有產業的平均指標，
+    寫入 industry_metrics_cache 並預熱 Redis，API 請求不再需要即時彙總
+
+    Returns:
+        計算結果統計
+    """
+    db: Session = SessionLocal()
+
+    try:
+        logger.info("開始預先計算產業基本面指標")
+
+        result = IndustryService(db).precompute_industry_metrics()
+
+        logger.info(
+            f"產業指標預先計算完成: {result['industries']} 個產業, "
+            f"{result['cache_rows']} 筆快取"
+        )
+
+        return {
+            "status": "success",
+            **result,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"產業指標預先計算失敗: {str(e)}")
+        raise self.retry(exc=e, countdown=600, max_retries=2)
+
+    finally:
+        db.close()
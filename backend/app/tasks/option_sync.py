@@ -14,10 +14,14 @@ from app.utils.task_deduplication import skip_if_recently_executed
 from app.db.session import get_db
 from loguru import logger
 from datetime import datetime, timezone, date, timedelta
+from decimal import Decimal
 from typing import List, Optional
 
+import numpy as np
+
 from app.services.shioaji_client import ShioajiClient
 from app.services.option_data_source import ShioajiOptionDataSource
+from app.services.option_chain_store import StoredOptionDataSource
 from app.services.option_calculator import OptionFactorCalculator
 from app.repositories.option import (
     OptionDailyFactorRepository,
@@ -33,12 +37,13 @@ from app.schemas.option import OptionDailyFactorCreate
     max_retries=3,
     default_retry_delay=300  # 5 minutes
 )
-@skip_if_recently_executed(min_interval_hours=24)
+@skip_if_recently_executed(min_interval_hours=24, bypass_kwarg='refresh_chain')
 @record_task_history
 def sync_option_daily_factors(
     self: Task,
     underlying_ids: Optional[List[str]] = None,
-    target_date: Optional[str] = None
+    target_date: Optional[str] = None,
+    refresh_chain: bool = False
 ) -> dict:
     """
     同步選擇權每日聚合因子（階段一主任務）
@@ -46,13 +51,14 @@ def sync_option_daily_factors(
     執行流程：
     1. 檢查當前階段配置
     2. 獲取啟用的標的物列表
-    3. 使用 Shioaji API 獲取選擇權鏈數據
+    3. 獲取選擇權鏈數據（已保存則讀取 option_chain_snapshots，否則以 Shioaji API 抓取並保存）
     4. 計算每日因子
     5. 儲存到 option_daily_factors 表
 
     Args:
         underlying_ids: 標的代碼列表（None 表示使用配置）
         target_date: 目標日期（YYYY-MM-DD，預設為今天）
+        refresh_chain: 已保存的選擇權鏈仍重新抓取並覆蓋（不受 24 小時間隔限制）
 
     Returns:
         Task result with sync statistics
@@ -138,8 +144,8 @@ def sync_option_daily_factors(
                         "timestamp": datetime.now(timezone.utc).isoformat()
                     }
 
-                # 創建資料源和計算器
-                data_source = ShioajiOptionDataSource(shioaji)
+                # 創建資料源和計算器（選擇權鏈每天只抓一次，Greeks 任務共用）
+                data_source = StoredOptionDataSource(db, ShioajiOptionDataSource(shioaji), refresh=refresh_chain)
                 calculator = OptionFactorCalculator(data_source, db)
 
                 # 同步統計
@@ -405,7 +411,7 @@ def register_option_contracts(
                 }
 
             # 創建資料源
-            data_source = ShioajiOptionDataSource(shioaji)
+            data_source = StoredOptionDataSource(db, ShioajiOptionDataSource(shioaji))
 
             # 註冊統計
             stats = {
@@ -632,7 +638,7 @@ def calculate_option_greeks(
         try:
             from app.services.greeks_calculator import (
                 BlackScholesGreeksCalculator,
-                calculate_time_to_expiry
+                time_to_expiry_array
             )
             from app.schemas.option import OptionGreeksCreate
             from app.repositories.option import OptionGreeksRepository
@@ -649,8 +655,8 @@ def calculate_option_greeks(
                         "timestamp": datetime.now(timezone.utc).isoformat()
                     }
 
-                # 創建資料源和計算器
-                data_source = ShioajiOptionDataSource(shioaji)
+                # 創建資料源和計算器（優先使用因子任務已保存的選擇權鏈）
+                data_source = StoredOptionDataSource(db, ShioajiOptionDataSource(shioaji))
                 bs_calculator = BlackScholesGreeksCalculator()
 
                 # 統計
@@ -658,6 +664,8 @@ def calculate_option_greeks(
                     "total_underlyings": len(underlying_ids),
                     "total_contracts_processed": 0,
                     "greeks_calculated": 0,
+                    "greeks_inserted": 0,
+                    "greeks_updated": 0,
                     "errors": []
                 }
 
@@ -698,61 +706,56 @@ def calculate_option_greeks(
 
                         logger.debug(f"[GREEKS] Spot price: {spot_price}")
 
-                        # 逐個合約計算 Greeks
-                        for _, row in valid_contracts.iterrows():
-                            try:
-                                contract_id = row['contract_id']
-                                strike_price = float(row['strike_price'])
-                                expiry_date = row['expiry_date']
-                                option_type = row['option_type']
-                                option_price = float(row['close'])
-
-                                # 計算到期時間
-                                time_to_expiry = calculate_time_to_expiry(expiry_date, calc_date)
-                                if time_to_expiry <= 0:
-                                    continue
-
-                                # 估算隱含波動率
-                                volatility = (option_price / strike_price) * np.sqrt(2 * np.pi / time_to_expiry)
-                                volatility = max(0.05, min(volatility, 1.0))
-
-                                # 計算 Greeks
-                                greeks = bs_calculator.calculate_greeks(
-                                    spot_price=spot_price,
-                                    strike_price=strike_price,
-                                    time_to_expiry=time_to_expiry,
-                                    volatility=volatility,
-                                    option_type=option_type
-                                )
+                        # 整條鏈一次計算 Greeks（隱含波動率由市價反推，無解時使用近似波動率）
+                        time_to_expiry = time_to_expiry_array(valid_contracts['expiry_date'], calc_date)
+                        live_contracts = valid_contracts[time_to_expiry > 0]
+                        greeks = bs_calculator.calculate_chain_greeks(
+                            spot_price=spot_price,
+                            strike_price=live_contracts['strike_price'].to_numpy(dtype=np.float64),
+                            time_to_expiry=time_to_expiry[time_to_expiry > 0],
+                            option_type=live_contracts['option_type'].to_numpy(),
+                            option_price=live_contracts['close'].to_numpy(dtype=np.float64)
+                        )
 
-                                if greeks['delta'] is None:
-                                    continue
+                        def to_decimal(value: float) -> Optional[Decimal]:
+                            return Decimal(str(value)) if value and not np.isnan(value) else None
 
-                                # 創建 Greeks 記錄
+                        calc_datetime = datetime.combine(calc_date, datetime.min.time())
+                        greeks_batch = []
+                        for i, contract_id in enumerate(live_contracts['contract_id']):
+                            delta = greeks['delta'][i]
+                            if np.isnan(delta):
+                                continue
+
+                            try:
                                 greeks_data = OptionGreeksCreate(
                                     contract_id=contract_id,
-                                    datetime=datetime.combine(calc_date, datetime.min.time()),
-                                    delta=Decimal(str(greeks['delta'])),
-                                    gamma=Decimal(str(greeks['gamma'])) if greeks['gamma'] else None,
-                                    theta=Decimal(str(greeks['theta'])) if greeks['theta'] else None,
-                                    vega=Decimal(str(greeks['vega'])) if greeks['vega'] else None,
-                                    rho=Decimal(str(greeks['rho'])) if greeks['rho'] else None,
-                                    vanna=Decimal(str(greeks['vanna'])) if greeks['vanna'] else None,
+                                    datetime=calc_datetime,
+                                    delta=Decimal(str(delta)),
+                                    gamma=to_decimal(greeks['gamma'][i]),
+                                    theta=to_decimal(greeks['theta'][i]),
+                                    vega=to_decimal(greeks['vega'][i]),
+                                    rho=to_decimal(greeks['rho'][i]),
+                                    vanna=to_decimal(greeks['vanna'][i]),
                                     spot_price=Decimal(str(spot_price)),
-                                    volatility=Decimal(str(volatility)),
-                                    risk_free_rate=Decimal('0.01')
+                                    volatility=Decimal(str(greeks['volatility'][i])),
+                                    risk_free_rate=Decimal(str(bs_calculator.risk_free_rate))
                                 )
 
-                                # 儲存到資料庫（upsert）
-                                OptionGreeksRepository.upsert(db, greeks_data)
-                                stats["greeks_calculated"] += 1
+                                greeks_batch.append(greeks_data)
 
                             except Exception as e:
                                 logger.debug(
-                                    f"[GREEKS] Failed to calculate for contract {row.get('contract_id', 'unknown')}: {str(e)}"
+                                    f"[GREEKS] Invalid Greeks for contract {contract_id}: {str(e)}"
                                 )
                                 continue
 
+                        # 整條鏈批次寫入（每個標的提交一次）
+                        counts = OptionGreeksRepository.bulk_upsert(db, greeks_batch)
+                        stats["greeks_calculated"] += len(greeks_batch)
+                        stats["greeks_inserted"] += counts["inserted"]
+                        stats["greeks_updated"] += counts["updated"]
+
                         stats["total_contracts_processed"] += len(valid_contracts)
                         logger.info(
                             f"[GREEKS] ✅ Processed {len(valid_contracts)} contracts for {underlying_id}"
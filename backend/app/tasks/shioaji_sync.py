@@ -9,10 +9,17 @@ from app.utils.task_deduplication import skip_if_recently_executed
 from loguru import logger
 from datetime import datetime, timezone, date, timedelta
 from typing import List, Optional
+import os
 import subprocess
 import sys
 from redis import Redis
 from app.core.config import settings
+from app.core.qlib_config import qlib_config
+
+# 分鐘線同步的抓取執行緒數（Shioaji 速率限制由腳本內的 RateLimiter 控制）
+SHIOAJI_FETCH_WORKERS = 4
+# 全市場同步的續傳進度檔（放在腳本寫入的同一個 Qlib 分鐘線目錄）
+SHIOAJI_SYNC_CHECKPOINT = os.path.join(qlib_config.minute_data_path, ".sync_checkpoint")
 
 
 @celery_app.task(bind=True, name="app.tasks.sync_shioaji_minute_data")
@@ -21,7 +28,8 @@ def sync_shioaji_minute_data(
     self: Task,
     stock_ids: Optional[List[str]] = None,
     smart_mode: bool = True,
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    workers: int = SHIOAJI_FETCH_WORKERS
 ) -> dict:
     """
     同步 Shioaji 分鐘線數據到 PostgreSQL + Qlib
@@ -30,6 +38,7 @@ def sync_shioaji_minute_data(
         stock_ids: 股票代碼列表（None 表示同步所有股票）
         smart_mode: 使用智慧增量同步（預設 True）
         end_date: 結束日期（YYYY-MM-DD，預設為今天）
+        workers: 抓取執行緒數（> 1 時腳本使用分階段管線，抓取與 DB/Qlib 寫入同時進行）
 
     Returns:
         Task result with sync statistics
@@ -48,7 +57,9 @@ def sync_shioaji_minute_data(
         # 準備命令參數
         cmd = [
             sys.executable,  # 使用當前 Python 解釋器
-            "/app/scripts/sync_shioaji_to_qlib.py"
+            "/app/scripts/sync_shioaji_to_qlib.py",
+            "--qlib-data-dir", qlib_config.minute_data_path,
+            "--futures-qlib-data-dir", qlib_config.futures_minute_data_path,
         ]
 
         # 添加模式參數
@@ -65,6 +76,11 @@ def sync_shioaji_minute_data(
         if stock_ids:
             cmd.extend(["--stocks", ",".join(stock_ids)])
 
+        # 並發抓取；全市場同步記錄進度，超時或重試時從中斷處續傳
+        cmd.extend(["--workers", str(workers)])
+        if not stock_ids:
+            cmd.extend(["--checkpoint", SHIOAJI_SYNC_CHECKPOINT])
+
         # 執行同步腳本
         logger.info(f"🔧 Command: {' '.join(cmd)}")
 
@@ -12,11 +12,8 @@ from app.db.session import SessionLocal
 from app.repositories.stock import StockRepository
 from app.repositories.stock_price import StockPriceRepository
 from app.schemas.stock import StockCreate
-from app.schemas.stock_price import StockPriceCreate
-from app.utils.price_validator import PriceValidationError
 from loguru import logger
 from datetime import datetime, timezone, timedelta, date as date_type
-from decimal import Decimal
 import pandas as pd
 
 
@@ -151,8 +148,6 @@ def sync_daily_prices(self: Task, stock_ids: list = None, days: int = 7) -> dict
     """
     from app.db.session import SessionLocal
     from app.repositories.stock_price import StockPriceRepository
-    from app.schemas.stock_price import StockPriceCreate
-    from datetime import date as DateType
 
     # 🔒 Distributed lock - prevent concurrent execution
     redis_client = cache.redis_client
@@ -214,6 +209,7 @@ def sync_daily_prices(self: Task, stock_ids: list = None, days: int = 7) -> dict
         synced_count = 0
         failed_count = 0
         db_records_count = 0
+        rejected_count = 0
 
         db = SessionLocal()
         try:
@@ -233,50 +229,37 @@ def sync_daily_prices(self: Task, stock_ids: list = None, days: int = 7) -> dict
                         if pd.notna(price)
                     }
 
-                    # Write to database (IMPORTANT!) 帶驗證
-                    validation_errors = 0
-                    for date_str, price_value in data.items():
-                        try:
+                    # 每檔一次批次寫入資料庫（帶驗證）：單檔違反約束只回滾該檔，不影響其他股票
+                    # FinLab price API只有收盤價，其他欄位用 close 填充（資料庫不允許 NULL）
+                    if data:
+                        close = pd.Series(data)
+                        ingest = StockPriceRepository.bulk_ingest(db, pd.DataFrame({
+                            'stock_id': stock_id,
                             # Extract date part only (remove time if present)
-                            date_only = date_str.split()[0] if ' ' in date_str else date_str
-                            # FinLab price API只有收盤價，其他欄位用 close 填充（資料庫不允許 NULL）
-                            price_create = StockPriceCreate(
-                                stock_id=stock_id,
-                                date=DateType.fromisoformat(date_only),
-                                close=price_value,
-                                open=price_value,   # 使用 close 作為 open
-                                high=price_value,   # 使用 close 作為 high
-                                low=price_value,    # 使用 close 作為 low
-                                volume=0,           # 無成交量數據
-                                adj_close=None
-                            )
-                            StockPriceRepository.upsert(db, price_create)  # 預設會驗證
-                            db_records_count += 1
-                        except PriceValidationError as e:
-                            # 價格驗證失敗 - 記錄但不中斷同步
-                            validation_errors += 1
-                            logger.warning(f"⚠️  [VALIDATION] {stock_id} {date_only if 'date_only' in locals() else date_str}: {str(e)}")
-                            continue
-                        except Exception as e:
-                            logger.warning(f"Failed to write {stock_id} {date_only if 'date_only' in locals() else date_str} to DB: {e}")
-                            continue
-
-                    if validation_errors > 0:
-                        logger.warning(
-                            f"⚠️  {stock_id} 驗證失敗: {validation_errors} 筆記錄被拒絕"
-                        )
+                            'date': [date_str.split()[0] for date_str in close.index],
+                            'open': close.values,
+                            'high': close.values,
+                            'low': close.values,
+                            'close': close.values,
+                            'volume': 0,  # 無成交量數據
+                        }))
+                        db_records_count += ingest["inserted"] + ingest["updated"]
+                        rejected_count += ingest["rejected"]
 
                     # Cache for 10 minutes (for API performance)
                     cache_key = f"price:{stock_id}:{start_date}:{end_date}"
                     cache.set(cache_key, data, expiry=600)
 
                     synced_count += 1
-                    logger.debug(f"Synced price data for {stock_id}: {len(data)} days ({db_records_count} DB records)")
+                    logger.debug(f"Fetched price data for {stock_id}: {len(data)} days")
 
                 except Exception as e:
                     logger.warning(f"Failed to sync {stock_id}: {str(e)}")
                     failed_count += 1
                     continue
+
+            if rejected_count > 0:
+                logger.warning(f"⚠️  驗證失敗: {rejected_count} 筆記錄被拒絕")
         finally:
             db.close()
 
@@ -366,6 +349,7 @@ def sync_ohlcv_data(self: Task, stock_ids: list = None, days: int = 30) -> dict:
         failed_count = 0
         total_days = 0
         db_saved = 0
+        rejected_count = 0
 
         for stock_id in stock_ids:
             try:
@@ -376,35 +360,15 @@ def sync_ohlcv_data(self: Task, stock_ids: list = None, days: int = 30) -> dict:
                     end_date=end_date
                 )
 
-                # Save to database using upsert（帶驗證）
-                validation_errors = 0
-                for date, row in ohlcv_df.iterrows():
-                    try:
-                        price_create = StockPriceCreate(
-                            stock_id=stock_id,
-                            date=date.date() if hasattr(date, 'date') else date,
-                            open=Decimal(str(row['open'])) if pd.notna(row['open']) else Decimal('0'),
-                            high=Decimal(str(row['high'])) if pd.notna(row['high']) else Decimal('0'),
-                            low=Decimal(str(row['low'])) if pd.notna(row['low']) else Decimal('0'),
-                            close=Decimal(str(row['close'])) if pd.notna(row['close']) else Decimal('0'),
-                            volume=int(row['volume']) if pd.notna(row['volume']) else 0,
-                            adj_close=None
-                        )
-                        StockPriceRepository.upsert(db, price_create)  # 預設會驗證
-                        db_saved += 1
-                    except PriceValidationError as e:
-                        # 價格驗證失敗 - 記錄但不中斷同步
-                        validation_errors += 1
-                        logger.warning(f"⚠️  [VALIDATION] {stock_id} {date}: {str(e)}")
-                        continue
-                    except Exception as e:
-                        logger.warning(f"Failed to save {stock_id} on {date}: {str(e)}")
-                        continue
-
-                if validation_errors > 0:
-                    logger.warning(
-                        f"⚠️  {stock_id} 驗證失敗: {validation_errors} 筆記錄被拒絕"
-                    )
+                # 每檔一次批次寫入資料庫（帶驗證）；缺值以 0 填充
+                # 單檔違反約束（外鍵、數值溢位）只回滾該檔，計為失敗
+                if not ohlcv_df.empty:
+                    frame = ohlcv_df[['open', 'high', 'low', 'close', 'volume']].fillna(0)
+                    frame.insert(0, 'date', pd.to_datetime(ohlcv_df.index))
+                    frame.insert(0, 'stock_id', stock_id)
+                    ingest = StockPriceRepository.bulk_ingest(db, frame.reset_index(drop=True))
+                    db_saved += ingest["inserted"] + ingest["updated"]
+                    rejected_count += ingest["rejected"]
 
                 # Convert to dict for caching
                 data = {
@@ -431,6 +395,9 @@ def sync_ohlcv_data(self: Task, stock_ids: list = None, days: int = 30) -> dict:
                 failed_count += 1
                 continue
 
+        if rejected_count > 0:
+            logger.warning(f"⚠️  驗證失敗: {rejected_count} 筆記錄被拒絕")
+
         logger.info(f"OHLCV sync completed: {synced_count} stocks, {total_days} total days, {db_saved} DB records")
 
         return {
@@ -72,28 +72,21 @@ def monitor_active_strategies(
         # 統計資訊
         total_signals = len(signals)
         signals_sent = 0
-        signals_filtered = 0
         errors = []
 
-        # 處理每個信號
-        for signal in signals:
-            try:
-                # 檢查重複信號（15 分鐘內相同股票相同方向）
-                is_duplicate = detector.is_duplicate_signal(
-                    strategy_id=signal['strategy_id'],
-                    stock_id=signal['stock_id'],
-                    signal_type=signal['signal_type'],
-                    minutes=15
-                )
+        # 批次過濾重複信號（15 分鐘內相同股票相同方向）
+        new_signals, duplicates = detector.filter_duplicate_signals(signals, minutes=15)
+        signals_filtered = len(duplicates)
 
-                if is_duplicate:
-                    logger.info(
-                        f"🔁 [STRATEGY_MONITOR] 過濾重複信號: "
-                        f"{signal['stock_id']} {signal['signal_type']}"
-                    )
-                    signals_filtered += 1
-                    continue
+        for signal in duplicates:
+            logger.info(
+                f"🔁 [STRATEGY_MONITOR] 過濾重複信號: "
+                f"{signal['stock_id']} {signal['signal_type']}"
+            )
 
+        # 處理每個信號
+        for signal in new_signals:
+            try:
                 # 保存信號到資料庫
                 signal_record = detector.save_signal(signal)
 
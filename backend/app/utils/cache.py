@@ -1,23 +1,199 @@
 """
 Redis caching utilities with HMAC-signed pickle protection
+
+序列化：JSON（簡單類型）；DataFrame / Series 以欄式二進位編碼（app.utils.frame_codec）、
+其他物件以 pickle，兩者皆加上 HMAC 簽章。
+
+兩層快取：
+- 近端：每個行程內有上限的 LRU（含 TTL），存放已驗證的序列化資料，
+  命中時免去 Redis 往返與 HMAC 驗證；寫入 / 刪除時經 Redis pub/sub 通知其他行程清除
+- 遠端：Redis
+
+失效：寫入時可帶標籤（cached / cached_method 的 tags），invalidate_tags 只處理該標籤下的鍵；
+clear_pattern 以 SCAN 分批 UNLINK，不使用會阻塞整個 Redis（同時是 Celery broker）的 KEYS。
+
+get_or_set / cached / cached_method 另提供防擊穿（stampede）保護：
+同一個鍵過期時只有一個 worker 重算（行程內 single-flight + Redis 鎖），
+命中時並以機率提早刷新（XFetch），在過期前由單一 worker 預先重算。
 """
 
+import fnmatch
 import json
+import math
+import os
 import pickle
 import hmac
 import hashlib
-from typing import Optional, Any, Callable
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Optional, Any, Callable, Dict, Iterable, List, Tuple
 from functools import wraps
+import pandas as pd
 import redis
 from loguru import logger
 from app.core.config import settings
+from app.utils.frame_codec import UnsupportedFrameError, decode_frame, encode_frame, is_frame_payload
+
+# 近端快取失效通知頻道
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# 重算鎖與上次重算耗時（毫秒，供提早刷新估算）以快取鍵加後綴存放
+RECOMPUTE_LOCK_SUFFIX = ":__lock"
+RECOMPUTE_DELTA_SUFFIX = ":__delta"
+
+# 標籤集合：cache:tag:<標籤> 存放帶有該標籤的快取鍵
+TAG_KEY_PREFIX = "cache:tag:"
+
+# SCAN / SSCAN 每批處理的鍵數
+_SCAN_BATCH = 500
+
+_FORMAT_JSON = "json"
+_FORMAT_PICKLE = "pickle"
+_FORMAT_FRAME = "frame"
+
+# 只釋放自己持有的鎖（與 RedisLock.release 相同）
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+else
+    return 0
+end
+"""
+
+
+class NearCache:
+    """
+    行程內有上限的 LRU 快取（附 TTL，執行緒安全）
+
+    存放 (格式, 已驗證的序列化資料) 而非物件本身，命中時重新反序列化，
+    呼叫端拿到的永遠是獨立物件，修改回傳值不會污染快取。
+    """
+
+    def __init__(self, max_items: int = 1024, ttl: float = 30.0, max_value_bytes: int = 1024 * 1024):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_value_bytes = max_value_bytes
+        self._entries: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """取得 (格式, 資料)，不存在或已過期返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, fmt, payload = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return fmt, payload
+
+    def set(self, key: str, fmt: str, payload: bytes, ttl: Optional[float] = None) -> bool:
+        """
+        寫入項目，TTL 不超過近端上限；過大的資料不放進近端
+
+        Returns:
+            是否已寫入
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_items <= 0 or len(payload) > self.max_value_bytes:
+            return False
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, fmt, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+        return True
+
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_pattern(self, pattern: str):
+        """以 glob 模式清除（與 Redis KEYS/SCAN 的模式語法相容）"""
+        with self._lock:
+            for key in [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CacheStats:
+    """快取命中、重算與延遲計數（每個行程各自累計）"""
+
+    COUNTERS = (
+        "near_hits", "redis_hits", "misses", "sets",
+        "recomputes", "early_refreshes", "lock_waits", "invalidations", "errors",
+    )
+    TIMERS = ("redis_get", "compute")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.COUNTERS, 0)
+            self._timers = {name: [0, 0.0] for name in self.TIMERS}
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timer = self._timers[name]
+            timer[0] += 1
+            timer[1] += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            各計數、命中率，以及各計時項目的次數 / 平均毫秒
+        """
+        with self._lock:
+            result: Dict[str, Any] = dict(self._counts)
+            timers = {name: tuple(values) for name, values in self._timers.items()}
+
+        lookups = result["near_hits"] + result["redis_hits"] + result["misses"]
+        result["hit_rate"] = (result["near_hits"] + result["redis_hits"]) / lookups if lookups else 0.0
+        result["near_hit_rate"] = result["near_hits"] / lookups if lookups else 0.0
+        for name, (count, total) in timers.items():
+            result[f"{name}_count"] = count
+            result[f"{name}_avg_ms"] = total / count * 1000 if count else 0.0
+        return result
+
+
+class _Flight:
+    """行程內同一個鍵的重算鎖（以 WeakValueDictionary 管理，無人使用時自動回收）"""
+
+    __slots__ = ("lock", "__weakref__")
+
+    def __init__(self):
+        self.lock = threading.Lock()
 
 
 class RedisCache:
     """Redis cache manager"""
 
-    def __init__(self):
-        """Initialize Redis connection"""
+    def __init__(self, near_cache: bool = True):
+        """
+        Initialize Redis connection
+
+        Args:
+            near_cache: 是否啟用行程內近端快取
+        """
         try:
             self.redis_client = redis.from_url(
                 settings.REDIS_URL,
@@ -29,6 +205,22 @@ class RedisCache:
             logger.error(f"Failed to connect to Redis: {str(e)}")
             self.redis_client = None
 
+        self.stats = CacheStats()
+        self.near = NearCache(
+            max_items=settings.CACHE_NEAR_MAX_ITEMS,
+            ttl=settings.CACHE_NEAR_TTL,
+            max_value_bytes=settings.CACHE_NEAR_MAX_VALUE_BYTES,
+        ) if near_cache else None
+
+        # 失效訂閱執行緒不會跟著 fork 到子行程（Celery prefork），以 pid 判斷是否需重新訂閱
+        self._instance_id = uuid.uuid4().hex
+        self._listener = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+        self._flights: "weakref.WeakValueDictionary[str, _Flight]" = weakref.WeakValueDictionary()
+        self._flights_lock = threading.Lock()
+
     def is_available(self) -> bool:
         """Check if Redis is available"""
         return self.redis_client is not None
@@ -99,6 +291,8 @@ class RedisCache:
         """
         Get value from cache with signature verification
 
+        先查近端快取，未命中再讀 Redis（並回填近端）
+
         Args:
             key: Cache key
 
@@ -109,32 +303,10 @@ class RedisCache:
             return None
 
         try:
-            value = self.redis_client.get(key)
-            if value is None:
-                return None
-
-            # 先嘗試 JSON 解碼（簡單類型，無需簽章）
-            try:
-                return json.loads(value.decode())
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                pass  # 不是 JSON，可能是簽章的 pickle
-
-            # 嘗試驗證簽章並 unpickle（複雜物件如 DataFrame）
-            try:
-                # 驗證簽章
-                verified_data = self._verify_and_extract(value)
-                if verified_data is None:
-                    logger.warning(f"簽章驗證失敗，拒絕載入快取 {key}")
-                    # 刪除被篡改的快取
-                    self.delete(key)
-                    return None
-
-                # 簽章驗證通過，安全 unpickle
-                return pickle.loads(verified_data)
-
-            except (pickle.UnpicklingError, TypeError, AttributeError) as e:
-                logger.warning(f"Failed to unpickle cache value for key {key}: {str(e)}")
-                return None
+            found, value = self._get_near(key)
+            if found:
+                return value
+            return self._fetch(key)[0]
 
         except redis.ConnectionError as e:
             logger.error(f"Redis connection error when getting key {key}: {str(e)}")
@@ -146,11 +318,180 @@ class RedisCache:
             logger.error(f"Unexpected error getting cache key {key}: {str(e)}")
             return None
 
+    def _fetch(
+        self,
+        key: str,
+        with_delta: bool = False,
+        record: bool = True,
+    ) -> Tuple[Optional[Any], Optional[int], int]:
+        """
+        讀取 Redis（單次往返取得值與剩餘 TTL），成功時回填近端快取
+
+        Args:
+            key: Cache key
+            with_delta: 一併讀取上次重算耗時
+            record: 是否計入命中 / 未命中統計（重算前的複查與等待輪詢不計）
+
+        Returns:
+            (值, 剩餘 TTL 毫秒, 上次重算耗時毫秒)
+        """
+        start = time.perf_counter()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        if with_delta:
+            pipe.get(key + RECOMPUTE_DELTA_SUFFIX)
+        results = pipe.execute()
+        self.stats.observe("redis_get", time.perf_counter() - start)
+
+        raw, ttl_ms = results[0], results[1]
+        delta_ms = int(results[2]) if with_delta and results[2] else 0
+
+        decoded = self._decode(key, raw) if raw is not None else None
+        if decoded is None:
+            if record:
+                self.stats.incr("misses")
+            return None, ttl_ms, delta_ms
+
+        fmt, payload, value = decoded
+        if record:
+            self.stats.incr("redis_hits")
+        if self._near_ready():
+            self.near.set(key, fmt, payload, ttl=ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else None)
+        return value, ttl_ms, delta_ms
+
+    def _decode(self, key: str, raw: bytes) -> Optional[Tuple[str, bytes, Any]]:
+        """
+        解碼 Redis 中的資料
+
+        Returns:
+            (格式, 已驗證的資料, 值)，簽章驗證或反序列化失敗時返回 None
+        """
+        # 先嘗試 JSON 解碼（簡單類型，無需簽章）
+        try:
+            return _FORMAT_JSON, raw, json.loads(raw.decode())
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            pass  # 不是 JSON，可能是簽章的 pickle
+
+        # 驗證簽章
+        verified_data = self._verify_and_extract(raw)
+        if verified_data is None:
+            logger.warning(f"簽章驗證失敗，拒絕載入快取 {key}")
+            # 刪除被篡改的快取
+            self.delete(key)
+            return None
+
+        # 簽章驗證通過，安全解碼
+        fmt = _FORMAT_FRAME if is_frame_payload(verified_data) else _FORMAT_PICKLE
+        try:
+            return fmt, verified_data, self._load(fmt, verified_data)
+        except (pickle.UnpicklingError, TypeError, AttributeError, ValueError) as e:
+            logger.warning(f"Failed to decode cache value for key {key}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _encode_object(value: Any) -> Tuple[str, bytes]:
+        """
+        序列化非 JSON 值（簽章前）
+
+        DataFrame / Series 使用欄式編碼，含不支援的欄位型別時與其他物件一樣退回 pickle
+
+        Returns:
+            (格式, 資料)
+        """
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            try:
+                return _FORMAT_FRAME, encode_frame(value)
+            except UnsupportedFrameError:
+                pass
+        return _FORMAT_PICKLE, pickle.dumps(value)
+
+    @staticmethod
+    def _load(fmt: str, payload: bytes) -> Any:
+        """由已驗證簽章的資料重建值（Redis 讀取與近端快取命中共用）"""
+        if fmt == _FORMAT_JSON:
+            return json.loads(payload.decode())
+        if fmt == _FORMAT_FRAME:
+            return decode_frame(payload)
+        return pickle.loads(payload)
+
+    def _get_near(self, key: str) -> Tuple[bool, Any]:
+        """查詢近端快取，返回 (是否命中, 值)"""
+        if not self._near_ready():
+            return False, None
+
+        entry = self.near.get(key)
+        if entry is None:
+            return False, None
+
+        self.stats.incr("near_hits")
+        return True, self._load(*entry)
+
+    def _near_ready(self) -> bool:
+        """近端快取是否可用；fork 出的子行程首次使用時清空繼承的項目並重新訂閱失效通知"""
+        if self.near is None:
+            return False
+
+        pid = os.getpid()
+        if self._listener_pid != pid:
+            with self._listener_lock:
+                if self._listener_pid != pid:
+                    self.near.clear()
+                    self._listener = self._subscribe_invalidations()
+                    self._listener_pid = pid
+        return self._listener is not None
+
+    def _subscribe_invalidations(self):
+        """訂閱失效通知（背景執行緒），失敗時此行程不使用近端快取"""
+        try:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+            return pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+            )
+        except Exception as e:
+            logger.warning(f"近端快取失效訂閱失敗，此行程停用近端快取: {str(e)}")
+            return None
+
+    def _on_invalidation(self, message: dict):
+        """處理其他行程的失效通知：'<instance_id> <key|keys|pattern> <目標>'（keys 以換行分隔）"""
+        try:
+            origin, kind, target = message["data"].decode().split(" ", 2)
+        except (AttributeError, KeyError, ValueError):
+            return
+
+        if origin == self._instance_id:
+            return
+
+        self.stats.incr("invalidations")
+        if kind == "key":
+            self.near.discard(target)
+        elif kind == "keys":
+            for key in target.split("\n"):
+                self.near.discard(key)
+        else:
+            self.near.discard_pattern(target)
+
+    def _on_listener_error(self, error, pubsub, thread):
+        """訂閱連線中斷：清空近端快取（可能漏收失效通知），下次使用時重新訂閱"""
+        logger.warning(f"近端快取失效訂閱中斷，清空近端快取: {str(error)}")
+        thread.stop()
+        pubsub.close()
+        self.near.clear()
+        self._listener = None
+        self._listener_pid = None
+
+    def _publish_invalidation(self, pipe, kind: str, target: str):
+        """在同一個 pipeline 中通知其他行程清除近端項目"""
+        pipe.publish(INVALIDATION_CHANNEL, f"{self._instance_id} {kind} {target}")
+
     def set(
         self,
         key: str,
         value: Any,
         expiry: int = 3600,
+        recompute_ms: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
     ) -> bool:
         """
         Set value in cache with signature protection
@@ -159,6 +500,8 @@ class RedisCache:
             key: Cache key
             value: Value to cache
             expiry: Expiry time in seconds (default: 1 hour)
+            recompute_ms: 產生此值的耗時（毫秒），供 get_or_set 估算提早刷新
+            tags: 失效標籤，之後可用 invalidate_tags 清除
 
         Returns:
             True if successful, False otherwise
@@ -171,17 +514,32 @@ class RedisCache:
             try:
                 serialized = json.dumps(value).encode()
             except (TypeError, ValueError):
-                # Fallback: Pickle + HMAC 簽章（複雜物件如 DataFrame）
+                # Fallback: 欄式編碼（DataFrame / Series）或 Pickle + HMAC 簽章（其他複雜物件）
                 try:
-                    pickled = pickle.dumps(value)
-                    # 🔒 使用 HMAC 簽章保護 pickle 資料
-                    serialized = self._sign_data(pickled)
-                    logger.debug(f"快取 {key} 使用簽章保護的 pickle 序列化")
+                    fmt, payload = self._encode_object(value)
+                    # 🔒 使用 HMAC 簽章保護資料
+                    serialized = self._sign_data(payload)
+                    logger.debug(f"快取 {key} 使用簽章保護的 {fmt} 序列化")
                 except (pickle.PicklingError, TypeError, AttributeError) as e:
                     logger.warning(f"Failed to serialize value for key {key}: {str(e)}")
                     return False
 
-            self.redis_client.setex(key, expiry, serialized)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.setex(key, expiry, serialized)
+            if recompute_ms is not None:
+                pipe.setex(key + RECOMPUTE_DELTA_SUFFIX, expiry, max(int(recompute_ms), 1))
+            for tag in tags or ():
+                tag_key = TAG_KEY_PREFIX + tag
+                pipe.sadd(tag_key, key)
+                # 標籤集合的存活時間不短於其中任一鍵（NX 設定初始 TTL，GT 只延長）
+                pipe.expire(tag_key, expiry, nx=True)
+                pipe.expire(tag_key, expiry, gt=True)
+            self._publish_invalidation(pipe, "key", key)
+            pipe.execute()
+
+            if self.near is not None:
+                self.near.discard(key)
+            self.stats.incr("sets")
             return True
 
         except redis.ConnectionError as e:
@@ -208,7 +566,13 @@ class RedisCache:
             return False
 
         try:
-            self.redis_client.delete(key)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.delete(key, key + RECOMPUTE_DELTA_SUFFIX)
+            self._publish_invalidation(pipe, "key", key)
+            pipe.execute()
+
+            if self.near is not None:
+                self.near.discard(key)
             return True
         except Exception as e:
             logger.error(f"Failed to delete cache key {key}: {str(e)}")
@@ -218,6 +582,10 @@ class RedisCache:
         """
         Clear all keys matching pattern
 
+        以 SCAN 逐批取得符合的鍵並 UNLINK（背景釋放記憶體），
+        不會像 KEYS 一樣在掃描整個 keyspace 期間阻塞 Redis。
+        主要用於未帶標籤的鍵；已知範圍的失效請用 invalidate_tags。
+
         Args:
             pattern: Key pattern (e.g., "stock:*")
 
@@ -227,15 +595,240 @@ class RedisCache:
         if not self.is_available():
             return 0
 
+        deleted = 0
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            batch = []
+            for key in self.redis_client.scan_iter(match=pattern, count=_SCAN_BATCH):
+                batch.append(key.decode())
+                if len(batch) >= _SCAN_BATCH:
+                    deleted += self._unlink_keys(batch, notify=False)
+                    batch = []
+            if batch:
+                deleted += self._unlink_keys(batch, notify=False)
+
+            # 刪除完成後才通知，避免其他行程在刪除前又從 Redis 回填近端
+            self.redis_client.publish(INVALIDATION_CHANNEL, f"{self._instance_id} pattern {pattern}")
+            if self.near is not None:
+                self.near.discard_pattern(pattern)
+            return deleted
         except Exception as e:
             logger.error(f"Failed to clear pattern {pattern}: {str(e)}")
+            return deleted
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        清除帶有任一標籤的快取鍵
+
+        成本為 O(標籤內的鍵數)：先以 RENAME 原子地取走標籤集合
+        （之後寫入的鍵進入新的集合，不會被誤刪或遺漏），再以 SSCAN 分批 UNLINK。
+
+        Args:
+            tags: 標籤
+
+        Returns:
+            刪除的快取鍵數
+        """
+        if not self.is_available():
             return 0
 
+        deleted = 0
+        for tag in tags:
+            tag_key = TAG_KEY_PREFIX + tag
+            purge_key = f"{tag_key}:purge:{uuid.uuid4().hex}"
+            try:
+                # RENAME 保留原集合的 TTL，清除中斷時殘留的集合也會過期
+                self.redis_client.rename(tag_key, purge_key)
+            except redis.ResponseError:
+                continue  # 標籤下沒有鍵
+            except Exception as e:
+                logger.error(f"Failed to invalidate tag {tag}: {str(e)}")
+                continue
+
+            try:
+                batch = []
+                for member in self.redis_client.sscan_iter(purge_key, count=_SCAN_BATCH):
+                    batch.append(member.decode())
+                    if len(batch) >= _SCAN_BATCH:
+                        deleted += self._unlink_keys(batch)
+                        batch = []
+                if batch:
+                    deleted += self._unlink_keys(batch)
+                self.redis_client.unlink(purge_key)
+            except Exception as e:
+                logger.error(f"Failed to invalidate tag {tag}: {str(e)}")
+
+        return deleted
+
+    def _unlink_keys(self, keys: List[str], notify: bool = True) -> int:
+        """
+        UNLINK 一批快取鍵（連同其重算耗時鍵），並清除近端項目
+
+        Args:
+            keys: 快取鍵
+            notify: 是否逐鍵通知其他行程（clear_pattern 已改以模式通知）
+
+        Returns:
+            實際刪除的快取鍵數
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.unlink(*keys)
+        pipe.unlink(*[key + RECOMPUTE_DELTA_SUFFIX for key in keys])
+        if notify:
+            self._publish_invalidation(pipe, "keys", "\n".join(keys))
+        deleted = pipe.execute()[0]
+
+        if self.near is not None:
+            for key in keys:
+                self.near.discard(key)
+        return deleted
+
+    def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        expiry: int = 3600,
+        lock_timeout: float = 30.0,
+        beta: float = 1.0,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Any:
+        """
+        讀取快取，未命中時重算並寫回（防擊穿）
+
+        - 行程內同一個鍵只有一個執行緒重算，其餘執行緒等待結果
+        - 跨行程以 Redis 鎖（SET NX PX）確保只有一個 worker 重算，其餘輪詢等待寫回；
+          等待逾時或持鎖者放棄時自行重算
+        - Redis 命中時依 XFetch 以機率提早重算：剩餘 TTL 越短、上次重算越慢越容易觸發，
+          拿不到鎖的 worker 直接回傳舊值
+
+        compute 回傳 None 時不寫入（與 get 以 None 表示未命中一致）。
+
+        Args:
+            key: Cache key
+            compute: 產生值的函式
+            expiry: Expiry time in seconds
+            lock_timeout: 重算鎖的存活時間 / 等待他人重算的上限（秒）
+            beta: 提早刷新的積極程度，0 表示停用
+            tags: 寫回時附加的失效標籤
+
+        Returns:
+            快取值或重算結果
+        """
+        if not self.is_available():
+            return compute()
+
+        try:
+            found, value = self._get_near(key)
+            if found:
+                return value
+
+            value, ttl_ms, delta_ms = self._fetch(key, with_delta=True)
+            if value is not None:
+                if not self._should_refresh_early(ttl_ms, delta_ms, beta):
+                    return value
+                token = self._acquire_recompute_lock(key, lock_timeout)
+                if token is None:
+                    return value
+                self.stats.incr("early_refreshes")
+                try:
+                    return self._recompute(key, compute, expiry, tags)
+                finally:
+                    self._release_recompute_lock(key, token)
+
+            flight = self._flight(key)
+            with flight.lock:
+                # 同行程的其他執行緒可能剛完成重算
+                found, value = self._get_near(key)
+                if found:
+                    return value
+                value = self._fetch(key, record=False)[0]
+                if value is not None:
+                    return value
+
+                token = self._acquire_recompute_lock(key, lock_timeout)
+                if token is None:
+                    self.stats.incr("lock_waits")
+                    value = self._wait_for_value(key, lock_timeout)
+                    if value is not None:
+                        return value
+                    logger.warning(f"等待快取 {key} 重算未果，改由本行程重算")
+
+                try:
+                    return self._recompute(key, compute, expiry, tags)
+                finally:
+                    if token is not None:
+                        self._release_recompute_lock(key, token)
+
+        except redis.RedisError as e:
+            logger.error(f"Redis error in get_or_set for key {key}: {str(e)}")
+            self.stats.incr("errors")
+            return compute()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得本行程的快取統計（命中率、Redis 讀取延遲、重算次數等）"""
+        stats = self.stats.snapshot()
+        stats["near_items"] = len(self.near) if self.near is not None else 0
+        stats["near_enabled"] = self.near is not None and self._listener is not None
+        return stats
+
+    def _recompute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        expiry: int,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Any:
+        start = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - start
+
+        self.stats.incr("recomputes")
+        self.stats.observe("compute", elapsed)
+        if value is not None:
+            self.set(key, value, expiry, recompute_ms=elapsed * 1000, tags=tags)
+        return value
+
+    @staticmethod
+    def _should_refresh_early(ttl_ms: Optional[int], delta_ms: int, beta: float) -> bool:
+        """XFetch：delta * beta * -ln(U) 超過剩餘 TTL 時提早重算"""
+        if beta <= 0 or not delta_ms or ttl_ms is None or ttl_ms <= 0:
+            return False
+        return delta_ms * beta * -math.log(1.0 - random.random()) >= ttl_ms
+
+    def _flight(self, key: str) -> _Flight:
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+            return flight
+
+    def _acquire_recompute_lock(self, key: str, timeout: float) -> Optional[str]:
+        """取得跨行程重算鎖，返回持有者 token（未取得返回 None）"""
+        token = uuid.uuid4().hex
+        if self.redis_client.set(key + RECOMPUTE_LOCK_SUFFIX, token, nx=True, px=int(timeout * 1000)):
+            return token
+        return None
+
+    def _release_recompute_lock(self, key: str, token: str):
+        try:
+            self.redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, key + RECOMPUTE_LOCK_SUFFIX, token)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release recompute lock for {key}: {str(e)}")
+
+    def _wait_for_value(self, key: str, timeout: float) -> Optional[Any]:
+        """等待其他 worker 重算寫回；持鎖者放棄（鎖已釋放仍無值）時提前返回 None"""
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            value = self._fetch(key, record=False)[0]
+            if value is not None:
+                return value
+            if not self.redis_client.exists(key + RECOMPUTE_LOCK_SUFFIX):
+                return None
+            delay = min(delay * 2, 0.5)
+        return None
+
 
 # Global cache instance
 cache = RedisCache()
@@ -245,6 +838,7 @@ def cached(
     key_prefix: str,
     expiry: int = 3600,
     key_func: Optional[Callable] = None,
+    tags: Optional[Callable[..., Iterable[str]]] = None,
 ):
     """
     Decorator to cache function results
@@ -253,6 +847,7 @@ def cached(
         key_prefix: Prefix for cache key
         expiry: Cache expiry in seconds
         key_func: Optional function to generate cache key from args
+        tags: Optional function returning invalidation tags from args (see RedisCache.invalidate_tags)
 
     Example:
         @cached(key_prefix="stock_price", expiry=600)
@@ -262,29 +857,13 @@ def cached(
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Generate cache key
-            if key_func:
-                cache_key = f"{key_prefix}:{key_func(*args, **kwargs)}"
-            else:
-                # Default: use function args as key
-                key_parts = [str(arg) for arg in args]
-                key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
-                cache_key = f"{key_prefix}:{'_'.join(key_parts)}"
-
-            # Try to get from cache
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache hit: {cache_key}")
-                return cached_value
-
-            # Execute function
-            logger.debug(f"Cache miss: {cache_key}")
-            result = func(*args, **kwargs)
-
-            # Store in cache
-            cache.set(cache_key, result, expiry)
-
-            return result
+            cache_key = _cache_key(key_prefix, key_func, args, kwargs)
+
+            # 未命中時只有一個 worker 執行函式，其餘等待寫回
+            return cache.get_or_set(
+                cache_key, lambda: func(*args, **kwargs), expiry,
+                tags=tags(*args, **kwargs) if tags else None,
+            )
 
         return wrapper
     return decorator
@@ -294,6 +873,7 @@ def cached_method(
     key_prefix: str,
     expiry: int = 3600,
     key_func: Optional[Callable] = None,
+    tags: Optional[Callable[..., Iterable[str]]] = None,
 ):
     """
     Decorator to cache class method results (handles 'self' argument)
@@ -302,6 +882,7 @@ def cached_method(
         key_prefix: Prefix for cache key
         expiry: Cache expiry in seconds
         key_func: Optional function to generate cache key from args (excluding self)
+        tags: Optional function returning invalidation tags from args (excluding self)
 
     Example:
         class MyService:
@@ -313,35 +894,13 @@ def cached_method(
         @wraps(func)
         def wrapper(self, *args, **kwargs):
             # Generate cache key (skip 'self' argument)
-            if key_func:
-                cache_key = f"{key_prefix}:{key_func(*args, **kwargs)}"
-            else:
-                # 使用 JSON + 哈希確保唯一性，避免鍵衝突
-                import hashlib
-                import json
-
-                key_data = {
-                    'args': [repr(arg) for arg in args],
-                    'kwargs': {k: repr(v) for k, v in sorted(kwargs.items())}
-                }
-                key_json = json.dumps(key_data, sort_keys=True)
-                key_hash = hashlib.md5(key_json.encode()).hexdigest()[:16]
-                cache_key = f"{key_prefix}:{key_hash}"
-
-            # Try to get from cache
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache hit: {cache_key}")
-                return cached_value
-
-            # Execute function
-            logger.debug(f"Cache miss: {cache_key}")
-            result = func(self, *args, **kwargs)
-
-            # Store in cache
-            cache.set(cache_key, result, expiry)
-
-            return result
+            cache_key = _method_cache_key(key_prefix, key_func, args, kwargs)
+
+            # 未命中時只有一個 worker 執行方法，其餘等待寫回
+            return cache.get_or_set(
+                cache_key, lambda: func(self, *args, **kwargs), expiry,
+                tags=tags(*args, **kwargs) if tags else None,
+            )
 
         # Add cache invalidation method
         wrapper.invalidate_cache = lambda *args, **kwargs: _invalidate_cache(key_prefix, key_func, *args, **kwargs)
@@ -350,14 +909,36 @@ def cached_method(
     return decorator
 
 
+def _cache_key(key_prefix: str, key_func: Optional[Callable], args: tuple, kwargs: dict) -> str:
+    """cached 的快取鍵"""
+    if key_func:
+        return f"{key_prefix}:{key_func(*args, **kwargs)}"
+
+    # Default: use function args as key
+    key_parts = [str(arg) for arg in args]
+    key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
+    return f"{key_prefix}:{'_'.join(key_parts)}"
+
+
+def _method_cache_key(key_prefix: str, key_func: Optional[Callable], args: tuple, kwargs: dict) -> str:
+    """cached_method 的快取鍵（args 不含 self）"""
+    if key_func:
+        return f"{key_prefix}:{key_func(*args, **kwargs)}"
+
+    # 使用 JSON + 哈希確保唯一性，避免鍵衝突
+    key_data = {
+        'args': [repr(arg) for arg in args],
+        'kwargs': {k: repr(v) for k, v in sorted(kwargs.items())}
+    }
+    key_json = json.dumps(key_data, sort_keys=True)
+    key_hash = hashlib.md5(key_json.encode()).hexdigest()[:16]
+    return f"{key_prefix}:{key_hash}"
+
+
 def _invalidate_cache(key_prefix: str, key_func: Optional[Callable], *args, **kwargs):
     """Helper to invalidate cache for specific key"""
-    if key_func:
-        cache_key = f"{key_prefix}:{key_func(*args, **kwargs)}"
-    else:
-        key_parts = [str(arg) for arg in args]
-        key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
-        cache_key = f"{key_prefix}:{'_'.join(key_parts)}"
+    # 與 cached_method 使用相同的鍵生成（原先未帶 key_func 時鍵格式不一致，無法失效）
+    cache_key = _method_cache_key(key_prefix, key_func, args, kwargs)
 
     cache.delete(cache_key)
     logger.debug(f"Cache invalidated: {cache_key}")
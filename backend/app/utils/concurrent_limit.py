@@ -219,7 +219,8 @@ class ConcurrentLimiter:
 
             # 刪除所有任務鎖
             pattern = f"{self.key_prefix}:lock:*"
-            keys = self.redis_client.keys(pattern)
+            # SCAN 逐批取得，避免 KEYS 阻塞 Redis
+            keys = list(self.redis_client.scan_iter(match=pattern, count=500))
             if keys:
                 self.redis_client.delete(*keys)
 
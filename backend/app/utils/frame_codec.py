@@ -0,0 +1,249 @@
+"""
+DataFrame / Series 的欄式二進位編碼（供 RedisCache 使用）
+
+取代 pickle：每個欄位與索引層以原生 NumPy 位元組連續存放（8 bytes 對齊），
+解碼時以 np.frombuffer 直接映射成欄位陣列，不需逐物件重建。
+
+格式：
+    MAGIC(4) | header 長度(<I) | header JSON | padding | 資料區塊...
+
+- 數值 / 布林 / datetime64（含時區）欄位：原生位元組，可選 zlib 壓縮
+- object 欄位：僅接受 JSON 純量（字串、數字、None），以 JSON 陣列存放
+- 其他型別（Categorical、Period、非 JSON 欄名等）拋出 UnsupportedFrameError，
+  呼叫端應退回 pickle
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"QFC1"
+
+_HEADER_LEN = struct.Struct("<I")
+_ALIGN = 8
+
+# 小於此大小的區塊不壓縮（壓縮收益小於額外的 CPU 開銷）
+DEFAULT_COMPRESS_THRESHOLD = 64 * 1024
+# 壓縮後至少要小這個比例才採用
+_MIN_COMPRESS_GAIN = 0.9
+
+
+class UnsupportedFrameError(TypeError):
+    """物件無法以欄式格式編碼"""
+
+
+def is_frame_payload(data: Union[bytes, memoryview]) -> bool:
+    """資料是否為本模組的編碼格式"""
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def encode_frame(
+    obj: Union[pd.DataFrame, pd.Series],
+    compress: bool = True,
+    compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+) -> bytes:
+    """
+    將 DataFrame / Series 編碼為欄式二進位
+
+    Args:
+        obj: 要編碼的 DataFrame 或 Series
+        compress: 是否對大區塊使用 zlib 壓縮
+        compress_threshold: 區塊大於此位元組數才嘗試壓縮
+
+    Returns:
+        編碼後的 bytes
+
+    Raises:
+        UnsupportedFrameError: 含無法編碼的欄位或索引
+    """
+    if isinstance(obj, pd.DataFrame):
+        kind = "frame"
+        columns = [obj.iloc[:, i] for i in range(obj.shape[1])]
+        names = list(obj.columns)
+        columns_name = obj.columns.name
+    elif isinstance(obj, pd.Series):
+        kind = "series"
+        columns = [obj]
+        names = [obj.name]
+        columns_name = None
+    else:
+        raise UnsupportedFrameError(f"Unsupported type: {type(obj).__name__}")
+
+    if kind == "frame" and isinstance(obj.columns, pd.MultiIndex):
+        raise UnsupportedFrameError("MultiIndex columns are not supported")
+
+    writer = _BlockWriter(compress, compress_threshold)
+    header = {
+        "kind": kind,
+        "names": _json_names(names),
+        "columns_name": _json_names([columns_name])[0],
+        "index": _encode_index(obj.index, writer),
+        "columns": [writer.add(_values(column)) for column in columns],
+    }
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    prefix = MAGIC + _HEADER_LEN.pack(len(header_bytes)) + header_bytes
+    prefix += b"\0" * (-len(prefix) % _ALIGN)
+    return prefix + b"".join(writer.chunks)
+
+
+def decode_frame(payload: Union[bytes, memoryview]) -> Union[pd.DataFrame, pd.Series]:
+    """
+    解碼 encode_frame 的輸出
+
+    資料先複製到一塊可寫的緩衝區（呼叫端可原地修改結果而不影響來源），
+    未壓縮的欄位直接以 np.frombuffer 映射在這塊緩衝區上。
+    """
+    buffer = memoryview(bytearray(payload))
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a columnar frame payload")
+
+    (header_len,) = _HEADER_LEN.unpack_from(buffer, len(MAGIC))
+    header_start = len(MAGIC) + _HEADER_LEN.size
+    header = json.loads(bytes(buffer[header_start:header_start + header_len]))
+    data_start = header_start + header_len
+    data_start += -data_start % _ALIGN
+    data = buffer[data_start:]
+
+    index = _decode_index(header["index"], data)
+    arrays = [_read_block(block, data) for block in header["columns"]]
+    names = header["names"]
+
+    if header["kind"] == "series":
+        return pd.Series(arrays[0], index=index, name=names[0], copy=False)
+
+    frame = pd.DataFrame(dict(enumerate(arrays)), index=index, copy=False)
+    frame.columns = pd.Index(names, name=header["columns_name"])
+    return frame
+
+
+# ============ Blocks ============
+
+class _BlockWriter:
+    """累積資料區塊並記錄其 offset（相對資料區起點）"""
+
+    def __init__(self, compress: bool, compress_threshold: int):
+        self.compress = compress
+        self.compress_threshold = compress_threshold
+        self.chunks: List[bytes] = []
+        self.offset = 0
+
+    def add(self, values) -> Dict[str, Any]:
+        meta, raw = _encode_array(values)
+
+        if meta["codec"] == "raw" and self.compress and len(raw) >= self.compress_threshold:
+            packed = zlib.compress(raw, 1)
+            if len(packed) < len(raw) * _MIN_COMPRESS_GAIN:
+                meta["codec"] = "zlib"
+                raw = packed
+
+        meta["offset"] = self.offset
+        meta["nbytes"] = len(raw)
+        padding = -len(raw) % _ALIGN
+        self.chunks.append(raw + b"\0" * padding if padding else raw)
+        self.offset += len(raw) + padding
+        return meta
+
+
+def _values(values: Union[pd.Series, pd.Index]):
+    """取出底層陣列：NumPy dtype 取 ndarray（不複製），擴充型別取 ExtensionArray"""
+    return values.to_numpy() if isinstance(values.dtype, np.dtype) else values.array
+
+
+def _encode_array(values) -> Tuple[Dict[str, Any], bytes]:
+    """單一欄位 / 索引層 → (中繼資料, 位元組)"""
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        stamps = pd.DatetimeIndex(values)
+        meta = {
+            "dtype": f"datetime64[{values.dtype.unit}]", "tz": str(values.dtype.tz),
+            "codec": "raw", "length": len(stamps),
+        }
+        return meta, np.ascontiguousarray(stamps.asi8).tobytes()
+
+    if not isinstance(values, np.ndarray):
+        raise UnsupportedFrameError(f"Unsupported extension dtype: {values.dtype}")
+
+    if values.dtype.kind in "biufcmM":
+        array = np.ascontiguousarray(values)
+        return {"dtype": array.dtype.str, "codec": "raw", "length": len(array)}, array.tobytes()
+
+    if values.dtype == object:
+        items = values.tolist()
+        if not all(item is None or isinstance(item, (str, int, float, bool)) for item in items):
+            raise UnsupportedFrameError("Object column contains non-scalar values")
+        raw = json.dumps(items, separators=(",", ":")).encode()
+        return {"dtype": "object", "codec": "json", "length": len(items)}, raw
+
+    raise UnsupportedFrameError(f"Unsupported dtype: {values.dtype}")
+
+
+def _read_block(meta: Dict[str, Any], data: memoryview):
+    raw = data[meta["offset"]:meta["offset"] + meta["nbytes"]]
+
+    if meta["codec"] == "json":
+        array = np.empty(meta["length"], dtype=object)
+        array[:] = json.loads(bytes(raw))
+        return array
+
+    if meta["codec"] == "zlib":
+        raw = bytearray(zlib.decompress(raw))
+
+    if meta["length"] == 0:
+        array = np.empty(0, dtype=meta["dtype"])
+    else:
+        array = np.frombuffer(raw, dtype=np.dtype(meta["dtype"]), count=meta["length"])
+
+    if meta.get("tz"):
+        return pd.DatetimeIndex(array).tz_localize("UTC").tz_convert(meta["tz"]).array
+    return array
+
+
+# ============ Index ============
+
+def _encode_index(index: pd.Index, writer: _BlockWriter) -> Dict[str, Any]:
+    if isinstance(index, pd.RangeIndex):
+        return {
+            "type": "range",
+            "start": index.start, "stop": index.stop, "step": index.step,
+            "name": _json_names([index.name])[0],
+        }
+
+    if isinstance(index, pd.MultiIndex):
+        levels = [index.get_level_values(i) for i in range(index.nlevels)]
+        names = list(index.names)
+        index_type = "multi"
+    else:
+        levels = [index]
+        names = [index.name]
+        index_type = "index"
+
+    return {
+        "type": index_type,
+        "names": _json_names(names),
+        "levels": [writer.add(_values(level)) for level in levels],
+    }
+
+
+def _decode_index(meta: Dict[str, Any], data: memoryview) -> pd.Index:
+    if meta["type"] == "range":
+        return pd.RangeIndex(meta["start"], meta["stop"], meta["step"], name=meta["name"])
+
+    names = meta["names"]
+    levels = [_read_block(block, data) for block in meta["levels"]]
+    if meta["type"] == "multi":
+        return pd.MultiIndex.from_arrays(levels, names=names)
+    return pd.Index(levels[0], name=names[0], copy=False)
+
+
+# ============ Names ============
+
+def _json_names(names: List[Any]) -> List[Any]:
+    """欄名 / 索引名僅接受 JSON 純量；tuple、Timestamp 等其他型別由呼叫端退回 pickle"""
+    for name in names:
+        if name is not None and not isinstance(name, (str, int, float, bool)):
+            raise UnsupportedFrameError(f"Unsupported column/index name: {name!r}")
+    return names
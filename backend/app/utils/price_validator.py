@@ -7,6 +7,8 @@
 
 from typing import Dict, Optional, Tuple
 from decimal import Decimal
+import numpy as np
+import pandas as pd
 from loguru import logger
 
 
@@ -175,6 +177,65 @@ class PriceValidator:
             allow_zero_placeholder=allow_zero_placeholder
         )
 
+    @staticmethod
+    def validate_price_frame(
+        df: pd.DataFrame,
+        allow_zero_placeholder: bool = True
+    ) -> pd.Series:
+        """
+        向量化驗證整個 OHLCV DataFrame（規則與順序同 validate_price_data）
+
+        Args:
+            df: 含 open, high, low, close 欄位（可選 volume, stock_id, date）的 DataFrame
+            allow_zero_placeholder: 是否允許全零佔位記錄
+
+        Returns:
+            與 df 同索引的 Series：有效列為 None，無效列為錯誤訊息（第一個不符合的規則）
+        """
+        prices = {
+            name: pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64)
+            for name in ('open', 'high', 'low', 'close')
+        }
+        o, h, l, c = prices['open'], prices['high'], prices['low'], prices['close']
+        missing = np.isnan(o) | np.isnan(h) | np.isnan(l) | np.isnan(c)
+        zero = (o == 0) & (h == 0) & (l == 0) & (c == 0)
+        if 'volume' in df.columns:
+            volume = pd.to_numeric(df['volume'], errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            volume = np.zeros(len(df))
+
+        # 依序套用規則：第一個成立的規則決定錯誤訊息
+        rules = [
+            (missing, lambda r: f"價格欄位不能為 None（open={r.open}, high={r.high}, low={r.low}, close={r.close}）"),
+            (zero & (not allow_zero_placeholder), lambda r: "不允許全零的佔位記錄"),
+            (h < l, lambda r: f"最高價 ({r.high}) < 最低價 ({r.low})"),
+            (~((l <= c) & (c <= h)), lambda r: f"收盤價 ({r.close}) 不在 [{r.low}, {r.high}] 範圍內"),
+            (o <= 0, lambda r: f"開盤價 ({r.open}) 必須 > 0"),
+            (h <= 0, lambda r: f"最高價 ({r.high}) 必須 > 0"),
+            (l <= 0, lambda r: f"最低價 ({r.low}) 必須 > 0"),
+            (c <= 0, lambda r: f"收盤價 ({r.close}) 必須 > 0"),
+            (volume < 0, lambda r: f"成交量 ({r.volume}) 不能為負數"),
+        ]
+
+        rule_index = np.full(len(df), -1)
+        undecided = ~(zero & allow_zero_placeholder & ~missing)
+        for i, (mask, _) in enumerate(rules):
+            hit = undecided & mask
+            rule_index[hit] = i
+            undecided &= ~hit
+
+        reasons = pd.Series([None] * len(df), index=df.index, dtype=object)
+        rejected = np.flatnonzero(rule_index >= 0)
+        if rejected.size:
+            # 只有被拒絕的列需要組訊息
+            has_context = 'stock_id' in df.columns and 'date' in df.columns
+            for pos, row in zip(rejected, df.iloc[rejected].itertuples(index=False)):
+                message = rules[rule_index[pos]][1](row)
+                context = f"{row.stock_id} {row.date}" if has_context else "Unknown"
+                reasons.iat[pos] = f"{context}: {message}"
+
+        return reasons
+
 
 # 便捷函數
 def validate_price(
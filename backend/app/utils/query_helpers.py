@@ -2,6 +2,18 @@
 查詢輔助工具函數
 """
 
+import io
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Boolean, Select, literal_column, select, tuple_
+from sqlalchemy.orm import Session
+
+
+# 單一 INSERT 語句的綁定參數上限（PostgreSQL 上限 65535；SQLite 舊版為 999）
+_MAX_BIND_PARAMS = {'postgresql': 30000, 'sqlite': 900}
+
 
 def escape_like_pattern(pattern: str, escape_char: str = '\\') -> str:
     """
@@ -32,3 +44,142 @@ def escape_like_pattern(pattern: str, escape_char: str = '\\') -> str:
     safe_pattern = safe_pattern.replace('_', escape_char + '_')
 
     return safe_pattern
+
+
+
+def fetch_columns(
+    db: Session,
+    stmt: Select,
+    columns: List[str],
+    parse_dates: Sequence[str] = (),
+    str_columns: Sequence[str] = ()
+) -> Dict[str, np.ndarray]:
+    """
+    以欄位導向方式執行查詢，直接產生 NumPy 陣列（不建立 ORM 物件）
+
+    PostgreSQL（psycopg2）使用 ``COPY (SELECT ...) TO STDOUT`` 串流 CSV，由 pandas
+    C 解析器直接解析為陣列；其他資料庫（如測試用 SQLite）則退回投影查詢後按欄轉置。
+
+    Args:
+        db: 資料庫會話
+        stmt: 已投影欄位的 SELECT 語句（欄位順序須與 columns 一致）
+        columns: 輸出欄位名稱
+        parse_dates: 需轉為 datetime64[ns] 的欄位
+        str_columns: 需保留為字串的欄位（如 stock_id，避免被解析為數字）
+
+    Returns:
+        {欄位名稱: np.ndarray}
+    """
+    bind = db.get_bind()
+
+    if bind.dialect.driver == 'psycopg2':
+        compiled = stmt.compile(dialect=bind.dialect)
+        raw_conn = db.connection().connection
+        with raw_conn.cursor() as cursor:
+            select_sql = cursor.mogrify(compiled.string, compiled.params).decode()
+            buffer = io.StringIO()
+            cursor.copy_expert(f"COPY ({select_sql}) TO STDOUT WITH (FORMAT csv)", buffer)
+
+        if buffer.tell() == 0:
+            return {name: np.array([]) for name in columns}
+        buffer.seek(0)
+
+        df = pd.read_csv(
+            buffer,
+            header=None,
+            names=columns,
+            parse_dates=list(parse_dates),
+            dtype={name: str for name in str_columns},
+        )
+        return {name: df[name].to_numpy() for name in columns}
+
+    rows = db.execute(stmt).all()
+    if not rows:
+        return {name: np.array([]) for name in columns}
+
+    result = {}
+    for name, values in zip(columns, zip(*rows)):
+        if name in parse_dates:
+            result[name] = pd.to_datetime(list(values)).to_numpy()
+        else:
+            result[name] = np.asarray(values)
+    return result
+
+
+def bulk_upsert(
+    db: Session,
+    model,
+    rows: List[Dict[str, Any]],
+    conflict_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None
+) -> Dict[str, int]:
+    """
+    批次 upsert：``INSERT ... ON CONFLICT (...) DO UPDATE``，每批一個語句
+
+    不提交交易，由呼叫端決定提交時機（例如每個標的提交一次）。
+    同一批中重複的鍵只保留最後一筆（PostgreSQL 不允許同一語句更新同一列兩次）。
+
+    Args:
+        db: 資料庫會話（PostgreSQL 或 SQLite）
+        model: ORM 模型類別
+        rows: 以資料表欄位名稱為鍵的字典列表（所有列的鍵須相同）
+        conflict_columns: 衝突判斷欄位（主鍵或唯一索引）
+        update_columns: 衝突時更新的欄位（預設為所有非鍵欄位；空列表表示 DO NOTHING）
+
+    Returns:
+        {"inserted": 新增筆數, "updated": 更新筆數}
+    """
+    if not rows:
+        return {"inserted": 0, "updated": 0}
+
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"bulk_upsert does not support dialect '{dialect}'")
+
+    table = model.__table__
+    conflict_columns = list(conflict_columns)
+    columns = list(rows[0].keys())
+    if update_columns is None:
+        update_columns = columns
+    update_columns = [c for c in update_columns if c not in conflict_columns]
+
+    # 依鍵去重（後者覆蓋前者），保留首次出現的順序
+    unique = {tuple(row[c] for c in conflict_columns): row for row in rows}
+    rows = list(unique.values())
+
+    chunk_size = max(1, _MAX_BIND_PARAMS[dialect] // len(columns))
+    inserted = updated = 0
+
+    for lo in range(0, len(rows), chunk_size):
+        chunk = rows[lo:lo + chunk_size]
+        stmt = insert(table).values(chunk)
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={c: stmt.excluded[c] for c in update_columns}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+
+        if dialect == 'postgresql':
+            # xmax = 0 表示本次新增的列（更新的列 xmax 為目前交易 ID；DO NOTHING 的列不回傳）
+            flags = db.execute(stmt.returning(literal_column('xmax = 0', Boolean))).scalars().all()
+            chunk_inserted = sum(1 for flag in flags if flag)
+            inserted += chunk_inserted
+            updated += len(flags) - chunk_inserted
+        else:
+            keys = [tuple(row[c] for c in conflict_columns) for row in chunk]
+            key_columns = [table.c[c] for c in conflict_columns]
+            existing = db.execute(
+                select(*key_columns).where(tuple_(*key_columns).in_(keys))
+            ).all()
+            db.execute(stmt)
+            inserted += len(chunk) - len(existing)
+            if update_columns:
+                updated += len(existing)
+
+    return {"inserted": inserted, "updated": updated}
@@ -0,0 +1,70 @@
+"""
+速率限制器
+
+Shioaji 行情查詢（歷史 K 線、選擇權 snapshots）共用同一份額度：每 5 秒 50 次。
+同一行程內的呼叫端（分鐘線同步管線、ShioajiOptionDataSource）應透過
+get_shioaji_rate_limiter() 取得同一個實例，才不會各自用滿額度而超限。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+# Shioaji 行情查詢限制：每 5 秒 50 次
+SHIOAJI_RATE_LIMIT = (50, 5.0)
+
+
+class RateLimiter:
+    """
+    滑動時間窗速率限制器（執行緒安全）
+
+    任意 period 秒內最多 max_calls 次 acquire()；超過時阻塞到最早的呼叫滑出時間窗。
+    """
+
+    def __init__(self, max_calls: int, period: float):
+        self.max_calls = max(1, max_calls)
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        取得一次呼叫額度
+
+        Returns:
+            因限速而等待的秒數
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return waited
+                delay = self.period - (now - self._calls[0])
+            time.sleep(delay)
+            waited += delay
+
+
+_shioaji_rate_limiter: Optional[RateLimiter] = None
+_shioaji_rate_limiter_pid: Optional[int] = None
+_shioaji_rate_limiter_lock = threading.Lock()
+
+
+def get_shioaji_rate_limiter() -> RateLimiter:
+    """
+    取得行程共用的 Shioaji 行情額度限制器（首次使用時建立）
+
+    Celery prefork 的子行程各自持有 Shioaji 連線，以 pid 判斷 fork 後重新建立。
+    """
+    global _shioaji_rate_limiter, _shioaji_rate_limiter_pid
+    with _shioaji_rate_limiter_lock:
+        if _shioaji_rate_limiter is None or _shioaji_rate_limiter_pid != os.getpid():
+            _shioaji_rate_limiter = RateLimiter(*SHIOAJI_RATE_LIMIT)
+            _shioaji_rate_limiter_pid = os.getpid()
+        return _shioaji_rate_limiter
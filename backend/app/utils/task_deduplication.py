@@ -165,12 +165,13 @@ def get_task_last_run(
         return None
 
 
-def skip_if_recently_executed(min_interval_hours: int = 24):
+def skip_if_recently_executed(min_interval_hours: int = 24, bypass_kwarg: Optional[str] = None):
     """
     裝飾器：自動檢查任務是否最近執行過，如果是則跳過
 
     Args:
         min_interval_hours: 最小執行間隔（小時）
+        bypass_kwarg: 此關鍵字參數為真時不檢查間隔（例如強制重新抓取）
 
     Examples:
         >>> @celery_app.task(bind=True)
@@ -184,10 +185,11 @@ def skip_if_recently_executed(min_interval_hours: int = 24):
             task_name = self.name
 
             # 檢查是否應該跳過
-            should_skip, info = should_skip_task(task_name, min_interval_hours)
+            if not (bypass_kwarg and kwargs.get(bypass_kwarg)):
+                should_skip, info = should_skip_task(task_name, min_interval_hours)
 
-            if should_skip:
-                return info
+                if should_skip:
+                    return info
 
             # 執行任務
             try:
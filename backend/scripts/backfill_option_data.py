@@ -3,29 +3,35 @@
 選擇權歷史資料回補腳本
 
 使用 Shioaji API 回補選擇權歷史資料：
-1. 獲取選擇權合約列表
-2. 對每個合約查詢歷史日線資料
+1. 讀取 option_chain_snapshots 中已保存的選擇權鏈
+2. 未保存的日期：獲取選擇權合約列表，逐合約查詢歷史日線資料後保存
 3. 計算每日因子（PCR, ATM IV, Greeks）
 4. 儲存到 option_daily_factors 表
 
 使用方式：
     python scripts/backfill_option_data.py --start-date 2024-12-01 --end-date 2025-12-15
     python scripts/backfill_option_data.py --days-back 30  # 回補最近 30 天
+    python scripts/backfill_option_data.py --days-back 365 --offline --recompute  # 以已保存的選擇權鏈重算
 """
 
 import sys
 import argparse
+import time
+from contextlib import ExitStack
 from datetime import date, datetime, timedelta
 from typing import List, Optional
 from loguru import logger
 from decimal import Decimal
 
+import pandas as pd
+
 # 添加 app 目錄到路徑
 sys.path.insert(0, '/app')
 
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, ensure_models_imported
 from app.services.shioaji_client import ShioajiClient
 from app.services.option_calculator import OptionFactorCalculator
+from app.services.option_chain_store import SOURCE_KBARS, load_option_chain, save_option_chain
 from app.repositories.option import (
     OptionDailyFactorRepository,
     OptionSyncConfigRepository,
@@ -196,6 +202,100 @@ def fetch_contract_daily_data(
     return None
 
 
+def fetch_option_chain_from_kbars(
+    api,
+    underlying: str,
+    target_date: date,
+    stats: dict
+) -> pd.DataFrame:
+    """
+    以逐合約 kbars 組出特定日期的選擇權鏈
+
+    Args:
+        api: Shioaji API 實例
+        underlying: 標的代碼
+        target_date: 目標日期
+        stats: 回補統計（累加 total_contracts / contracts_fetched）
+
+    Returns:
+        get_option_chain 格式的 DataFrame（無資料時為空）
+    """
+    # 獲取當天的合約列表
+    contracts = get_option_contracts_for_date(api, underlying, target_date)
+    if not contracts:
+        logger.warning(f"[BACKFILL] ⚠️  No contracts for {target_date}")
+        return pd.DataFrame()
+
+    stats['total_contracts'] += len(contracts)
+
+    # 獲取每個合約的價格數據（分批處理，避免速率限制）
+    contract_data = []
+    batch_size = 50  # 每批處理 50 個合約
+    batch_delay = 2.0  # 每批之間延遲 2 秒
+    request_delay = 0.1  # 每個請求之間延遲 0.1 秒
+
+    for i, contract in enumerate(contracts):
+        # 每批之間添加延遲
+        if i > 0 and i % batch_size == 0:
+            logger.info(
+                f"[BACKFILL] 💤 Batch {i // batch_size} completed, "
+                f"sleeping {batch_delay}s to avoid rate limit..."
+            )
+            time.sleep(batch_delay)
+
+        # option_right 為 OptionRight.Call / OptionRight.Put（合約代碼以月份字母區分買賣權，不能以是否含 'C' 判斷）
+        option_type = (
+            'CALL' if 'Call' in str(contract.option_right) else 'PUT'
+        ) if hasattr(contract, 'option_right') else None
+        if option_type is None:
+            logger.warning(f"[BACKFILL] ⚠️  Skipping {contract.code}: missing option_right")
+            continue
+
+        # 獲取合約數據
+        data = fetch_contract_daily_data(api, contract, target_date)
+        if data:
+            # 驗證數據合理性
+            if not validate_contract_data(data, contract.code):
+                logger.warning(
+                    f"[BACKFILL] ⚠️  Skipping invalid data for {contract.code}"
+                )
+                continue
+
+            # 補充合約資訊
+            # 確保 expiry_date 是 date 物件而非字串
+            if isinstance(contract.delivery_date, str):
+                expiry_date = datetime.strptime(contract.delivery_date, "%Y/%m/%d").date()
+            else:
+                expiry_date = contract.delivery_date
+
+            data.update({
+                'underlying_id': underlying,
+                'underlying_type': 'FUTURES',
+                'option_type': option_type,
+                'strike_price': float(contract.strike_price),
+                'expiry_date': expiry_date
+            })
+            contract_data.append(data)
+            stats['contracts_fetched'] += 1
+
+        # 每個請求之間添加小延遲
+        if i < len(contracts) - 1:
+            time.sleep(request_delay)
+
+    if not contract_data:
+        logger.warning(
+            f"[BACKFILL] ⚠️  No data fetched for {target_date} "
+            f"(tried {len(contracts)} contracts)"
+        )
+        return pd.DataFrame()
+
+    logger.info(
+        f"[BACKFILL] ✅ Fetched {len(contract_data)}/{len(contracts)} contracts "
+        f"({len(contract_data)/len(contracts)*100:.1f}%)"
+    )
+    return pd.DataFrame(contract_data)
+
+
 def validate_contract_data(data: dict, contract_code: str) -> bool:
     """
     驗證合約數據合理性
@@ -287,24 +387,47 @@ def validate_contract_data(data: dict, contract_code: str) -> bool:
         return False
 
 
+class _LazyShioaji:
+    """第一次呼叫 api() 時才建立 Shioaji 連線（連線由 ExitStack 在結束時關閉）"""
+
+    def __init__(self, stack: ExitStack):
+        self._stack = stack
+        self._api = None
+
+    def api(self):
+        if self._api is None:
+            client = self._stack.enter_context(ShioajiClient())
+            if not client.is_available():
+                raise RuntimeError("Shioaji client not available")
+            self._api = client._api
+        return self._api
+
+
 def backfill_option_factors(
     underlying: str,
     start_date: date,
     end_date: date,
-    dry_run: bool = False
+    dry_run: bool = False,
+    offline: bool = False,
+    recompute: bool = False
 ):
     """
     回補選擇權因子數據
 
+    選擇權鏈優先讀取 option_chain_snapshots；缺少的日期以 kbars 抓取後保存，
+    之後重算同一段歷史不需再呼叫 Shioaji。
+
     Args:
         underlying: 標的代碼（TX, MTX）
         start_date: 開始日期
         end_date: 結束日期
         dry_run: 是否為測試模式（不寫入資料庫）
+        offline: 只使用已保存的選擇權鏈（不連線 Shioaji）
+        recompute: 已有因子的日期也重新計算
     """
     logger.info(f"[BACKFILL] 🚀 Starting option data backfill for {underlying}")
     logger.info(f"[BACKFILL] 📅 Date range: {start_date} to {end_date}")
-    logger.info(f"[BACKFILL] 🧪 Dry run: {dry_run}")
+    logger.info(f"[BACKFILL] 🧪 Dry run: {dry_run}, offline: {offline}, recompute: {recompute}")
 
     # 生成日期範圍
     dates = generate_date_range(start_date, end_date)
@@ -328,13 +451,12 @@ def backfill_option_factors(
     )
     cur = conn.cursor()
 
-    # 初始化 Shioaji 客戶端
-    with ShioajiClient() as shioaji:
-        if not shioaji.is_available():
-            logger.error("[BACKFILL] ❌ Shioaji client not available")
-            return
+    ensure_models_imported()
+    db = SessionLocal()
 
-        api = shioaji._api
+    # Shioaji 客戶端在第一次需要抓取時才連線（選擇權鏈都已保存時不連線）
+    with ExitStack() as stack:
+        shioaji = _LazyShioaji(stack)
 
         # 統計
         stats = {
@@ -344,6 +466,7 @@ def backfill_option_factors(
             'days_failed': 0,
             'total_contracts': 0,
             'contracts_fetched': 0,
+            'chains_from_store': 0,
             'factors_saved': 0
         }
 
@@ -360,88 +483,36 @@ def backfill_option_factors(
                     "SELECT 1 FROM option_daily_factors WHERE underlying_id = %s AND date = %s",
                     (underlying, target_date)
                 )
-                if cur.fetchone() and not dry_run:
+                if cur.fetchone() and not dry_run and not recompute:
                     logger.info(f"[BACKFILL] ⏭️  Data already exists for {target_date}, skipping")
                     stats['days_processed'] += 1
                     continue
 
-                # 獲取當天的合約列表
-                contracts = get_option_contracts_for_date(api, underlying, target_date)
-                if not contracts:
-                    logger.warning(f"[BACKFILL] ⚠️  No contracts for {target_date}")
-                    stats['days_failed'] += 1
-                    stats['days_processed'] += 1
-                    continue
-
-                stats['total_contracts'] += len(contracts)
-
-                # 獲取每個合約的價格數據（分批處理，避免速率限制）
-                import time
-
-                contract_data = []
-                batch_size = 50  # 每批處理 50 個合約
-                batch_delay = 2.0  # 每批之間延遲 2 秒
-                request_delay = 0.1  # 每個請求之間延遲 0.1 秒
-
-                for i, contract in enumerate(contracts):
-                    # 每批之間添加延遲
-                    if i > 0 and i % batch_size == 0:
-                        logger.info(
-                            f"[BACKFILL] 💤 Batch {i // batch_size} completed, "
-                            f"sleeping {batch_delay}s to avoid rate limit..."
-                        )
-                        time.sleep(batch_delay)
-
-                    # 獲取合約數據
-                    data = fetch_contract_daily_data(api, contract, target_date)
-                    if data:
-                        # 驗證數據合理性
-                        if not validate_contract_data(data, contract.code):
-                            logger.warning(
-                                f"[BACKFILL] ⚠️  Skipping invalid data for {contract.code}"
-                            )
-                            continue
-
-                        # 補充合約資訊
-                        # 確保 expiry_date 是 date 物件而非字串
-                        if isinstance(contract.delivery_date, str):
-                            expiry_date = datetime.strptime(contract.delivery_date, "%Y/%m/%d").date()
-                        else:
-                            expiry_date = contract.delivery_date
-
-                        data.update({
-                            'underlying_id': underlying,
-                            'underlying_type': 'FUTURES',
-                            'option_type': 'CALL' if 'C' in contract.code else 'PUT',
-                            'strike_price': float(contract.strike_price),
-                            'expiry_date': expiry_date
-                        })
-                        contract_data.append(data)
-                        stats['contracts_fetched'] += 1
-
-                    # 每個請求之間添加小延遲
-                    if i < len(contracts) - 1:
-                        time.sleep(request_delay)
-
-                if not contract_data:
-                    logger.warning(
-                        f"[BACKFILL] ⚠️  No data fetched for {target_date} "
-                        f"(tried {len(contracts)} contracts)"
+                # 優先使用已保存的選擇權鏈，缺少時才以 kbars 抓取並保存
+                option_chain = load_option_chain(db, underlying, target_date)
+                if not option_chain.empty:
+                    logger.info(
+                        f"[BACKFILL] 📂 Using stored option chain for {target_date} "
+                        f"({len(option_chain)} contracts)"
                     )
+                    stats['chains_from_store'] += 1
+                elif offline:
+                    logger.warning(f"[BACKFILL] ⚠️  No stored option chain for {target_date} (offline)")
                     stats['days_failed'] += 1
                     stats['days_processed'] += 1
                     continue
+                else:
+                    option_chain = fetch_option_chain_from_kbars(
+                        shioaji.api(), underlying, target_date, stats
+                    )
+                    if option_chain.empty:
+                        stats['days_failed'] += 1
+                        stats['days_processed'] += 1
+                        continue
+                    if not dry_run:
+                        save_option_chain(db, underlying, target_date, option_chain, SOURCE_KBARS)
 
-                logger.info(
-                    f"[BACKFILL] ✅ Fetched {len(contract_data)}/{len(contracts)} contracts "
-                    f"({len(contract_data)/len(contracts)*100:.1f}%)"
-                )
-
-                # 計算因子（直接使用已獲取的數據）
-                import pandas as pd
-                option_chain = pd.DataFrame(contract_data)
-
-                # 使用 OptionFactorCalculator 的內部方法計算因子
+                # 計算因子（使用 OptionFactorCalculator 的內部方法）
                 calculator = OptionFactorCalculator(None, None)
 
                 # 手動計算階段一因子
@@ -541,6 +612,7 @@ def backfill_option_factors(
     # 關閉資料庫
     cur.close()
     conn.close()
+    db.close()
 
     # 輸出統計
     logger.info("=" * 60)
@@ -551,6 +623,7 @@ def backfill_option_factors(
     logger.info(f"Days failed: {stats['days_failed']}")
     logger.info(f"Contracts total: {stats['total_contracts']}")
     logger.info(f"Contracts fetched: {stats['contracts_fetched']}")
+    logger.info(f"Chains from store: {stats['chains_from_store']}")
     logger.info(f"Factors saved: {stats['factors_saved']}")
 
     if stats['total_contracts'] > 0:
@@ -590,6 +663,16 @@ def main():
         action='store_true',
         help='測試模式（不寫入資料庫）'
     )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='只使用已保存的選擇權鏈，不連線 Shioaji'
+    )
+    parser.add_argument(
+        '--recompute',
+        action='store_true',
+        help='已有因子的日期也重新計算（搭配 --offline 可重算歷史而不呼叫 API）'
+    )
 
     args = parser.parse_args()
 
@@ -614,7 +697,9 @@ def main():
         underlying=args.underlying,
         start_date=start_date,
         end_date=end_date,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        offline=args.offline,
+        recompute=args.recompute
     )
 
 
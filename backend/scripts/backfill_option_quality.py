@@ -19,12 +19,16 @@
     
     # 驗證模式（不寫入資料庫）
     python scripts/backfill_option_quality.py --underlying TX --days-back 5 --verify-only
+
+    # 只用已保存的選擇權鏈重算（不呼叫 API）
+    python scripts/backfill_option_quality.py --underlying TX --days-back 365 --offline
 """
 
 import sys
 import time
 import argparse
 import psycopg2
+from contextlib import ExitStack
 from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict
 from loguru import logger
@@ -35,7 +39,9 @@ import numpy as np
 sys.path.insert(0, '/app')
 
 from app.core.config import settings
+from app.db.session import SessionLocal, ensure_models_imported
 from app.services.shioaji_client import ShioajiClient
+from app.services.option_chain_store import SOURCE_SNAPSHOT, load_option_chain, save_option_chain
 from app.services.greeks_calculator import (
     BlackScholesGreeksCalculator,
     calculate_time_to_expiry
@@ -132,7 +138,10 @@ def fetch_contract_snapshot(api, contract, retry_count: int = 3) -> Optional[Dic
             
             # 提取合約屬性
             strike_price = float(contract.strike_price) if hasattr(contract, 'strike_price') else None
-            option_type = contract.option_right.upper() if hasattr(contract, 'option_right') else None
+            # option_right 為 OptionRight.Call / OptionRight.Put
+            option_type = (
+                'CALL' if 'Call' in str(contract.option_right) else 'PUT'
+            ) if hasattr(contract, 'option_right') else None
             
             if strike_price is None or option_type is None:
                 return None
@@ -283,7 +292,8 @@ def backfill_with_quality(
     end_date: date,
     verify_only: bool = False,
     batch_delay: float = 3.0,
-    request_delay: float = 0.15
+    request_delay: float = 0.15,
+    offline: bool = False
 ):
     """
     高品質回補選擇權數據
@@ -295,6 +305,7 @@ def backfill_with_quality(
         verify_only: 僅驗證不寫入
         batch_delay: 批次間延遲（秒）
         request_delay: 請求間延遲（秒）
+        offline: 只使用已保存的選擇權鏈（option_chain_snapshots），不連線 Shioaji
     """
     logger.info(f"[QUALITY] ===== 開始高品質回補 =====")
     logger.info(f"[QUALITY] 標的: {underlying}")
@@ -316,13 +327,13 @@ def backfill_with_quality(
         'failed': 0
     }
     
-    with ShioajiClient() as shioaji:
-        if not shioaji.is_available():
-            logger.error("[QUALITY] Shioaji API 不可用")
-            return
-        
-        api = shioaji._api
-        
+    ensure_models_imported()
+    db = SessionLocal()
+
+    # Shioaji 在第一次需要抓取時才連線（選擇權鏈都已保存時不連線）
+    with ExitStack() as stack:
+        api = None
+
         for i, target_date in enumerate(dates, 1):
             logger.info(f"[QUALITY] [{i}/{len(dates)}] 處理 {target_date}...")
             
@@ -351,31 +362,54 @@ def backfill_with_quality(
                     logger.info(f"[QUALITY] ⚠️  {target_date} 存在估算數據，將重新計算")
             
             try:
-                # 獲取合約列表
-                contracts = get_active_option_contracts(api, underlying, target_date)
-                
-                if not contracts:
-                    logger.warning(f"[QUALITY] {target_date} 無有效合約")
+                # 優先使用已保存的選擇權鏈（不呼叫 API）
+                stored = load_option_chain(db, underlying, target_date)
+                if not stored.empty:
+                    stored = stored[stored['close'] > 0]
+                    contracts_data = stored[
+                        ['contract_id', 'close', 'strike_price', 'option_type', 'expiry_date']
+                    ].to_dict('records')
+                    logger.info(f"[QUALITY]   使用已保存的選擇權鏈（{len(contracts_data)} 合約）")
+                elif offline:
+                    logger.warning(f"[QUALITY] {target_date} 沒有已保存的選擇權鏈（離線模式）")
                     stats['failed'] += 1
                     continue
-                
-                # 批次獲取合約數據
-                contracts_data = []
-                batch_size = 30
-                
-                for j, contract in enumerate(contracts):
-                    if j > 0 and j % batch_size == 0:
-                        logger.info(f"[QUALITY]   處理 {j}/{len(contracts)} 合約，休息 {batch_delay}s")
-                        time.sleep(batch_delay)
-                    
-                    snapshot_data = fetch_contract_snapshot(api, contract)
-                    if snapshot_data:
-                        contracts_data.append(snapshot_data)
-                    
-                    if j < len(contracts) - 1:
-                        time.sleep(request_delay)
-                
-                logger.info(f"[QUALITY]   獲取 {len(contracts_data)}/{len(contracts)} 合約數據")
+                else:
+                    if api is None:
+                        shioaji = stack.enter_context(ShioajiClient())
+                        if not shioaji.is_available():
+                            logger.error("[QUALITY] Shioaji API 不可用")
+                            return
+                        api = shioaji._api
+
+                    # 獲取合約列表
+                    contracts = get_active_option_contracts(api, underlying, target_date)
+
+                    if not contracts:
+                        logger.warning(f"[QUALITY] {target_date} 無有效合約")
+                        stats['failed'] += 1
+                        continue
+
+                    # 批次獲取合約數據
+                    contracts_data = []
+                    batch_size = 30
+
+                    for j, contract in enumerate(contracts):
+                        if j > 0 and j % batch_size == 0:
+                            logger.info(f"[QUALITY]   處理 {j}/{len(contracts)} 合約，休息 {batch_delay}s")
+                            time.sleep(batch_delay)
+
+                        snapshot_data = fetch_contract_snapshot(api, contract)
+                        if snapshot_data:
+                            contracts_data.append(snapshot_data)
+
+                        if j < len(contracts) - 1:
+                            time.sleep(request_delay)
+
+                    logger.info(f"[QUALITY]   獲取 {len(contracts_data)}/{len(contracts)} 合約數據")
+
+                    if contracts_data and not verify_only:
+                        save_option_chain(db, underlying, target_date, pd.DataFrame(contracts_data), SOURCE_SNAPSHOT)
                 
                 if len(contracts_data) < 10:
                     logger.warning(f"[QUALITY] {target_date} 數據不足（< 10 合約）")
@@ -439,6 +473,7 @@ def backfill_with_quality(
     
     cur.close()
     conn.close()
+    db.close()
     
     logger.info(f"[QUALITY] ===== 回補完成 =====")
     logger.info(f"[QUALITY] 總計: {stats['total']}")
@@ -454,6 +489,7 @@ if __name__ == "__main__":
     parser.add_argument("--end-date", type=str, help="結束日期（YYYY-MM-DD）")
     parser.add_argument("--days-back", type=int, help="回補天數（從今天往前）")
     parser.add_argument("--verify-only", action="store_true", help="僅驗證不寫入")
+    parser.add_argument("--offline", action="store_true", help="只使用已保存的選擇權鏈，不連線 Shioaji")
     
     args = parser.parse_args()
     
@@ -472,5 +508,6 @@ if __name__ == "__main__":
         underlying=args.underlying,
         start_date=start_date,
         end_date=end_date,
-        verify_only=args.verify_only
+        verify_only=args.verify_only,
+        offline=args.offline
     )
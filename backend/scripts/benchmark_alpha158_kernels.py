@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Alpha158 滾動核心效能基準測試
+
+比較 Alpha158Calculator 兩種後端：
+- pandas: rolling().apply 逐窗口 Python 回呼（參考實作）
+- numpy:  alpha158_kernels 向量化核心
+
+輸出每個核心的耗時、加速比與最大絕對誤差，以及 compute_all_factors 整體耗時；
+--panel-stocks 另外比較「逐檔 compute_all_factors」與「compute_panel_factors 一次計算」。
+
+Usage:
+    python scripts/benchmark_alpha158_kernels.py --bars 2500 --stocks 20
+    python scripts/benchmark_alpha158_kernels.py --bars 2500 --stocks 5 --panel-stocks 500
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.services import alpha158_kernels
+from app.services.alpha158_factors import Alpha158Calculator
+
+
+KERNELS = [
+    ('slope', Alpha158Calculator.slope, alpha158_kernels.rolling_slope),
+    ('rsquare', Alpha158Calculator.rsquare, alpha158_kernels.rolling_rsquare),
+    ('resi', Alpha158Calculator.resi, alpha158_kernels.rolling_resi),
+    ('rank', Alpha158Calculator.rank, alpha158_kernels.rolling_rank),
+    ('idx_max', Alpha158Calculator.idx_max, alpha158_kernels.rolling_idx_max),
+    ('idx_min', Alpha158Calculator.idx_min, alpha158_kernels.rolling_idx_min),
+]
+
+
+def _synthetic_ohlcv(bars: int, seed: int) -> pd.DataFrame:
+    """合成日線 OHLCV"""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.cumprod(1 + rng.normal(0, 0.02, bars)), 2)
+    return pd.DataFrame({
+        '$open': close * (1 + rng.normal(0, 0.005, bars)),
+        '$high': close * 1.01,
+        '$low': close * 0.99,
+        '$close': close,
+        '$volume': rng.integers(1_000, 1_000_000, bars).astype(float),
+    }, index=pd.date_range('2010-01-04', periods=bars, freq='B'))
+
+
+def _timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alpha158 滾動核心效能基準測試")
+    parser.add_argument('--bars', type=int, default=2500, help='每檔股票的 K 棒數量')
+    parser.add_argument('--stocks', type=int, default=10, help='compute_all_factors 的股票數量')
+    parser.add_argument('--windows', default='5,10,20,30,60', help='滾動窗口（逗號分隔）')
+    parser.add_argument('--panel-stocks', type=int, default=0, help='Panel 模式比較的股票數量（0 表示略過）')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    warnings.simplefilter('ignore')
+
+    windows = [int(w) for w in args.windows.split(',')]
+    close = _synthetic_ohlcv(args.bars, 0)['$close']
+
+    print(f"Kernels: {args.bars:,} bars × windows {windows}\n")
+    print(f"{'kernel':<10} {'pandas (s)':>11} {'numpy (s)':>10} {'speedup':>9} {'max abs err':>12}")
+    for name, reference, kernel in KERNELS:
+        ref_seconds = fast_seconds = 0.0
+        max_err = 0.0
+        for w in windows:
+            expected, seconds = _timed(reference, close, w)
+            ref_seconds += seconds
+            actual, seconds = _timed(kernel, close.to_numpy(), w)
+            fast_seconds += seconds
+            mask = ~np.isnan(expected.to_numpy())
+            if mask.any():
+                max_err = max(max_err, float(np.max(np.abs(actual[mask] - expected.to_numpy()[mask]))))
+        print(f"{name:<10} {ref_seconds:>11.3f} {fast_seconds:>10.4f} "
+              f"{ref_seconds / fast_seconds:>8.0f}x {max_err:>12.2e}")
+
+    frames = [_synthetic_ohlcv(args.bars, seed) for seed in range(args.stocks)]
+    config = {
+        'kbar': {},
+        'price': {'windows': [0, 1, 2, 3, 4], 'feature': ['OPEN', 'HIGH', 'LOW', 'CLOSE']},
+        'volume': {'windows': [0, 1, 2, 3, 4]},
+        'rolling': {'windows': windows},
+    }
+
+    print(f"\ncompute_all_factors: {args.stocks} stocks × {args.bars:,} bars")
+    totals = {}
+    for backend in ('pandas', 'numpy'):
+        calculator = Alpha158Calculator(backend=backend)
+        started = time.perf_counter()
+        for df in frames:
+            calculator.compute_all_factors(df, config)
+        totals[backend] = time.perf_counter() - started
+        print(f"  {backend:<7} {totals[backend]:>8.2f}s ({totals[backend] / args.stocks:.3f}s / stock)")
+
+    print(f"  speedup {totals['pandas'] / totals['numpy']:.1f}x")
+
+    if args.panel_stocks:
+        _benchmark_panel(args.bars, args.panel_stocks, config)
+
+
+def _benchmark_panel(bars: int, stocks: int, config: dict) -> None:
+    """逐檔計算 vs Panel 一次計算"""
+    frames = [_synthetic_ohlcv(bars, seed) for seed in range(stocks)]
+    fields = {
+        name: np.column_stack([df[name].to_numpy() for df in frames])
+        for name in frames[0].columns
+    }
+    calculator = Alpha158Calculator(backend='numpy')
+
+    print(f"\nPanel: {stocks} stocks × {bars:,} bars")
+    started = time.perf_counter()
+    per_stock = [calculator.compute_all_factors(df, config)[0] for df in frames]
+    loop_seconds = time.perf_counter() - started
+    print(f"  per-stock loop {loop_seconds:>8.2f}s")
+
+    started = time.perf_counter()
+    panel = calculator.compute_panel_factors(fields, config)
+    panel_seconds = time.perf_counter() - started
+    print(f"  panel          {panel_seconds:>8.2f}s  cube {panel.values.shape} "
+          f"{panel.values.nbytes / 1024 ** 2:,.0f} MB float32")
+
+    expected = np.stack([df[panel.factor_names].to_numpy(dtype=np.float32) for df in per_stock], axis=1)
+    identical = np.array_equal(expected, panel.values, equal_nan=True)
+    print(f"  speedup {loop_seconds / panel_seconds:.1f}x, identical to per-stock: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+回測資料載入效能基準測試
+
+比較 BacktestEngine 的兩種載入方式：
+- legacy:   ORM 物件逐筆轉換（Decimal → float）後組成 DataFrame（舊版實作）
+- columnar: Repository.get_ohlcv_columns 欄位陣列載入（COPY / 投影查詢）
+
+每種模式在獨立子進程中執行，以取得各自的峰值 RSS。
+
+Usage:
+    # 使用資料庫中的真實資料（分鐘線）
+    python scripts/benchmark_backtest_loader.py --stock TX --minute \\
+        --start 2024-01-01 --end 2024-12-31
+
+    # 使用合成資料（臨時 SQLite，無需資料庫）
+    python scripts/benchmark_backtest_loader.py --synthetic-rows 300000 --minute
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+
+def _current_rss_kb() -> int:
+    """讀取目前 RSS（KB）"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _open_session(sqlite_path: Optional[str]):
+    """建立資料庫會話（合成模式使用臨時 SQLite）"""
+    if sqlite_path:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.session import ensure_models_imported
+
+        ensure_models_imported()
+        engine = create_engine(f"sqlite:///{sqlite_path}")
+        return sessionmaker(bind=engine)()
+
+    from app.db.session import SessionLocal, ensure_models_imported
+
+    ensure_models_imported()
+    return SessionLocal()
+
+
+def _legacy_load(db, stock_id: str, start: datetime, end: datetime, minute: bool):
+    """舊版載入流程：ORM 物件 + 逐筆轉換"""
+    import pandas as pd
+    from app.repositories.stock_price import StockPriceRepository
+    from app.repositories.stock_minute_price import StockMinutePriceRepository
+
+    if minute:
+        prices = StockMinutePriceRepository.get_by_stock(db, stock_id, start, end, '1min', 10_000_000)
+        key, attr = 'datetime', 'datetime'
+    else:
+        prices = StockPriceRepository.get_by_stock(
+            db, stock_id, start_date=start.date(), end_date=end.date(),
+            skip=0, limit=999999, ascending=True
+        )
+        key, attr = 'date', 'date'
+
+    data = []
+    for price in prices:
+        data.append({
+            key: pd.Timestamp(getattr(price, attr)),
+            'open': float(price.open),
+            'high': float(price.high),
+            'low': float(price.low),
+            'close': float(price.close),
+            'volume': int(price.volume),
+        })
+
+    df = pd.DataFrame(data)
+    df.set_index(key, inplace=True)
+    return df
+
+
+def _columnar_load(db, stock_id: str, start: datetime, end: datetime, minute: bool):
+    """新版載入流程：欄位陣列"""
+    from app.services.backtest_engine import BacktestEngine
+    from app.repositories.stock_price import StockPriceRepository
+    from app.repositories.stock_minute_price import StockMinutePriceRepository
+
+    if minute:
+        columns = StockMinutePriceRepository.get_ohlcv_columns(db, stock_id, start, end, 10_000_000)
+        return BacktestEngine._columns_to_frame(columns, 'datetime')
+
+    columns = StockPriceRepository.get_ohlcv_columns(db, stock_id, start.date(), end.date())
+    return BacktestEngine._columns_to_frame(columns, 'date')
+
+
+def _run_mode(mode: str, args: Dict, queue) -> None:
+    """子進程：執行單一載入模式並回報結果"""
+    db = _open_session(args['sqlite_path'])
+    loader = _legacy_load if mode == 'legacy' else _columnar_load
+
+    rss_before = _current_rss_kb()
+    started = time.perf_counter()
+    df = loader(db, args['stock'], args['start'], args['end'], args['minute'])
+    elapsed = time.perf_counter() - started
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    db.close()
+    queue.put({
+        'mode': mode,
+        'rows': len(df),
+        'seconds': elapsed,
+        'peak_rss_delta_mb': max(peak_rss - rss_before, 0) / 1024,
+    })
+
+
+def _build_synthetic_db(path: str, rows: int, minute: bool, stock_id: str) -> None:
+    """建立合成資料 SQLite 檔案"""
+    import numpy as np
+    from sqlalchemy import create_engine, insert
+    from app.db.base import Base
+    from app.db.session import ensure_models_imported
+    from app.models.stock import Stock
+    from app.models.stock_price import StockPrice
+    from app.models.stock_minute_price import StockMinutePrice
+
+    ensure_models_imported()
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    rng = np.random.default_rng(42)
+    closes = np.round(10000 + np.cumsum(rng.normal(0, 5, rows)), 2)
+    base = datetime(2015, 1, 1, 8, 45)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Stock), [{'stock_id': stock_id, 'name': stock_id}])
+        batch = []
+        for i, close in enumerate(closes):
+            record = {
+                'stock_id': stock_id,
+                'open': float(close), 'high': float(close) + 1,
+                'low': float(close) - 1, 'close': float(close),
+                'volume': int(i % 1000),
+            }
+            if minute:
+                record.update(datetime=base + timedelta(minutes=i), timeframe='1min')
+            else:
+                record.update(date=(base + timedelta(days=i)).date())
+            batch.append(record)
+            if len(batch) >= 50000:
+                conn.execute(insert(StockMinutePrice if minute else StockPrice), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(StockMinutePrice if minute else StockPrice), batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回測資料載入效能基準測試")
+    parser.add_argument('--stock', default='TX', help='標的代碼')
+    parser.add_argument('--start', default='2015-01-01', help='開始日期 (YYYY-MM-DD)')
+    parser.add_argument('--end', default='2030-12-31', help='結束日期 (YYYY-MM-DD)')
+    parser.add_argument('--minute', action='store_true', help='載入分鐘線（預設日線）')
+    parser.add_argument('--synthetic-rows', type=int, default=0,
+                        help='使用 N 筆合成資料的臨時 SQLite（不連線資料庫）')
+    args = parser.parse_args()
+
+    sqlite_path = None
+    if args.synthetic_rows:
+        sqlite_path = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+        print(f"Building synthetic dataset: {args.synthetic_rows:,} rows → {sqlite_path}")
+        _build_synthetic_db(sqlite_path, args.synthetic_rows, args.minute, args.stock)
+
+    run_args = {
+        'sqlite_path': sqlite_path,
+        'stock': args.stock,
+        'start': datetime.fromisoformat(args.start),
+        'end': datetime.fromisoformat(args.end),
+        'minute': args.minute,
+    }
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for mode in ('legacy', 'columnar'):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_mode, args=(mode, run_args, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    print(f"\n{'mode':<10} {'rows':>10} {'seconds':>10} {'rows/sec':>14} {'peak RSS Δ (MB)':>17}")
+    for r in results:
+        rate = r['rows'] / r['seconds'] if r['seconds'] > 0 else float('inf')
+        print(f"{r['mode']:<10} {r['rows']:>10,} {r['seconds']:>10.3f} {rate:>14,.0f} {r['peak_rss_delta_mb']:>17.1f}")
+
+    legacy, columnar = results
+    if columnar['seconds'] > 0:
+        print(f"\nSpeedup: {legacy['seconds'] / columnar['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+回測參數掃描效能基準測試
+
+以合成日線資料執行 N 組 SMA 交叉參數，比較：
+- sequential: 單進程循序執行（資料與策略編譯共用）
+- pool:       fork 進程池平行執行
+
+Usage:
+    python scripts/benchmark_backtest_sweep.py --combos 500 --bars 2500 --workers 8
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.services.backtest_sweep import ParameterSweepRunner, SweepSnapshot, expand_parameter_grid
+
+
+SMA_STRATEGY = '''
+import backtrader as bt
+
+class SmaCross(bt.Strategy):
+    params = (('fast', 5), ('slow', 20))
+
+    def __init__(self):
+        fast = bt.indicators.SMA(self.data.close, period=self.p.fast)
+        slow = bt.indicators.SMA(self.data.close, period=self.p.slow)
+        self.crossover = bt.indicators.CrossOver(fast, slow)
+
+    def next(self):
+        if not self.position and self.crossover > 0:
+            self.buy(size=100)
+        elif self.position and self.crossover < 0:
+            self.close()
+'''
+
+
+def _synthetic_snapshot(bars: int) -> SweepSnapshot:
+    """建立合成日線快照"""
+    rng = np.random.default_rng(42)
+    close = 100 * np.cumprod(1 + rng.normal(0.0003, 0.02, bars))
+    index = pd.date_range("2010-01-04", periods=bars, freq="B", name="date")
+    data = pd.DataFrame({
+        'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+        'volume': np.full(bars, 1000, dtype=np.int64),
+    }, index=index)
+    return SweepSnapshot(strategy_code=SMA_STRATEGY, stock_id='BENCH', data=data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回測參數掃描效能基準測試")
+    parser.add_argument('--combos', type=int, default=500, help='參數組合數量')
+    parser.add_argument('--bars', type=int, default=2500, help='日線 K 棒數量')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='進程池大小')
+    parser.add_argument('--skip-sequential', action='store_true', help='略過循序執行基準')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    snapshot = _synthetic_snapshot(args.bars)
+    grid = {'fast': list(range(2, 52)), 'slow': list(range(20, 220, 2))}
+    combos = expand_parameter_grid(grid, search='random', n_samples=args.combos, seed=0)
+    runner = ParameterSweepRunner(snapshot)
+
+    modes = [('pool', args.workers)]
+    if not args.skip_sequential:
+        modes.insert(0, ('sequential', 1))
+
+    print(f"{args.combos} combinations × {args.bars} bars\n")
+    print(f"{'mode':<12} {'workers':>8} {'seconds':>10} {'combos/sec':>12} {'failed':>8}")
+    timings = {}
+    for mode, workers in modes:
+        started = time.perf_counter()
+        results = runner.run(combos, rank_by='sharpe_ratio', max_workers=workers)
+        elapsed = time.perf_counter() - started
+        timings[mode] = elapsed
+        failed = sum(1 for r in results if 'error' in r)
+        print(f"{mode:<12} {workers:>8} {elapsed:>10.2f} {len(results) / elapsed:>12.1f} {failed:>8}")
+
+    best = results[0]
+    print(f"\nBest: {best['params']} sharpe={best['metrics'].get('sharpe_ratio')}")
+    if 'sequential' in timings:
+        print(f"Speedup: {timings['sequential'] / timings['pool']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+快取 DataFrame 序列化效能基準測試（離線，不需 Redis）
+
+比較 RedisCache 寫入 / 讀取 DataFrame 的兩種方式（皆含 HMAC-SHA256 簽章與驗證）：
+- pickle:   原本 pickle.dumps / pickle.loads
+- columnar: app.utils.frame_codec 欄式編碼（大區塊 zlib 壓縮）
+
+資料：10 年日線 OHLCV（單檔）與因子截面（交易日 × 股票）。
+
+Usage:
+    python scripts/benchmark_cache_codec.py --years 10 --stocks 1800
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import argparse
+import hashlib
+import hmac
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.frame_codec import decode_frame, encode_frame
+
+SIGNING_KEY = b"benchmark-signing-key"
+
+
+def _sign(data: bytes) -> bytes:
+    return hmac.new(SIGNING_KEY, data, hashlib.sha256).digest() + data
+
+
+def _verify(signed: bytes) -> bytes:
+    data = signed[32:]
+    expected = hmac.new(SIGNING_KEY, data, hashlib.sha256).digest()
+    assert hmac.compare_digest(signed[:32], expected)
+    return data
+
+
+def _timeit(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _frames(years: int, stocks: int):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2015-01-01", periods=years * 250, name="date")
+
+    close = 100 * np.exp(rng.normal(0, 0.02, len(dates)).cumsum()).round(2)
+    ohlcv = pd.DataFrame({
+        "open": close, "high": (close * 1.01).round(2), "low": (close * 0.99).round(2),
+        "close": close, "volume": rng.integers(1_000, 5_000_000, len(dates)).astype(float),
+    }, index=dates)
+
+    factor = pd.DataFrame(
+        rng.standard_normal((len(dates), stocks)).astype(np.float32),
+        index=dates, columns=[str(1000 + i) for i in range(stocks)],
+    )
+    return {"ohlcv": ohlcv, "factor": factor}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="快取 DataFrame 序列化效能基準測試")
+    parser.add_argument('--years', type=int, default=10, help='交易年數')
+    parser.add_argument('--stocks', type=int, default=1800, help='因子截面的股票數')
+    parser.add_argument('--repeat', type=int, default=5, help='每項重複次數（取最佳）')
+    args = parser.parse_args()
+
+    codecs = {
+        "pickle": (pickle.dumps, pickle.loads),
+        "columnar": (encode_frame, decode_frame),
+    }
+
+    print(f"{'frame':<8}{'codec':<10}{'bytes':>14}{'encode ms':>12}{'decode ms':>12}")
+    for name, df in _frames(args.years, args.stocks).items():
+        for codec, (encode, decode) in codecs.items():
+            signed = _sign(encode(df))
+            restored = decode(_verify(signed))
+            pd.testing.assert_frame_equal(restored, df, check_freq=False)
+
+            encode_s = _timeit(lambda: _sign(encode(df)), args.repeat)
+            decode_s = _timeit(lambda: decode(_verify(signed)), args.repeat)
+            print(f"{name:<8}{codec:<10}{len(signed):>14,}{encode_s * 1000:>12.2f}{decode_s * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
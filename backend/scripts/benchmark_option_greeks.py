@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+選擇權鏈 Greeks 效能基準測試
+
+比較兩種計算方式：
+- loop:       逐合約 calculate_greeks + scipy.optimize.newton 反推隱含波動率（原 iterrows 流程）
+- vectorized: calculate_chain_greeks 一次計算整條鏈的 Greeks 與隱含波動率
+
+並驗證兩者結果一致。
+
+Usage:
+    python scripts/benchmark_option_greeks.py --strikes 100 --expiries 10
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import argparse
+import time
+
+import numpy as np
+from loguru import logger
+from scipy.optimize import newton
+
+from app.services.greeks_calculator import (
+    BlackScholesGreeksCalculator,
+    black_scholes_price_chain,
+)
+
+
+def _loop_iv(spot, strike, t, price, option_type, r=0.01):
+    """原單一合約 Newton 求解（無保護）"""
+    def objective(vol):
+        return float(black_scholes_price_chain(spot, strike, t, vol, option_type == 'CALL', r)) - price
+
+    guess = max(0.01, min(price / (spot * np.sqrt(t / (2 * np.pi))), 2.0))
+    try:
+        vol = newton(objective, guess, maxiter=100, tol=1e-4)
+    except (RuntimeError, OverflowError):
+        return np.nan
+    return vol if 0.01 <= vol <= 2.0 else np.nan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="選擇權鏈 Greeks 效能基準測試")
+    parser.add_argument('--strikes', type=int, default=100, help='每個到期日的履約價數')
+    parser.add_argument('--expiries', type=int, default=10, help='到期日數')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    rng = np.random.default_rng(0)
+    spot = 20000.0
+    strikes = np.tile(np.linspace(16000, 24000, args.strikes), 2 * args.expiries)
+    times = np.repeat(np.linspace(7, 360, args.expiries) / 365, 2 * args.strikes)
+    types = np.tile(np.repeat(['CALL', 'PUT'], args.strikes), args.expiries)
+    true_vols = rng.uniform(0.12, 0.45, len(strikes))
+    prices = black_scholes_price_chain(spot, strikes, times, true_vols, types == 'CALL')
+
+    calculator = BlackScholesGreeksCalculator()
+    print(f"Option chain: {len(strikes)} contracts ({args.expiries} expiries × {args.strikes} strikes × 2)")
+
+    t0 = time.perf_counter()
+    loop_iv = np.array([_loop_iv(spot, k, t, p, o) for k, t, p, o in zip(strikes, times, prices, types)])
+    loop_delta = np.array([
+        calculator.calculate_greeks(spot, k, t, v, o)['delta'] if not np.isnan(v) else np.nan
+        for k, t, v, o in zip(strikes, times, loop_iv, types)
+    ])
+    loop_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    chain = calculator.calculate_chain_greeks(spot, strikes, times, types, option_price=prices)
+    vector_seconds = time.perf_counter() - t0
+
+    solved = ~np.isnan(loop_iv)
+    print(f"\n{'':<12}{'loop (ms)':>12}{'vector (ms)':>13}{'speedup':>10}{'IV diff':>12}{'delta diff':>12}")
+    print(f"{'chain':<12}{loop_seconds * 1000:>12.1f}{vector_seconds * 1000:>13.2f}"
+          f"{loop_seconds / vector_seconds:>9.0f}x"
+          f"{np.max(np.abs(chain['implied_volatility'][solved] - loop_iv[solved])):>12.1e}"
+          f"{np.max(np.abs(chain['delta'][solved] - loop_delta[solved])):>12.1e}")
+    print(f"\nIV solved: vectorized {np.count_nonzero(~np.isnan(chain['implied_volatility']))}, "
+          f"loop {np.count_nonzero(solved)} / {len(strikes)}")
+
+
+if __name__ == "__main__":
+    main()
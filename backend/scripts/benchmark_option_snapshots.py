@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+選擇權快照抓取基準測試（離線）
+
+以 StubShioajiOptionClient 模擬 Shioaji 延遲與失敗，比較 ShioajiOptionDataSource.get_option_chain：
+- serial:  原流程（每個合約一次 snapshots 呼叫，逐一執行）
+- batched: 分批請求（每批 chunk_size 檔），共用執行緒池並受速率限制
+
+Usage:
+    python scripts/benchmark_option_snapshots.py --expiries 5 --strikes 100 --latency 0.2
+    python scripts/benchmark_option_snapshots.py --fail-rate 0.05 --chunk-size 100
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from types import SimpleNamespace
+from typing import List
+
+from loguru import logger
+
+from app.services.option_data_source import (
+    SNAPSHOT_CHUNK_SIZE,
+    SNAPSHOT_MAX_WORKERS,
+    ShioajiOptionDataSource,
+)
+from app.utils.rate_limiter import RateLimiter
+
+
+class StubShioajiOptionClient:
+    """
+    離線假 Shioaji 客戶端（TXO 合約列表與 snapshots）
+
+    以固定延遲（每次請求 + 每檔合約）模擬網路往返，可注入失敗率，
+    用於 ShioajiOptionDataSource 的基準測試與單元測試（tests/services/test_option_data_source.py）。
+    """
+
+    def __init__(
+        self,
+        expiries: int = 5,
+        strikes: int = 100,
+        latency: float = 0.2,
+        per_contract_latency: float = 0.0005,
+        fail_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.latency = latency
+        self.per_contract_latency = per_contract_latency
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self.contracts_requested = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        contracts = []
+        for month in range(expiries):
+            expiry = date(2025 + (month // 12), month % 12 + 1, 15)
+            for i in range(strikes):
+                strike = 20000 + i * 50
+                for right in ('Call', 'Put'):
+                    contracts.append(SimpleNamespace(
+                        code=f"TXO{expiry:%Y%m}{right[0]}{strike}",
+                        strike_price=strike,
+                        option_right=f"OptionRight.{right}",
+                        delivery_date=expiry.strftime('%Y/%m/%d'),
+                    ))
+
+        self._api = SimpleNamespace(
+            Contracts=SimpleNamespace(Options=SimpleNamespace(TXO=contracts)),
+            snapshots=self._snapshots,
+        )
+
+    def is_available(self) -> bool:
+        return True
+
+    def refresh_connection(self) -> bool:
+        return True
+
+    def _snapshots(self, contracts: List, timeout: int = 30000) -> List:
+        with self._lock:
+            self.calls += 1
+            self.contracts_requested += len(contracts)
+            fail = self._rng.random() < self.fail_rate
+
+        time.sleep(self.latency + self.per_contract_latency * len(contracts))
+        if fail:
+            raise ConnectionError("stub snapshot failure")
+
+        return [
+            SimpleNamespace(
+                code=contract.code,
+                close=float(max(1, 500 - abs(contract.strike_price - 22500) / 10)),
+                volume=100,
+            )
+            for contract in contracts
+        ]
+
+
+def _run(name, client, **kwargs):
+    data_source = ShioajiOptionDataSource(client, retry_delay=0.1, **kwargs)
+    t0 = time.perf_counter()
+    chain = data_source.get_option_chain('TX', date(2025, 1, 2))
+    elapsed = time.perf_counter() - t0
+    print(f"{name:<10}{elapsed:>10.2f}{client.calls:>10}{len(chain):>10,}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="選擇權快照抓取基準測試")
+    parser.add_argument('--expiries', type=int, default=5, help='到期月份數')
+    parser.add_argument('--strikes', type=int, default=100, help='每個到期月份的履約價數（各含 Call / Put）')
+    parser.add_argument('--latency', type=float, default=0.2, help='模擬每次 API 往返延遲（秒）')
+    parser.add_argument('--per-contract-latency', type=float, default=0.0005, help='每檔合約的額外延遲（秒）')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='每次呼叫失敗機率')
+    parser.add_argument('--chunk-size', type=int, default=SNAPSHOT_CHUNK_SIZE, help='每批合約數')
+    parser.add_argument('--workers', type=int, default=SNAPSHOT_MAX_WORKERS, help='並發請求數')
+    parser.add_argument('--skip-serial', action='store_true', help='略過原逐檔流程（合約數多時很慢）')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    def make_client():
+        return StubShioajiOptionClient(
+            expiries=args.expiries, strikes=args.strikes, latency=args.latency,
+            per_contract_latency=args.per_contract_latency, fail_rate=args.fail_rate,
+        )
+
+    contracts = args.expiries * args.strikes * 2
+    print(f"Contracts: {contracts:,}, API latency {args.latency * 1000:.0f} ms, "
+          f"fail rate {args.fail_rate:.0%}, chunk size {args.chunk_size}, workers {args.workers}")
+    print(f"\n{'':<10}{'seconds':>10}{'calls':>10}{'rows':>10}")
+
+    serial = None
+    if not args.skip_serial:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            serial = _run(
+                'serial', make_client(), chunk_size=1,
+                rate_limiter=RateLimiter(10 ** 9, 1.0), executor=executor,
+            )
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        batched = _run('batched', make_client(), chunk_size=args.chunk_size, executor=executor)
+
+    if serial:
+        print(f"\nspeedup: {serial / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
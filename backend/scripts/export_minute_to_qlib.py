@@ -4,10 +4,12 @@
 
 功能：
 1. 從 stock_minute_prices 表讀取分鐘線數據
-2. 轉換為 Qlib 官方格式（FileFeatureStorage API）
+2. 以 QlibBinWriter 寫入 Qlib 格式（與 sync_shioaji_to_qlib.py 相同的日曆規則，可寫入同一目錄）
 3. 支援智慧增量同步
 4. 比從 Shioaji API 下載快 10-100 倍
 
+股票寫入 --output-dir，期貨（TX / MTX 及其月份合約）寫入 --futures-output-dir。
+
 使用範例：
     # 🧠 智慧增量轉換（推薦）
     python export_minute_to_qlib.py --output-dir /data/qlib/tw_stock_minute --smart
@@ -21,31 +23,42 @@
 
 import sys
 import os
+import re
 from pathlib import Path
 from datetime import datetime, date, timedelta, time as dt_time
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import argparse
 
 # 添加專案根目錄到 Python 路徑
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
-import numpy as np
 from loguru import logger
 from tqdm import tqdm
 from sqlalchemy import create_engine, text
 
+from app.core import trading_calendar
 from app.core.config import settings
+from app.core.qlib_config import qlib_config
+from app.core.trading_hours import filter_trading_hours
+from app.services.qlib_bin_writer import QlibBinWriter
 
 # Qlib 模組
 import qlib
 from qlib.config import REG_CN
-from qlib.data.storage.file_storage import FileFeatureStorage
 from qlib.data import D
 
 # Qlib 特徵列表（分鐘線）
 QLIB_MINUTE_FEATURES = ['open', 'high', 'low', 'close', 'volume']
 
+# 期貨標的：TX / MTX 或同步腳本寫入的月份合約代碼（如 TX202512）
+FUTURES_ID_PATTERN = r'^(TX|MTX)([0-9]{6})?$'
+
+
+def is_futures_id(stock_id: str) -> bool:
+    """是否為期貨標的（寫入期貨資料目錄，日曆含夜盤）"""
+    return re.match(FUTURES_ID_PATTERN, stock_id) is not None
+
 # 日誌配置
 logger.remove()
 logger.add(
@@ -77,16 +90,23 @@ def get_all_stock_ids(engine) -> List[str]:
         return [row[0] for row in result.fetchall()]
 
 
-def get_all_trading_minutes(engine) -> pd.DatetimeIndex:
-    """獲取所有交易分鐘"""
+def get_db_date_bounds(engine) -> Dict[bool, Tuple[date, date]]:
+    """
+    股票與期貨各自的資料日期範圍
+
+    Returns:
+        {是否為期貨: (最早日期, 最晚日期)}；沒有資料的類別不在結果中
+    """
     with engine.connect() as conn:
-        result = conn.execute(text("""
-            SELECT DISTINCT datetime
+        rows = conn.execute(text("""
+            SELECT
+                stock_id ~ :futures_pattern AS is_futures,
+                MIN(datetime::date) AS min_date,
+                MAX(datetime::date) AS max_date
             FROM stock_minute_prices
-            ORDER BY datetime ASC
-        """))
-        datetimes = [row[0] for row in result.fetchall()]
-        return pd.DatetimeIndex(datetimes)
+            GROUP BY 1
+        """), {"futures_pattern": FUTURES_ID_PATTERN}).fetchall()
+    return {bool(row[0]): (row[1], row[2]) for row in rows if row[1] is not None}
 
 
 def get_db_date_range(engine, stock_id: str) -> Tuple[Optional[date], Optional[date]]:
@@ -103,20 +123,15 @@ def get_db_date_range(engine, stock_id: str) -> Tuple[Optional[date], Optional[d
         return (None, None)
 
 
-def get_qlib_last_date(stock_id: str) -> Optional[date]:
-    """獲取 Qlib 中該股票的最後日期"""
-    try:
-        df = D.features([stock_id], ['$close'], freq='1min')
-        if df is None or df.empty:
-            return None
-        last_datetime = df.index.get_level_values('datetime').max()
-        return last_datetime.date()
-    except Exception:
-        return None
+def get_qlib_last_date(writer: QlibBinWriter, stock_id: str) -> Optional[date]:
+    """獲取 Qlib 中該股票的最後日期（只讀 bin 檔檔頭與大小）"""
+    last_timestamp = writer.last_timestamp(stock_id)
+    return last_timestamp.date() if last_timestamp is not None else None
 
 
 def determine_sync_range(
     engine,
+    writer: QlibBinWriter,
     stock_id: str,
     smart_mode: bool = False
 ) -> Tuple[Optional[date], Optional[date], str]:
@@ -138,7 +153,7 @@ def determine_sync_range(
         return (db_min_date, db_max_date, 'full')
 
     # 檢查 Qlib 已有數據
-    qlib_last_date = get_qlib_last_date(stock_id)
+    qlib_last_date = get_qlib_last_date(writer, stock_id)
 
     if not qlib_last_date:
         # 首次轉換，完整同步
@@ -154,19 +169,6 @@ def determine_sync_range(
     return (incremental_start, db_max_date, 'incremental')
 
 
-def create_calendar_file(output_dir: Path, trading_minutes: pd.DatetimeIndex):
-    """建立 Qlib 交易分鐘日曆檔案"""
-    cal_file = output_dir / 'calendars' / '1min.txt'
-    cal_file.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(cal_file, 'w') as f:
-        for dt in trading_minutes:
-            f.write(dt.strftime('%Y-%m-%d %H:%M:%S') + '\n')
-
-    logger.info(f"✅ 交易分鐘日曆: {len(trading_minutes)} 個交易分鐘")
-    logger.info(f"   範圍: {trading_minutes[0]} 至 {trading_minutes[-1]}")
-
-
 def fetch_stock_minute_data(
     engine,
     stock_id: str,
@@ -208,37 +210,37 @@ def fetch_stock_minute_data(
 
 
 def export_stock_to_qlib(
+    writer: QlibBinWriter,
     stock_id: str,
     df: pd.DataFrame,
-    trading_minutes: pd.DatetimeIndex
-):
-    """使用 Qlib FileFeatureStorage 導出股票數據"""
-    instrument = stock_id.lower()
-
-    # 將 DataFrame 對齊到完整交易分鐘索引
-    df = df.set_index('datetime')
-    df = df.reindex(trading_minutes)
-
-    # 為每個特徵寫入數據
-    for field in QLIB_MINUTE_FEATURES:
-        if field not in df.columns:
-            continue
+    start_date: date,
+    end_date: date,
+    replace: bool = False
+) -> Dict[str, int]:
+    """
+    以 QlibBinWriter 寫入單一標的的分鐘線
 
-        # 提取特徵數據
-        data = df[field].values.astype(np.float32)
+    與 sync_shioaji_to_qlib.py 的 save_to_qlib 相同：先以共用規則附加交易日曆
+    （已存在的時點不會改寫），再寫入各特徵；有任何 K 棒不在日曆中時整筆不寫入並拋出 ValueError。
 
-        # 使用 FileFeatureStorage 寫入
-        storage = FileFeatureStorage(
-            instrument=instrument,
-            field=field,
-            freq="1min"
-        )
+    Args:
+        writer: 標的所屬資料目錄的寫入器
+        stock_id: 股票代碼
+        df: fetch_stock_minute_data 的結果
+        start_date / end_date: 本次轉換的日期區間
+        replace: True 表示整檔改寫（完整轉換）
 
-        try:
-            storage.write(data)
-        except Exception as e:
-            logger.warning(f"  ⚠️  {field}: 寫入失敗 - {e}")
-            continue
+    Returns:
+        write_instrument 的統計
+    """
+    futures = is_futures_id(stock_id)
+    if not futures:
+        df = filter_trading_hours(df, datetime_column='datetime', include_night=False)
+
+    writer.extend_calendar(trading_calendar.qlib_minute_calendar(start_date, end_date, is_futures=futures))
+    return writer.write_instrument(
+        stock_id, df.set_index('datetime'), QLIB_MINUTE_FEATURES, replace=replace, strict=True
+    )
 
 
 def main():
@@ -258,7 +260,9 @@ def main():
         """
     )
 
-    parser.add_argument('--output-dir', type=str, required=True, help='Qlib 數據輸出目錄')
+    parser.add_argument('--output-dir', type=str, required=True, help='Qlib 數據輸出目錄（股票）')
+    parser.add_argument('--futures-output-dir', type=str, default=qlib_config.futures_minute_data_path,
+                        help=f'期貨 Qlib 數據輸出目錄（預設: {qlib_config.futures_minute_data_path}）')
     parser.add_argument('--stocks', type=str, default='all', help='股票代碼（逗號分隔）或 "all"')
     parser.add_argument('--smart', action='store_true', help='🧠 智慧模式：自動增量同步')
     parser.add_argument('--test', action='store_true', help='測試模式（僅處理前 10 檔）')
@@ -268,6 +272,8 @@ def main():
 
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
+    futures_output_dir = Path(args.futures_output_dir)
+    futures_output_dir.mkdir(parents=True, exist_ok=True)
 
     # 建立資料庫連接
     logger.info("=== 連接資料庫 ===")
@@ -278,10 +284,21 @@ def main():
     qlib.init(provider_uri=str(output_dir), region=REG_CN)
     logger.info(f"✅ Qlib 已初始化: {output_dir}")
 
-    # 獲取交易分鐘日曆
-    logger.info("\n=== 建立交易分鐘日曆 ===")
-    trading_minutes = get_all_trading_minutes(engine)
-    create_calendar_file(output_dir, trading_minutes)
+    # 增量寫入器（股票 / 期貨各自一個資料目錄）；先還原上次中斷的寫入
+    writers = {
+        False: QlibBinWriter(output_dir, freq='1min'),
+        True: QlibBinWriter(futures_output_dir, freq='1min'),
+    }
+    for writer in writers.values():
+        writer.recover()
+
+    # 附加交易分鐘日曆：先涵蓋資料庫的完整日期範圍，個股依序寫入時不會早於日曆結尾
+    logger.info("\n=== 附加交易分鐘日曆 ===")
+    for futures, (min_date, max_date) in get_db_date_bounds(engine).items():
+        appended = writers[futures].extend_calendar(
+            trading_calendar.qlib_minute_calendar(min_date, max_date, is_futures=futures)
+        )
+        logger.info(f"✅ {'期貨' if futures else '股票'}日曆: 新增 {appended} 個交易分鐘（{min_date} ~ {max_date}）")
 
     # 獲取股票列表
     logger.info("\n=== 準備股票列表 ===")
@@ -303,15 +320,6 @@ def main():
     if args.smart:
         logger.info(f"🧠 智慧模式：啟用增量同步")
 
-    # 建立 features 目錄結構
-    logger.info("\n=== 建立目錄結構 ===")
-    for stock_id in stock_ids:
-        instrument = stock_id.lower()
-        features_dir = output_dir / 'features' / instrument
-        features_dir.mkdir(parents=True, exist_ok=True)
-
-    logger.info(f"✅ 已建立 {len(stock_ids)} 個股票目錄")
-
     # 導出每檔股票
     logger.info("\n=== 開始轉換數據 ===")
     full_count = 0
@@ -325,9 +333,11 @@ def main():
         progress_bar.set_description(f"轉換 {stock_id}")
 
         try:
+            writer = writers[is_futures_id(stock_id)]
+
             # 判斷同步範圍
             start_date, end_date, sync_type = determine_sync_range(
-                engine, stock_id, smart_mode=args.smart
+                engine, writer, stock_id, smart_mode=args.smart
             )
 
             # 跳過已是最新的股票
@@ -351,14 +361,18 @@ def main():
                 logger.info(f"  ➕ {stock_id}: 增量轉換 {len(df)} 筆 ({start_date} ~ {end_date})")
                 incremental_count += 1
 
-            # 導出到 Qlib
-            export_stock_to_qlib(stock_id, df, trading_minutes)
+            # 導出到 Qlib（完整轉換整檔改寫，增量只寫入新的時點）
+            export_stock_to_qlib(writer, stock_id, df, start_date, end_date, replace=sync_type == 'full')
 
         except Exception as e:
             logger.error(f"  ❌ {stock_id}: 失敗 - {str(e)}")
             error_count += 1
             continue
 
+    # 更新 instruments 起迄時間
+    for writer in writers.values():
+        writer.update_instruments()
+
     # 總結
     logger.info(f"\n{'='*60}")
     logger.info("=== 轉換完成 ===")
@@ -36,18 +36,17 @@ from pathlib import Path
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Tuple
 import pandas as pd
-import numpy as np
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from sqlalchemy import create_engine, text
 from app.core.config import settings
+from app.services.qlib_bin_writer import QlibBinWriter
 
 # Qlib imports
 import qlib
 from qlib.config import REG_CN
-from qlib.data.storage.file_storage import FileFeatureStorage
 from qlib.data import D
 
 # Qlib 特徵列表
@@ -184,9 +183,12 @@ def create_calendar_file(output_dir: Path, trading_dates: List[date]):
     cal_file = output_dir / 'calendars' / 'day.txt'
     cal_file.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(cal_file, 'w') as f:
+    # 先寫暫存檔再替換，避免中斷時留下不完整的日曆
+    tmp_file = cal_file.with_name('.day.txt.tmp')
+    with open(tmp_file, 'w') as f:
         for d in trading_dates:
             f.write(d.strftime('%Y-%m-%d') + '\n')
+    os.replace(tmp_file, cal_file)
 
     print(f"✅ 交易日曆: {len(trading_dates)} 個交易日")
     print(f"   範圍: {trading_dates[0]} 至 {trading_dates[-1]}")
@@ -247,45 +249,23 @@ def fetch_stock_data(
 def export_stock_to_qlib(
     stock_id: str,
     df: pd.DataFrame,
-    trading_dates: List[date]
+    writer: QlibBinWriter,
+    replace: bool = False
 ):
     """
-    使用 Qlib FileFeatureStorage 導出股票數據
+    導出股票數據到 Qlib bin 檔
+
+    增量模式只寫入 df 涵蓋的交易日（附加到檔尾或覆寫重疊的尾段），不重寫既有資料。
 
     Args:
         stock_id: 股票代碼
         df: 股票數據 DataFrame
-        trading_dates: 完整交易日曆
+        writer: Qlib bin 寫入器（已載入交易日曆）
+        replace: 整檔改寫（完整重新導出）
     """
-    # 確保股票代碼為小寫（Qlib 要求）
-    instrument = stock_id.lower()
-
-    # 將 DataFrame 對齊到完整交易日曆
-    df = df.set_index('date')
-    df = df.reindex(trading_dates)
-
-    # 為每個特徵寫入數據
-    for field in QLIB_FEATURES:
-        if field not in df.columns:
-            continue
-
-        # 提取特徵數據
-        data = df[field].values.astype(np.float32)
-
-        # 使用 FileFeatureStorage 寫入
-        storage = FileFeatureStorage(
-            instrument=instrument,
-            field=field,
-            freq="day"
-        )
+    result = writer.write_instrument(stock_id, df.set_index('date'), QLIB_FEATURES, replace=replace)
 
-        try:
-            storage.write(data)
-        except Exception as e:
-            print(f"  ⚠️  {field}: 寫入失敗 - {e}")
-            continue
-
-    print(f"  ✓ {stock_id}: {len(df)} 個交易日")
+    print(f"  ✓ {stock_id}: {result['slots']} 個交易日")
 
 
 def main():
@@ -308,7 +288,17 @@ def main():
     # 獲取交易日曆
     print("\n=== 建立交易日曆 ===")
     trading_dates = get_all_trading_dates(engine)
-    create_calendar_file(output_dir, trading_dates)
+    writer = QlibBinWriter(output_dir, freq='day')
+    if args.smart and len(writer.calendar):
+        # 智慧模式：只附加新的交易日（原子替換），既有 bin 檔位置不變
+        recovered = writer.recover()
+        if recovered:
+            print(f"⚠️  已還原 {recovered} 個中斷寫入的 bin 檔")
+        appended = writer.extend_calendar(trading_dates)
+        print(f"✅ 交易日曆: 新增 {appended} 個交易日（共 {len(writer.calendar)} 個）")
+    else:
+        create_calendar_file(output_dir, trading_dates)
+        writer = QlibBinWriter(output_dir, freq='day')
 
     # 初始化 Qlib
     print("\n=== 初始化 Qlib ===")
@@ -382,7 +372,7 @@ def main():
                 incremental_count += 1
 
             # 導出到 Qlib
-            export_stock_to_qlib(stock_id, df, trading_dates)
+            export_stock_to_qlib(stock_id, df, writer, replace=sync_type == 'full')
 
             # 進度報告
             if idx % 100 == 0:
@@ -395,6 +385,9 @@ def main():
             error_count += 1
             continue
 
+    # 更新 instruments 起迄日期
+    writer.update_instruments()
+
     # 總結
     print("\n" + "="*60)
     print("=== 導出完成 ===")
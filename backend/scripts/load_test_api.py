@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+API 延遲負載測試（並發客戶端，回報 p50 / p95 / p99）
+
+以 N 個並發客戶端在指定時間內輪流請求讀取端點，統計每個端點的延遲分位數與吞吐量。
+用於比較同步 Session 與 asyncpg 資料路徑：在改動前後各跑一次並以 --baseline 對照。
+
+- 需要登入的端點（intraday / options / backtest）以 --token 或 LOAD_TEST_TOKEN 提供 JWT
+- 速率限制（DATA_FETCH）在正式環境為 100/minute，請對開發環境或關閉限制的實例執行；
+  429 回應會單獨計數，不納入延遲統計
+
+Usage:
+    python scripts/load_test_api.py --concurrency 50 --duration 30 --output before.json
+    python scripts/load_test_api.py --concurrency 50 --duration 30 --output after.json \\
+        --baseline before.json
+    python scripts/load_test_api.py --endpoint "/api/v1/options/chain/TX?expiry_date=2025-12-17"
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+DEFAULT_ENDPOINTS = [
+    "/api/v1/data/ohlcv/2330",
+    "/api/v1/intraday/ohlcv/2330?timeframe=5min&limit=2000",
+    "/api/v1/intraday/latest/2330",
+    "/api/v1/options/factors/TX?limit=100",
+    "/api/v1/options/factors/TX/latest",
+]
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """線性內插分位數（輸入須已排序）"""
+    if not sorted_values:
+        return float("nan")
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+class LoadStats:
+    """每個端點的延遲（秒）與狀態碼統計"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, endpoint: str, status: str, elapsed: float):
+        self.statuses[endpoint][status] += 1
+        if status.startswith("2"):
+            self.latencies[endpoint].append(elapsed)
+
+    def summary(self, duration: float) -> Dict[str, Dict]:
+        result = {}
+        endpoints = list(self.statuses) + ["ALL"]
+        for endpoint in endpoints:
+            if endpoint == "ALL":
+                values = sorted(v for lat in self.latencies.values() for v in lat)
+                statuses = sum(self.statuses.values(), Counter())
+            else:
+                values = sorted(self.latencies[endpoint])
+                statuses = self.statuses[endpoint]
+
+            row = {
+                "ok": len(values),
+                "rps": len(values) / duration if duration else 0.0,
+                "statuses": dict(statuses),
+            }
+            for pct in PERCENTILES:
+                row[f"p{pct}_ms"] = percentile(values, pct) * 1000
+            result[endpoint] = row
+        return result
+
+
+async def _client_loop(
+    client: httpx.AsyncClient,
+    endpoints: List[str],
+    offset: int,
+    deadline: float,
+    warmup_until: float,
+    stats: LoadStats,
+):
+    """單一客戶端：依序（錯開起點）請求端點直到截止時間"""
+    i = offset
+    while time.perf_counter() < deadline:
+        endpoint = endpoints[i % len(endpoints)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(endpoint)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        if start >= warmup_until:
+            stats.record(endpoint, status, time.perf_counter() - start)
+
+
+async def run_load_test(
+    base_url: str,
+    endpoints: List[str],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    token: Optional[str],
+    timeout: float,
+) -> Dict[str, Dict]:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    stats = LoadStats()
+
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=timeout
+    ) as client:
+        start = time.perf_counter()
+        warmup_until = start + warmup
+        deadline = warmup_until + duration
+        await asyncio.gather(*(
+            _client_loop(client, endpoints, n, deadline, warmup_until, stats)
+            for n in range(concurrency)
+        ))
+
+    return stats.summary(duration)
+
+
+def print_summary(summary: Dict[str, Dict], baseline: Optional[Dict[str, Dict]] = None):
+    header = f"{'endpoint':<60}{'ok':>8}{'rps':>9}" + "".join(f"{f'p{p} ms':>11}" for p in PERCENTILES)
+    print(header)
+    print("-" * len(header))
+    for endpoint, row in summary.items():
+        line = f"{endpoint[:59]:<60}{row['ok']:>8}{row['rps']:>9.1f}"
+        line += "".join(f"{row[f'p{p}_ms']:>11.1f}" for p in PERCENTILES)
+        print(line)
+
+        errors = {k: v for k, v in row["statuses"].items() if not k.startswith("2")}
+        if errors:
+            print(f"{'':<4}non-2xx: {errors}")
+
+        before = (baseline or {}).get(endpoint)
+        if before:
+            deltas = []
+            for p in PERCENTILES:
+                key = f"p{p}_ms"
+                if before[key]:
+                    deltas.append(f"p{p} {before[key]:.1f} → {row[key]:.1f} ms ({row[key] / before[key]:.2f}x)")
+            deltas.append(f"rps {before['rps']:.1f} → {row['rps']:.1f}")
+            print(f"{'':<4}vs baseline: " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 延遲負載測試")
+    parser.add_argument('--base-url', default='http://localhost:8000', help='API 位址')
+    parser.add_argument('--endpoint', action='append', dest='endpoints',
+                        help='要測試的路徑（可重複指定；預設為主要讀取端點）')
+    parser.add_argument('--concurrency', type=int, default=50, help='並發客戶端數')
+    parser.add_argument('--duration', type=float, default=30.0, help='量測秒數')
+    parser.add_argument('--warmup', type=float, default=5.0, help='暖機秒數（不計入統計）')
+    parser.add_argument('--timeout', type=float, default=30.0, help='單一請求逾時秒數')
+    parser.add_argument('--token', default=os.getenv('LOAD_TEST_TOKEN'), help='JWT access token')
+    parser.add_argument('--output', help='將結果寫入 JSON（供之後 --baseline 比較）')
+    parser.add_argument('--baseline', help='先前 --output 的 JSON，用於前後對照')
+    args = parser.parse_args()
+
+    endpoints = args.endpoints or DEFAULT_ENDPOINTS
+    print(
+        f"Load test: {args.base_url}, {len(endpoints)} endpoints, "
+        f"concurrency={args.concurrency}, duration={args.duration}s (+{args.warmup}s warmup)"
+    )
+
+    summary = asyncio.run(run_load_test(
+        args.base_url, endpoints, args.concurrency, args.duration,
+        args.warmup, args.token, args.timeout,
+    ))
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_summary(summary, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2, ensure_ascii=False))
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
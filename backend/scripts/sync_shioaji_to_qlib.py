@@ -33,7 +33,7 @@ import sys
 import os
 from pathlib import Path
 from datetime import datetime, date, timedelta
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import argparse
 import time
 import struct
@@ -42,7 +42,6 @@ import struct
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
-import numpy as np
 from loguru import logger
 from tqdm import tqdm
 from sqlalchemy import create_engine, text
@@ -50,16 +49,26 @@ from sqlalchemy.orm import sessionmaker
 
 # QuantLab 模組
 from app.core.config import settings
+from app.core.qlib_config import qlib_config
 from app.db.base import import_models
 from app.services.shioaji_client import ShioajiClient
+from app.services.minute_sync_pipeline import (
+    MinuteSyncPipeline,
+    PipelineResult,
+    SyncCheckpoint,
+    SyncJob,
+    kbars_to_dataframe,
+)
+from app.utils.rate_limiter import RateLimiter, get_shioaji_rate_limiter
+from app.core import trading_calendar
+from app.core.trading_hours import filter_trading_hours
+from app.services.qlib_bin_writer import QlibBinWriter
 from app.repositories.stock_minute_price import StockMinutePriceRepository
 from app.schemas.stock_minute_price import StockMinutePriceCreate
 
 # Qlib 模組
 import qlib
 from qlib.config import REG_CN
-from qlib.data.storage.file_storage import FileFeatureStorage
-from qlib.data import D
 
 # 導入所有模型
 import_models()
@@ -92,19 +101,24 @@ class ShioajiToQlibSyncer:
 
     def __init__(
         self,
-        qlib_data_dir: str = "/data/qlib/tw_stock_minute",
+        qlib_data_dir: Optional[str] = None,
+        futures_qlib_data_dir: Optional[str] = None,
         db_url: Optional[str] = None,
         skip_db: bool = False,
-        verbose: bool = False
+        verbose: bool = False,
+        shioaji_client=None
     ):
         """
         初始化同步器
 
         Args:
-            qlib_data_dir: Qlib 數據目錄
+            qlib_data_dir: Qlib 數據目錄（股票；None 則使用 QLIB_MINUTE_DATA_PATH）
+            futures_qlib_data_dir: 期貨 Qlib 數據目錄（None 則使用 QLIB_FUTURES_MINUTE_DATA_PATH）；
+                期貨含夜盤與 08:45 開盤，與股票共用日曆會使這些時點落在日曆結尾之前而無法寫入
             db_url: 資料庫連接字串（None 則使用環境變數）
             skip_db: 是否跳過資料庫存儲（僅更新 Qlib）
             verbose: 是否輸出詳細日誌（默認 False，適合大量股票同步）
+            shioaji_client: 預先建立的客戶端（例如離線測試用的 StubShioajiClient；None 則延遲初始化）
         """
         self.verbose = verbose
 
@@ -112,9 +126,10 @@ class ShioajiToQlibSyncer:
         logger.info("🔧 初始化 Shioaji → Qlib 同步器...")
         logger.info("=" * 60)
 
-        self.qlib_data_dir = Path(qlib_data_dir)
+        self.qlib_data_dir = Path(qlib_data_dir or qlib_config.minute_data_path)
+        self.futures_qlib_data_dir = Path(futures_qlib_data_dir or qlib_config.futures_minute_data_path)
         self.skip_db = skip_db
-        logger.info(f"📁 Qlib 數據目錄: {qlib_data_dir}")
+        logger.info(f"📁 Qlib 數據目錄: {self.qlib_data_dir}（期貨: {self.futures_qlib_data_dir}）")
         if verbose:
             logger.info(f"📝 詳細日誌模式: 啟用")
 
@@ -152,19 +167,30 @@ class ShioajiToQlibSyncer:
         self._init_qlib()
 
         # Shioaji 客戶端（延遲初始化）
-        self.shioaji_client = None
-        logger.info("⏳ Shioaji 客戶端將在首次使用時初始化")
+        self.shioaji_client = shioaji_client
+        if shioaji_client is None:
+            logger.info("⏳ Shioaji 客戶端將在首次使用時初始化")
 
     def _init_qlib(self):
         """初始化 Qlib 環境"""
         logger.info("📊 正在初始化 Qlib...")
         try:
             # 檢查目錄是否存在
-            if not self.qlib_data_dir.exists():
-                logger.info(f"   創建 Qlib 目錄: {self.qlib_data_dir}")
-                self.qlib_data_dir.mkdir(parents=True, exist_ok=True)
-            else:
-                logger.info(f"   Qlib 目錄已存在: {self.qlib_data_dir}")
+            for data_dir in (self.qlib_data_dir, self.futures_qlib_data_dir):
+                if not data_dir.exists():
+                    logger.info(f"   創建 Qlib 目錄: {data_dir}")
+                    data_dir.mkdir(parents=True, exist_ok=True)
+                else:
+                    logger.info(f"   Qlib 目錄已存在: {data_dir}")
+
+            # 增量寫入器（只附加新的交易分鐘，不重寫既有資料）；先還原上次中斷的寫入
+            # 股票與期貨各自一個資料目錄與交易日曆
+            self.qlib_writer = QlibBinWriter(self.qlib_data_dir, freq='1min')
+            self.futures_qlib_writer = QlibBinWriter(self.futures_qlib_data_dir, freq='1min')
+            for writer in (self.qlib_writer, self.futures_qlib_writer):
+                recovered = writer.recover()
+                if recovered:
+                    logger.warning(f"   已還原 {recovered} 個中斷寫入的 bin 檔（{writer.root}）")
 
             # 初始化 Qlib
             qlib.init(provider_uri=str(self.qlib_data_dir), region=REG_CN)
@@ -249,31 +275,29 @@ class ShioajiToQlibSyncer:
         """
         獲取 Qlib 中該股票的最後日期
 
+        由寫入器讀取收盤價 bin 檔的檔頭與大小換算，不透過 D.features 載入整段資料。
+        寫入器會還原中斷的寫入，不可與 Qlib 寫入執行緒同時呼叫（管線模式於啟動前先解析）。
+
         Args:
             stock_id: 股票代碼
 
         Returns:
             最後日期或 None
         """
+        writer = self.futures_qlib_writer if self._is_futures(stock_id) else self.qlib_writer
         try:
-            # 嘗試讀取該股票的收盤價數據
-            df = D.features([stock_id], ['$close'], freq='1min')
-
-            if df is None or df.empty:
-                return None
-
-            # 獲取最後一個日期時間
-            last_datetime = df.index.get_level_values('datetime').max()
-            return last_datetime.date()
-        except Exception:
-            # 如果讀取失敗，表示數據不存在
+            last_timestamp = writer.last_timestamp(stock_id)
+        except Exception as e:
+            logger.debug(f"無法獲取 {stock_id} 的 Qlib 最後日期: {e}")
             return None
+        return last_timestamp.date() if last_timestamp is not None else None
 
     def determine_sync_range(
         self,
         stock_id: str,
         user_end_date: date,
-        smart_mode: bool = False
+        smart_mode: bool = False,
+        qlib_last_dates: Optional[Dict[str, Optional[date]]] = None
     ) -> Tuple[Optional[date], Optional[date], str]:
         """
         智慧判斷需要同步的日期範圍
@@ -282,6 +306,7 @@ class ShioajiToQlibSyncer:
             stock_id: 股票代碼
             user_end_date: 用戶指定的結束日期（通常是今天）
             smart_mode: 是否使用智慧模式
+            qlib_last_dates: 預先解析的 Qlib 最後日期（None 則即時讀取）
 
         Returns:
             (開始日期, 結束日期, 同步類型)
@@ -295,7 +320,10 @@ class ShioajiToQlibSyncer:
         db_last_date = self.get_db_last_date(stock_id)
 
         # 檢查 Qlib 最後日期
-        qlib_last_date = self.get_qlib_last_date(stock_id)
+        if qlib_last_dates is not None:
+            qlib_last_date = qlib_last_dates.get(stock_id)
+        else:
+            qlib_last_date = self.get_qlib_last_date(stock_id)
 
         # 取兩者中較早的日期作為參考點
         if db_last_date and qlib_last_date:
@@ -326,6 +354,48 @@ class ShioajiToQlibSyncer:
         """獲取契約類型"""
         return 'futures' if self._is_futures(stock_id) else 'stock'
 
+    def _update_qlib_instruments(self):
+        """更新兩個資料目錄的 instruments 起迄時間"""
+        for writer in (self.qlib_writer, self.futures_qlib_writer):
+            writer.update_instruments()
+
+    def _ensure_client(self) -> bool:
+        """初始化 Shioaji 客戶端（首次使用時），返回是否可用"""
+        if not self.shioaji_client:
+            logger.info("  🔌 首次調用，初始化 Shioaji 客戶端...")
+            try:
+                start_init = time.time()
+                self.shioaji_client = ShioajiClient()
+                init_elapsed = time.time() - start_init
+                logger.info(f"  ✅ Shioaji 客戶端初始化成功 ({init_elapsed:.1f}s)")
+            except Exception as e:
+                logger.error(f"  ❌ Shioaji 客戶端初始化失敗: {e}")
+                logger.exception("完整錯誤追蹤:")
+                return False
+
+        if not self.shioaji_client.is_available():
+            logger.error("  ❌ Shioaji 客戶端未就緒")
+            return False
+        return True
+
+    def _kbar_window(self, start_date: date, end_date: date, is_futures: bool) -> Tuple[datetime, datetime]:
+        """
+        K 線查詢時間範圍
+
+        期貨：08:45-次日05:00（完整日盤 + 夜盤）
+        股票：09:00-13:30（僅日盤）
+        """
+        if is_futures:
+            start_datetime = datetime.combine(start_date, datetime.min.time().replace(hour=8, minute=45))
+            # 期货夜盘延续到次日 05:00，因此 end_datetime 需要 +1 天
+            end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time().replace(hour=5, minute=0))
+            logger.debug(f"  📅 期貨時間範圍: {start_datetime} ~ {end_datetime}（含完整夜盤）")
+        else:
+            start_datetime = datetime.combine(start_date, datetime.min.time().replace(hour=9, minute=0))
+            end_datetime = datetime.combine(end_date, datetime.min.time().replace(hour=13, minute=30))
+            logger.debug(f"  📅 股票時間範圍: {start_datetime} ~ {end_datetime}")
+        return start_datetime, end_datetime
+
     def fetch_minute_data(
         self,
         stock_id: str,
@@ -352,21 +422,7 @@ class ShioajiToQlibSyncer:
         if self.verbose:
             logger.info(f"  📡 [API] 正在獲取 {stock_id} 數據 ({start_date} ~ {end_date})...")
 
-        # 初始化 Shioaji 客戶端
-        if not self.shioaji_client:
-            logger.info("  🔌 首次調用，初始化 Shioaji 客戶端...")
-            try:
-                start_init = time.time()
-                self.shioaji_client = ShioajiClient()
-                init_elapsed = time.time() - start_init
-                logger.info(f"  ✅ Shioaji 客戶端初始化成功 ({init_elapsed:.1f}s)")
-            except Exception as e:
-                logger.error(f"  ❌ Shioaji 客戶端初始化失敗: {e}")
-                logger.exception("完整錯誤追蹤:")
-                return None
-
-        if not self.shioaji_client.is_available():
-            logger.error("  ❌ Shioaji 客戶端未就緒")
+        if not self._ensure_client():
             return None
 
         # 判斷契約類型
@@ -393,18 +449,7 @@ class ShioajiToQlibSyncer:
                 return None
 
         try:
-            # 設定時間範圍
-            # 期貨：08:45-次日05:00（完整日盤 + 夜盤）
-            # 股票：09:00-13:30（僅日盤）
-            if is_futures:
-                start_datetime = datetime.combine(start_date, datetime.min.time().replace(hour=8, minute=45))
-                # 期货夜盘延续到次日 05:00，因此 end_datetime 需要 +1 天
-                end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time().replace(hour=5, minute=0))
-                logger.debug(f"  📅 期貨時間範圍: {start_datetime} ~ {end_datetime}（含完整夜盤）")
-            else:
-                start_datetime = datetime.combine(start_date, datetime.min.time().replace(hour=9, minute=0))
-                end_datetime = datetime.combine(end_date, datetime.min.time().replace(hour=13, minute=30))
-                logger.debug(f"  📅 股票時間範圍: {start_datetime} ~ {end_datetime}")
+            start_datetime, end_datetime = self._kbar_window(start_date, end_date, is_futures)
 
             # 調用 Shioaji API（帶重試機制）
             df = None
@@ -575,15 +620,21 @@ class ShioajiToQlibSyncer:
         self,
         stock_id: str,
         df: pd.DataFrame,
-        trading_minutes: pd.DatetimeIndex
+        trading_minutes: pd.DatetimeIndex,
+        is_futures: bool = False
     ) -> bool:
         """
-        保存數據到 Qlib 格式
+        保存數據到 Qlib 格式（增量：只寫入新的交易分鐘）
+
+        先將 trading_minutes 中晚於日曆結尾的時點附加到 calendars/1min.txt，
+        再把數據寫入各特徵 bin 檔對應的日曆位置（檔尾附加或覆寫重疊的尾段）。
+        有任何 K 棒不在交易日曆中時整筆不寫入並視為失敗（不靜默丟棄資料）。
 
         Args:
-            stock_id: 股票代碼
+            stock_id: 股票代碼（期貨為實際合約代碼）
             df: 數據 DataFrame
             trading_minutes: 完整的交易分鐘索引
+            is_futures: 是否為期貨（寫入期貨資料目錄）
 
         Returns:
             是否成功
@@ -591,58 +642,30 @@ class ShioajiToQlibSyncer:
         logger.info(f"  📊 [QLIB] 正在保存到 Qlib...")
 
         try:
-            instrument = stock_id.lower()
-
-            # 創建股票目錄
-            features_dir = self.qlib_data_dir / 'features' / instrument
-            logger.debug(f"  📁 目標目錄: {features_dir}")
-
-            if not features_dir.exists():
-                logger.info(f"  ➕ 創建目錄: {instrument}")
-                features_dir.mkdir(parents=True, exist_ok=True)
-
-            # 將 DataFrame 對齊到完整交易分鐘索引
-            logger.debug(f"  🔧 對齊時間索引（{len(trading_minutes)} 個時間點）...")
-            df = df.set_index('datetime')
-            df = df.reindex(trading_minutes)
-
-            # 為每個特徵寫入數據
             qlib_start = time.time()
-            successful_features = 0
+            writer = self.futures_qlib_writer if is_futures else self.qlib_writer
+            bytes_before = writer.stats['bytes_written']
 
-            for field in QLIB_MINUTE_FEATURES:
-                if field not in df.columns:
-                    logger.warning(f"  ⚠️  欄位 {field} 不存在，跳過")
-                    continue
-
-                try:
-                    # 提取特徵數據
-                    data = df[field].values.astype(np.float32)
-
-                    # 使用 FileFeatureStorage 寫入
-                    storage = FileFeatureStorage(
-                        instrument=instrument,
-                        field=field,
-                        freq="1min"
-                    )
-
-                    storage.write(data)
-                    successful_features += 1
-                    logger.debug(f"  ✓ {field}: 寫入成功")
-
-                except Exception as e:
-                    logger.error(f"  ❌ Qlib {field}: 寫入失敗 - {e}")
-                    continue
+            appended = writer.extend_calendar(trading_minutes)
+            if appended:
+                logger.debug(f"  📅 交易日曆新增 {appended} 個時點")
 
+            result = writer.write_instrument(
+                stock_id, df.set_index('datetime'), QLIB_MINUTE_FEATURES, strict=True
+            )
             qlib_elapsed = time.time() - qlib_start
+            written = writer.stats['bytes_written'] - bytes_before
 
-            if successful_features == len(QLIB_MINUTE_FEATURES):
-                logger.info(f"  ✅ Qlib: {len(df)} 個時間點，{successful_features} 個特徵 ({qlib_elapsed:.1f}s)")
-                return True
-            else:
-                logger.warning(f"  ⚠️  Qlib: 部分成功（{successful_features}/{len(QLIB_MINUTE_FEATURES)} 個特徵）")
+            if result['slots'] == 0:
+                logger.warning(f"  ⚠️  Qlib: 沒有可寫入的時點")
                 return False
 
+            logger.info(
+                f"  ✅ Qlib: {result['slots']} 個時點，{len(QLIB_MINUTE_FEATURES)} 個特徵，"
+                f"寫入 {written / 1024:.0f} KB ({qlib_elapsed:.1f}s)"
+            )
+            return True
+
         except Exception as e:
             logger.error(f"  ❌ Qlib: 保存失敗 - {e}")
             logger.exception("完整錯誤追蹤:")
@@ -672,69 +695,8 @@ class ShioajiToQlibSyncer:
           - 日盤：08:45-13:45
           - 夜盤前段：15:00-23:59
         """
-        minutes = []
-        current_date = start_date
-
-        if is_futures:
-            # 期貨：完整交易時段（日盤 + 夜盤）
-            while current_date <= end_date:
-                # 1. 夜盤後段：00:00-05:00（屬於前一交易日的夜盤）
-                for hour in range(0, 5):
-                    for minute in range(60):
-                        dt = datetime.combine(current_date, datetime.min.time().replace(hour=hour, minute=minute))
-                        minutes.append(dt)
-
-                # 05:00 記錄最後一分鐘
-                dt = datetime.combine(current_date, datetime.min.time().replace(hour=5, minute=0))
-                minutes.append(dt)
-
-                # 2. 日盤：08:45-13:45
-                # 08:45-08:59 (15 分钟)
-                for minute in range(45, 60):
-                    dt = datetime.combine(current_date, datetime.min.time().replace(hour=8, minute=minute))
-                    minutes.append(dt)
-
-                # 09:00-12:00
-                for hour in range(9, 12):
-                    for minute in range(60):
-                        dt = datetime.combine(current_date, datetime.min.time().replace(hour=hour, minute=minute))
-                        minutes.append(dt)
-
-                # 12:00-13:45
-                for hour in range(12, 14):
-                    for minute in range(60):
-                        if hour == 13 and minute > 45:
-                            break
-                        dt = datetime.combine(current_date, datetime.min.time().replace(hour=hour, minute=minute))
-                        minutes.append(dt)
-
-                # 3. 夜盤前段：15:00-23:59（屬於當日交易）
-                for hour in range(15, 24):
-                    for minute in range(60):
-                        dt = datetime.combine(current_date, datetime.min.time().replace(hour=hour, minute=minute))
-                        minutes.append(dt)
-
-                current_date += timedelta(days=1)
-        else:
-            # 股票：09:00-13:30
-            while current_date <= end_date:
-                # 上午盤：09:00-12:00
-                for hour in range(9, 12):
-                    for minute in range(60):
-                        dt = datetime.combine(current_date, datetime.min.time().replace(hour=hour, minute=minute))
-                        minutes.append(dt)
-
-                # 下午盤：12:00-13:30
-                for hour in range(12, 14):
-                    for minute in range(60):
-                        if hour == 13 and minute > 30:
-                            break
-                        dt = datetime.combine(current_date, datetime.min.time().replace(hour=hour, minute=minute))
-                        minutes.append(dt)
-
-                current_date += timedelta(days=1)
-
-        return pd.DatetimeIndex(minutes)
+        # 向量化生成並快取，同一區間的多檔標的共用同一索引（與 export_minute_to_qlib.py 相同規則）
+        return trading_calendar.qlib_minute_calendar(start_date, end_date, is_futures=is_futures)
 
     def sync_stock(
         self,
@@ -771,7 +733,9 @@ class ShioajiToQlibSyncer:
         db_count = self.save_to_postgresql(actual_stock_id, df) if not self.skip_db else 0
 
         # 3. 保存到 Qlib（使用實際合約代碼）
-        qlib_success = self.save_to_qlib(actual_stock_id, df, trading_minutes)
+        qlib_success = self.save_to_qlib(
+            actual_stock_id, df, trading_minutes, is_futures=self._is_futures(stock_id)
+        )
 
         return (db_count, 1 if qlib_success else 0)
 
@@ -780,7 +744,9 @@ class ShioajiToQlibSyncer:
         stock_ids: List[str],
         user_start_date: Optional[date],
         user_end_date: date,
-        smart_mode: bool = False
+        smart_mode: bool = False,
+        workers: int = 1,
+        checkpoint_path: Optional[str] = None
     ):
         """
         同步所有標的的數據（支持股票和期货，支援智慧模式）
@@ -790,7 +756,15 @@ class ShioajiToQlibSyncer:
             user_start_date: 用戶指定的開始日期（智慧模式下可為 None）
             user_end_date: 用戶指定的結束日期
             smart_mode: 是否使用智慧增量同步
+            workers: 抓取執行緒數（> 1 或指定 checkpoint_path 時改用 sync_all_pipelined）
+            checkpoint_path: 續傳進度檔路徑
         """
+        if workers > 1 or checkpoint_path:
+            return self.sync_all_pipelined(
+                stock_ids, user_start_date, user_end_date, smart_mode,
+                workers=workers, checkpoint_path=checkpoint_path
+            )
+
         logger.info(f"\n{'='*60}")
         logger.info(f"🚀 開始同步: {len(stock_ids)} 檔標的（股票/期货）")
         if smart_mode:
@@ -892,6 +866,9 @@ class ShioajiToQlibSyncer:
                 logger.info(f"  ⏩ 繼續處理下一檔...")
                 continue
 
+        # 更新 instruments 起迄時間
+        self._update_qlib_instruments()
+
         # 總結
         total_elapsed = time.time() - start_time
         total_minutes = int(total_elapsed / 60)
@@ -917,6 +894,154 @@ class ShioajiToQlibSyncer:
             logger.info(f"📈 效率: 平均每檔 {avg_time:.1f} 秒")
         logger.info(f"{'='*60}")
 
+    def _plan_job(
+        self,
+        stock_id: str,
+        user_start_date: Optional[date],
+        user_end_date: date,
+        smart_mode: bool,
+        qlib_last_dates: Optional[Dict[str, Optional[date]]] = None
+    ) -> Optional[SyncJob]:
+        """管線 plan 階段：決定同步範圍（None 表示已是最新）"""
+        if not smart_mode:
+            return SyncJob(stock_id, user_start_date, user_end_date)
+
+        sync_start, sync_end, sync_type = self.determine_sync_range(
+            stock_id, user_end_date, smart_mode=True, qlib_last_dates=qlib_last_dates
+        )
+        if sync_type == 'skip':
+            if self.verbose:
+                logger.info(f"  ⏭️  {stock_id}: 已是最新，跳過")
+            return None
+        return SyncJob(stock_id, sync_start, sync_end, sync_type)
+
+    def _fetch_job(self, job: SyncJob, max_retries: int = 3, retry_delay: float = 2.0):
+        """
+        管線 fetch 階段：解析期貨合約並取得原始 Kbars（連線錯誤指數退避重試）
+
+        Returns:
+            Kbars 物件；沒有資料返回 None
+        """
+        is_futures = self._is_futures(job.stock_id)
+        job.actual_id = job.stock_id
+        if is_futures:
+            contract_id = self.shioaji_client.get_futures_contract_id(job.stock_id)
+            if not contract_id:
+                raise ValueError(f"無法取得 {job.stock_id} 的合約代碼")
+            job.actual_id = contract_id
+
+        start_datetime, end_datetime = self._kbar_window(job.start_date, job.end_date, is_futures)
+        for attempt in range(max_retries):
+            try:
+                return self.shioaji_client.fetch_kbars(
+                    stock_id=job.stock_id,
+                    start_datetime=start_datetime,
+                    end_datetime=end_datetime,
+                    contract_type=self._get_contract_type(job.stock_id)
+                )
+            except (TimeoutError, ConnectionError) as e:
+                if attempt == max_retries - 1:
+                    raise
+                wait_time = retry_delay * (2 ** attempt)  # 指數退避
+                logger.warning(f"  ⚠️  {job.stock_id}: {type(e).__name__} - 等待 {wait_time:.1f}s 後重試...")
+                time.sleep(wait_time)
+
+    def _decode_job(self, job: SyncJob, kbars) -> Optional[pd.DataFrame]:
+        """管線 decode 階段：Kbars → DataFrame，過濾股票交易時段並準備 Qlib 交易分鐘索引"""
+        df = kbars_to_dataframe(kbars)
+        if df is None:
+            return None
+
+        is_futures = self._is_futures(job.stock_id)
+        if not is_futures:
+            df = filter_trading_hours(df, datetime_column='datetime', include_night=False)
+
+        job.context['trading_minutes'] = self.generate_trading_minutes(
+            job.start_date, job.end_date, is_futures=is_futures
+        )
+        return df.reset_index(drop=True)
+
+    def sync_all_pipelined(
+        self,
+        stock_ids: List[str],
+        user_start_date: Optional[date],
+        user_end_date: date,
+        smart_mode: bool = False,
+        workers: int = 4,
+        checkpoint_path: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ) -> Optional[PipelineResult]:
+        """
+        以分階段管線同步所有標的
+
+        抓取（workers 個執行緒，受 Shioaji 速率限制）、解碼、PostgreSQL 寫入、Qlib 寫入
+        同時進行，以有界佇列串接。指定 checkpoint_path 時可中斷續傳：
+        已完成的標的記錄在進度檔中，重跑時略過；全部成功後刪除進度檔。
+
+        Args:
+            stock_ids: 標的代碼列表
+            user_start_date: 用戶指定的開始日期（智慧模式下可為 None）
+            user_end_date: 用戶指定的結束日期
+            smart_mode: 是否使用智慧增量同步
+            workers: 抓取執行緒數
+            checkpoint_path: 進度檔路徑（None 表示不續傳）
+            rate_limiter: 速率限制器（預設為行程共用的 Shioaji 行情額度，與選擇權 snapshots 共享）
+
+        Returns:
+            PipelineResult；Shioaji 客戶端無法初始化時返回 None
+        """
+        # 客戶端在啟動執行緒前初始化，避免多個執行緒同時登入
+        if not self._ensure_client():
+            return None
+
+        rate_limiter = rate_limiter or get_shioaji_rate_limiter()
+        checkpoint = None
+        if checkpoint_path:
+            key = f"{'smart' if smart_mode else user_start_date}:{user_end_date}"
+            checkpoint = SyncCheckpoint(checkpoint_path, key)
+
+        logger.info(f"\n{'='*60}")
+        logger.info(f"🚀 開始管線同步: {len(stock_ids)} 檔標的（抓取執行緒 {workers}，"
+                    f"限速 {rate_limiter.max_calls} 次/{rate_limiter.period:g}s）")
+        if smart_mode:
+            logger.info(f"🧠 智慧模式: 目標日期 {user_end_date}")
+        else:
+            logger.info(f"📅 日期範圍: {user_start_date} ~ {user_end_date}")
+        if checkpoint:
+            logger.info(f"📌 進度檔: {checkpoint_path}")
+        logger.info(f"{'='*60}\n")
+
+        # plan 在抓取執行緒中執行，同時 Qlib 寫入執行緒正在改寫 bin 檔：
+        # 最後日期在啟動執行緒前一次解析完畢
+        qlib_last_dates = None
+        if smart_mode:
+            qlib_last_dates = {stock_id: self.get_qlib_last_date(stock_id) for stock_id in stock_ids}
+
+        pipeline = MinuteSyncPipeline(
+            plan=lambda stock_id: self._plan_job(
+                stock_id, user_start_date, user_end_date, smart_mode, qlib_last_dates
+            ),
+            fetch=self._fetch_job,
+            decode=self._decode_job,
+            write_db=None if self.skip_db else (lambda job, df: self.save_to_postgresql(job.actual_id, df)),
+            write_qlib=lambda job, df: self.save_to_qlib(
+                job.actual_id, df, job.context['trading_minutes'], is_futures=self._is_futures(job.stock_id)
+            ),
+            fetch_workers=workers,
+            rate_limiter=rate_limiter,
+            checkpoint=checkpoint
+        )
+        result = pipeline.run(stock_ids)
+        self._update_qlib_instruments()
+        result.log_summary()
+
+        for stock_id, errors in result.failures.items():
+            logger.warning(f"  ❌ {stock_id}: {'; '.join(errors)}")
+        if checkpoint and result.failed == 0:
+            checkpoint.clear()
+
+        return result
+
     def close(self):
         """關閉資源"""
         logger.info("🔧 正在釋放資源...")
@@ -977,6 +1102,9 @@ def main():
 
   # 測試模式（僅同步 5 檔股票）
   python sync_shioaji_to_qlib.py --smart --test
+
+  # 全市場管線同步（4 個抓取執行緒，可中斷續傳）
+  python sync_shioaji_to_qlib.py --smart --workers 4 --checkpoint /data/qlib/tw_stock_minute/.sync_checkpoint
         """
     )
 
@@ -997,8 +1125,16 @@ def main():
 
     # 存儲選項
     parser.add_argument('--qlib-only', action='store_true', help='僅更新 Qlib，跳過 PostgreSQL')
-    parser.add_argument('--qlib-data-dir', type=str, default='/data/qlib/tw_stock_minute',
-                        help='Qlib 數據目錄（預設: /data/qlib/tw_stock_minute）')
+    parser.add_argument('--qlib-data-dir', type=str, default=qlib_config.minute_data_path,
+                        help=f'Qlib 數據目錄（預設: {qlib_config.minute_data_path}）')
+    parser.add_argument('--futures-qlib-data-dir', type=str, default=qlib_config.futures_minute_data_path,
+                        help=f'期貨 Qlib 數據目錄（預設: {qlib_config.futures_minute_data_path}）')
+
+    # 並發選項
+    parser.add_argument('--workers', type=int, default=1,
+                        help='抓取執行緒數（> 1 時使用分階段管線，抓取與寫入同時進行）')
+    parser.add_argument('--checkpoint', type=str,
+                        help='續傳進度檔路徑（中斷後重跑會略過已完成的標的）')
 
     # 日誌選項
     parser.add_argument('--verbose', '-v', action='store_true',
@@ -1031,7 +1167,7 @@ def main():
         logger.info(f"   開始: {start_date}")
         logger.info(f"   結束: {end_date}")
 
-    logger.info(f"📁 Qlib 目錄: {args.qlib_data_dir}")
+    logger.info(f"📁 Qlib 目錄: {args.qlib_data_dir}（期貨: {args.futures_qlib_data_dir}）")
     logger.info(f"💾 資料庫: {'跳過' if args.qlib_only else '啟用'}")
     logger.info("")
 
@@ -1039,6 +1175,7 @@ def main():
     try:
         syncer = ShioajiToQlibSyncer(
             qlib_data_dir=args.qlib_data_dir,
+            futures_qlib_data_dir=args.futures_qlib_data_dir,
             skip_db=args.qlib_only,
             verbose=args.verbose
         )
@@ -1085,7 +1222,10 @@ def main():
 
     exit_code = 0
     try:
-        syncer.sync_all(stock_ids, start_date, end_date, smart_mode=smart_mode)
+        syncer.sync_all(
+            stock_ids, start_date, end_date, smart_mode=smart_mode,
+            workers=args.workers, checkpoint_path=args.checkpoint
+        )
     except KeyboardInterrupt:
         logger.warning("\n⚠️  用戶中斷執行 (Ctrl+C)")
         exit_code = 130
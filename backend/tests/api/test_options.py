@@ -5,14 +5,16 @@ Unit tests for Option API endpoints
 """
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from datetime import date, datetime
 from decimal import Decimal
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.main import app
 from app.models.user import User
 from app.api.dependencies import get_current_user, get_db
+from app.db.session import get_async_db
 
 
 # 測試用的假用戶
@@ -35,12 +37,19 @@ def get_test_db():
     return db
 
 
+# 測試用的假非同步資料庫 session
+def get_test_async_db():
+    """返回測試用 AsyncSession"""
+    return AsyncMock(spec=AsyncSession)
+
+
 @pytest.fixture
 def client():
     """測試客戶端（使用 dependency override）"""
     # Override dependencies
     app.dependency_overrides[get_current_user] = get_test_user
     app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_async_db] = get_test_async_db
 
     test_client = TestClient(app)
 
@@ -196,8 +205,10 @@ class TestGetExpiryDates:
 class TestGetOptionChain:
     """測試 GET /api/v1/options/chain/{underlying_id}"""
 
-    @patch('app.api.v1.options.OptionContractRepository')
-    def test_get_option_chain_success(self, MockRepo, client):
+    @patch('app.services.option_service.OptionMinutePriceRepository')
+    @patch('app.services.option_service.StockMinutePriceRepository')
+    @patch('app.services.option_service.OptionContractRepository')
+    def test_get_option_chain_success(self, MockRepo, MockSpotRepo, MockPriceRepo, client):
         """測試成功獲取 option chain"""
         # 模擬 CALL 合約
         call_contract = Mock()
@@ -211,9 +222,14 @@ class TestGetOptionChain:
         put_contract.option_type = 'PUT'
         put_contract.strike_price = Decimal('23000')
 
-        MockRepo.get_by_underlying_and_expiry.return_value = [
-            call_contract, put_contract
-        ]
+        MockRepo.get_by_underlying_and_expiry_async = AsyncMock(
+            return_value=[call_contract, put_contract]
+        )
+        MockSpotRepo.get_latest_async = AsyncMock(return_value=Mock(close=Decimal('23050')))
+        MockPriceRepo.get_latest_prices_for_contracts_async = AsyncMock(return_value={
+            'TXO202512C23000': None,
+            'TXO202512P23000': None,
+        })
 
         response = client.get(
             "/api/v1/options/chain/TX",
@@ -223,13 +239,14 @@ class TestGetOptionChain:
         assert response.status_code == 200
         data = response.json()
         assert data['underlying_id'] == 'TX'
+        assert data['spot_price'] == 23050.0
         assert len(data['calls']) == 1
         assert len(data['puts']) == 1
 
-    @patch('app.api.v1.options.OptionContractRepository')
+    @patch('app.services.option_service.OptionContractRepository')
     def test_get_option_chain_not_found(self, MockRepo, client):
         """測試無合約的情況"""
-        MockRepo.get_by_underlying_and_expiry.return_value = []
+        MockRepo.get_by_underlying_and_expiry_async = AsyncMock(return_value=[])
 
         response = client.get(
             "/api/v1/options/chain/TX",
@@ -267,7 +284,7 @@ class TestGetDailyFactors:
         mock_factor.gamma_exposure = None
         mock_factor.vanna_exposure = None
 
-        MockRepo.get_by_underlying.return_value = [mock_factor]
+        MockRepo.get_by_underlying_async = AsyncMock(return_value=[mock_factor])
 
         response = client.get("/api/v1/options/factors/TX")
 
@@ -279,7 +296,7 @@ class TestGetDailyFactors:
     @patch('app.api.v1.options.OptionDailyFactorRepository')
     def test_get_daily_factors_with_date_range(self, MockRepo, client):
         """測試帶日期範圍的查詢"""
-        MockRepo.get_by_underlying.return_value = []
+        MockRepo.get_by_underlying_async = AsyncMock(return_value=[])
 
         response = client.get(
             "/api/v1/options/factors/TX",
@@ -312,7 +329,7 @@ class TestGetLatestFactor:
                      'avg_call_delta', 'avg_put_delta', 'gamma_exposure', 'vanna_exposure']:
             setattr(mock_factor, field, None)
 
-        MockRepo.get_latest.return_value = mock_factor
+        MockRepo.get_latest_async = AsyncMock(return_value=mock_factor)
 
         response = client.get("/api/v1/options/factors/TX/latest")
 
@@ -323,7 +340,7 @@ class TestGetLatestFactor:
     @patch('app.api.v1.options.OptionDailyFactorRepository')
     def test_get_latest_factor_not_found(self, MockRepo, client):
         """測試無數據的情況"""
-        MockRepo.get_latest.return_value = None
+        MockRepo.get_latest_async = AsyncMock(return_value=None)
 
         response = client.get("/api/v1/options/factors/TX/latest")
 
@@ -0,0 +1,124 @@
+"""
+Unit tests for set-based industry fundamental aggregation
+"""
+import pytest
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy.orm import Session
+
+from app.models.fundamental_data import FundamentalData
+from app.models.industry import Industry
+from app.models.industry_metrics_cache import IndustryMetricsCache
+from app.models.stock import Stock
+from app.models.stock_industry import StockIndustry
+from app.repositories.industry import IndustryRepository
+from app.services.industry_service import IndustryService
+
+
+@pytest.fixture
+def industry_data(db_session: Session):
+    """兩個產業：M1 兩檔主要股票 + 一檔次要股票，M2 一檔無資料股票"""
+    db_session.add_all([
+        Industry(code='M1', name_zh='半導體', level=1),
+        Industry(code='M2', name_zh='金融', level=1),
+    ])
+    db_session.add_all([
+        Stock(stock_id=stock_id, name=stock_id) for stock_id in ('2330', '2303', '2317', '2882')
+    ])
+    db_session.add_all([
+        StockIndustry(stock_id='2330', industry_code='M1', is_primary=True),
+        StockIndustry(stock_id='2303', industry_code='M1', is_primary=True),
+        StockIndustry(stock_id='2317', industry_code='M1', is_primary=False),
+        StockIndustry(stock_id='2882', industry_code='M2', is_primary=True),
+    ])
+    values = [
+        ('2330', 'ROE稅後', '2025-Q3', 30.0),
+        ('2303', 'ROE稅後', '2025-Q3', 10.0),
+        ('2317', 'ROE稅後', '2025-Q3', 100.0),  # 非主要產業，不納入
+        ('2330', 'ROE稅後', '2025-Q2', 16.0),
+        ('2303', 'ROE稅後', '2025-Q2', None),
+        ('2330', '營業毛利率', '2025-Q3', 50.0),
+        ('2330', 'ROE稅後', '2024-Q3', 12.0),
+    ]
+    db_session.add_all([
+        FundamentalData(stock_id=stock_id, indicator=indicator, date=quarter, value=value)
+        for stock_id, indicator, quarter, value in values
+    ])
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def no_redis():
+    with patch('app.services.industry_service.cache') as mock_cache:
+        mock_cache.get.return_value = None
+        yield mock_cache
+
+
+class TestAggregateFundamentals:
+    """測試分組彙總查詢"""
+
+    def test_groups_primary_stocks_only(self, industry_data):
+        rows = IndustryRepository().aggregate_fundamentals(
+            industry_data, ['ROE稅後'], ['2025-Q3', '2025-Q2']
+        )
+
+        assert sorted(rows) == [
+            ('M1', 'ROE稅後', '2025-Q2', 16.0, 1),
+            ('M1', 'ROE稅後', '2025-Q3', 20.0, 2),
+        ]
+
+    def test_filters_industries(self, industry_data):
+        repo = IndustryRepository()
+
+        assert repo.aggregate_fundamentals(industry_data, ['ROE稅後'], ['2025-Q3'], ['M2']) == []
+        assert repo.aggregate_fundamentals(industry_data, ['ROE稅後'], ['2025-Q3'], []) == []
+
+
+class TestIndustryMetrics:
+    """測試產業指標計算與預先計算"""
+
+    def test_calculate_metrics(self, industry_data, no_redis):
+        result = IndustryService(industry_data).calculate_industry_fundamental_metrics('M1')
+
+        assert result['date'] == '2025-Q3'
+        assert result['stocks_count'] == 2
+        assert result['stocks_with_data_count'] == 2
+        assert result['has_data'] is True
+
+        roe = result['metrics']['ROE稅後']
+        assert roe['average'] == 20.0
+        assert roe['sample_size'] == 2
+        assert roe['previous_value'] == 16.0
+        assert roe['change_percent'] == 25.0
+        assert roe['trend_data'] == [20.0, 16.0, None, None, 12.0, None, None, None, None, None]
+        assert result['metrics']['營業毛利率']['previous_value'] is None
+        assert '每股稅後淨利' not in result['metrics']
+        no_redis.set.assert_called_once()
+
+    def test_precompute_fills_cache_table(self, industry_data, no_redis):
+        result = IndustryService(industry_data).precompute_industry_metrics()
+
+        assert result == {'date': '2025-Q3', 'industries': 2, 'cache_rows': 4}
+        cached_keys = {call.args[0] for call in no_redis.set.call_args_list}
+        assert cached_keys == {'industry_metrics:M1:2025-Q3', 'industry_metrics:M2:2025-Q3'}
+
+        row = industry_data.query(IndustryMetricsCache).filter_by(
+            industry_code='M1', metric_name='avg_ROE稅後', date=date(2025, 9, 30)
+        ).one()
+        assert float(row.value) == pytest.approx(20.0)
+        assert row.stocks_count == 2
+
+        # 重複執行只更新既有資料列
+        IndustryService(industry_data).precompute_industry_metrics()
+        assert industry_data.query(IndustryMetricsCache).count() == 4
+
+    def test_compare_industries(self, industry_data):
+        result = IndustryService(industry_data).compare_industries(['M2', 'M1', 'XX'], 'ROE稅後')
+
+        assert [row['industry_code'] for row in result['industries']] == ['M2', 'M1']
+        assert result['industries'][0] == {
+            'industry_code': 'M2', 'industry_name': '金融', 'value': None, 'sample_size': 0
+        }
+        assert result['industries'][1]['value'] == 20.0
@@ -0,0 +1,122 @@
+"""
+Unit tests for the materialized industry tree
+"""
+import pytest
+from unittest.mock import patch
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.industry import Industry
+from app.models.stock import Stock
+from app.models.stock_industry import StockIndustry
+from app.repositories.industry import IndustryRepository
+from app.services.industry_service import IndustryService
+
+
+@pytest.fixture
+def industries(db_session: Session):
+    """M01 → (M0101, M0102)，M02 無子產業"""
+    db_session.add_all([
+        Industry(code='M01', name_zh='電子', level=1),
+        Industry(code='M0102', name_zh='電腦', level=2, parent_code='M01'),
+        Industry(code='M0101', name_zh='半導體', level=2, parent_code='M01'),
+        Industry(code='M02', name_zh='金融', level=1),
+    ])
+    db_session.add_all([Stock(stock_id=sid, name=sid) for sid in ('2330', '2303', '2882')])
+    db_session.add_all([
+        StockIndustry(stock_id='2330', industry_code='M0101', is_primary=True),
+        StockIndustry(stock_id='2303', industry_code='M0101', is_primary=True),
+        StockIndustry(stock_id='2330', industry_code='M01', is_primary=False),
+    ])
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def cache_store():
+    """以字典模擬 cache.get_or_set"""
+    store = {}
+
+    def get_or_set(key, compute, **kwargs):
+        if key not in store:
+            store[key] = compute()
+        return store[key]
+
+    with patch('app.services.industry_service.cache') as mock_cache:
+        mock_cache.get_or_set.side_effect = get_or_set
+        yield store
+
+
+def _record_queries(db_session: Session):
+    statements = []
+
+    @event.listens_for(db_session.get_bind(), "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return statements
+
+
+class TestIndustryTree:
+    """測試產業樹建構與版本化快取"""
+
+    def test_builds_tree_with_counts(self, industries, cache_store):
+        tree = IndustryService(industries).get_industry_tree()
+
+        assert [node['code'] for node in tree] == ['M01', 'M02']
+        electronics = tree[0]
+        assert electronics['stock_count'] == 1
+        assert [child['code'] for child in electronics['children']] == ['M0101', 'M0102']
+        assert electronics['children'][0]['stock_count'] == 2
+        assert electronics['children'][1] == {
+            'code': 'M0102', 'name_zh': '電腦', 'name_en': None, 'level': 2,
+            'parent_code': 'M01', 'stock_count': 0, 'children': [],
+        }
+
+    def test_query_count_is_constant(self, industries, cache_store):
+        statements = _record_queries(industries)
+
+        IndustryService(industries)._build_industry_tree()
+
+        assert len(statements) == 2
+
+    def test_cached_until_mappings_change(self, industries, cache_store):
+        service = IndustryService(industries)
+        service.get_industry_tree()
+        service.get_industry_tree()
+        assert len(cache_store) == 1
+
+        industries.add(StockIndustry(stock_id='2882', industry_code='M02', is_primary=True))
+        industries.commit()
+
+        tree = service.get_industry_tree()
+        assert len(cache_store) == 2
+        assert tree[1]['stock_count'] == 1
+
+    def test_version_changes_on_delete(self, industries):
+        repo = IndustryRepository()
+        before = repo.get_industry_tree_version(industries)
+
+        assert repo.get_industry_tree_version(industries) == before
+        repo.delete_stock_industry_mapping(industries, '2303', 'M0101')
+
+        assert repo.get_industry_tree_version(industries) != before
+
+
+class TestStockNames:
+    """測試股票名稱對照表"""
+
+    def test_names_from_lookup(self, industries, cache_store):
+        with patch.object(
+            IndustryService, '_load_stock_names', return_value={'2330': '台積電'}
+        ) as load:
+            service = IndustryService(industries)
+            stocks = service.get_stocks_by_industry('M0101')
+            service.get_stocks_by_industry('M01')
+
+        assert sorted(stocks, key=lambda s: s['stock_id']) == [
+            {'stock_id': '2303', 'stock_name': '2303'},
+            {'stock_id': '2330', 'stock_name': '台積電'},
+        ]
+        load.assert_called_once()
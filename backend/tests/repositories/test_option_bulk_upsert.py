@@ -0,0 +1,110 @@
+"""
+Unit tests for the option repositories' bulk upsert path
+"""
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy.orm import Session
+
+from app.models.option import OptionContract, OptionGreeks, OptionMinutePrice, OptionDailyFactor
+from app.models.stock import Stock
+from app.repositories.option import (
+    OptionDailyFactorRepository,
+    OptionGreeksRepository,
+    OptionMinutePriceRepository,
+)
+from app.schemas.option import OptionDailyFactorCreate, OptionGreeksCreate, OptionMinutePriceCreate
+
+
+CALC_TIME = datetime(2025, 1, 2)
+CONTRACTS = [f"TXO2025{i:02d}C" for i in range(5)]
+
+
+@pytest.fixture
+def contracts(db_session: Session):
+    db_session.add(Stock(stock_id="TX", name="台指期"))
+    for i, contract_id in enumerate(CONTRACTS):
+        db_session.add(OptionContract(
+            contract_id=contract_id,
+            underlying_id="TX",
+            underlying_type="FUTURES",
+            option_type="CALL",
+            strike_price=Decimal(20000 + 100 * i),
+            expiry_date=date(2025, 1, 15),
+        ))
+    db_session.commit()
+    return CONTRACTS
+
+
+def _greeks(contract_id, delta, vega=None):
+    return OptionGreeksCreate(
+        contract_id=contract_id,
+        datetime=CALC_TIME,
+        delta=Decimal(str(delta)),
+        vega=Decimal(str(vega)) if vega is not None else None,
+    )
+
+
+class TestOptionGreeksBulkUpsert:
+    """測試 Greeks 批次 upsert"""
+
+    def test_insert_then_update_counts(self, db_session: Session, contracts):
+        first = OptionGreeksRepository.bulk_upsert(db_session, [_greeks(c, 0.5, 10) for c in contracts[:3]])
+        second = OptionGreeksRepository.bulk_upsert(db_session, [_greeks(c, 0.6) for c in contracts])
+
+        assert first == {"inserted": 3, "updated": 0}
+        assert second == {"inserted": 2, "updated": 3}
+        rows = {g.contract_id: g for g in db_session.query(OptionGreeks).all()}
+        assert len(rows) == 5
+        assert float(rows[contracts[0]].delta) == pytest.approx(0.6)
+
+    def test_update_only_touches_set_fields(self, db_session: Session, contracts):
+        OptionGreeksRepository.bulk_upsert(db_session, [_greeks(contracts[0], 0.5, 10)])
+        OptionGreeksRepository.bulk_upsert(db_session, [
+            OptionGreeksCreate(contract_id=contracts[0], datetime=CALC_TIME, delta=Decimal("0.4"))
+        ])
+
+        row = db_session.query(OptionGreeks).one()
+        assert float(row.delta) == pytest.approx(0.4)
+        assert float(row.vega) == pytest.approx(10)
+
+    def test_duplicate_keys_last_wins(self, db_session: Session, contracts):
+        counts = OptionGreeksRepository.bulk_upsert(
+            db_session, [_greeks(contracts[0], 0.1), _greeks(contracts[0], 0.2)]
+        )
+
+        assert counts == {"inserted": 1, "updated": 0}
+        assert float(db_session.query(OptionGreeks).one().delta) == pytest.approx(0.2)
+
+    def test_empty_list(self, db_session: Session):
+        assert OptionGreeksRepository.bulk_upsert(db_session, []) == {"inserted": 0, "updated": 0}
+
+
+class TestOptionDailyAndMinuteBulkUpsert:
+    """測試每日因子與分鐘線批次 upsert"""
+
+    def test_daily_factors(self, db_session: Session, contracts):
+        factors = [
+            OptionDailyFactorCreate(underlying_id="TX", date=date(2025, 1, d), pcr_volume=Decimal("1.1"))
+            for d in (2, 3)
+        ]
+        assert OptionDailyFactorRepository.bulk_upsert(db_session, factors) == {"inserted": 2, "updated": 0}
+
+        factors[0] = OptionDailyFactorCreate(underlying_id="TX", date=date(2025, 1, 2), pcr_volume=Decimal("0.9"))
+        assert OptionDailyFactorRepository.bulk_upsert(db_session, factors[:1]) == {"inserted": 0, "updated": 1}
+        stored = OptionDailyFactorRepository.get_by_key(db_session, "TX", date(2025, 1, 2))
+        assert float(stored.pcr_volume) == pytest.approx(0.9)
+        assert db_session.query(OptionDailyFactor).count() == 2
+
+    def test_minute_prices(self, db_session: Session, contracts):
+        bars = [
+            OptionMinutePriceCreate(
+                contract_id=contracts[0], datetime=datetime(2025, 1, 2, 9, minute),
+                open=Decimal("100"), high=Decimal("101"), low=Decimal("99"), close=Decimal("100.5"), volume=10,
+            )
+            for minute in range(30)
+        ]
+
+        assert OptionMinutePriceRepository.bulk_upsert(db_session, bars) == {"inserted": 30, "updated": 0}
+        assert OptionMinutePriceRepository.bulk_upsert(db_session, bars[:5]) == {"inserted": 0, "updated": 5}
+        assert db_session.query(OptionMinutePrice).count() == 30
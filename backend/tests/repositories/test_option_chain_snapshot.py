@@ -0,0 +1,146 @@
+"""
+Unit tests for the option chain snapshot store
+"""
+import pytest
+from datetime import date
+from unittest.mock import Mock, patch
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.repositories.option import OptionChainSnapshotRepository
+from app.services.option_chain_store import (
+    SOURCE_KBARS,
+    StoredOptionDataSource,
+    load_option_chain,
+    save_option_chain,
+)
+
+
+TODAY = date(2025, 1, 2)
+
+
+def _chain(closes=(150.5, 120.3)):
+    return pd.DataFrame({
+        'contract_id': ['TXO202501C23000', 'TXO202501P23000'],
+        'underlying_id': ['TX', 'TX'],
+        'underlying_type': ['FUTURES', 'FUTURES'],
+        'option_type': ['CALL', 'PUT'],
+        'strike_price': [23000.0, 23000.0],
+        'expiry_date': ['2025-01-15', '2025-01-15'],  # 與 ShioajiOptionDataSource 相同格式
+        'close': list(closes),
+        'volume': [1000, 800],
+        'open_interest': [5000, None],
+    })
+
+
+@pytest.fixture
+def today():
+    with patch('app.services.option_chain_store.today_taiwan', return_value=TODAY):
+        yield TODAY
+
+
+class TestSaveAndLoad:
+    """測試選擇權鏈保存與讀取"""
+
+    def test_round_trip(self, db_session: Session):
+        assert save_option_chain(db_session, 'TX', TODAY, _chain()) == 2
+
+        chain = load_option_chain(db_session, 'TX', TODAY)
+
+        assert list(chain['contract_id']) == ['TXO202501C23000', 'TXO202501P23000']
+        assert chain['close'].tolist() == pytest.approx([150.5, 120.3])
+        assert chain['strike_price'].dtype == float
+        assert chain.loc[0, 'expiry_date'] == date(2025, 1, 15)
+        assert pd.isna(chain.loc[1, 'open_interest'])
+        assert OptionChainSnapshotRepository.get_dates(db_session, 'TX') == [TODAY]
+
+    def test_save_overwrites_same_day(self, db_session: Session):
+        save_option_chain(db_session, 'TX', TODAY, _chain())
+        save_option_chain(db_session, 'TX', TODAY, _chain(closes=(151.0, 119.0)), source=SOURCE_KBARS)
+
+        rows = OptionChainSnapshotRepository.get_chain(db_session, 'TX', TODAY)
+
+        assert len(rows) == 2
+        assert float(rows[0].close) == pytest.approx(151.0)
+        assert rows[0].source == SOURCE_KBARS
+
+    def test_missing_chain_is_empty(self, db_session: Session):
+        assert load_option_chain(db_session, 'TX', TODAY).empty
+
+
+class TestStoredOptionDataSource:
+    """測試 fetch-if-missing 策略"""
+
+    def test_fetches_once_then_reads_store(self, db_session: Session, today):
+        fetcher = Mock()
+        fetcher.get_option_chain.return_value = _chain()
+        data_source = StoredOptionDataSource(db_session, fetcher)
+
+        first = data_source.get_option_chain('TX', today)
+        second = data_source.get_option_chain('TX', today)
+
+        assert fetcher.get_option_chain.call_count == 1
+        assert len(first) == len(second) == 2
+
+    def test_past_dates_not_fetched_from_live_source(self, db_session: Session, today):
+        fetcher = Mock()
+        data_source = StoredOptionDataSource(db_session, fetcher)
+
+        result = data_source.get_option_chain('TX', date(2024, 12, 31))
+
+        assert result.empty
+        fetcher.get_option_chain.assert_not_called()
+
+    def test_store_only_without_fetcher(self, db_session: Session, today):
+        save_option_chain(db_session, 'TX', date(2024, 12, 31), _chain())
+        data_source = StoredOptionDataSource(db_session)
+
+        assert len(data_source.get_option_chain('TX', date(2024, 12, 31))) == 2
+        assert data_source.get_option_chain('TX', today).empty
+        assert data_source.is_available()
+
+    def test_empty_fetch_is_not_stored(self, db_session: Session, today):
+        fetcher = Mock()
+        fetcher.get_option_chain.return_value = pd.DataFrame()
+        data_source = StoredOptionDataSource(db_session, fetcher)
+
+        data_source.get_option_chain('TX', today)
+        data_source.get_option_chain('TX', today)
+
+        assert fetcher.get_option_chain.call_count == 2
+        assert OptionChainSnapshotRepository.get_dates(db_session, 'TX') == []
+
+    def test_incomplete_fetch_is_not_stored(self, db_session: Session, today):
+        partial = _chain()
+        partial.attrs['failed_count'] = 3
+        fetcher = Mock()
+        fetcher.get_option_chain.return_value = partial
+        data_source = StoredOptionDataSource(db_session, fetcher)
+
+        assert len(data_source.get_option_chain('TX', today)) == 2
+        assert OptionChainSnapshotRepository.get_dates(db_session, 'TX') == []
+
+    def test_refresh_overwrites_stored_chain(self, db_session: Session, today):
+        save_option_chain(db_session, 'TX', today, _chain())
+        fetcher = Mock()
+        fetcher.get_option_chain.return_value = _chain(closes=(151.0, 119.0))
+        data_source = StoredOptionDataSource(db_session, fetcher, refresh=True)
+
+        result = data_source.get_option_chain('TX', today)
+
+        assert result['close'].tolist() == pytest.approx([151.0, 119.0])
+        assert load_option_chain(db_session, 'TX', today)['close'].tolist() == pytest.approx([151.0, 119.0])
+
+    def test_refresh_keeps_stored_chain_when_incomplete(self, db_session: Session, today):
+        save_option_chain(db_session, 'TX', today, _chain())
+        partial = _chain(closes=(151.0, 119.0)).iloc[:1]
+        partial.attrs['failed_count'] = 1
+        fetcher = Mock()
+        fetcher.get_option_chain.return_value = partial
+        data_source = StoredOptionDataSource(db_session, fetcher, refresh=True)
+
+        result = data_source.get_option_chain('TX', today)
+
+        assert result['close'].tolist() == pytest.approx([150.5, 120.3])
+        assert load_option_chain(db_session, 'TX', today)['close'].tolist() == pytest.approx([150.5, 120.3])
@@ -0,0 +1,170 @@
+"""
+Unit tests for StockPriceRepository / StockMinutePriceRepository column loaders and bulk ingest
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.repositories.stock_price import StockPriceRepository
+from app.repositories.stock_minute_price import StockMinutePriceRepository
+from app.models.stock import Stock
+from app.models.stock_price import StockPrice
+from app.models.stock_minute_price import StockMinutePrice
+from app.utils.price_validator import PriceValidator
+
+
+@pytest.fixture
+def test_stock(db_session: Session):
+    """Create a test stock"""
+    stock = Stock(stock_id="2330", name="台積電")
+    db_session.add(stock)
+    db_session.commit()
+    return stock
+
+
+@pytest.fixture
+def daily_prices(db_session: Session, test_stock: Stock):
+    """Create 5 daily bars (inserted newest first)"""
+    base = date(2024, 1, 1)
+    for i in reversed(range(5)):
+        db_session.add(StockPrice(
+            stock_id="2330",
+            date=base + timedelta(days=i),
+            open=Decimal("100.50") + i,
+            high=Decimal("101.25") + i,
+            low=Decimal("99.75") + i,
+            close=Decimal("100.00") + i,
+            volume=1000 + i,
+        ))
+    db_session.commit()
+
+
+@pytest.fixture
+def minute_prices(db_session: Session, test_stock: Stock):
+    """Create 10 one-minute bars"""
+    base = datetime(2024, 1, 2, 9, 0)
+    for i in range(10):
+        db_session.add(StockMinutePrice(
+            stock_id="2330",
+            datetime=base + timedelta(minutes=i),
+            timeframe="1min",
+            open=Decimal("500.00") + i,
+            high=Decimal("501.00") + i,
+            low=Decimal("499.00") + i,
+            close=Decimal("500.50") + i,
+            volume=10 * i,
+        ))
+    db_session.commit()
+
+
+class TestStockPriceColumns:
+    """Test StockPriceRepository.get_ohlcv_columns"""
+
+    def test_columns_match_orm_rows(self, db_session: Session, daily_prices):
+        """Column arrays should match the ORM path value by value"""
+        columns = StockPriceRepository.get_ohlcv_columns(db_session, "2330")
+        prices = StockPriceRepository.get_by_stock(db_session, "2330", limit=100, ascending=True)
+
+        assert len(columns['date']) == len(prices) == 5
+        assert columns['date'].dtype == np.dtype('datetime64[ns]')
+        assert columns['close'].dtype == np.float64
+        np.testing.assert_array_equal(columns['close'], [float(p.close) for p in prices])
+        np.testing.assert_array_equal(columns['volume'], [p.volume for p in prices])
+        assert np.all(np.diff(columns['date']) > np.timedelta64(0))
+
+    def test_date_filter(self, db_session: Session, daily_prices):
+        """Start/end dates are inclusive"""
+        columns = StockPriceRepository.get_ohlcv_columns(
+            db_session, "2330", start_date=date(2024, 1, 2), end_date=date(2024, 1, 4)
+        )
+
+        assert len(columns['date']) == 3
+        assert columns['open'][0] == pytest.approx(101.50)
+
+    def test_empty_result(self, db_session: Session, test_stock: Stock):
+        """No rows returns empty arrays for every column"""
+        columns = StockPriceRepository.get_ohlcv_columns(db_session, "2330")
+
+        assert set(columns) == {'date', 'open', 'high', 'low', 'close', 'volume'}
+        assert all(len(values) == 0 for values in columns.values())
+
+
+class TestStockMinutePriceColumns:
+    """Test StockMinutePriceRepository.get_ohlcv_columns"""
+
+    def test_range_query_respects_limit(self, db_session: Session, minute_prices):
+        """Range query returns the earliest N bars in ascending order"""
+        columns = StockMinutePriceRepository.get_ohlcv_columns(
+            db_session,
+            "2330",
+            datetime(2024, 1, 2, 9, 0),
+            datetime(2024, 1, 2, 13, 30),
+            limit=4
+        )
+
+        assert len(columns['datetime']) == 4
+        assert columns['close'][0] == pytest.approx(500.50)
+        assert np.all(np.diff(columns['datetime']) > np.timedelta64(0))
+
+    def test_latest_when_no_range(self, db_session: Session, minute_prices):
+        """Without a range the latest N bars are returned, still ascending"""
+        columns = StockMinutePriceRepository.get_ohlcv_columns(db_session, "2330", limit=3)
+
+        assert len(columns['datetime']) == 3
+        np.testing.assert_array_equal(columns['volume'], [70, 80, 90])
+
+
+def _ohlcv_frame(rows):
+    return pd.DataFrame(rows, columns=['stock_id', 'date', 'open', 'high', 'low', 'close', 'volume'])
+
+
+class TestStockPriceBulkIngest:
+    """測試整批 OHLCV 的驗證與 upsert"""
+
+    def test_insert_update_and_reject(self, db_session: Session, daily_prices):
+        frame = _ohlcv_frame([
+            ("2330", date(2024, 1, 1), 110.0, 112.0, 109.0, 111.0, 5000),   # 更新既有
+            ("2330", date(2024, 1, 10), 120.0, 121.0, 119.0, 120.5, 6000),  # 新增
+            ("2330", date(2024, 1, 11), 120.0, 118.0, 119.0, 118.5, 100),   # high < low
+            ("2330", date(2024, 1, 12), 0.0, 0.0, 0.0, 0.0, 0),             # 全零佔位（允許）
+        ])
+
+        result = StockPriceRepository.bulk_ingest(db_session, frame)
+
+        assert (result["inserted"], result["updated"], result["rejected"], result["total"]) == (2, 1, 1, 4)
+        assert result["rejections"][0]["date"] == date(2024, 1, 11)
+        assert "最高價" in result["rejections"][0]["reason"]
+        updated = StockPriceRepository.get_by_stock_and_date(db_session, "2330", date(2024, 1, 1))
+        assert float(updated.close) == pytest.approx(111.0)
+        assert updated.volume == 5000
+        assert db_session.query(StockPrice).count() == 7
+
+    def test_skip_validation_and_empty(self, db_session: Session, test_stock):
+        assert StockPriceRepository.bulk_ingest(db_session, _ohlcv_frame([]))["total"] == 0
+
+        frame = _ohlcv_frame([("2330", "2024-02-01", 100.0, 101.0, 99.0, 100.0, -1)])
+        assert StockPriceRepository.bulk_ingest(db_session, frame)["rejected"] == 1
+        assert StockPriceRepository.bulk_ingest(db_session, frame, skip_validation=True)["inserted"] == 1
+
+
+def test_validate_price_frame_matches_scalar_rules():
+    frame = _ohlcv_frame([
+        ("2330", "2024-01-02", 100.0, 101.0, 99.0, 100.0, 10),
+        ("2330", "2024-01-03", 100.0, 101.0, 99.0, 102.0, 10),
+        ("2330", "2024-01-04", -1.0, 101.0, 99.0, 100.0, 10),
+        ("2330", "2024-01-05", None, 101.0, 99.0, 100.0, 10),
+        ("2330", "2024-01-08", 0.0, 0.0, 0.0, 0.0, 0),
+    ])
+
+    reasons = PriceValidator.validate_price_frame(frame)
+
+    for row, reason in zip(frame.itertuples(index=False), reasons):
+        is_valid, message = PriceValidator.validate_price_data(
+            None if pd.isna(row.open) else row.open, row.high, row.low, row.close, row.volume,
+            stock_id=row.stock_id, date=row.date
+        )
+        assert (reason is None) == is_valid
+        assert reason is None or reason.split(":")[0] == message.split(":")[0]
@@ -144,6 +144,48 @@ class TestStrategySignalRepositoryCheckDuplicate:
         assert is_duplicate is False
 
 
+class TestStrategySignalRepositoryGetRecentSignalKeys:
+    """測試 get_recent_signal_keys 方法（批次去重）"""
+
+    def test_returns_recent_keys(
+        self,
+        db_session: Session,
+        test_signal: StrategySignal,
+        test_strategy: Strategy
+    ):
+        """測試回傳時間範圍內的信號鍵"""
+        time_threshold = datetime.now(timezone.utc) - timedelta(minutes=15)
+
+        keys = StrategySignalRepository.get_recent_signal_keys(
+            db_session,
+            strategy_ids=[test_strategy.id],
+            time_threshold=time_threshold
+        )
+
+        assert keys == {(test_strategy.id, "2330", "BUY")}
+
+    def test_excludes_old_signals_and_other_strategies(
+        self,
+        db_session: Session,
+        test_signal: StrategySignal,
+        test_strategy: Strategy
+    ):
+        """測試排除過期信號與其他策略"""
+        future_threshold = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+        assert StrategySignalRepository.get_recent_signal_keys(
+            db_session, strategy_ids=[test_strategy.id], time_threshold=future_threshold
+        ) == set()
+        assert StrategySignalRepository.get_recent_signal_keys(
+            db_session,
+            strategy_ids=[test_strategy.id + 1],
+            time_threshold=datetime.now(timezone.utc) - timedelta(minutes=15)
+        ) == set()
+        assert StrategySignalRepository.get_recent_signal_keys(
+            db_session, strategy_ids=[], time_threshold=future_threshold
+        ) == set()
+
+
 class TestStrategySignalRepositoryCreate:
     """測試 create 方法"""
 
@@ -0,0 +1,102 @@
+"""
+Unit tests for export_minute_to_qlib script
+
+匯出腳本與 sync_shioaji_to_qlib.py 寫入同一資料目錄時，交易日曆必須一致
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加專案路徑
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.core import trading_calendar
+from app.core.trading_hours import filter_trading_hours
+from app.services.qlib_bin_writer import QlibBinWriter
+from scripts.export_minute_to_qlib import export_stock_to_qlib, is_futures_id
+from scripts.sync_shioaji_to_qlib import ShioajiToQlibSyncer
+
+
+def _bars(start_date: date, end_date: date) -> pd.DataFrame:
+    """交易分鐘的 K 棒（價格由時點決定，兩條路徑寫入的值可直接比對）"""
+    minutes = trading_calendar.qlib_minute_calendar(start_date, end_date)
+    price = 500 + (minutes.asi8 // 60_000_000_000 % 1000) / 10
+    return pd.DataFrame({
+        'datetime': minutes,
+        'open': price,
+        'high': price + 1,
+        'low': price - 1,
+        'close': price,
+        'volume': 1000.0,
+    })
+
+
+def _syncer(qlib_dir: Path) -> ShioajiToQlibSyncer:
+    return ShioajiToQlibSyncer(
+        qlib_data_dir=str(qlib_dir),
+        futures_qlib_data_dir=str(qlib_dir.parent / f"{qlib_dir.name}_futures"),
+        skip_db=True,
+        shioaji_client=object(),
+    )
+
+
+def _sync(syncer: ShioajiToQlibSyncer, stock_id: str, start_date: date, end_date: date) -> bool:
+    """與同步器的處理流程相同：股票先過濾交易時段，再寫入 Qlib"""
+    return syncer.save_to_qlib(
+        stock_id,
+        filter_trading_hours(_bars(start_date, end_date), datetime_column='datetime', include_night=False),
+        syncer.generate_trading_minutes(start_date, end_date),
+    )
+
+
+class TestExportThenSync:
+    """匯出後再同步到同一目錄"""
+
+    # 週四 ~ 下週三，涵蓋週末
+    EXPORT_START, EXPORT_END = date(2025, 1, 2), date(2025, 1, 4)
+    SYNC_START, SYNC_END = date(2025, 1, 4), date(2025, 1, 8)
+
+    def test_calendar_matches_sync_only(self, tmp_path):
+        shared_dir = tmp_path / 'shared'
+        export_stock_to_qlib(
+            QlibBinWriter(shared_dir, freq='1min'), '2330',
+            _bars(self.EXPORT_START, self.EXPORT_END), self.EXPORT_START, self.EXPORT_END,
+        )
+        assert _sync(_syncer(shared_dir), '2330', self.SYNC_START, self.SYNC_END)
+
+        sync_dir = tmp_path / 'sync_only'
+        assert _sync(_syncer(sync_dir), '2330', self.EXPORT_START, self.SYNC_END)
+
+        calendar_file = Path('calendars') / '1min.txt'
+        assert (shared_dir / calendar_file).read_text() == (sync_dir / calendar_file).read_text()
+
+        close_file = Path('features') / '2330' / 'close.1min.bin'
+        shared_close = np.fromfile(shared_dir / close_file, dtype='<f4')
+        sync_close = np.fromfile(sync_dir / close_file, dtype='<f4')
+        np.testing.assert_array_equal(shared_close, sync_close)
+
+    def test_sync_then_export_keeps_existing_positions(self, tmp_path):
+        """匯出較早區間的其他標的，只附加日曆，不改寫已寫入標的的位置"""
+        qlib_dir = tmp_path / 'qlib'
+        assert _sync(_syncer(qlib_dir), '2330', self.EXPORT_START, self.SYNC_END)
+        calendar_before = (qlib_dir / 'calendars' / '1min.txt').read_text()
+
+        writer = QlibBinWriter(qlib_dir, freq='1min')
+        export_stock_to_qlib(
+            writer, '2317', _bars(self.EXPORT_START, self.EXPORT_END), self.EXPORT_START, self.EXPORT_END,
+        )
+
+        assert (qlib_dir / 'calendars' / '1min.txt').read_text() == calendar_before
+        assert writer.last_timestamp('2330') == trading_calendar.qlib_minute_calendar(
+            self.EXPORT_START, self.SYNC_END
+        )[-1]
+
+
+def test_is_futures_id():
+    assert is_futures_id('TX')
+    assert is_futures_id('MTX202601')
+    assert not is_futures_id('2330')
+    assert not is_futures_id('TXF')
@@ -0,0 +1,103 @@
+"""
+Parity tests for Alpha158 NumPy rolling kernels
+
+NumPy 核心必須與 Alpha158Calculator 的 pandas 參考實作一致（含 NaN 位置、部分窗口、同值）
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from app.services import alpha158_kernels
+from app.services.alpha158_factors import Alpha158Calculator
+
+
+WINDOWS = [5, 10, 20, 30, 60]
+
+KERNELS = [
+    (Alpha158Calculator.slope, alpha158_kernels.rolling_slope),
+    (Alpha158Calculator.rsquare, alpha158_kernels.rolling_rsquare),
+    (Alpha158Calculator.resi, alpha158_kernels.rolling_resi),
+    (Alpha158Calculator.rank, alpha158_kernels.rolling_rank),
+    (Alpha158Calculator.idx_max, alpha158_kernels.rolling_idx_max),
+    (Alpha158Calculator.idx_min, alpha158_kernels.rolling_idx_min),
+]
+
+
+@pytest.fixture
+def prices():
+    """含缺值、同值與盤整區間的收盤價"""
+    rng = np.random.default_rng(0)
+    values = np.round(500 * np.cumprod(1 + rng.normal(0, 0.02, 1200)), 2)
+    values[100:103] = np.nan
+    values[[50, 900]] = values[[49, 899]]
+    values[700:704] = values[699]
+    return values
+
+
+def _ohlcv(n, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    return pd.DataFrame({
+        '$open': close * (1 + rng.normal(0, 0.005, n)),
+        '$high': close * 1.01,
+        '$low': close * 0.99,
+        '$close': close,
+        '$volume': rng.integers(1_000, 100_000, n).astype(float),
+    }, index=pd.date_range('2020-01-01', periods=n, freq='B'))
+
+
+class TestKernelParity:
+    """各核心與 pandas 參考實作一致"""
+
+    @pytest.mark.parametrize('reference, kernel', KERNELS, ids=lambda f: getattr(f, '__name__', ''))
+    @pytest.mark.parametrize('window', WINDOWS)
+    def test_matches_reference(self, prices, reference, kernel, window):
+        expected = reference(pd.Series(prices), window).to_numpy()
+        actual = kernel(prices, window)
+
+        np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
+
+    def test_2d_input_matches_columns(self, prices):
+        panel = np.column_stack([prices, prices[::-1], np.full(len(prices), np.nan)])
+
+        for _, kernel in KERNELS:
+            result = kernel(panel, 20)
+            assert result.shape == panel.shape
+            np.testing.assert_allclose(result[:, 0], kernel(prices, 20), rtol=1e-9, atol=1e-12)
+            assert np.isnan(result[:, 2]).all()
+
+    def test_constant_window_rsquare_is_zero(self):
+        values = np.array([10.0, 11.0, 12.0, 12.0, 12.0, 12.0, 12.0])
+
+        rsquare = alpha158_kernels.rolling_rsquare(values, 5)
+
+        assert rsquare[0] != rsquare[0]  # 單筆窗口為 NaN
+        assert rsquare[-1] == 0.0
+
+    def test_empty_input(self):
+        for _, kernel in KERNELS:
+            assert kernel(np.array([]), 5).shape == (0,)
+
+
+class TestComputeAllFactorsBackend:
+    """compute_all_factors 的後端選擇"""
+
+    def test_numpy_backend_matches_pandas(self):
+        df = _ohlcv(300)
+        calculator = Alpha158Calculator()
+
+        expected, names = calculator.compute_all_factors(df, backend='pandas')
+        actual, actual_names = calculator.compute_all_factors(df, backend='numpy')
+
+        assert actual_names == names
+        assert list(actual.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9, atol=1e-9)
+
+    def test_default_backend_and_validation(self):
+        assert Alpha158Calculator().backend == 'numpy'
+
+        with pytest.raises(ValueError):
+            Alpha158Calculator(backend='numba')
+        with pytest.raises(ValueError):
+            Alpha158Calculator().compute_rolling_factors(_ohlcv(10), backend='cython')
@@ -0,0 +1,104 @@
+"""
+Unit tests for Alpha158Calculator panel (date × instrument) mode
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from app.services.alpha158_factors import Alpha158Calculator, Alpha158Panel
+
+
+N_DATES = 300
+N_INSTRUMENTS = 5
+
+
+@pytest.fixture
+def fields():
+    """5 檔股票 × 300 日的 OHLCV 矩陣"""
+    rng = np.random.default_rng(3)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, (N_DATES, N_INSTRUMENTS)), axis=0)
+    return {
+        '$open': close * (1 + rng.normal(0, 0.005, close.shape)),
+        '$high': close * 1.01,
+        '$low': close * 0.99,
+        '$close': close,
+        '$volume': rng.integers(1_000, 100_000, close.shape).astype(float),
+    }
+
+
+@pytest.fixture
+def dates():
+    return pd.date_range('2022-01-03', periods=N_DATES, freq='B')
+
+
+class TestComputePanelFactors:
+    """測試 Panel 模式因子計算"""
+
+    def test_matches_single_stock_mode(self, fields, dates):
+        calculator = Alpha158Calculator()
+
+        panel = calculator.compute_panel_factors(fields, chunk_size=2)
+
+        assert panel.values.shape == (N_DATES, N_INSTRUMENTS, 179)
+        assert panel.values.dtype == np.float32
+        for j in range(N_INSTRUMENTS):
+            df = pd.DataFrame({name: values[:, j] for name, values in fields.items()}, index=dates)
+            expected, _ = calculator.compute_all_factors(df)
+            np.testing.assert_array_equal(
+                panel.values[:, j, :],
+                expected[panel.factor_names].to_numpy(dtype=np.float32)
+            )
+
+    def test_config_and_factor_access(self, fields):
+        config = {'kbar': {}, 'rolling': {'windows': [5, 20], 'include': ['MA', 'RANK']}}
+
+        panel = Alpha158Calculator().compute_panel_factors(fields, config=config)
+
+        assert panel.factor_names[:9] == ['KMID', 'KLEN', 'KMID2', 'KUP', 'KUP2', 'KLOW', 'KLOW2', 'KSFT', 'KSFT2']
+        assert panel.factor_names[9:] == ['MA5', 'RANK5', 'MA20', 'RANK20']
+        np.testing.assert_array_equal(panel.factor('MA5'), panel.values[:, :, 9])
+
+    def test_missing_field_rejected(self, fields):
+        del fields['$volume']
+
+        with pytest.raises(ValueError, match="missing"):
+            Alpha158Calculator().compute_panel_factors(fields)
+
+    def test_shape_mismatch_rejected(self, fields):
+        fields['$volume'] = fields['$volume'][:, :2]
+
+        with pytest.raises(ValueError, match="identical shape"):
+            Alpha158Calculator().compute_panel_factors(fields)
+
+
+class TestPanelFrames:
+    """測試長格式轉換"""
+
+    def test_round_trip_with_qlib_frame(self, fields, dates):
+        instruments = pd.Index([f'S{j}' for j in range(N_INSTRUMENTS)])
+        long_df = pd.concat({
+            instrument: pd.DataFrame({name: values[:, j] for name, values in fields.items()}, index=dates)
+            for j, instrument in enumerate(instruments)
+        }, names=['instrument', 'datetime'])
+        # 第二檔股票較晚上市
+        long_df = long_df.drop(index=[('S1', d) for d in dates[:10]])
+
+        panel_fields, panel_dates, panel_instruments = Alpha158Calculator.panel_fields_from_frame(long_df)
+
+        assert list(panel_instruments) == list(instruments)
+        assert np.isnan(panel_fields['$close'][:10, 1]).all()
+        np.testing.assert_array_equal(panel_fields['$close'][:, 0], fields['$close'][:, 0])
+
+        panel = Alpha158Calculator().compute_panel_factors(
+            panel_fields, config={'kbar': {}}, dates=panel_dates, instruments=panel_instruments
+        )
+        frame = panel.to_frame()
+
+        assert frame.index.names == ['datetime', 'instrument']
+        assert frame.shape == (N_DATES * N_INSTRUMENTS, 9)
+        assert frame.loc[(dates[20], 'S3'), 'KLEN'] == panel.factor('KLEN')[20, 3]
+
+    def test_to_frame_without_labels(self):
+        panel = Alpha158Panel(values=np.zeros((2, 3, 1), dtype=np.float32), factor_names=['F'])
+
+        assert panel.to_frame().shape == (6, 1)
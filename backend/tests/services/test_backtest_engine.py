@@ -0,0 +1,122 @@
+"""
+Unit tests for BacktestEngine multi-symbol (portfolio) mode
+
+使用記憶體 SQLite 建立合成日線資料，驗證股票池載入、日曆對齊與投組回測結果
+"""
+import pytest
+import numpy as np
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.session import ensure_models_imported
+from app.db.base import Base
+from app.models.stock import Stock
+from app.models.stock_price import StockPrice
+from app.services.backtest_engine import BacktestEngine
+
+ensure_models_imported()
+
+
+ROTATION_STRATEGY = '''
+import backtrader as bt
+
+class RotationStrategy(bt.Strategy):
+    def next(self):
+        for d in self.datas:
+            pos = self.getposition(d).size
+            if not pos and len(d) % 10 == 1:
+                self.buy(data=d, size=100)
+            elif pos and len(d) % 10 == 6:
+                self.close(data=d)
+'''
+
+
+@pytest.fixture
+def db_session():
+    """In-memory SQLite with three stocks of different coverage"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    rng = np.random.default_rng(0)
+    base = date(2024, 1, 1)
+    # 1101: 完整 60 天；2330: 第 5 天停牌；2317: 第 10 天才開始交易
+    for stock_id, halted_day, first_day in [("1101", None, 0), ("2330", 5, 0), ("2317", None, 10)]:
+        session.add(Stock(stock_id=stock_id, name=stock_id))
+        price = 100.0
+        for i in range(60):
+            price *= 1 + rng.normal(0, 0.02)
+            if i == halted_day or i < first_day:
+                continue
+            session.add(StockPrice(
+                stock_id=stock_id,
+                date=base + timedelta(days=i),
+                open=round(price, 2),
+                high=round(price * 1.01, 2),
+                low=round(price * 0.99, 2),
+                close=round(price, 2),
+                volume=1000,
+            ))
+    session.commit()
+
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+class TestLoadUniverseData:
+    """測試股票池批次載入與日曆對齊"""
+
+    def test_aligned_to_shared_calendar(self, db_session):
+        engine = BacktestEngine(db_session)
+        feeds = engine.load_universe_data(["2330", "1101", "2317"], date(2024, 1, 1), date(2024, 3, 1))
+
+        assert list(feeds) == ["2330", "1101", "2317"]
+        assert len(feeds["1101"]) == 60
+        # 停牌日補齊：前一日收盤價、成交量 0
+        halted = feeds["2330"].loc["2024-01-06"]
+        assert halted['volume'] == 0
+        assert halted['open'] == halted['close'] == feeds["2330"].loc["2024-01-05", 'close']
+        # 晚上市的股票從自身第一筆資料開始
+        assert feeds["2317"].index[0] == np.datetime64("2024-01-11")
+        assert not feeds["2317"].isna().any().any()
+
+    def test_missing_symbols_skipped(self, db_session):
+        engine = BacktestEngine(db_session)
+        feeds = engine.load_universe_data(["9999", "1101"], date(2024, 1, 1), date(2024, 3, 1))
+
+        assert list(feeds) == ["1101"]
+
+
+class TestRunPortfolioBacktest:
+    """測試投組回測"""
+
+    def test_portfolio_results(self, db_session):
+        engine = BacktestEngine(db_session)
+        results = engine.run_portfolio_backtest(
+            backtest_id=1,
+            strategy_code=ROTATION_STRATEGY,
+            stock_ids=["2330", "1101", "2317"],
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 1),
+            initial_cash=1_000_000,
+        )
+
+        assert results['symbols'] == ["2330", "1101", "2317"]
+        assert {t['symbol'] for t in results['trades']} == {"2330", "1101", "2317"}
+
+        attribution = results['detailed_results']['symbol_attribution']
+        assert {a['symbol'] for a in attribution} == {"2330", "1101", "2317"}
+        assert sum(a['trades'] for a in attribution) == results['metrics']['total_trades']
+
+        # 共用資金：投組淨值變化等於各標的損益總和
+        total_pnl = sum(a['total_pnl'] for a in attribution)
+        assert results['final_value'] - 1_000_000 == pytest.approx(total_pnl, abs=0.1)
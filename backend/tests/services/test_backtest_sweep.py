@@ -0,0 +1,139 @@
+"""
+Unit tests for backtest parameter sweep
+
+不連線資料庫：直接以合成 DataFrame 建立 SweepSnapshot
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from app.services.backtest_sweep import (
+    MAX_SWEEP_COMBINATIONS,
+    ParameterSweepRunner,
+    SweepSnapshot,
+    expand_parameter_grid,
+    rank_results,
+    run_combination,
+)
+
+
+SMA_STRATEGY = '''
+import backtrader as bt
+
+class SmaCross(bt.Strategy):
+    params = (('fast', 5), ('slow', 20))
+
+    def __init__(self):
+        fast = bt.indicators.SMA(self.data.close, period=self.p.fast)
+        slow = bt.indicators.SMA(self.data.close, period=self.p.slow)
+        self.crossover = bt.indicators.CrossOver(fast, slow)
+
+    def next(self):
+        if not self.position and self.crossover > 0:
+            self.buy(size=100)
+        elif self.position and self.crossover < 0:
+            self.close()
+'''
+
+
+@pytest.fixture
+def snapshot():
+    """250 日合成日線資料"""
+    rng = np.random.default_rng(7)
+    close = 100 * np.cumprod(1 + rng.normal(0.0005, 0.02, 250))
+    index = pd.date_range("2023-01-02", periods=250, freq="B", name="date")
+    data = pd.DataFrame({
+        'open': close,
+        'high': close * 1.01,
+        'low': close * 0.99,
+        'close': close,
+        'volume': np.full(250, 1000, dtype=np.int64),
+    }, index=index)
+    return SweepSnapshot(strategy_code=SMA_STRATEGY, stock_id="2330", data=data)
+
+
+class TestExpandParameterGrid:
+    """測試參數網格展開"""
+
+    def test_grid_expands_all_combinations(self):
+        combos = expand_parameter_grid({'fast': [5, 10], 'slow': [20, 30, 60]})
+
+        assert len(combos) == 6
+        assert combos[0] == {'fast': 5, 'slow': 20}
+        assert {'fast': 10, 'slow': 60} in combos
+
+    def test_grid_over_limit_rejected(self):
+        grid = {'a': list(range(100)), 'b': list(range(100))}
+
+        with pytest.raises(ValueError, match="exceeds limit"):
+            expand_parameter_grid(grid, max_combinations=MAX_SWEEP_COMBINATIONS)
+
+    def test_random_samples_unique_and_reproducible(self):
+        grid = {'a': list(range(100)), 'b': list(range(100)), 'c': [1, 2]}
+
+        combos = expand_parameter_grid(grid, search='random', n_samples=500, seed=1)
+
+        assert len(combos) == 500
+        assert len({tuple(c.values()) for c in combos}) == 500
+        assert all(c['a'] in grid['a'] and c['c'] in grid['c'] for c in combos)
+        assert combos == expand_parameter_grid(grid, search='random', n_samples=500, seed=1)
+
+    def test_invalid_input(self):
+        with pytest.raises(ValueError):
+            expand_parameter_grid({})
+        with pytest.raises(ValueError):
+            expand_parameter_grid({'a': [1]}, search='bayes')
+
+
+class TestRankResults:
+    """測試結果排序"""
+
+    def test_failed_results_last(self):
+        results = [
+            {'params': {'a': 1}, 'metrics': {'sharpe_ratio': 0.5}},
+            {'params': {'a': 2}, 'error': 'boom'},
+            {'params': {'a': 3}, 'metrics': {'sharpe_ratio': 1.5}},
+        ]
+
+        ranked = rank_results(results, 'sharpe_ratio')
+
+        assert [r['params']['a'] for r in ranked] == [3, 1, 2]
+        assert [r['rank'] for r in ranked] == [1, 2, 3]
+
+    def test_lower_is_better_metric(self):
+        results = [
+            {'params': {'a': 1}, 'metrics': {'max_drawdown_pct': 20.0}},
+            {'params': {'a': 2}, 'metrics': {'max_drawdown_pct': 5.0}},
+        ]
+
+        assert rank_results(results, 'max_drawdown_pct', top=1)[0]['params'] == {'a': 2}
+
+
+class TestParameterSweepRunner:
+    """測試掃描執行"""
+
+    def test_run_combination_metrics(self, snapshot):
+        result = run_combination(snapshot, {'fast': 5, 'slow': 20})
+
+        assert 'error' not in result
+        assert result['metrics']['total_trades'] > 0
+        assert result['metrics']['final_value'] > 0
+
+    def test_bad_params_reported_not_raised(self, snapshot):
+        result = run_combination(snapshot, {'fast': 'x'})
+
+        assert result['params'] == {'fast': 'x'}
+        assert 'metrics' not in result
+        assert result['error']
+
+    def test_pool_matches_sequential(self, snapshot):
+        combos = expand_parameter_grid({'fast': [3, 5, 8], 'slow': [15, 30]})
+        runner = ParameterSweepRunner(snapshot)
+
+        sequential = runner.run(combos, rank_by='total_return', max_workers=1)
+        parallel = runner.run(combos, rank_by='total_return', max_workers=2)
+
+        assert len(parallel) == len(combos)
+        assert [r['params'] for r in sequential] == [r['params'] for r in parallel]
+        assert [r['metrics']['final_value'] for r in sequential] == \
+            [r['metrics']['final_value'] for r in parallel]
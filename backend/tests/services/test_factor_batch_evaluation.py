@@ -0,0 +1,91 @@
+"""
+Unit tests for shared-data batch factor evaluation
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.factor_batch_evaluation import (
+    FactorBatchEvaluator,
+    FactorBatchSnapshot,
+    dedupe_formulas,
+    normalize_formula,
+)
+from app.services.factor_evaluation_service import FactorEvaluationService
+
+
+DATES = pd.bdate_range('2024-01-01', periods=120, name='datetime')
+STOCKS = [f'{2300 + i}' for i in range(30)]
+
+
+class FakeAdapter:
+    """以固定價格面板模擬 get_qlib_features_panel，記錄每次呼叫的表達式"""
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.02, (len(DATES), len(STOCKS))), axis=0)
+        self.close = pd.DataFrame(close, index=DATES, columns=STOCKS)
+        self.calls = []
+
+    def expression(self, formula):
+        if 'Bad' in formula:
+            raise SyntaxError(f'invalid expression {formula}')
+        lag = int(formula.split(',')[1].strip(' )')) if ',' in formula else 1
+        return self.close / self.close.shift(lag) - 1
+
+    def get_qlib_features_panel(self, symbols, start_date, end_date, fields):
+        self.calls.append(list(fields))
+        return {field: self.expression(field)[list(symbols)] for field in fields}
+
+
+@pytest.fixture
+def service():
+    service = FactorEvaluationService.__new__(FactorEvaluationService)
+    service.qlib_adapter = FakeAdapter()
+    return service
+
+
+@pytest.fixture
+def snapshot(service):
+    return FactorBatchSnapshot.load(service.qlib_adapter, STOCKS, '2024-01-01', '2024-06-30')
+
+
+class TestFormulaDedup:
+    def test_whitespace_insensitive(self):
+        assert normalize_formula('Ref($close, 5) / $close') == 'Ref($close,5)/$close'
+        assert dedupe_formulas({1: 'Ref($close, 5)', 2: 'Ref($close,5)', 3: '$close'}) == {
+            'Ref($close,5)': [1, 2],
+            '$close': [3],
+        }
+
+
+class TestFactorBatchEvaluator:
+    def test_matches_single_factor_metrics(self, service, snapshot):
+        formula = 'Ref($close, 5)'
+        results = FactorBatchEvaluator(service, snapshot).evaluate({7: formula})
+
+        factor = service.qlib_adapter.expression(formula)
+        expected = service._calculate_metrics(factor, snapshot.returns)
+        assert results[7]['ic'] == pytest.approx(expected['ic'])
+        assert results[7]['rank_icir'] == pytest.approx(expected['rank_icir'])
+        assert 'sharpe_ratio' in results[7]
+
+    def test_duplicates_computed_once_in_one_call(self, service, snapshot):
+        adapter = service.qlib_adapter
+        adapter.calls.clear()
+
+        results = FactorBatchEvaluator(service, snapshot).evaluate({
+            1: 'Ref($close, 5)', 2: 'Ref($close,5)', 3: 'Ref($close, 10)', 4: 'Ref($close, 20)',
+        })
+
+        assert adapter.calls == [['Ref($close, 5)', 'Ref($close, 10)', 'Ref($close, 20)']]
+        assert results[1] == results[2]
+        assert results[1]['ic'] != results[3]['ic']
+
+    def test_bad_expression_isolated(self, service, snapshot):
+        results = FactorBatchEvaluator(service, snapshot, chunk_size=3).evaluate({
+            1: 'Ref($close, 5)', 2: 'Bad($close)', 3: 'Ref($close, 10)',
+        })
+
+        assert 'invalid expression' in results[2]['error']
+        assert 'error' not in results[1] and 'error' not in results[3]
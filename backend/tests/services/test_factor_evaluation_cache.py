@@ -58,26 +58,42 @@ class TestFactorEvaluationCache:
         mock_db = Mock()
         service = FactorEvaluationService(mock_db)
 
-        with patch.object(cache, 'clear_pattern') as mock_clear:
-            mock_clear.return_value = 5  # 清除了 5 個快取項目
+        with patch.object(cache, 'invalidate_tags') as mock_invalidate, \
+                patch.object(cache, 'get', return_value=True):
+            mock_invalidate.return_value = 5  # 清除了 5 個快取項目
 
             count = service.clear_evaluation_cache(factor_id=1)
 
             assert count == 5
-            mock_clear.assert_called_once_with("factor_evaluation:1:*")
+            mock_invalidate.assert_called_once_with("factor_evaluation:factor:1")
 
     def test_clear_all_evaluation_cache(self):
         """測試清除所有評估快取"""
         mock_db = Mock()
         service = FactorEvaluationService(mock_db)
 
-        with patch.object(cache, 'clear_pattern') as mock_clear:
-            mock_clear.return_value = 25  # 清除了 25 個快取項目
+        with patch.object(cache, 'invalidate_tags') as mock_invalidate, \
+                patch.object(cache, 'get', return_value=True):
+            mock_invalidate.return_value = 25  # 清除了 25 個快取項目
 
             count = service.clear_all_evaluation_cache()
 
             assert count == 25
-            mock_clear.assert_called_once_with("factor_evaluation:*")
+            mock_invalidate.assert_called_once_with("factor_evaluation")
+
+    def test_legacy_keys_cleared_once(self):
+        """測試未帶標籤的舊版快取只以前綴掃描清除一次"""
+        service = FactorEvaluationService(Mock())
+        store = {}
+
+        with patch.object(cache, 'invalidate_tags', return_value=1), \
+                patch.object(cache, 'clear_pattern', return_value=3) as mock_clear, \
+                patch.object(cache, 'get', side_effect=store.get), \
+                patch.object(cache, 'set', side_effect=lambda key, value, **kwargs: store.__setitem__(key, value)):
+            assert service.clear_evaluation_cache(factor_id=1) == 4
+            assert service.clear_evaluation_cache(factor_id=2) == 1
+
+        mock_clear.assert_called_once_with("factor_evaluation:*")
 
 
 class TestCacheIntegration:
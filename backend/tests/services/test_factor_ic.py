@@ -0,0 +1,106 @@
+"""
+Parity tests for the vectorized cross-sectional IC engine
+
+向量化 IC 必須與原本逐日 dropna / intersection / corr / rank 的 pandas 實作一致
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock
+
+from app.services.factor_evaluation_service import FactorEvaluationService
+from app.services.factor_ic import cross_sectional_ic, forward_returns, ic_summary
+
+
+def _reference_ic(factor: pd.DataFrame, returns: pd.DataFrame):
+    """原逐日實作（不可計算的日期為 NaN）"""
+    ic, rank_ic = [], []
+    for date in factor.index:
+        f = factor.loc[date].dropna()
+        r = returns.loc[date].dropna()
+        common = f.index.intersection(r.index)
+        if len(common) < 5:
+            ic.append(np.nan)
+            rank_ic.append(np.nan)
+            continue
+        f, r = f[common], r[common]
+        ic.append(f.corr(r))
+        rank_ic.append(f.rank().corr(r.rank()))
+    return np.array(ic), np.array(rank_ic)
+
+
+@pytest.fixture
+def panel():
+    """120 日 × 40 檔，含缺值、同值、常數截面與股票數不足的日期"""
+    rng = np.random.default_rng(11)
+    index = pd.bdate_range('2023-01-02', periods=120)
+    columns = [f'{2300 + i}' for i in range(40)]
+    factor = pd.DataFrame(rng.normal(size=(120, 40)), index=index, columns=columns)
+    returns = pd.DataFrame(0.3 * factor.to_numpy() + rng.normal(size=(120, 40)), index=index, columns=columns)
+
+    factor = factor.round(1)                                # 大量同值
+    factor[factor.abs() > 2] = np.nan
+    returns.iloc[rng.random((120, 40)) < 0.1] = np.nan
+    factor.iloc[5] = 1.0                                    # 常數截面 → NaN
+    returns.iloc[6, 4:] = np.nan                            # 只剩 4 檔 → NaN
+    return factor, returns
+
+
+class TestCrossSectionalIC:
+    """截面 IC 與原實作一致"""
+
+    def test_matches_reference(self, panel):
+        factor, returns = panel
+
+        ic, rank_ic = cross_sectional_ic(factor.to_numpy(), returns.to_numpy())
+        expected_ic, expected_rank_ic = _reference_ic(factor, returns)
+
+        np.testing.assert_array_equal(np.isnan(ic), np.isnan(expected_ic))
+        np.testing.assert_allclose(ic, expected_ic, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(rank_ic, expected_rank_ic, rtol=1e-12, atol=1e-12)
+        assert np.isnan(ic[5]) and np.isnan(ic[6])
+
+    def test_multiple_horizons_in_one_call(self, panel):
+        factor, _ = panel
+        close = 100 * np.cumprod(1 + np.random.default_rng(2).normal(0, 0.02, factor.shape), axis=0)
+        horizons = [1, 5, 20]
+
+        returns_by_horizon = forward_returns(close, horizons)
+        ic, rank_ic = cross_sectional_ic(factor.to_numpy(), returns_by_horizon)
+
+        assert ic.shape == rank_ic.shape == (3, len(factor))
+        for i, h in enumerate(horizons):
+            pivot = pd.DataFrame(close)
+            expected = ((pivot.shift(-h) - pivot) / pivot).to_numpy()
+            np.testing.assert_array_equal(returns_by_horizon[i], expected)
+            single_ic, single_rank_ic = cross_sectional_ic(factor.to_numpy(), expected)
+            np.testing.assert_allclose(ic[i], single_ic, rtol=1e-12, equal_nan=True)
+            np.testing.assert_allclose(rank_ic[i], single_rank_ic, rtol=1e-12, equal_nan=True)
+        assert np.isnan(ic[2, -20:]).all()
+
+    def test_ic_summary(self):
+        assert ic_summary(np.array([np.nan, np.nan])) == (0.0, 0.0, [])
+
+        mean_ic, icir, series = ic_summary(np.array([0.1, np.nan, 0.3]))
+        assert series == [0.1, 0.3]
+        assert mean_ic == pytest.approx(0.2)
+        assert icir == pytest.approx(0.2 / 0.1)
+
+
+class TestCalculateMetrics:
+    """FactorEvaluationService._calculate_metrics 輸出欄位不變"""
+
+    def test_fields_match_reference(self, panel):
+        factor, returns = panel
+        service = FactorEvaluationService(Mock())
+
+        metrics = service._calculate_metrics(factor, returns.iloc[:100])
+
+        expected_ic, expected_rank_ic = _reference_ic(*factor.align(returns.iloc[:100], join='inner'))
+        expected_ic = expected_ic[~np.isnan(expected_ic)]
+        expected_rank_ic = expected_rank_ic[~np.isnan(expected_rank_ic)]
+        assert set(metrics) == {'ic', 'icir', 'rank_ic', 'rank_icir', 'ic_time_series'}
+        np.testing.assert_allclose(metrics['ic_time_series'], expected_ic, rtol=1e-12)
+        assert metrics['ic'] == pytest.approx(expected_ic.mean(), rel=1e-12)
+        assert metrics['icir'] == pytest.approx(expected_ic.mean() / expected_ic.std(), rel=1e-12)
+        assert metrics['rank_ic'] == pytest.approx(expected_rank_ic.mean(), rel=1e-12)
@@ -0,0 +1,167 @@
+"""
+Unit tests for the persistent on-disk factor store
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock, patch
+
+from app.services import qlib_backtest_engine
+from app.services.alpha158_factors import alpha158_calculator
+from app.services.factor_store import FactorStore, qlib_source_files
+from app.services.qlib_backtest_engine import QlibBacktestEngine
+
+
+DATES = pd.bdate_range('2024-01-01', '2024-12-31', name='datetime')
+
+
+def _series_frame(start, end):
+    """確定性的假因子值：以日期序數為值"""
+    index = DATES[(DATES >= start) & (DATES <= end)]
+    ordinal = np.array([d.toordinal() for d in index], dtype=float)
+    return pd.DataFrame({'A': ordinal, 'B': -ordinal / 7}, index=index)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    calendar = tmp_path / 'qlib' / 'calendars' / 'day.txt'
+    close_bin = tmp_path / 'qlib' / 'features' / '2330' / 'close.day.bin'
+    close_bin.parent.mkdir(parents=True)
+    calendar.parent.mkdir(parents=True)
+    calendar.write_text('2024-01-01\n2024-01-02\n')
+    np.arange(100, dtype='<f4').tofile(close_bin)
+    return [calendar, close_bin]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FactorStore(str(tmp_path / 'store'), max_bytes=10 * 1024 * 1024)
+
+
+@pytest.fixture
+def compute():
+    return Mock(side_effect=_series_frame)
+
+
+class TestFactorStore:
+    """測試命中、增量附加與失效"""
+
+    def test_miss_then_hit(self, store, sources, compute):
+        first = store.get_or_compute('k', '2330', '2024-01-01', '2024-06-30', compute, sources)
+        second = store.get_or_compute('k', '2330', '2024-02-01', '2024-03-31', compute, sources)
+
+        assert compute.call_count == 1
+        assert first['A'].dtype == np.float32
+        pd.testing.assert_frame_equal(second, first.loc['2024-02-01':'2024-03-31'])
+        assert store.stats['misses'] == 1 and store.stats['hits'] == 1
+
+    def test_extension_computes_only_new_days(self, store, sources, compute):
+        store.get_or_compute('k', '2330', '2024-01-01', '2024-06-30', compute, sources)
+
+        result = store.get_or_compute('k', '2330', '2024-01-01', '2024-09-30', compute, sources)
+
+        assert compute.call_args.args == (pd.Timestamp('2024-07-01'), pd.Timestamp('2024-09-30'))
+        expected = _series_frame('2024-01-01', '2024-09-30').astype(np.float32)
+        np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+        assert store.stats['appends'] == 1
+
+    def test_source_append_keeps_stored_rows(self, store, sources, compute):
+        # 寫入時資料只到 6 月底
+        compute.side_effect = lambda s, e: _series_frame(s, min(e, pd.Timestamp('2024-06-30')))
+        store.get_or_compute('k', '2330', '2024-01-01', '2024-12-31', compute, sources)
+
+        with open(sources[1], 'ab') as f:
+            np.arange(5, dtype='<f4').tofile(f)
+        compute.side_effect = _series_frame
+        result = store.get_or_compute('k', '2330', '2024-01-01', '2024-12-31', compute, sources)
+
+        # 覆蓋區間縮回最後一筆已存日期（2024-06-28），只補算其後的交易日
+        assert compute.call_args.args == (pd.Timestamp('2024-06-29'), pd.Timestamp('2024-12-31'))
+        assert result.index[-1] == pd.Timestamp('2024-12-31')
+        assert len(result) == len(_series_frame('2024-01-01', '2024-12-31'))
+        assert store.stats['invalidations'] == 0
+
+    def test_source_rewrite_invalidates(self, store, sources, compute):
+        store.get_or_compute('k', '2330', '2024-01-01', '2024-06-30', compute, sources)
+
+        np.arange(1, 101, dtype='<f4').tofile(sources[1])
+        store.get_or_compute('k', '2330', '2024-01-01', '2024-06-30', compute, sources)
+
+        assert compute.call_count == 2
+        assert store.stats['invalidations'] == 1
+
+    def test_lru_eviction_under_budget(self, tmp_path, sources, compute):
+        store = FactorStore(str(tmp_path / 'store'), max_bytes=10 ** 9)
+        store.get_or_compute('a', '2330', '2024-01-01', '2024-12-31', compute, sources)
+        entry_size = store.disk_usage()
+        store.get_or_compute('b', '2330', '2024-01-01', '2024-12-31', compute, sources)
+        store.get_or_compute('a', '2330', '2024-01-01', '2024-12-31', compute, sources)  # a 為最近存取
+
+        store.max_bytes = 2 * entry_size + 100
+        store.get_or_compute('c', '2330', '2024-01-01', '2024-12-31', compute, sources)
+
+        assert store.stats['evictions'] == 1
+        compute.reset_mock()
+        store.get_or_compute('a', '2330', '2024-01-01', '2024-12-31', compute, sources)
+        assert compute.call_count == 0
+        store.get_or_compute('b', '2330', '2024-01-01', '2024-12-31', compute, sources)
+        assert compute.call_count == 1
+
+    def test_missing_sources_not_cached(self, store, sources, compute, tmp_path):
+        missing = [tmp_path / 'qlib' / 'features' / '9999' / 'close.day.bin']
+
+        store.get_or_compute('k', '9999', '2024-01-01', '2024-03-31', compute, missing)
+        store.get_or_compute('k', '9999', '2024-01-01', '2024-03-31', compute, missing)
+
+        assert compute.call_count == 2
+        assert store.disk_usage() == 0
+
+    def test_get_put_shares_entries_with_get_or_compute(self, store, sources, compute):
+        assert store.get('k', '2330', '2024-01-01', '2024-03-31', sources) is None
+
+        store.put('k', '2330', '2024-01-01', '2024-06-30', _series_frame('2024-01-01', '2024-06-30'), sources)
+        cached = store.get('k', '2330', '2024-02-01', '2024-03-31', sources)
+        store.get_or_compute('k', '2330', '2024-01-01', '2024-06-30', compute, sources)
+
+        assert compute.call_count == 0
+        assert store.get('k', '2330', '2024-01-01', '2024-07-31', sources) is None
+        pd.testing.assert_frame_equal(
+            cached, _series_frame('2024-02-01', '2024-03-31').astype(np.float32), check_freq=False
+        )
+
+    def test_qlib_source_files(self, tmp_path):
+        files = qlib_source_files('SZ2330', ['Mean($close, 5) / $Volume', '$close'], data_path=str(tmp_path))
+
+        assert files == [
+            tmp_path / 'calendars' / 'day.txt',
+            tmp_path / 'features' / 'sz2330' / 'close.day.bin',
+            tmp_path / 'features' / 'sz2330' / 'volume.day.bin',
+        ]
+
+
+class TestAlpha158FactorStore:
+    """回測 Alpha158 資料經由因子儲存增量補算"""
+
+    def test_incremental_matches_full_computation(self, store, sources):
+        rng = np.random.default_rng(0)
+        index = pd.bdate_range('2022-01-03', '2024-12-31', name='datetime')
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.02, len(index)))
+        ohlcv = pd.DataFrame({
+            '$open': close, '$high': close * 1.01, '$low': close * 0.99,
+            '$close': close, '$volume': rng.integers(1_000, 100_000, len(index)).astype(float),
+        }, index=index)
+
+        engine = QlibBacktestEngine(Mock())
+        engine.data_adapter = Mock()
+        engine.data_adapter.get_qlib_ohlcv.side_effect = lambda symbol, s, e: ohlcv.loc[str(s):str(e)]
+
+        with patch.object(qlib_backtest_engine, 'factor_store', store), \
+                patch.object(qlib_backtest_engine, 'qlib_source_files', return_value=sources):
+            engine._get_alpha158_data('2330', pd.Timestamp('2022-01-03').date(), pd.Timestamp('2024-06-28').date())
+            extended = engine._get_alpha158_data('2330', pd.Timestamp('2022-01-03').date(), pd.Timestamp('2024-12-31').date())
+
+        assert store.stats['appends'] == 1
+        expected, names = alpha158_calculator.compute_all_factors(ohlcv)
+        np.testing.assert_allclose(
+            extended[names].to_numpy(), expected[names].to_numpy(dtype=np.float32), rtol=1e-5, atol=1e-6
+        )
@@ -0,0 +1,89 @@
+"""
+Unit tests for the vectorized Black-Scholes Greeks and implied-vol solver
+"""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.greeks_calculator import (
+    BlackScholesGreeksCalculator,
+    black_scholes_price_chain,
+    estimate_volatility_from_option_prices,
+    implied_volatility_chain,
+    time_to_expiry_array,
+)
+
+
+SPOT = 20000.0
+STRIKES = np.array([18000, 19000, 19500, 20000, 20500, 21000, 22000] * 2, dtype=float)
+TYPES = np.array(['CALL'] * 7 + ['PUT'] * 7)
+TIMES = np.linspace(0.02, 0.5, len(STRIKES))
+VOLS = np.linspace(0.12, 0.45, len(STRIKES))
+
+
+class TestChainGreeks:
+    """整條鏈的 Greeks 與單一合約計算一致"""
+
+    def test_matches_scalar_greeks(self):
+        calculator = BlackScholesGreeksCalculator()
+        chain = calculator.calculate_chain_greeks(SPOT, STRIKES, TIMES, TYPES, volatility=VOLS)
+
+        for i in range(len(STRIKES)):
+            scalar = calculator.calculate_greeks(SPOT, STRIKES[i], TIMES[i], VOLS[i], TYPES[i])
+            for name, value in scalar.items():
+                assert chain[name][i] == pytest.approx(value, rel=1e-9, abs=1e-12), name
+
+    def test_invalid_inputs_are_nan(self):
+        calculator = BlackScholesGreeksCalculator()
+        chain = calculator.calculate_chain_greeks(
+            SPOT, np.array([20000.0, -1.0, 20000.0]), np.array([0.1, 0.1, 0.0]),
+            np.array(['CALL', 'CALL', 'PUT']), volatility=0.2
+        )
+
+        assert not np.isnan(chain['delta'][0])
+        assert np.isnan(chain['delta'][1:]).all()
+        assert np.isnan(chain['volatility'][1:]).all()
+
+
+class TestImpliedVolatility:
+    """向量化隱含波動率求解"""
+
+    def test_round_trip(self):
+        is_call = TYPES == 'CALL'
+        prices = black_scholes_price_chain(SPOT, STRIKES, TIMES, VOLS, is_call)
+
+        implied = implied_volatility_chain(SPOT, STRIKES, TIMES, prices, is_call, tolerance=1e-8)
+
+        np.testing.assert_allclose(implied, VOLS, rtol=1e-6)
+
+    def test_unsolvable_prices_are_nan(self):
+        # 低於內含價值、高於現價、非正價格皆無解
+        implied = implied_volatility_chain(
+            SPOT, np.array([18000.0, 20000.0, 20000.0]), 0.1,
+            np.array([500.0, 25000.0, 0.0]), np.array([True, True, False])
+        )
+
+        assert np.isnan(implied).all()
+
+    def test_chain_falls_back_to_approximate_volatility(self):
+        calculator = BlackScholesGreeksCalculator()
+        chain = calculator.calculate_chain_greeks(
+            SPOT, np.array([18000.0]), np.array([0.1]), np.array(['CALL']), option_price=np.array([500.0])
+        )
+
+        assert np.isnan(chain['implied_volatility'][0])
+        assert 0.05 <= chain['volatility'][0] <= 1.0
+        assert not np.isnan(chain['delta'][0])
+
+    def test_scalar_wrapper(self):
+        price = float(black_scholes_price_chain(SPOT, 20500.0, 0.1, 0.25, False))
+
+        assert estimate_volatility_from_option_prices(SPOT, 20500.0, price, 0.1, "PUT") == pytest.approx(0.25, rel=1e-3)
+        assert estimate_volatility_from_option_prices(SPOT, 18000.0, 500.0, 0.1, "CALL") is None
+
+
+def test_time_to_expiry_array():
+    times = time_to_expiry_array([date(2025, 1, 16), date(2025, 1, 1), date(2025, 3, 1)], date(2025, 1, 1))
+
+    np.testing.assert_allclose(times, [15 / 365, 0.0, 59 / 365])
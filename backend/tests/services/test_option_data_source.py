@@ -4,15 +4,22 @@ Unit tests for Option Data Source
 測試選擇權資料源的各項功能
 """
 import pytest
+import sys
+from pathlib import Path
 from unittest.mock import Mock, MagicMock, patch, PropertyMock
 from datetime import date
 import pandas as pd
 
+# 添加專案路徑（假客戶端位於基準測試腳本）
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
 from app.services.option_data_source import (
     OptionDataSource,
     ShioajiOptionDataSource,
     QlibOptionDataSource
 )
+from app.utils.rate_limiter import RateLimiter, get_shioaji_rate_limiter
+from scripts.benchmark_option_snapshots import StubShioajiOptionClient
 
 
 class TestShioajiOptionDataSourceInit:
@@ -304,106 +311,152 @@ class TestParseContract:
         assert result is None
 
 
-class TestGetContractSnapshot:
-    """測試 _get_contract_snapshot 方法"""
+def _snapshot(code, close=150.0, volume=1000, open_interest=5000):
+    """模擬 Shioaji Snapshot（以 code 對應合約）"""
+    snap = Mock()
+    snap.code = code
+    snap.close = close
+    snap.volume = volume
+    snap.open_interest = open_interest
+    return snap
 
-    def test_get_snapshot_success(self):
-        """測試成功獲取快照"""
-        mock_client = Mock()
-        mock_api = Mock()
 
-        # 模擬 snapshot 數據
-        snapshot_data = Mock()
-        snapshot_data.close = 150.5
-        snapshot_data.volume = 1000
-        snapshot_data.open_interest = 5000
+def _echo_snapshots(contracts, timeout=None):
+    """對每個請求的合約回傳一筆快照"""
+    return [_snapshot(contract.code) for contract in contracts]
 
-        mock_api.snapshots.return_value = [snapshot_data]
-        mock_client._api = mock_api
 
-        data_source = ShioajiOptionDataSource(mock_client)
+class TestFetchSnapshots:
+    """測試 _fetch_snapshots 分批請求"""
 
-        # 模擬合約
-        contract = Mock()
-        contract.code = 'TXO202512C23000'
-        contract.strike_price = 23000
-        contract.option_right = 'Call'
-        contract.delivery_date = '2025-12-17'
+    def create_contracts(self, n):
+        contracts = []
+        for i in range(n):
+            contract = Mock()
+            contract.code = f'TXO202512C{23000 + i * 50}'
+            contract.strike_price = 23000 + i * 50
+            contract.option_right = 'Call'
+            contract.delivery_date = '2025/12/17'
+            contracts.append(contract)
+        return contracts
 
-        result = data_source._get_contract_snapshot(contract, date(2024, 12, 15))
+    def create_data_source(self, snapshots, **kwargs):
+        mock_client = Mock()
+        mock_client._api = Mock()
+        mock_client._api.snapshots.side_effect = snapshots
+        kwargs.setdefault('retry_delay', 0)
+        kwargs.setdefault('rate_limiter', RateLimiter(1000, 1.0))
+        return ShioajiOptionDataSource(mock_client, **kwargs), mock_client
+
+    def test_requests_are_chunked(self):
+        data_source, client = self.create_data_source(_echo_snapshots, chunk_size=4)
+
+        data, failed = data_source._fetch_snapshots(self.create_contracts(10))
+
+        assert failed == 0
+        assert len(data) == 10
+        sizes = sorted(len(call.args[0]) for call in client._api.snapshots.call_args_list)
+        assert sizes == [2, 4, 4]
+
+    def test_snapshots_matched_by_code(self):
+        contracts = self.create_contracts(3)
+        # 回傳順序與請求不同，且缺少第二檔
+        data_source, _ = self.create_data_source([[
+            _snapshot(contracts[2].code, close=3.0),
+            _snapshot(contracts[0].code, close=1.0),
+        ]])
+
+        data, failed = data_source._fetch_snapshots(contracts)
+
+        assert failed == 1
+        assert {row['contract_id']: row['close'] for row in data} == {
+            contracts[0].code: 1.0,
+            contracts[2].code: 3.0,
+        }
+
+    def test_missing_attributes(self):
+        contract = self.create_contracts(1)[0]
+        snap = Mock(spec=['code', 'close'])
+        snap.code = contract.code
+        snap.close = 150.5
+        data_source, _ = self.create_data_source([[snap]])
+
+        data, _ = data_source._fetch_snapshots([contract])
+
+        assert data[0]['close'] == 150.5
+        assert data[0]['volume'] == 0  # 預設值
+        assert data[0]['open_interest'] is None  # 預設值
+
+    def test_failed_chunk_is_retried(self):
+        contracts = self.create_contracts(2)
+        data_source, client = self.create_data_source(
+            [Exception("API Error"), _echo_snapshots(contracts)], max_retries=2
+        )
 
-        assert result is not None
-        assert result['contract_id'] == 'TXO202512C23000'
-        assert result['close'] == 150.5
-        assert result['volume'] == 1000
-        assert result['open_interest'] == 5000
+        data, failed = data_source._fetch_snapshots(contracts)
 
-    def test_get_snapshot_no_data(self):
-        """測試無快照數據"""
-        mock_client = Mock()
-        mock_api = Mock()
-        mock_api.snapshots.return_value = []
-        mock_client._api = mock_api
+        assert failed == 0
+        assert len(data) == 2
+        assert client._api.snapshots.call_count == 2
 
-        data_source = ShioajiOptionDataSource(mock_client)
+    def test_chunk_fails_after_max_retries(self):
+        data_source, client = self.create_data_source(Exception("API Error"), max_retries=2)
 
-        contract = Mock()
-        contract.code = 'TXO202512C23000'
-        contract.strike_price = 23000
-        contract.option_right = 'Call'
-        contract.delivery_date = '2025-12-17'
+        data, failed = data_source._fetch_snapshots(self.create_contracts(3))
 
-        result = data_source._get_contract_snapshot(contract, date(2024, 12, 15))
+        assert data == []
+        assert failed == 3
+        assert client._api.snapshots.call_count == 3
 
-        assert result is None
+    def test_token_expired_refreshes_once(self):
+        new_api = Mock()
+        new_api.snapshots.side_effect = _echo_snapshots
+        data_source, client = self.create_data_source(
+            Exception("401 Token is expired"), chunk_size=2
+        )
 
-    def test_get_snapshot_missing_attributes(self):
-        """測試快照數據缺少屬性"""
-        mock_client = Mock()
-        mock_api = Mock()
+        def refresh():
+            client._api = new_api
+            return True
 
-        # 使用 spec 創建快照數據，只包含 close 屬性
-        snapshot_data = Mock(spec=['close'])
-        snapshot_data.close = 150.5
-        # volume 和 open_interest 不在 spec 中，hasattr 會返回 False
+        client.refresh_connection.side_effect = refresh
 
-        mock_api.snapshots.return_value = [snapshot_data]
-        mock_client._api = mock_api
+        data, failed = data_source._fetch_snapshots(self.create_contracts(4))
 
-        data_source = ShioajiOptionDataSource(mock_client)
+        assert failed == 0
+        assert len(data) == 4
+        assert client.refresh_connection.call_count == 1
+        assert data_source._api is new_api
 
-        contract = Mock()
-        contract.code = 'TXO202512C23000'
-        contract.strike_price = 23000
-        contract.option_right = 'Call'
-        contract.delivery_date = '2025-12-17'
+    def test_unparseable_contracts_counted_as_failed(self):
+        contracts = self.create_contracts(2)
+        contracts[1].code = '2330O202512C600'
+        data_source, _ = self.create_data_source(_echo_snapshots)
 
-        result = data_source._get_contract_snapshot(contract, date(2024, 12, 15))
+        data, failed = data_source._fetch_snapshots(contracts)
 
-        # 應處理缺失屬性
-        assert result is not None
-        assert result['close'] == 150.5
-        assert result['volume'] == 0  # 預設值
-        assert result['open_interest'] is None  # 預設值
+        assert len(data) == 1
+        assert failed == 1
 
-    def test_get_snapshot_api_error(self):
-        """測試 API 錯誤"""
-        mock_client = Mock()
-        mock_api = Mock()
-        mock_api.snapshots.side_effect = Exception("API Error")
-        mock_client._api = mock_api
 
-        data_source = ShioajiOptionDataSource(mock_client)
+def test_stub_client_chain_in_few_requests():
+    """假 API：1000 檔合約只需數次批次請求"""
+    client = StubShioajiOptionClient(expiries=5, strikes=100, latency=0, per_contract_latency=0)
+    data_source = ShioajiOptionDataSource(client, chunk_size=200, rate_limiter=RateLimiter(1000, 1.0))
 
-        contract = Mock()
-        contract.code = 'TXO202512C23000'
-        contract.strike_price = 23000
-        contract.option_right = 'Call'
-        contract.delivery_date = '2025-12-17'
+    result = data_source.get_option_chain('TX', date(2025, 1, 2))
 
-        result = data_source._get_contract_snapshot(contract, date(2024, 12, 15))
+    assert len(result) == 1000
+    assert client.calls == 5
+    assert set(result['option_type']) == {'CALL', 'PUT'}
 
-        assert result is None
+
+def test_default_rate_limiter_is_shared():
+    """預設與分鐘線同步共用行程內同一個 Shioaji 額度限制器"""
+    first = ShioajiOptionDataSource(Mock())
+    second = ShioajiOptionDataSource(Mock())
+
+    assert first._rate_limiter is second._rate_limiter is get_shioaji_rate_limiter()
 
 
 class TestGetOptionChain:
@@ -435,18 +488,11 @@ class TestGetOptionChain:
         mock_txo.__iter__ = Mock(return_value=iter(contracts))
         mock_api.Contracts.Options.TXO = mock_txo
 
-        # 模擬 snapshot 數據
-        snapshot1 = Mock()
-        snapshot1.close = 150.0
-        snapshot1.volume = 1000
-        snapshot1.open_interest = 5000
-
-        snapshot2 = Mock()
-        snapshot2.close = 130.0
-        snapshot2.volume = 1200
-        snapshot2.open_interest = 6000
-
-        mock_api.snapshots.side_effect = [[snapshot1], [snapshot2]]
+        # 模擬 snapshot 數據（同一批次請求回傳兩檔）
+        mock_api.snapshots.return_value = [
+            _snapshot('TXO202512C23000', close=150.0, volume=1000, open_interest=5000),
+            _snapshot('TXO202512P23000', close=130.0, volume=1200, open_interest=6000),
+        ]
 
         data_source = ShioajiOptionDataSource(mock_client)
         result = data_source.get_option_chain('TX', date(2024, 12, 15))
@@ -456,6 +502,7 @@ class TestGetOptionChain:
         assert 'contract_id' in result.columns
         assert 'close' in result.columns
         assert 'volume' in result.columns
+        assert mock_api.snapshots.call_count == 1
 
     def test_get_option_chain_client_unavailable(self):
         """測試客戶端不可用"""
@@ -504,7 +551,7 @@ class TestGetOptionChain:
         # 所有 snapshot 調用失敗
         mock_api.snapshots.side_effect = Exception("API Error")
 
-        data_source = ShioajiOptionDataSource(mock_client)
+        data_source = ShioajiOptionDataSource(mock_client, retry_delay=0)
         result = data_source.get_option_chain('TX', date(2024, 12, 15))
 
         assert isinstance(result, pd.DataFrame)
@@ -527,29 +574,19 @@ class TestGetOptionChain:
         mock_txo.__iter__ = Mock(return_value=iter(contracts))
         mock_api.Contracts.Options.TXO = mock_txo
 
-        # 第一個成功，第二個失敗，第三個成功
-        snapshot1 = Mock()
-        snapshot1.close = 150.0
-        snapshot1.volume = 1000
-        snapshot1.open_interest = 5000
-
-        snapshot3 = Mock()
-        snapshot3.close = 140.0
-        snapshot3.volume = 800
-        snapshot3.open_interest = 4500
-
-        mock_api.snapshots.side_effect = [
-            [snapshot1],
-            Exception("API Error"),
-            [snapshot3]
+        # 第二個合約沒有快照資料
+        mock_api.snapshots.return_value = [
+            _snapshot('TXO202512C23000', close=150.0, volume=1000, open_interest=5000),
+            _snapshot('TXO202512C23100', close=140.0, volume=800, open_interest=4500),
         ]
 
         data_source = ShioajiOptionDataSource(mock_client)
         result = data_source.get_option_chain('TX', date(2024, 12, 15))
 
-        # 應返回 2 個成功的合約
+        # 應返回 2 個成功的合約，失敗數隨結果返回
         assert isinstance(result, pd.DataFrame)
         assert len(result) == 2
+        assert result.attrs['failed_count'] == 1
 
     def test_get_option_chain_contract_list_error(self):
         """測試獲取合約列表失敗"""
@@ -684,14 +721,11 @@ class TestEdgeCases:
         mock_api.Contracts.Options.TXO = mock_txo
 
         # 所有快照都成功
-        snapshot = Mock()
-        snapshot.close = 150.0
-        snapshot.volume = 1000
-        snapshot.open_interest = 5000
-        mock_api.snapshots.return_value = [snapshot]
+        mock_api.snapshots.side_effect = _echo_snapshots
 
-        data_source = ShioajiOptionDataSource(mock_client)
+        data_source = ShioajiOptionDataSource(mock_client, chunk_size=100)
         result = data_source.get_option_chain('TX', date(2024, 12, 15))
 
-        # 應成功處理所有合約
+        # 應成功處理所有合約（兩個批次）
         assert len(result) == 150
+        assert mock_api.snapshots.call_count == 2
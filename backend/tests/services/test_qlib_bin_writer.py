@@ -0,0 +1,143 @@
+"""
+Unit tests for the append-only Qlib bin writer
+"""
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.qlib_bin_writer import QlibBinWriter
+
+
+DATES = pd.bdate_range('2024-01-01', periods=10)
+
+
+def _frame(dates, start=100.0):
+    return pd.DataFrame(
+        {'close': start + np.arange(len(dates), dtype=float), 'volume': 1000.0},
+        index=dates
+    )
+
+
+def _read_bin(writer, instrument, field='close'):
+    data = np.fromfile(writer.feature_path(instrument, field), dtype='<f4')
+    return int(data[0]), data[1:]
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = QlibBinWriter(tmp_path, freq='day')
+    writer.extend_calendar(DATES[:6])
+    return writer
+
+
+class TestCalendar:
+    def test_append_only(self, writer, tmp_path):
+        assert writer.extend_calendar(DATES) == 4
+        assert writer.extend_calendar(DATES[:3]) == 0
+
+        lines = (tmp_path / 'calendars' / 'day.txt').read_text().split()
+        assert lines == list(DATES.strftime('%Y-%m-%d'))
+        assert QlibBinWriter(tmp_path).calendar.equals(DATES)
+
+    def test_stale_writer_does_not_overwrite_other_writers_stamps(self, writer, tmp_path):
+        other = QlibBinWriter(tmp_path, freq='day')
+        writer.extend_calendar(DATES[:8])
+
+        assert other.extend_calendar(DATES) == 2
+        assert QlibBinWriter(tmp_path).calendar.equals(DATES)
+
+    def test_stale_writer_sees_stamps_added_elsewhere(self, writer, tmp_path):
+        other = QlibBinWriter(tmp_path, freq='day')
+        writer.extend_calendar(DATES)
+
+        assert other.write_instrument('2330', _frame(DATES[6:8])) == {'slots': 2, 'dropped': 0}
+        assert other.last_timestamp('2330') == DATES[7]
+
+
+class TestWriteInstrument:
+    def test_first_write_starts_at_first_position(self, writer):
+        writer.write_instrument('2330', _frame(DATES[2:5]))
+
+        start, values = _read_bin(writer, '2330')
+        assert start == 2
+        np.testing.assert_allclose(values, [100, 101, 102])
+        assert writer.last_timestamp('2330') == DATES[4]
+
+    def test_append_and_gap_fill_keeps_prefix(self, writer):
+        writer.write_instrument('2330', _frame(DATES[:3]))
+        path = writer.feature_path('2330', 'close')
+        prefix = path.read_bytes()
+        writer.extend_calendar(DATES)
+
+        writer.write_instrument('2330', _frame(DATES[5:7], start=200))
+
+        start, values = _read_bin(writer, '2330')
+        assert start == 0
+        assert path.read_bytes()[:len(prefix)] == prefix
+        np.testing.assert_allclose(values, [100, 101, 102, np.nan, np.nan, 200, 201])
+        assert writer.stats['appends'] == 2  # close + volume
+
+    def test_overlapping_tail_is_overwritten(self, writer):
+        writer.write_instrument('2330', _frame(DATES[:4]))
+
+        writer.write_instrument('2330', _frame(DATES[3:6], start=500))
+
+        _, values = _read_bin(writer, '2330')
+        np.testing.assert_allclose(values, [100, 101, 102, 500, 501, 502])
+
+    def test_data_before_file_start_rewrites(self, writer):
+        writer.write_instrument('2330', _frame(DATES[3:5]))
+
+        writer.write_instrument('2330', _frame(DATES[1:2], start=50))
+
+        start, values = _read_bin(writer, '2330')
+        assert start == 1
+        np.testing.assert_allclose(values, [50, np.nan, 100, 101])
+
+    def test_dates_outside_calendar_are_dropped(self, writer):
+        result = writer.write_instrument('2330', _frame(DATES[4:8]))
+
+        assert result == {'slots': 2, 'dropped': 2}
+
+    def test_strict_rejects_dates_outside_calendar(self, writer):
+        with pytest.raises(ValueError):
+            writer.write_instrument('2330', _frame(DATES[4:8]), strict=True)
+
+        assert not writer.feature_path('2330', 'close').exists()
+
+
+class TestCrashRecovery:
+    def test_interrupted_in_place_write_is_rolled_back(self, writer):
+        writer.write_instrument('2330', _frame(DATES[:4]))
+        path = writer.feature_path('2330', 'close')
+        before = path.read_bytes()
+
+        # 模擬原地寫入途中中斷：journal 已寫入，bin 檔尾段被部分修改並延長
+        offset = 4 * 3
+        journal = path.with_name(path.name + '.wal')
+        journal.write_bytes(struct.pack('<q', offset) + before[offset:])
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write(b'\x00' * 14)
+
+        assert writer.recover() == 1
+        assert path.read_bytes() == before
+        assert not journal.exists()
+
+
+def test_update_instruments(writer, tmp_path):
+    inst_dir = tmp_path / 'instruments'
+    inst_dir.mkdir()
+    (inst_dir / 'tw50.txt').write_text("2330\t2024-01-01\t2024-01-02\n")
+
+    writer.write_instrument('2330', _frame(DATES[:5]))
+    writer.write_instrument('2317', _frame(DATES[2:4]))
+    writer.update_instruments()
+
+    assert (inst_dir / 'all.txt').read_text().splitlines() == [
+        "2317\t2024-01-03\t2024-01-04",
+        "2330\t2024-01-01\t2024-01-05",
+    ]
+    assert (inst_dir / 'tw50.txt').read_text().splitlines() == ["2330\t2024-01-01\t2024-01-05"]
@@ -0,0 +1,171 @@
+"""
+Unit tests for QlibDataAdapter.get_qlib_features_panel and FactorEvaluationService._load_factor_panel
+"""
+import zlib
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.qlib_config import qlib_config
+from app.services.factor_evaluation_service import FactorEvaluationService
+from app.services.factor_store import FactorStore, qlib_source_files
+from app.services.qlib_data_adapter import QlibDataAdapter
+
+
+DATES = pd.bdate_range('2024-01-01', periods=20, name='datetime')
+START, END = '2024-01-01', '2024-01-26'
+
+
+def _values(instrument, field):
+    """確定性的假表達式值：由標的與表達式決定"""
+    return zlib.crc32(f'{instrument.lower()}|{field}'.encode()) % 1000 + np.arange(len(DATES), dtype=float)
+
+
+class FakeFeatures:
+    """模擬 D.features：回傳 (instrument, datetime) MultiIndex，標的名稱為小寫（與 Qlib 目錄名稱相同）"""
+
+    def __init__(self):
+        self.calls = []
+        self.error = None
+
+    def __call__(self, instruments, fields, start_time=None, end_time=None, freq='day'):
+        self.calls.append((list(instruments), list(fields)))
+        if self.error:
+            raise self.error
+        frames = {
+            instrument.lower(): pd.DataFrame(
+                {field: _values(instrument, field) for field in fields}, index=DATES
+            )
+            for instrument in instruments
+        }
+        return pd.concat(frames, names=['instrument', 'datetime'])
+
+
+@pytest.fixture
+def qlib_dir(tmp_path):
+    """本地 Qlib 資料：2330 與 00631L 有 close.day.bin，9999 沒有"""
+    root = tmp_path / 'qlib'
+    (root / 'calendars').mkdir(parents=True)
+    (root / 'calendars' / 'day.txt').write_text('\n'.join(d.strftime('%Y-%m-%d') for d in DATES))
+    for instrument in ['2330', '00631l']:
+        close_bin = root / 'features' / instrument / 'close.day.bin'
+        close_bin.parent.mkdir(parents=True)
+        np.concatenate([[0], np.arange(len(DATES))]).astype('<f4').tofile(close_bin)
+    with patch.object(qlib_config, 'get_data_path', return_value=str(root)):
+        yield root
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FactorStore(str(tmp_path / 'store'), max_bytes=10 * 1024 * 1024)
+    with patch('app.services.qlib_data_adapter.factor_store', store):
+        yield store
+
+
+@pytest.fixture
+def features():
+    fake = FakeFeatures()
+    with patch('qlib.data.D', SimpleNamespace(features=fake)):
+        yield fake
+
+
+@pytest.fixture
+def adapter(qlib_dir, store, features):
+    adapter = QlibDataAdapter.__new__(QlibDataAdapter)
+    adapter.qlib_initialized = True
+    return adapter
+
+
+class TestFactorStoreKeys:
+    """快取以單一表達式為鍵，不同批次組合可共用"""
+
+    def test_expressions_reused_across_batches(self, adapter, features):
+        first = adapter.get_qlib_features_panel(['2330'], START, END, ['Mean($close, 5)', '$close'])
+        second = adapter.get_qlib_features_panel(['2330'], START, END, ['Std($close, 20)', 'Mean($close, 5)'])
+
+        assert features.calls == [
+            (['2330'], ['Mean($close, 5)', '$close']),
+            (['2330'], ['Std($close, 20)']),
+        ]
+        np.testing.assert_allclose(second['Mean($close, 5)']['2330'], first['Mean($close, 5)']['2330'])
+
+        adapter.get_qlib_features_panel(['2330'], START, END, ['$close', 'Std($close, 20)'])
+        assert len(features.calls) == 2
+
+    def test_same_key_as_single_expression_lookup(self, adapter, store):
+        adapter.get_qlib_features_panel(['2330'], START, END, ['Mean($close, 5)', '$close'])
+
+        cached = store.get('day|$close', '2330', START, END, qlib_source_files('2330', ['$close']))
+
+        assert list(cached.columns) == ['$close']
+        np.testing.assert_allclose(cached['$close'], _values('2330', '$close'))
+
+
+class TestFeaturesPanel:
+    """快取命中 / 未命中分流、標的名稱對應與寬表組裝"""
+
+    def test_only_uncached_stocks_are_computed(self, adapter, features):
+        adapter.get_qlib_features_panel(['2330'], START, END, ['$close'])
+
+        panel = adapter.get_qlib_features_panel(['2330', '00631L', '9999'], START, END, ['$close'])
+
+        # 9999 沒有本地資料，2330 命中快取，只有 00631L 呼叫 D.features
+        assert features.calls[-1] == (['00631L'], ['$close'])
+        assert list(panel['$close'].columns) == ['2330', '00631L']
+
+    def test_wide_table_uses_requested_symbols(self, adapter):
+        panel = adapter.get_qlib_features_panel(
+            ['00631L', '2330'], START, END, ['Mean($close, 5)', '$close', '$close']
+        )
+
+        assert list(panel) == ['Mean($close, 5)', '$close']
+        close = panel['$close']
+        # D.features 回傳小寫名稱，欄位仍為呼叫端的代碼並依 symbols 順序
+        assert list(close.columns) == ['00631L', '2330']
+        pd.testing.assert_index_equal(close.index, DATES)
+        np.testing.assert_allclose(close['00631L'], _values('00631L', '$close'))
+        np.testing.assert_allclose(panel['Mean($close, 5)']['2330'], _values('2330', 'Mean($close, 5)'))
+
+    def test_chunks(self, adapter, features):
+        panel = adapter.get_qlib_features_panel(['2330', '00631L'], START, END, ['$close'], chunk_size=1)
+
+        assert [call[0] for call in features.calls] == [['2330'], ['00631L']]
+        assert list(panel['$close'].columns) == ['2330', '00631L']
+
+    def test_no_local_data(self, adapter, features):
+        assert adapter.get_qlib_features_panel(['9999'], START, END, ['$close']) == {}
+        assert features.calls == []
+
+    def test_qlib_not_initialized(self, adapter):
+        adapter.qlib_initialized = False
+        assert adapter.get_qlib_features_panel(['2330'], START, END, ['$close']) == {}
+
+
+class TestLoadFactorPanel:
+    """FactorEvaluationService._load_factor_panel 以同一次呼叫取得因子與收盤價"""
+
+    @pytest.fixture
+    def service(self, adapter):
+        service = FactorEvaluationService.__new__(FactorEvaluationService)
+        service.qlib_adapter = adapter
+        return service
+
+    def test_factor_and_close(self, service, features):
+        factor, close = service._load_factor_panel('Mean($close, 5)', ['2330', '00631L'], START, END)
+
+        assert features.calls == [(['2330', '00631L'], ['Mean($close, 5)', '$close'])]
+        assert list(factor.columns) == list(close.columns) == ['2330', '00631L']
+        np.testing.assert_allclose(factor['2330'], _values('2330', 'Mean($close, 5)'))
+        np.testing.assert_allclose(close['00631L'], _values('00631L', '$close'))
+
+    def test_no_data(self, service):
+        assert service._load_factor_panel('$close', ['9999'], START, END) == (None, None)
+
+    def test_syntax_error_propagates(self, service, features):
+        features.error = SyntaxError('bad expression')
+
+        with pytest.raises(SyntaxError):
+            service._load_factor_panel('Bad(', ['2330'], START, END)
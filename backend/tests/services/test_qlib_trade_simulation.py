@@ -0,0 +1,101 @@
+"""
+Parity tests for QlibBacktestEngine trade simulation
+
+向量化模擬（_simulate_trading_vectorized）必須與逐筆迴圈（_simulate_trading_loop）
+產生完全相同的交易記錄、資金曲線與期末現金
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock
+
+from app.services.qlib_backtest_engine import QlibBacktestEngine
+
+
+@pytest.fixture
+def engine():
+    return QlibBacktestEngine(Mock())
+
+
+def _make_dataset(n, seed=0, freq='D', dtype=np.float64):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    index = pd.date_range('2024-01-01', periods=n, freq=freq)
+    return pd.DataFrame({'$close': close.astype(dtype)}, index=index)
+
+
+def _assert_parity(engine, signals, dataset, initial_capital=1_000_000):
+    expected = engine._simulate_trading_loop(signals, dataset, initial_capital, '2330')
+    actual = engine._simulate_trading_vectorized(signals, dataset, initial_capital, '2330')
+
+    assert actual[0] == expected[0]
+    assert actual[1] == expected[1]
+    assert actual[2] == expected[2]
+    return actual
+
+
+class TestSimulationParity:
+    """向量化與逐筆迴圈一致性"""
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_random_signals(self, engine, seed):
+        dataset = _make_dataset(500, seed=seed)
+        rng = np.random.default_rng(seed + 100)
+        signals = pd.Series(rng.choice([-1, 0, 0, 0, 1], size=500), index=dataset.index)
+
+        trades, equity_curve, _ = _assert_parity(engine, signals, dataset)
+
+        assert len(equity_curve) == 500
+        assert trades
+
+    def test_float32_minute_data(self, engine):
+        dataset = _make_dataset(2000, seed=3, freq='min', dtype=np.float32)
+        rng = np.random.default_rng(9)
+        signals = pd.Series(rng.choice([-1, 0, 1], size=2000).astype(float), index=dataset.index)
+
+        _assert_parity(engine, signals, dataset)
+
+    def test_final_settlement_and_last_bar_buy(self, engine):
+        dataset = _make_dataset(10)
+        signals = pd.Series(0, index=dataset.index)
+        signals.iloc[[2, 9]] = [1, 1]
+
+        trades, _, _ = _assert_parity(engine, signals, dataset)
+
+        # 第 2 根買入後未賣出 → 期末結算；第 9 根的買入信號因持倉中而忽略
+        assert [t['action'] for t in trades] == ['BUY', 'SELL']
+        assert trades[-1]['date'] == '2024-01-10'
+
+    def test_insufficient_cash_skips_buy(self, engine):
+        dataset = pd.DataFrame(
+            {'$close': [500.0, 2000.0, 800.0, 900.0]},
+            index=pd.date_range('2024-01-01', periods=4, freq='D')
+        )
+        signals = pd.Series([0, 1, 1, -1], index=dataset.index)
+
+        trades, _, _ = _assert_parity(engine, signals, dataset, initial_capital=1000)
+
+        assert trades[0]['date'] == '2024-01-03'
+        assert trades[0]['shares'] == 1
+
+    def test_partial_signal_index_and_no_trades(self, engine):
+        dataset = _make_dataset(50)
+        signals = pd.Series([1, -1], index=dataset.index[[10, 20]])
+        _assert_parity(engine, signals, dataset)
+
+        trades, equity_curve, cash = _assert_parity(engine, pd.Series(dtype=float), dataset)
+        assert trades == []
+        assert cash == 1_000_000
+        assert {e['equity'] for e in equity_curve} == {1_000_000.0}
+
+    def test_dispatch_matches_loop(self, engine):
+        dataset = _make_dataset(20)
+        signals = pd.Series(0, index=dataset.index)
+        signals.iloc[[3, 8]] = [1, -1]
+
+        vectorized = engine._simulate_trading(signals, dataset, 1_000_000, '2330')
+        engine.use_vectorized_simulation = False
+        loop = engine._simulate_trading(signals, dataset, 1_000_000, '2330')
+
+        assert vectorized == loop
+        assert len(vectorized[0]) == 2
@@ -0,0 +1,133 @@
+"""
+Unit tests for incremental strategy signal detection
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pandas as pd
+
+from app.services.strategy_signal_detector import StrategySignalDetector
+
+
+def _bars(days=3, last_close=101.0):
+    index = pd.date_range('2025-01-02', periods=days, freq='D')
+    closes = [100.0] * (days - 1) + [last_close]
+    return pd.DataFrame({
+        'open': closes, 'high': closes, 'low': closes, 'close': closes,
+        'volume': [1000] * days,
+    }, index=index)
+
+
+def _strategy(**overrides):
+    fields = dict(
+        id=1, user_id=7, engine_type='backtrader',
+        code='class MA(bt.Strategy): pass', parameters={'stocks': ['2330']},
+    )
+    fields.update(overrides)
+    strategy = Mock(**fields)
+    strategy.name = 'MA'  # Mock(name=...) 不會設定 name 屬性
+    return strategy
+
+
+def _signal(data, signal_type='BUY'):
+    return [{
+        'stock_id': '2330',
+        'signal_type': signal_type,
+        'price': float(data['close'].iloc[-1]),
+        'datetime': data.index[-1].to_pydatetime(),
+    }]
+
+
+@pytest.fixture
+def fake_cache():
+    """以字典模擬 Redis 快取"""
+    store = {}
+    with patch('app.services.strategy_signal_detector.cache') as mock_cache:
+        mock_cache.get.side_effect = store.get
+        mock_cache.set.side_effect = lambda key, value, expiry=None: store.__setitem__(key, value)
+        yield store
+
+
+@pytest.fixture
+def detector():
+    detector = StrategySignalDetector(Mock())
+    with patch.object(detector, '_build_strategy_class', return_value=object), \
+            patch.object(detector, '_detect_signals_for_stock') as run:
+        run.side_effect = lambda strategy_class, stock_id, data: _signal(data)
+        yield detector, run
+
+
+class TestIncrementalDetection:
+    """測試檢查點沿用與失效"""
+
+    def test_unchanged_bars_reuse_checkpoint(self, detector, fake_cache):
+        detector, run = detector
+        stock_data = {'2330': _bars()}
+
+        first = detector.detect_signals_for_strategy(_strategy(), stock_data=stock_data)
+        second = detector.detect_signals_for_strategy(_strategy(), stock_data=stock_data)
+
+        assert run.call_count == 1
+        assert detector.stats == {'replayed': 1, 'reused': 1}
+        assert second == first
+        assert second[0]['datetime'] == datetime(2025, 1, 4)
+        assert second[0]['strategy_id'] == 1 and second[0]['user_id'] == 7
+
+    def test_new_bar_replays(self, detector, fake_cache):
+        detector, run = detector
+
+        detector.detect_signals_for_strategy(_strategy(), stock_data={'2330': _bars()})
+        detector.detect_signals_for_strategy(_strategy(), stock_data={'2330': _bars(days=4)})
+        detector.detect_signals_for_strategy(
+            _strategy(), stock_data={'2330': _bars(days=4, last_close=99.0)}
+        )
+
+        assert run.call_count == 3
+
+    def test_code_change_invalidates_checkpoint(self, detector, fake_cache):
+        detector, run = detector
+        stock_data = {'2330': _bars()}
+
+        detector.detect_signals_for_strategy(_strategy(), stock_data=stock_data)
+        detector.detect_signals_for_strategy(
+            _strategy(code='class MA2(bt.Strategy): pass'), stock_data=stock_data
+        )
+
+        assert run.call_count == 2
+
+    def test_failed_run_is_not_checkpointed(self, detector, fake_cache):
+        detector, run = detector
+        run.side_effect = None
+        run.return_value = None
+        stock_data = {'2330': _bars()}
+
+        assert detector.detect_signals_for_strategy(_strategy(), stock_data=stock_data) == []
+        detector.detect_signals_for_strategy(_strategy(), stock_data=stock_data)
+
+        assert run.call_count == 2
+        assert fake_cache == {}
+
+
+class TestFilterDuplicateSignals:
+    """測試批次去重"""
+
+    def test_filters_recent_and_in_batch_duplicates(self):
+        detector = StrategySignalDetector(Mock())
+        signals = [
+            {'strategy_id': 1, 'stock_id': '2330', 'signal_type': 'BUY'},
+            {'strategy_id': 1, 'stock_id': '2330', 'signal_type': 'SELL'},
+            {'strategy_id': 1, 'stock_id': '2330', 'signal_type': 'SELL'},
+            {'strategy_id': 2, 'stock_id': '2330', 'signal_type': 'BUY'},
+        ]
+
+        with patch(
+            'app.services.strategy_signal_detector.StrategySignalRepository.get_recent_signal_keys',
+            return_value={(1, '2330', 'BUY')}
+        ) as lookup:
+            fresh, duplicates = detector.filter_duplicate_signals(signals)
+
+        lookup.assert_called_once()
+        assert lookup.call_args.kwargs['strategy_ids'] == [1, 2]
+        assert fresh == [signals[1], signals[3]]
+        assert duplicates == [signals[0], signals[2]]
@@ -0,0 +1,46 @@
+"""
+Unit tests for the backtest sweep chunk task
+
+測試參數掃描批次任務的逾時處理
+"""
+from unittest.mock import MagicMock, patch
+
+from celery.exceptions import SoftTimeLimitExceeded
+
+from app.tasks.backtest import run_backtest_sweep_chunk
+
+
+def _results_then_timeout(results):
+    def iter_results(params_list, max_workers=1):
+        yield from results
+        raise SoftTimeLimitExceeded()
+    return iter_results
+
+
+class TestRunBacktestSweepChunk:
+    """測試 run_backtest_sweep_chunk 任務"""
+
+    @patch('app.services.backtest_sweep.ParameterSweepRunner')
+    @patch('app.services.backtest_sweep.SweepResultStore')
+    def test_soft_time_limit_records_unrun_combinations(self, MockStore, MockRunner):
+        store = MockStore.return_value
+        store.get_meta.side_effect = [
+            {'rank_by': 'sharpe_ratio', 'total': 3},
+            {'total': 3, 'completed': 1, 'failed': 2},
+        ]
+        store.load_snapshot.return_value = MagicMock()
+        MockRunner.return_value.iter_results.side_effect = _results_then_timeout([
+            {'params': {'fast': 5}, 'metrics': {'sharpe_ratio': 1.0}},
+        ])
+
+        combos = [[0, {'fast': 5}], [1, {'fast': 10}], [2, {'fast': 20}]]
+        result = run_backtest_sweep_chunk.run('sweep-1', combos)
+
+        assert result['completed'] == 1
+        assert result['failed'] == 2
+        recorded = [call.args for call in store.add_result.call_args_list]
+        assert [args[0] for args in recorded] == [0, 1, 2]
+        assert recorded[1][1]['params'] == {'fast': 10}
+        assert 'error' in recorded[1][1] and 'metrics' not in recorded[1][1]
+        store.update_meta.assert_called_once()
+        assert store.update_meta.call_args.kwargs['status'] == 'completed'
@@ -97,11 +97,20 @@ class TestCacheKeyCollision:
     def test_md5_hash_in_cache_key(self):
         """验证缓存键使用 MD5 哈希"""
         from app.utils.cache import cached_method
-        import inspect
+        import hashlib
+        import json
+
+        class Service:
+            @cached_method(key_prefix="prices")
+            def get_prices(self, stock_id, days=30):
+                return stock_id
 
-        source = inspect.getsource(cached_method)
+        with patch('app.utils.cache.cache') as mock_cache:
+            Service().get_prices("2330", days=5)
 
-        assert "md5" in source.lower(), \
+        cache_key = mock_cache.get_or_set.call_args.args[0]
+        key_json = json.dumps({'args': ["'2330'"], 'kwargs': {'days': '5'}}, sort_keys=True)
+        assert cache_key == f"prices:{hashlib.md5(key_json.encode()).hexdigest()[:16]}", \
             "cached_method should use MD5 hash for cache keys"
 
     def test_cache_key_uniqueness(self):
@@ -0,0 +1,64 @@
+"""
+交易日曆模組測試
+
+以逐分鐘迴圈的參考實作驗證向量化生成結果
+"""
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from app.core import trading_calendar
+from app.core.trading_calendar import SESSION_FUTURES, SESSION_STOCK, trading_minutes
+
+
+def _reference(start_date, end_date, windows):
+    minutes = []
+    current = start_date
+    while current <= end_date:
+        for (start_h, start_m), (end_h, end_m) in windows:
+            t = datetime.combine(current, datetime.min.time()).replace(hour=start_h, minute=start_m)
+            end = t.replace(hour=end_h, minute=end_m)
+            while t <= end:
+                minutes.append(t)
+                t += timedelta(minutes=1)
+        current += timedelta(days=1)
+    return pd.DatetimeIndex(minutes)
+
+
+def test_stock_session_matches_loop():
+    result = trading_minutes(date(2025, 1, 1), date(2025, 1, 10), SESSION_STOCK)
+
+    assert len(result) == 10 * 271
+    assert result.equals(_reference(date(2025, 1, 1), date(2025, 1, 10), [((9, 0), (13, 30))]))
+
+
+def test_futures_session_matches_loop():
+    result = trading_minutes('2025-01-01', '2025-01-03', SESSION_FUTURES)
+
+    expected = _reference(
+        date(2025, 1, 1), date(2025, 1, 3),
+        [((0, 0), (5, 0)), ((8, 45), (13, 45)), ((15, 0), (23, 59))]
+    )
+    assert len(result) == 3 * 1142
+    assert result.equals(expected)
+    assert result.is_monotonic_increasing
+
+
+def test_weekends_and_holidays_excluded():
+    # 2025-01-04/05 為週末
+    result = trading_minutes(
+        date(2025, 1, 1), date(2025, 1, 7), SESSION_STOCK,
+        weekdays_only=True, holidays=['2025-01-02']
+    )
+
+    assert sorted(set(result.date)) == [date(2025, 1, 1), date(2025, 1, 3), date(2025, 1, 6), date(2025, 1, 7)]
+
+
+def test_indexes_are_cached():
+    trading_calendar.clear_cache()
+
+    first = trading_minutes(date(2024, 1, 1), date(2024, 12, 31), SESSION_FUTURES)
+    second = trading_minutes(datetime(2024, 1, 1), '2024-12-31', SESSION_FUTURES)
+
+    assert first is second
+    assert trading_calendar._trading_minutes.cache_info().hits == 1
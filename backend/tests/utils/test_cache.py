@@ -0,0 +1,160 @@
+"""
+兩層快取測試
+
+NearCache / CacheStats 為純記憶體邏輯；get_or_set 與跨行程失效需要 Redis
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.utils.cache import CacheStats, NearCache, RedisCache, cache
+
+
+class TestNearCache:
+    """行程內 LRU 快取"""
+
+    def test_lru_eviction(self):
+        near = NearCache(max_items=2, ttl=60)
+        near.set("a", "json", b"1")
+        near.set("b", "json", b"2")
+        near.get("a")  # a 變為最近使用
+        near.set("c", "json", b"3")
+
+        assert near.get("a") == ("json", b"1")
+        assert near.get("b") is None
+        assert len(near) == 2
+
+    def test_ttl_capped_by_near_limit(self):
+        near = NearCache(max_items=10, ttl=0.05)
+        near.set("a", "json", b"1", ttl=3600)
+
+        time.sleep(0.1)
+        assert near.get("a") is None
+
+    def test_large_values_skipped(self):
+        near = NearCache(max_items=10, ttl=60, max_value_bytes=4)
+
+        assert near.set("a", "pickle", b"12345") is False
+        assert near.get("a") is None
+
+    def test_discard_pattern(self):
+        near = NearCache(max_items=10, ttl=60)
+        for key in ("strategy:list:1", "strategy:list:12", "strategy:detail:1"):
+            near.set(key, "json", b"1")
+
+        near.discard_pattern("strategy:list:1*")
+
+        assert near.get("strategy:list:1") is None
+        assert near.get("strategy:list:12") is None
+        assert near.get("strategy:detail:1") is not None
+
+
+def test_stats_snapshot():
+    stats = CacheStats()
+    stats.incr("near_hits", 3)
+    stats.incr("misses")
+    stats.observe("redis_get", 0.002)
+    stats.observe("redis_get", 0.004)
+
+    snapshot = stats.snapshot()
+
+    assert snapshot["hit_rate"] == pytest.approx(0.75)
+    assert snapshot["redis_get_count"] == 2
+    assert snapshot["redis_get_avg_ms"] == pytest.approx(3.0)
+
+
+def test_early_refresh_probability():
+    # 重算耗時遠小於剩餘 TTL 時幾乎不會提早刷新，接近過期時幾乎必定刷新
+    far = sum(RedisCache._should_refresh_early(600_000, 100, 1.0) for _ in range(1000))
+    near = sum(RedisCache._should_refresh_early(10, 1000, 1.0) for _ in range(1000))
+
+    assert far == 0
+    assert near > 950
+    assert not RedisCache._should_refresh_early(10, 1000, 0)
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(not cache.is_available(), reason="Redis not available")
+class TestGetOrSet:
+    """需要 Redis 的防擊穿與失效測試"""
+
+    def test_single_flight_across_threads(self):
+        key = "test:cache:single_flight"
+        cache.delete(key)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"value": 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_set(key, compute, expiry=60)))
+            for _ in range(8)
+        ]
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            assert len(calls) == 1
+            assert results == [{"value": 42}] * 8
+        finally:
+            cache.delete(key)
+
+    def test_near_cache_hit_and_cross_process_invalidation(self):
+        key = "test:cache:near"
+        other = RedisCache()  # 模擬另一個行程
+        try:
+            cache.set(key, {"v": 1}, expiry=60)
+            assert cache.get(key) == {"v": 1}
+
+            before = cache.stats.snapshot()["near_hits"]
+            assert cache.get(key) == {"v": 1}
+            assert cache.stats.snapshot()["near_hits"] == before + 1
+
+            other.set(key, {"v": 2}, expiry=60)
+            time.sleep(0.3)  # 等待 pub/sub 失效通知
+            assert cache.get(key) == {"v": 2}
+        finally:
+            cache.delete(key)
+
+    def test_returned_values_are_independent(self):
+        key = "test:cache:independent"
+        try:
+            cache.set(key, {"items": [1, 2]}, expiry=60)
+            cache.get(key)["items"].append(3)
+
+            assert cache.get(key) == {"items": [1, 2]}
+        finally:
+            cache.delete(key)
+
+    def test_invalidate_tags_only_removes_tagged_keys(self):
+        keys = ["test:cache:tag:1", "test:cache:tag:10", "test:cache:tag:other"]
+        try:
+            cache.set(keys[0], {"v": 1}, expiry=60, tags=["test:user:1"])
+            cache.set(keys[1], {"v": 10}, expiry=60, tags=["test:user:10"])
+            cache.set(keys[2], {"v": 0}, expiry=60, tags=["test:user:1", "test:all"])
+
+            assert cache.invalidate_tags("test:user:1") == 2
+
+            assert cache.get(keys[0]) is None
+            assert cache.get(keys[2]) is None
+            assert cache.get(keys[1]) == {"v": 10}
+            assert cache.invalidate_tags("test:user:1") == 0
+        finally:
+            for key in keys:
+                cache.delete(key)
+            cache.invalidate_tags("test:user:10", "test:all")
+
+    def test_clear_pattern_across_scan_batches(self):
+        keys = [f"test:cache:scan:{i}" for i in range(1200)]
+        for key in keys:
+            cache.set(key, 1, expiry=60)
+
+        assert cache.clear_pattern("test:cache:scan:*") == len(keys)
+        assert cache.get(keys[0]) is None
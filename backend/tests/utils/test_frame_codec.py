@@ -0,0 +1,84 @@
+"""
+DataFrame 欄式快取編碼測試
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.frame_codec import (
+    UnsupportedFrameError,
+    decode_frame,
+    encode_frame,
+    is_frame_payload,
+)
+
+
+def _ohlcv(days=2500):
+    index = pd.bdate_range("2015-01-01", periods=days, name="date")
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(days).cumsum()
+    return pd.DataFrame({
+        "open": close + 0.1,
+        "high": close + 1.0,
+        "low": close - 1.0,
+        "close": close,
+        "volume": rng.integers(1_000, 1_000_000, days),
+    }, index=index)
+
+
+class TestRoundTrip:
+    def test_ohlcv_frame(self):
+        df = _ohlcv()
+
+        payload = encode_frame(df)
+        result = decode_frame(payload)
+
+        assert is_frame_payload(payload)
+        pd.testing.assert_frame_equal(result, df, check_freq=False)
+
+    def test_compressed_blocks(self):
+        df = pd.DataFrame({"flag": np.zeros(100_000, dtype=np.int64)})
+
+        payload = encode_frame(df, compress_threshold=1024)
+
+        assert len(payload) < df.memory_usage(index=False).sum() / 10
+        pd.testing.assert_frame_equal(decode_frame(payload), df)
+
+    def test_series_multiindex_and_mixed_columns(self):
+        index = pd.MultiIndex.from_product(
+            [["2330", "2317"], pd.date_range("2024-01-01", periods=3, tz="Asia/Taipei")],
+            names=["instrument", "datetime"],
+        )
+        series = pd.Series(np.arange(6, dtype=np.float32), index=index, name="$close")
+        df = pd.DataFrame({
+            "name": ["台積電", None, "鴻海", "x", "y", "z"],
+            "ok": [True, False, True, True, False, True],
+            "ts": pd.date_range("2024-01-01", periods=6, tz="UTC"),
+        }, index=index)
+
+        pd.testing.assert_series_equal(decode_frame(encode_frame(series)), series)
+        pd.testing.assert_frame_equal(decode_frame(encode_frame(df)), df)
+
+    def test_empty_frame(self):
+        df = pd.DataFrame({"close": pd.Series([], dtype=float)})
+
+        pd.testing.assert_frame_equal(decode_frame(encode_frame(df)), df)
+
+    def test_decoded_frame_is_writable_and_independent(self):
+        payload = encode_frame(_ohlcv(10))
+
+        first = decode_frame(payload)
+        first.iloc[0, 0] = -1.0
+
+        assert decode_frame(payload).iloc[0, 0] != -1.0
+
+
+@pytest.mark.parametrize("obj", [
+    pd.DataFrame({"c": pd.Categorical(["a", "b"])}),
+    pd.DataFrame({"c": [{"nested": 1}, {"nested": 2}]}),
+    pd.DataFrame({("a", "b"): [1, 2]}),
+])
+def test_unsupported_values_raise(obj):
+    with pytest.raises(UnsupportedFrameError):
+        encode_frame(obj)
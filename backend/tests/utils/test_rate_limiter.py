@@ -0,0 +1,37 @@
+"""
+速率限制器測試
+"""
+
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.utils import rate_limiter
+from app.utils.rate_limiter import SHIOAJI_RATE_LIMIT, RateLimiter, get_shioaji_rate_limiter
+
+
+def test_rate_limiter_window():
+    limiter = RateLimiter(max_calls=3, period=0.1)
+
+    t0 = time.monotonic()
+    for _ in range(7):
+        limiter.acquire()
+
+    # 7 次呼叫需要至少兩個完整時間窗
+    assert time.monotonic() - t0 == pytest.approx(0.2, abs=0.08)
+
+
+class TestSharedShioajiRateLimiter:
+    def test_single_instance_per_process(self):
+        limiter = get_shioaji_rate_limiter()
+
+        assert get_shioaji_rate_limiter() is limiter
+        assert (limiter.max_calls, limiter.period) == SHIOAJI_RATE_LIMIT
+
+    def test_recreated_after_fork(self):
+        limiter = get_shioaji_rate_limiter()
+
+        with patch.object(rate_limiter.os, 'getpid', return_value=os.getpid() + 1):
+            assert get_shioaji_rate_limiter() is not limiter